@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: 2023 Mewbot Developers <mewbot@quicksilver.london>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""
+Compares the old str(tuple) content hashes with the BLAKE2b fingerprints now used as keys.
+
+Run from the root of the repo with
+    PYTHONPATH=src python benchmarks/bench_fingerprints.py
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, Callable, Hashable, List
+
+import argparse
+import random
+import string
+import timeit
+import tracemalloc
+
+from mewbot.io.client_for_reddit.io_configs.inputs.utils import GenericRedditTools
+
+
+def make_comments(count: int, body_length: int, seed: int = 0) -> List[Any]:
+    """
+    Make synthetic comments - with bodies of about the given length.
+
+    :param count:
+    :param body_length:
+    :param seed:
+    :return:
+    """
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + "      "
+    return [
+        SimpleNamespace(
+            id=f"{i:x}",
+            body="".join(rng.choices(alphabet, k=rng.randint(body_length // 2, body_length))),
+        )
+        for i in range(count)
+    ]
+
+
+def str_tuple_hash(reddit_comment: Any) -> str:
+    """
+    The content hash used before fingerprints.
+
+    :param reddit_comment:
+    :return:
+    """
+    return str((reddit_comment.id, reddit_comment.body))
+
+
+def key_memory(comments: List[Any], hash_function: Callable[[Any], Hashable]) -> int:
+    """
+    Measure the memory (in bytes) taken by a dict keyed with the hashes of the comments.
+
+    :param comments:
+    :param hash_function:
+    :return:
+    """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    keys = {hash_function(comment): None for comment in comments}
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del keys
+    return after - before
+
+
+def main() -> None:
+    """
+    Run the benchmark and print a small table of results.
+
+    :return:
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100_000, help="Comments to hash")
+    parser.add_argument("--body-length", type=int, default=500, help="Max body length")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats")
+    args = parser.parse_args()
+
+    comments = make_comments(args.count, args.body_length)
+
+    print(f"{args.count} comments - bodies of up to {args.body_length} characters")
+    print(f"{'method':<14}{'ns / hash':>12}{'key bytes / item':>20}")
+    for name, hash_function in (
+        ("str(tuple)", str_tuple_hash),
+        ("blake2b-16", GenericRedditTools.hash_comment),
+    ):
+        best = min(
+            timeit.repeat(
+                lambda hf=hash_function: [hf(comment) for comment in comments],  # type: ignore
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        memory = key_memory(comments, hash_function)
+        print(f"{name:<14}{best / args.count * 1e9:>12.0f}{memory / args.count:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
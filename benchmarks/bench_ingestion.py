@@ -0,0 +1,285 @@
+# SPDX-FileCopyrightText: 2023 Mewbot Developers <mewbot@quicksilver.london>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""
+Measures ingestion end to end - from a (synthetic) reddit, through an input, onto its queue.
+
+Each scenario builds an input on top of SyntheticReddit, calls run() - as the bot would - and
+consumes the queue until every listing has run dry.
+Reported are the events per second, the p50 and p99 latency from an item being handed out by
+a listing to its event being taken off the queue, and the peak memory allocated (measured in a
+separate run - tracemalloc slows everything down).
+Run from the root of the repo with
+    PYTHONPATH=src python benchmarks/bench_ingestion.py
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from synthetic_reddit import (
+    DEFAULT_MIX,
+    SyntheticItemFactory,
+    SyntheticReddit,
+    parse_mix,
+)
+
+from mewbot.io.client_for_reddit.io_configs.inputs.redditors import RedditRedditorInput
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+
+# Short enough that the poll loops never hold the pipeline up
+BENCH_MIN_POLL_INTERVAL: float = 0.001
+BENCH_MAX_POLL_INTERVAL: float = 0.001
+
+# Time with nothing coming off the queue - once the listings are dry - which ends a run
+SETTLE_SECONDS: float = 0.2
+# Time with nothing coming off the queue - before the listings are dry - which means a stream
+# task has died
+STALL_SECONDS: float = 10.0
+
+
+class ScenarioResult(NamedTuple):
+    """
+    The measurements from a single run of a scenario.
+    """
+
+    events: int
+    seconds: float
+    latencies: List[float]
+
+
+def make_subreddit_input(reddit: SyntheticReddit, watch: int) -> RedditSubredditInput:
+    """
+    One comment and one submission stream for each subreddit.
+
+    :param reddit:
+    :param watch: How many subreddits to watch
+    :return:
+    """
+    return RedditSubredditInput(
+        praw_reddit=reddit,
+        subreddits=[f"synthetic_{i}" for i in range(watch)],
+        min_poll_interval=BENCH_MIN_POLL_INTERVAL,
+        max_poll_interval=BENCH_MAX_POLL_INTERVAL,
+    )
+
+
+def make_multireddit_input(reddit: SyntheticReddit, watch: int) -> RedditSubredditInput:
+    """
+    The subreddits combined into multireddit streams.
+
+    :param reddit:
+    :param watch: How many subreddits to watch
+    :return:
+    """
+    return RedditSubredditInput(
+        praw_reddit=reddit,
+        subreddits=[f"synthetic_{i}" for i in range(watch)],
+        multireddit_mode=True,
+        min_poll_interval=BENCH_MIN_POLL_INTERVAL,
+        max_poll_interval=BENCH_MAX_POLL_INTERVAL,
+    )
+
+
+def make_redditor_input(reddit: SyntheticReddit, watch: int) -> RedditRedditorInput:
+    """
+    Profile, comment and submission streams for each redditor.
+
+    :param reddit:
+    :param watch: How many redditors to watch
+    :return:
+    """
+    return RedditRedditorInput(
+        praw_reddit=reddit,
+        redditors=[f"redditor_{i}" for i in range(watch)],
+        min_poll_interval=BENCH_MIN_POLL_INTERVAL,
+        max_poll_interval=BENCH_MAX_POLL_INTERVAL,
+    )
+
+
+def make_overview_input(reddit: SyntheticReddit, watch: int) -> RedditRedditorInput:
+    """
+    A single overview stream for each redditor.
+
+    :param reddit:
+    :param watch: How many redditors to watch
+    :return:
+    """
+    return RedditRedditorInput(
+        praw_reddit=reddit,
+        redditors=[f"redditor_{i}" for i in range(watch)],
+        overview_mode=True,
+        min_poll_interval=BENCH_MIN_POLL_INTERVAL,
+        max_poll_interval=BENCH_MAX_POLL_INTERVAL,
+    )
+
+
+SCENARIOS: Dict[str, Callable[[SyntheticReddit, int], RedditSubredditInput]] = {
+    "subreddits": make_subreddit_input,
+    "multireddit": make_multireddit_input,
+    "redditors": make_redditor_input,
+    "overview": make_overview_input,
+}
+
+
+def event_item(event: Any) -> Optional[Any]:
+    """
+    Return the synthetic item an event was built from.
+
+    :param event:
+    :return:
+    """
+    item = getattr(event, "comment", None)
+    return getattr(event, "submission", None) if item is None else item
+
+
+async def run_scenario(
+    make_input: Callable[[SyntheticReddit, int], RedditSubredditInput],
+    watch: int,
+    budget: int,
+    page_size: int,
+    mix: Dict[str, float],
+) -> ScenarioResult:
+    """
+    Run an input over a fresh synthetic reddit - until every listing has run dry.
+
+    :param make_input: One of SCENARIOS
+    :param watch: How many subreddits (or redditors) to watch
+    :param budget: How many items each listing hands out
+    :param page_size: How many items each poll of a listing returns
+    :param mix: Of item states
+    :return:
+    """
+    reddit = SyntheticReddit(
+        factory=SyntheticItemFactory(mix=mix), budget=budget, page_size=page_size
+    )
+    reddit_input = make_input(reddit, watch)
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+    reddit_input.bind(queue)
+
+    latencies: List[float] = []
+    last_event = time.perf_counter()
+
+    async def consume() -> None:
+        nonlocal last_event
+        while True:
+            event = await queue.get()
+            last_event = time.perf_counter()
+            item = event_item(event)
+            if item is not None:
+                latencies.append(last_event - item.produced_at)
+
+    start = time.perf_counter()
+    consumer = asyncio.create_task(consume())
+    await reddit_input.run()
+
+    while (
+        not reddit.exhausted()
+        or not queue.empty()
+        or time.perf_counter() - last_event < SETTLE_SECONDS
+    ):
+        if time.perf_counter() - last_event > STALL_SECONDS:
+            raise RuntimeError(
+                f"Stalled after {len(latencies)} events - has a stream task died?"
+            )
+        await asyncio.sleep(SETTLE_SECONDS / 10)
+
+    for task in asyncio.all_tasks():
+        if task is not asyncio.current_task():
+            task.cancel()
+    await asyncio.gather(consumer, return_exceptions=True)
+
+    return ScenarioResult(
+        events=len(latencies), seconds=last_event - start, latencies=sorted(latencies)
+    )
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """
+    Return a percentile of some sorted values - nearest rank.
+
+    :param ordered:
+    :param fraction: e.g. 0.99
+    :return:
+    """
+    if not ordered:
+        return float("nan")
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def peak_memory(run: Callable[[], Any]) -> float:
+    """
+    Run something under tracemalloc - returning the peak allocated, in MiB.
+
+    :param run:
+    :return:
+    """
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def main() -> None:
+    """
+    Run the scenarios and print a small table of results.
+
+    :return:
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scenario",
+        choices=sorted(SCENARIOS),
+        action="append",
+        help="Scenario to run - may be repeated. Default is all of them",
+    )
+    parser.add_argument("--watch", type=int, default=10, help="Subreddits/redditors watched")
+    parser.add_argument("--budget", type=int, default=2000, help="Items per listing")
+    parser.add_argument("--page-size", type=int, default=50, help="Items per poll")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help='Weights of the item states - e.g. "created=70,edited=20,deleted=5,removed=5"',
+    )
+    parser.add_argument("--no-memory", action="store_true", help="Skip the memory runs")
+    args = parser.parse_args()
+
+    print(
+        f"watching {args.watch} - {args.budget} items per listing - pages of {args.page_size}"
+        f" - mix {args.mix}"
+    )
+    print(
+        f"{'scenario':<14}{'events':>9}{'events / sec':>14}{'p50 ms':>9}{'p99 ms':>9}"
+        f"{'peak MiB':>10}"
+    )
+    for name in args.scenario or SCENARIOS:
+
+        def run(name: str = name) -> ScenarioResult:
+            return asyncio.run(
+                run_scenario(
+                    SCENARIOS[name], args.watch, args.budget, args.page_size, args.mix
+                )
+            )
+
+        result = run()
+        memory = float("nan") if args.no_memory else peak_memory(run)
+        print(
+            f"{name:<14}{result.events:>9}{result.events / result.seconds:>14.0f}"
+            f"{percentile(result.latencies, 0.5) * 1e3:>9.2f}"
+            f"{percentile(result.latencies, 0.99) * 1e3:>9.2f}"
+            f"{memory:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# SPDX-FileCopyrightText: 2023 Mewbot Developers <mewbot@quicksilver.london>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""
+Compares handling stream items one at a time with handling a listing page at a time.
+
+"item" awaits subreddit_comment_to_event (and so a queue put) for every comment.
+"page" builds the events for a whole page in one pass and hands them to the queue as a batch.
+Run from the root of the repo with
+    PYTHONPATH=src python benchmarks/bench_page_pipeline.py
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, List
+
+import argparse
+import asyncio
+import time
+
+from mewbot.io.client_for_reddit.io_configs.inputs.streams import MAX_LISTING_LIMIT
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+
+
+def make_pages(count: int, page_size: int) -> List[List[Any]]:
+    """
+    Make pages of synthetic comments - about one in ten edited.
+
+    :param count:
+    :param page_size:
+    :return:
+    """
+    now = time.time()
+    comments = [
+        SimpleNamespace(
+            id=f"{i:x}",
+            fullname=f"t1_{i:x}",
+            body=f"comment number {i}",
+            edited=i % 10 == 0,
+            author=f"author_{i % 1000}",
+            parent_id="t3_xyz",
+            subreddit="test",
+            created_utc=now,
+        )
+        for i in range(count)
+    ]
+    pages = []
+    for start in range(0, count, page_size):
+        end = start + page_size
+        pages.append(comments[start:end])
+    return pages
+
+
+async def item_at_a_time(reddit_input: RedditSubredditInput, page: List[Any]) -> None:
+    """
+    Handle a page the way the monitors used to - an await per item.
+
+    :param reddit_input:
+    :param page:
+    :return:
+    """
+    for comment in page:
+        await reddit_input.subreddit_comment_to_event("test", comment)
+
+
+async def page_at_a_time(reddit_input: RedditSubredditInput, page: List[Any]) -> None:
+    """
+    Handle a page through the batched pipeline stage.
+
+    :param reddit_input:
+    :param page:
+    :return:
+    """
+    await reddit_input.comment_page_to_events(("test", comment) for comment in page)
+
+
+async def run_mode(
+    pages: List[List[Any]],
+    handle_page: Callable[[RedditSubredditInput, List[Any]], Awaitable[None]],
+) -> float:
+    """
+    Put every page through a fresh input - with a consumer draining the queue as it goes.
+
+    :param pages:
+    :param handle_page:
+    :return: Seconds taken
+    """
+    reddit_input = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+    reddit_input.bind(queue)
+
+    total = sum(len(page) for page in pages)
+
+    async def consume() -> None:
+        for _ in range(total):
+            await queue.get()
+
+    consumer = asyncio.create_task(consume())
+
+    start = time.perf_counter()
+    for page in pages:
+        await handle_page(reddit_input, page)
+    await consumer
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """
+    Run the benchmark and print a small table of results.
+
+    :return:
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100_000, help="Comments per mode")
+    parser.add_argument("--page-size", type=int, default=MAX_LISTING_LIMIT, help="Page size")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repeats")
+    args = parser.parse_args()
+
+    pages = make_pages(args.count, args.page_size)
+
+    print(f"{args.count} comments - in pages of {args.page_size}")
+    print(f"{'pipeline':<10}{'events / sec':>14}{'us / event':>12}")
+    for name, handle_page in (("item", item_at_a_time), ("page", page_at_a_time)):
+        best = min(asyncio.run(run_mode(pages, handle_page)) for _ in range(args.repeat))
+        print(f"{name:<10}{args.count / best:>14.0f}{best / args.count * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# SPDX-FileCopyrightText: 2023 Mewbot Developers <mewbot@quicksilver.london>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""
+Compares events/sec through subreddit_comment_to_event with the debug rendering off and on.
+
+"print" is how every item was rendered before the render logger - to stdout (here a buffer).
+Run from the root of the repo with
+    PYTHONPATH=src python benchmarks/bench_rendering.py
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, Callable, List
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import random
+import string
+import time
+
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+from mewbot.io.client_for_reddit.io_configs.inputs.utils import RENDER_LOGGER_NAME
+
+
+def make_comments(count: int, body_length: int, seed: int = 0) -> List[Any]:
+    """
+    Make synthetic comments - with everything the renderer reads.
+
+    :param count:
+    :param body_length:
+    :param seed:
+    :return:
+    """
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + "      "
+    now = time.time()
+    return [
+        SimpleNamespace(
+            id=f"{i:x}",
+            fullname=f"t1_{i:x}",
+            body="".join(rng.choices(alphabet, k=rng.randint(body_length // 2, body_length))),
+            author=f"author_{i % 1000}",
+            parent_id="t3_xyz",
+            subreddit="test",
+            subreddit_id="t5_test",
+            created_utc=now,
+            distinguished=None,
+            edited=False,
+            is_submitter=False,
+        )
+        for i in range(count)
+    ]
+
+
+async def run_mode(
+    comments: List[Any], render: Callable[[RedditSubredditInput, Any], None]
+) -> float:
+    """
+    Put every comment through a fresh input - rendering each one the given way.
+
+    :param comments:
+    :param render:
+    :return: Events per second
+    """
+    reddit_input = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+    reddit_input.bind(queue)
+
+    start = time.perf_counter()
+    for comment in comments:
+        render(reddit_input, comment)
+        await reddit_input.subreddit_comment_to_event("test", comment)
+    elapsed = time.perf_counter() - start
+
+    assert queue.qsize() == len(comments)
+    return len(comments) / elapsed
+
+
+def render_print(reddit_input: RedditSubredditInput, comment: Any) -> None:
+    """
+    Render the way the monitors used to.
+
+    :param reddit_input:
+    :param comment:
+    :return:
+    """
+    print("-------------")
+    print(reddit_input.render_comment(comment))
+    print("-------------")
+
+
+def main() -> None:
+    """
+    Run the benchmark and print a small table of results.
+
+    :return:
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20_000, help="Comments per mode")
+    parser.add_argument("--body-length", type=int, default=500, help="Max body length")
+    args = parser.parse_args()
+
+    comments = make_comments(args.count, args.body_length)
+
+    render_logger = logging.getLogger(RENDER_LOGGER_NAME)
+    render_logger.propagate = False
+    output = io.StringIO()
+    render_logger.addHandler(logging.StreamHandler(output))
+
+    def with_level(level: int, sample_rate: float = 1.0) -> Callable[[], float]:
+        def run() -> float:
+            render_logger.setLevel(level)
+
+            def render(reddit_input: RedditSubredditInput, comment: Any) -> None:
+                reddit_input.render_sample_rate = sample_rate
+                reddit_input.log_rendering(reddit_input.render_comment, comment)
+
+            return asyncio.run(run_mode(comments, render))
+
+        return run
+
+    def with_print() -> float:
+        with contextlib.redirect_stdout(output):
+            return asyncio.run(run_mode(comments, render_print))
+
+    print(f"{args.count} comments - bodies of up to {args.body_length} characters")
+    print(f"{'rendering':<16}{'events / sec':>14}")
+    for name, run in (
+        ("print", with_print),
+        ("logger off", with_level(logging.INFO)),
+        ("logger 1%", with_level(logging.DEBUG, sample_rate=0.01)),
+        ("logger on", with_level(logging.DEBUG)),
+    ):
+        output.seek(0)
+        output.truncate()
+        print(f"{name:<16}{run():>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# SPDX-FileCopyrightText: 2023 Mewbot Developers <mewbot@quicksilver.london>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""
+Compares a set of str ids with the SeenIdIndex now used to record seen ids.
+
+Ids are generated the way a monitored subreddit sees them - increasing, with random gaps
+(the ids in between going to other subreddits) and a little reordering.
+
+Run from the root of the repo with
+    PYTHONPATH=src python benchmarks/bench_seen_ids.py
+"""
+
+from __future__ import annotations
+
+from typing import Any, List
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from mewbot.io.client_for_reddit.io_configs.inputs.state import SeenIdIndex
+
+BASE36_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def to_base36(value: int) -> str:
+    """
+    Encode an int as a reddit id.
+
+    :param value:
+    :return:
+    """
+    digits = []
+    while value:
+        value, digit = divmod(value, 36)
+        digits.append(BASE36_DIGITS[digit])
+    return "".join(reversed(digits)) or "0"
+
+
+def make_ids(count: int, max_gap: int, seed: int = 0) -> List[str]:
+    """
+    Make increasing ids with random gaps - and swap some neighbours.
+
+    :param count:
+    :param max_gap: 1 for a stream which sees every id (e.g. r/all)
+    :param seed:
+    :return:
+    """
+    rng = random.Random(seed)
+    value = int("k0000000", 36)
+    ids = []
+    for _ in range(count):
+        value += rng.randint(1, max_gap)
+        ids.append(to_base36(value))
+    for position in range(0, count - 1, 50):
+        ids[position], ids[position + 1] = ids[position + 1], ids[position]
+    return ids
+
+
+def measure(ids: List[str], container_class: Any) -> None:
+    """
+    Fill a container with the ids - and print the memory and time taken.
+
+    The memory for a set includes the str ids it keeps alive - the index keeps none.
+    :param ids:
+    :param container_class:
+    :return:
+    """
+    container = container_class()
+    started = time.perf_counter()
+    for reddit_id in ids:
+        container.add(reddit_id)
+    filled = time.perf_counter()
+    hits = sum(1 for reddit_id in ids[::10] if reddit_id in container)
+    looked_up = time.perf_counter()
+
+    del container
+    tracemalloc.start()
+    container = container_class()
+    for reddit_id in ids:
+        container.add(reddit_id)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if isinstance(container, set):
+        memory += sum(sys.getsizeof(reddit_id) for reddit_id in ids)
+
+    print(
+        f"{container_class.__name__:<14}"
+        f"{(filled - started) / len(ids) * 1e9:>10.0f}"
+        f"{(looked_up - filled) / max(hits, 1) * 1e9:>12.0f}"
+        f"{memory / len(ids):>12.1f}"
+    )
+
+
+def main() -> None:
+    """
+    Run the benchmark and print a small table of results.
+
+    :return:
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1_000_000, help="Ids to add")
+    args = parser.parse_args()
+
+    for max_gap in (1, 1000):
+        ids = make_ids(args.count, max_gap)
+        print(f"{args.count} ids - gaps of up to {max_gap}")
+        print(f"{'container':<14}{'ns / add':>10}{'ns / lookup':>12}{'bytes / id':>12}")
+        measure(ids, set)
+        measure(ids, SeenIdIndex)
+
+
+if __name__ == "__main__":
+    main()
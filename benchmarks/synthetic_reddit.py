@@ -0,0 +1,454 @@
+# SPDX-FileCopyrightText: 2023 Mewbot Developers <mewbot@quicksilver.london>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""
+A stand in for asyncpraw.Reddit - serving synthetic comments and submissions.
+
+The inputs poll listings (Subreddit.comments, Subreddit.new, Redditor.comments.new e.t.c.) -
+so that's what is faked. Each poll of a listing returns a page of brand new items, in whatever
+mix of created, edited, deleted and removed states was asked for, until its budget runs out.
+Every item records when it was handed out - so the latency to the queue can be measured.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import itertools
+import random
+import time
+
+ITEM_CREATED: str = "created"
+ITEM_EDITED: str = "edited"
+ITEM_DELETED: str = "deleted"
+ITEM_REMOVED: str = "removed"
+ITEM_STATES = (ITEM_CREATED, ITEM_EDITED, ITEM_DELETED, ITEM_REMOVED)
+
+DEFAULT_MIX: Dict[str, float] = {
+    ITEM_CREATED: 0.85,
+    ITEM_EDITED: 0.1,
+    ITEM_DELETED: 0.03,
+    ITEM_REMOVED: 0.02,
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    Parse a mix of item states - e.g. "created=70,edited=20,deleted=5,removed=5".
+
+    Weights do not have to add up to anything - states left out are never produced.
+    :param spec:
+    :return:
+    """
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        state, _, weight = part.partition("=")
+        if state.strip() not in ITEM_STATES:
+            raise ValueError(f"Unknown item state {state!r} - expected one of {ITEM_STATES}")
+        mix[state.strip()] = float(weight)
+    return mix
+
+
+class SubredditName(str):
+    """
+    The subreddit of an item - asyncpraw gives a lazy Subreddit, which str() to its name.
+    """
+
+    @property
+    def display_name(self) -> str:
+        """
+        The name of the subreddit.
+
+        :return:
+        """
+        return str(self)
+
+
+class SyntheticComment:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """
+    Has the fields of a Comment which the inputs read.
+    """
+
+    __slots__ = (
+        "id",
+        "fullname",
+        "body",
+        "edited",
+        "author",
+        "author_fullname",
+        "parent_id",
+        "subreddit",
+        "subreddit_id",
+        "created_utc",
+        "distinguished",
+        "is_submitter",
+        "produced_at",
+    )
+
+    def __init__(
+        self, item_id: str, state: str, author: str, subreddit: SubredditName
+    ) -> None:
+        """
+        Make a comment - as a listing would return it in the given state.
+
+        :param item_id: base36
+        :param state: One of ITEM_STATES
+        :param author:
+        :param subreddit:
+        """
+        self.id = item_id
+        self.fullname = f"t1_{item_id}"
+        self.body = {ITEM_DELETED: "[deleted]", ITEM_REMOVED: "[removed]"}.get(
+            state, f"synthetic comment {item_id}"
+        )
+        self.edited = time.time() if state == ITEM_EDITED else False
+        self.author = "[deleted]" if state in (ITEM_DELETED, ITEM_REMOVED) else author
+        self.author_fullname = None if self.author == "[deleted]" else f"t2_{author}"
+        self.parent_id = "t3_synthetic"
+        self.subreddit = subreddit
+        self.subreddit_id = f"t5_{subreddit}"
+        self.created_utc = time.time()
+        self.distinguished = None
+        self.is_submitter = False
+        self.produced_at = 0.0
+
+
+class SyntheticSubmission:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """
+    Has the fields of a Submission which the inputs read.
+    """
+
+    __slots__ = (
+        "id",
+        "fullname",
+        "name",
+        "title",
+        "selftext",
+        "url",
+        "edited",
+        "stickied",
+        "author",
+        "author_fullname",
+        "subreddit",
+        "created_utc",
+        "produced_at",
+    )
+
+    def __init__(
+        self, item_id: str, state: str, author: str, subreddit: SubredditName
+    ) -> None:
+        """
+        Make a submission - as a listing would return it in the given state.
+
+        :param item_id: base36
+        :param state: One of ITEM_STATES
+        :param author:
+        :param subreddit:
+        """
+        self.id = item_id
+        self.fullname = f"t3_{item_id}"
+        self.name = self.fullname
+        self.title = f"synthetic submission {item_id}"
+        self.selftext = {ITEM_DELETED: "[deleted]", ITEM_REMOVED: "[removed]"}.get(
+            state, f"synthetic submission body {item_id}"
+        )
+        self.url = f"https://reddit.invalid/{item_id}"
+        self.edited = time.time() if state == ITEM_EDITED else False
+        self.stickied = False
+        self.author = "[deleted]" if state in (ITEM_DELETED, ITEM_REMOVED) else author
+        self.author_fullname = None if self.author == "[deleted]" else f"t2_{author}"
+        self.subreddit = subreddit
+        self.created_utc = time.time()
+        self.produced_at = 0.0
+
+
+class SyntheticItemFactory:
+    """
+    Makes items with increasing ids - in a random (but seeded) mix of states.
+    """
+
+    def __init__(
+        self, mix: Optional[Dict[str, float]] = None, authors: int = 1000, seed: int = 0
+    ) -> None:
+        """
+        Startup the factory.
+
+        :param mix: Keyed with one of ITEM_STATES and valued with its weight
+        :param authors: How many different authors the items are spread over
+        :param seed:
+        """
+        mix = DEFAULT_MIX if mix is None else mix
+
+        self._rng = random.Random(seed)
+        self._states = list(mix)
+        self._weights = [mix[state] for state in self._states]
+        self._authors = [f"author_{i}" for i in range(authors)]
+        # Ids start high enough to be several base36 characters - as real ones are
+        self._ids = itertools.count(36**5)
+
+    def _next_id(self) -> str:
+        """
+        Return the next item id - in base36.
+
+        :return:
+        """
+        number = next(self._ids)
+        digits = []
+        while number:
+            number, digit = divmod(number, 36)
+            digits.append("0123456789abcdefghijklmnopqrstuvwxyz"[digit])
+        return "".join(reversed(digits))
+
+    def _next_state_and_author(self) -> Tuple[str, str]:
+        """
+        Pick the state and author of the next item.
+
+        :return:
+        """
+        state = self._rng.choices(self._states, self._weights)[0]
+        return state, self._rng.choice(self._authors)
+
+    def comment(self, subreddit: SubredditName) -> SyntheticComment:
+        """
+        Make the next comment.
+
+        :param subreddit:
+        :return:
+        """
+        state, author = self._next_state_and_author()
+        return SyntheticComment(self._next_id(), state, author, subreddit)
+
+    def submission(self, subreddit: SubredditName) -> SyntheticSubmission:
+        """
+        Make the next submission.
+
+        :param subreddit:
+        :return:
+        """
+        state, author = self._next_state_and_author()
+        return SyntheticSubmission(self._next_id(), state, author, subreddit)
+
+
+class SyntheticListing:  # pylint: disable=too-few-public-methods
+    """
+    Stands in for a listing function - each call returns a page of new items, newest first.
+
+    Paging back ("after") finds nothing - the pages are sized so no gap is ever detected.
+    """
+
+    def __init__(self, make_item: Any, subreddit: str, budget: int, page_size: int) -> None:
+        """
+        Startup the listing.
+
+        :param make_item: SyntheticItemFactory.comment or .submission
+        :param subreddit: Which the items are in - items from a multireddit ("a+b") are
+                          spread over its subreddits
+        :param budget: How many items the listing hands out - in total
+        :param page_size: How many items each call hands out
+        """
+        self.make_item = make_item
+        self.subreddits = itertools.cycle(
+            [SubredditName(name) for name in subreddit.split("+")]
+        )
+        self.remaining = budget
+        self.page_size = page_size
+        self.polled = False
+
+    async def __call__(
+        self, limit: int = 100, params: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Hand out a page of new items - newest first.
+
+        :param limit:
+        :param params:
+        :return:
+        """
+        self.polled = True
+        if params and "after" in params:
+            return
+
+        count = min(self.page_size, limit - 1, self.remaining)
+        self.remaining -= count
+
+        page = [self.make_item(next(self.subreddits)) for _ in range(count)]
+        produced_at = time.perf_counter()
+        for item in reversed(page):
+            item.produced_at = produced_at
+            yield item
+
+
+class SyntheticSubreddit:  # pylint: disable=too-few-public-methods
+    """
+    A subreddit - or a redditor profile, which acts like one.
+    """
+
+    def __init__(
+        self, factory: SyntheticItemFactory, name: str, budget: int, page_size: int
+    ) -> None:
+        """
+        Startup the subreddit.
+
+        :param factory:
+        :param name:
+        :param budget: How many items each of its listings hands out
+        :param page_size:
+        """
+        self.display_name = name
+        self.subreddit_type = "public"
+        self.comments = SyntheticListing(factory.comment, name, budget, page_size)
+        self.new = SyntheticListing(factory.submission, name, budget, page_size)
+
+    def __str__(self) -> str:
+        """
+        Return the name - as asyncpraw subreddits do.
+
+        :return:
+        """
+        return str(self.display_name)
+
+
+class SyntheticRedditor:  # pylint: disable=too-few-public-methods
+    """
+    A redditor - with comment, submission and overview listings.
+    """
+
+    def __init__(
+        self, factory: SyntheticItemFactory, name: str, budget: int, page_size: int
+    ) -> None:
+        """
+        Startup the redditor.
+
+        :param factory:
+        :param name:
+        :param budget: How many items each of its listings hands out
+        :param page_size:
+        """
+        self.name = name
+        # Their posts are in subreddits which are not watched - so no stream sees them twice
+        posted_in = f"elsewhere_{name}"
+        # Redditor.comments.new and Redditor.submissions.new
+        self.comments = SimpleNamespace(
+            new=SyntheticListing(factory.comment, posted_in, budget, page_size)
+        )
+        self.submissions = SimpleNamespace(
+            new=SyntheticListing(factory.submission, posted_in, budget, page_size)
+        )
+        # The overview
+        self.new = SyntheticListing(factory.comment, posted_in, budget, page_size)
+
+
+class SyntheticUser:  # pylint: disable=too-few-public-methods
+    """
+    Stands in for Reddit.user.
+    """
+
+    async def me(self) -> str:
+        """
+        The account the bot is logged in as.
+
+        :return:
+        """
+        return "synthetic_bot"
+
+
+class SyntheticReddit:
+    """
+    Stands in for asyncpraw.Reddit - for the parts the inputs use.
+    """
+
+    def __init__(
+        self,
+        factory: Optional[SyntheticItemFactory] = None,
+        budget: int = 1000,
+        page_size: int = 50,
+    ) -> None:
+        """
+        Startup the fake.
+
+        :param factory: Makes the items - if not provided, one with the default mix
+        :param budget: How many items each listing hands out before it runs dry
+        :param page_size: How many items each poll of a listing returns
+        """
+        self.factory = SyntheticItemFactory() if factory is None else factory
+        self.budget = budget
+        self.page_size = page_size
+
+        self.user = SyntheticUser()
+
+        self._subreddits: Dict[str, SyntheticSubreddit] = {}
+        self._redditors: Dict[str, SyntheticRedditor] = {}
+
+    def _subreddit(self, name: str) -> SyntheticSubreddit:
+        """
+        Return the subreddit - making it the first time it's asked for.
+
+        :param name:
+        :return:
+        """
+        if name.lower() not in self._subreddits:
+            self._subreddits[name.lower()] = SyntheticSubreddit(
+                self.factory, name, self.budget, self.page_size
+            )
+        return self._subreddits[name.lower()]
+
+    @property
+    def listings(self) -> List[SyntheticListing]:
+        """
+        Every listing handed out so far.
+
+        :return:
+        """
+        listings: List[SyntheticListing] = []
+        for subreddit in self._subreddits.values():
+            listings.extend((subreddit.comments, subreddit.new))
+        for redditor in self._redditors.values():
+            listings.extend((redditor.comments.new, redditor.submissions.new, redditor.new))
+        return listings
+
+    def exhausted(self) -> bool:
+        """
+        Return whether all the listings being polled have handed out everything they will.
+
+        Listings no stream polls (e.g. the single subreddits in a multireddit) do not count.
+        :return:
+        """
+        polled = [listing for listing in self.listings if listing.polled]
+        return bool(polled) and all(listing.remaining == 0 for listing in polled)
+
+    async def subreddit(  # pylint: disable=unused-argument
+        self, display_name: str, fetch: bool = False
+    ) -> SyntheticSubreddit:
+        """
+        Return a subreddit - multireddits ("a+b") draw on a single listing of their own.
+
+        :param display_name:
+        :param fetch: Ignored - nothing is ever missing
+        :return:
+        """
+        return self._subreddit(display_name)
+
+    async def info(self, subreddits: Iterable[str]) -> AsyncIterator[SyntheticSubreddit]:
+        """
+        Look subreddits up in bulk - they all exist.
+
+        :param subreddits:
+        :return:
+        """
+        for name in subreddits:
+            yield self._subreddit(name)
+
+    async def redditor(self, name: str) -> SyntheticRedditor:
+        """
+        Return a redditor - making them the first time they're asked for.
+
+        :param name:
+        :return:
+        """
+        if name not in self._redditors:
+            self._redditors[name] = SyntheticRedditor(
+                self.factory, name, self.budget, self.page_size
+            )
+        return self._redditors[name]
@@ -12,7 +12,8 @@ from mewbot.io.client_for_reddit.io_configs.reddit_bot_oauth_io import (
 from mewbot.io.client_for_reddit.io_configs.reddit_bot_password_io import (
     RedditBotPasswordIOConfig,
 )
+from mewbot.io.client_for_reddit.io_configs.reddit_dump_io import RedditDumpIOConfig
 
 __version__ = "0.0.2"
 
-__all__ = ["RedditBotPasswordIOConfig", "RedditBotOauthIOConfig"]
+__all__ = ["RedditBotPasswordIOConfig", "RedditBotOauthIOConfig", "RedditDumpIOConfig"]
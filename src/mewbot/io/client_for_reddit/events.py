@@ -9,13 +9,16 @@ Contains all the input events which could be produced by a reddit client.
 """
 
 
-from typing import Optional
+from typing import Optional, Union
 
 import dataclasses
 
 import asyncpraw  # type: ignore
 from mewbot.api.v1 import InputEvent
 
+from .payloads import CommentPayload, SubmissionPayload
+from .snapshots import CommentSnapshot, SubmissionSnapshot
+
 
 @dataclasses.dataclass
 class RedditInputEvent(InputEvent):
@@ -40,7 +43,8 @@ class SubRedditSubmissionInputEvent(RedditInputEvent):
     Base class for all submission events to a subreddit.
     """
 
-    submission: asyncpraw.reddit.Submission
+    # The submission - or, from lightweight inputs and dumps, a payload of it
+    submission: Union[asyncpraw.reddit.Submission, SubmissionPayload]
 
     subreddit: str  # Which subreddit is the post in?
 
@@ -59,7 +63,7 @@ class SubRedditSubmissionCreationInputEvent(SubRedditSubmissionInputEvent):
     A post was created in a monitored subreddit.
     """
 
-    creation_timestamp: str  # When the post was created
+    creation_timestamp: float  # When the post was created - as created_utc, in epoch seconds
 
 
 @dataclasses.dataclass
@@ -70,7 +74,7 @@ class SubRedditSubmissionEditInputEvent(SubRedditSubmissionInputEvent):
 
     # the titles of reddit posts cannot be changed - neither can their author?
     pre_edit_submission: Optional[
-        asyncpraw.reddit.Submission
+        SubmissionSnapshot
     ]  # We might not be able to get hold of the pre-edit text
 
     edit_timestamp: str  # When the post was edited
@@ -115,7 +119,8 @@ class SubRedditCommentInputEvent(RedditInputEvent):
     A comment is made to a post in a subreddit.
     """
 
-    comment: asyncpraw.reddit.Comment
+    # The comment - or, from lightweight inputs and dumps, a payload of it
+    comment: Union[asyncpraw.reddit.Comment, CommentPayload]
 
     subreddit: str  # Which subreddit is the post in?
 
@@ -136,7 +141,7 @@ class SubRedditCommentCreationInputEvent(SubRedditCommentInputEvent):
     - A comment is added/edited/deleted/removed to the comment forest of an existing submission.
     """
 
-    creation_timestamp: str  # When the post was created
+    creation_timestamp: float  # When the post was created - as created_utc, in epoch seconds
 
 
 @dataclasses.dataclass
@@ -149,7 +154,7 @@ class SubRedditCommentEditInputEvent(SubRedditCommentInputEvent):
 
     # the titles of reddit posts cannot be changed - neither can their author?
     pre_edit_message: Optional[
-        asyncpraw.reddit.Comment
+        CommentSnapshot
     ]  # We might not be able to get hold of the pre-edit text
 
     edit_timestamp: str  # When the post was edited
@@ -9,20 +9,35 @@ Contains means of connecting to reddit - either via a bot account or your own.
 
 from __future__ import annotations
 
-from typing import List, Optional, Sequence, Union
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 import abc
 import logging
 
 import asyncpraw  # type: ignore
-from mewbot.api.v1 import Input, IOConfig, Output
+from mewbot.api.v1 import Input, Output
 
+from .inputs.buffer import BUFFER_BLOCK, BUFFER_POLICIES, RedditEventBuffer
+from .inputs.checkpoints import StreamCheckpointStore
+from .inputs.metrics import RedditInputMetrics
 from .inputs.redditors import RedditRedditorInput
+from .inputs.revisit import RedditRevisitEngine
+from .inputs.scheduler import RedditRateLimitScheduler
+from .inputs.state import (
+    DEFAULT_CACHE_CAPACITY,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_SEEN_ID_MAX_RANGES,
+    RedditState,
+)
+from .inputs.streams import DEFAULT_MAX_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL
 from .inputs.subreddit import RedditSubredditInput
 from .outputs import RedditOutput
+from .recording import RecordingRequestor, ReplayRequestor
+from .replay import RedditReplayConfigBase
 
 
-class RedditIOConfigBase(IOConfig):
+# pylint: disable-next=too-many-instance-attributes,too-many-public-methods
+class RedditIOConfigBase(RedditReplayConfigBase):
     """
     Base class for all the forms of the mewbot reddit client.
 
@@ -51,11 +66,68 @@ class RedditIOConfigBase(IOConfig):
     _redditor_input: Optional[RedditRedditorInput] = None
     _output: Optional[RedditOutput] = None
 
+    # Shared between all the inputs - so every stream draws on the same rate limit budget
+    _rate_limit_scheduler: Optional[RedditRateLimitScheduler] = None
+    # Shared between all the inputs - so their streams are reported together
+    _metrics: Optional[RedditInputMetrics] = None
+
     praw_reddit: asyncpraw.reddit
 
     _subreddits: list[str]
     _redditors: list[str]
 
+    _multireddit_mode: bool = False
+
+    _min_poll_interval: float = DEFAULT_MIN_POLL_INTERVAL
+    _max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL
+
+    # Bounds on the caches of seen content - which would otherwise grow without limit
+    _cache_capacity: int = DEFAULT_CACHE_CAPACITY
+    _cache_ttl: Optional[float] = DEFAULT_CACHE_TTL
+    _cache_capacities: Optional[Dict[str, int]] = None
+    _seen_id_max_ranges: int = DEFAULT_SEEN_ID_MAX_RANGES
+
+    # Look at new items again as they age - to catch edits, deletions and removals
+    _revisit_mode: bool = False
+
+    # Read removals off the mod log of the watched subreddits the account moderates
+    _mod_log_mode: bool = False
+
+    # Poll r/all and keep the items from the watched subreddits - for very large watchlists
+    _firehose_mode: bool = False
+
+    # Look up the details of the authors seen - in bulk, in the background
+    _resolve_authors: bool = False
+
+    # Events carry compact, picklable payloads - rather than asyncpraw objects
+    _lightweight_events: bool = False
+
+    # The fraction of items polled rendered to the render logger - when it's enabled for DEBUG
+    _render_sample_rate: float = 1.0
+
+    # Bound the events waiting for the behaviours - if None, the streams wait on the input queue
+    _event_buffer_capacity: Optional[int] = None
+    _event_buffer_policy: str = BUFFER_BLOCK
+    _coalesce_edits: bool = False
+
+    # Serve the stream metrics in the Prometheus text format on this local port - if not None
+    _metrics_port: Optional[int] = None
+
+    # Watch each redditor through one overview stream - rather than four
+    _redditor_overview_mode: bool = False
+    # Poll all the redditors from a few shared tasks - for large watchlists
+    _batched_redditor_polling: bool = False
+
+    # Where to record how far each stream has got - if None, streams start fresh each run
+    _checkpoint_file: Optional[str] = None
+    _checkpoint_store: Optional[StreamCheckpointStore] = None
+
+    # Record the traffic with reddit to a file - or answer from a recording, offline
+    _record_traffic_file: Optional[str] = None
+    _replay_traffic_file: Optional[str] = None
+    # Of the replay - None for as fast as possible
+    _replay_speed: Optional[float] = 1.0
+
     @property
     def subreddits(self) -> list[str]:
         """
@@ -106,6 +178,538 @@ class RedditIOConfigBase(IOConfig):
         if self._redditor_input is not None:
             self._redditor_input.subreddits = new_redditors
 
+    @property
+    def multireddit_mode(self) -> bool:
+        """
+        Return whether the watched subreddits are polled as combined multireddits.
+
+        :return:
+        """
+        return self._multireddit_mode
+
+    @multireddit_mode.setter
+    def multireddit_mode(self, new_multireddit_mode: bool) -> None:
+        """
+        Poll the watched subreddits as a few combined "a+b+c" multireddits.
+
+        Only takes effect if set before the inputs are created.
+        :param new_multireddit_mode:
+        :return:
+        """
+        self._multireddit_mode = bool(new_multireddit_mode)
+
+    @property
+    def revisit_mode(self) -> bool:
+        """
+        Return whether new comments and submissions are looked at again as they age.
+
+        :return:
+        """
+        return self._revisit_mode
+
+    @revisit_mode.setter
+    def revisit_mode(self, new_revisit_mode: bool) -> None:
+        """
+        Look at new comments and submissions again (in batches, via /api/info) as they age.
+
+        Catches edits, deletions and removals - at about one request per 100 tracked items.
+        Only takes effect if set before the inputs are created.
+        :param new_revisit_mode:
+        :return:
+        """
+        self._revisit_mode = bool(new_revisit_mode)
+
+    @property
+    def mod_log_mode(self) -> bool:
+        """
+        Return whether removals are read off the mod log - for subreddits the account moderates.
+
+        :return:
+        """
+        return self._mod_log_mode
+
+    @mod_log_mode.setter
+    def mod_log_mode(self, new_mod_log_mode: bool) -> None:
+        """
+        Read removals off the mod log - for the watched subreddits the account moderates.
+
+        Only takes effect if set before the inputs are created.
+        :param new_mod_log_mode:
+        :return:
+        """
+        self._mod_log_mode = bool(new_mod_log_mode)
+
+    @property
+    def firehose_mode(self) -> bool:
+        """
+        Return whether the watched subreddits are picked out of r/all - not polled one by one.
+
+        :return:
+        """
+        return self._firehose_mode
+
+    @firehose_mode.setter
+    def firehose_mode(self, new_firehose_mode: bool) -> None:
+        """
+        Pick the watched subreddits out of r/all - rather than polling them one by one.
+
+        Only takes effect if set before the inputs are created.
+        Takes precedence over multireddit mode.
+        :param new_firehose_mode:
+        :return:
+        """
+        self._firehose_mode = bool(new_firehose_mode)
+
+    @property
+    def resolve_authors(self) -> bool:
+        """
+        Return whether the details of the authors seen are looked up in bulk.
+
+        :return:
+        """
+        return self._resolve_authors
+
+    @resolve_authors.setter
+    def resolve_authors(self, new_resolve_authors: bool) -> None:
+        """
+        Look up the details (e.g. account age) of the authors seen - in bulk, in the background.
+
+        Only takes effect if set before the inputs are created.
+        :param new_resolve_authors:
+        :return:
+        """
+        self._resolve_authors = bool(new_resolve_authors)
+
+    @property
+    def lightweight_events(self) -> bool:
+        """
+        Return whether events carry compact payloads of the comments and submissions.
+
+        :return:
+        """
+        return self._lightweight_events
+
+    @lightweight_events.setter
+    def lightweight_events(self, new_lightweight_events: bool) -> None:
+        """
+        Put compact, immutable payloads on the events - rather than asyncpraw objects.
+
+        Payloads can be pickled and handed to other processes - and don't keep the Reddit
+        instance alive. Each can make its asyncpraw object again, with materialize.
+        Only takes effect if set before the inputs are created.
+        :param new_lightweight_events:
+        :return:
+        """
+        self._lightweight_events = bool(new_lightweight_events)
+
+    @property
+    def render_sample_rate(self) -> float:
+        """
+        The fraction of items polled which are rendered for debugging.
+
+        :return:
+        """
+        return self._render_sample_rate
+
+    @render_sample_rate.setter
+    def render_sample_rate(self, new_render_sample_rate: float) -> None:
+        """
+        Set the fraction of items polled which are rendered for debugging.
+
+        Rendering only happens if the render logger (RENDER_LOGGER_NAME) is enabled for DEBUG.
+        Only takes effect if set before the inputs are created.
+        :param new_render_sample_rate:
+        :return:
+        """
+        new_render_sample_rate = float(new_render_sample_rate)
+        if not 0.0 <= new_render_sample_rate <= 1.0:
+            raise AttributeError(
+                f"render_sample_rate must be between 0 and 1 - got {new_render_sample_rate}"
+            )
+        self._render_sample_rate = new_render_sample_rate
+
+    @property
+    def event_buffer_capacity(self) -> Optional[int]:
+        """
+        The most events which can wait for the behaviours - None if unbounded.
+
+        :return:
+        """
+        return self._event_buffer_capacity
+
+    @event_buffer_capacity.setter
+    def event_buffer_capacity(self, new_event_buffer_capacity: Optional[int]) -> None:
+        """
+        Bound the events which can wait for the behaviours - None to leave them unbounded.
+
+        Only takes effect if set before the inputs are created.
+        :param new_event_buffer_capacity:
+        :return:
+        """
+        if new_event_buffer_capacity is not None and new_event_buffer_capacity < 1:
+            raise AttributeError(
+                f"event_buffer_capacity must be at least 1 - got {new_event_buffer_capacity}"
+            )
+        self._event_buffer_capacity = new_event_buffer_capacity
+
+    @property
+    def event_buffer_policy(self) -> str:
+        """
+        What happens to new events when the buffer is full.
+
+        :return:
+        """
+        return self._event_buffer_policy
+
+    @event_buffer_policy.setter
+    def event_buffer_policy(self, new_event_buffer_policy: str) -> None:
+        """
+        Set what happens to new events when the buffer is full - one of BUFFER_POLICIES.
+
+        Only takes effect if set before the inputs are created.
+        :param new_event_buffer_policy:
+        :return:
+        """
+        if new_event_buffer_policy not in BUFFER_POLICIES:
+            raise AttributeError(
+                f"Unknown buffer policy {new_event_buffer_policy} - "
+                f"expected one of {BUFFER_POLICIES}"
+            )
+        self._event_buffer_policy = new_event_buffer_policy
+
+    @property
+    def coalesce_edits(self) -> bool:
+        """
+        Return whether repeated edits of an item waiting in the buffer are folded together.
+
+        :return:
+        """
+        return self._coalesce_edits
+
+    @coalesce_edits.setter
+    def coalesce_edits(self, new_coalesce_edits: bool) -> None:
+        """
+        Fold repeated edits of an item waiting in the buffer into one event.
+
+        Only takes effect if set before the inputs are created - and with a bounded buffer.
+        :param new_coalesce_edits:
+        :return:
+        """
+        self._coalesce_edits = bool(new_coalesce_edits)
+
+    @property
+    def metrics_port(self) -> Optional[int]:
+        """
+        The local port the stream metrics are served on - None if they are not served.
+
+        :return:
+        """
+        return self._metrics_port
+
+    @metrics_port.setter
+    def metrics_port(self, new_metrics_port: Optional[int]) -> None:
+        """
+        Serve the stream metrics in the Prometheus text format on a local port.
+
+        None to not serve them - they can still be read off the metrics property.
+        Only takes effect if set before the inputs are created.
+        :param new_metrics_port:
+        :return:
+        """
+        if new_metrics_port is not None and not 0 <= new_metrics_port <= 65535:
+            raise AttributeError(
+                f"metrics_port must be a valid port - got {new_metrics_port}"
+            )
+        self._metrics_port = new_metrics_port
+
+    @property
+    def redditor_overview_mode(self) -> bool:
+        """
+        Return whether each redditor is watched through a single stream of their overview.
+
+        :return:
+        """
+        return self._redditor_overview_mode
+
+    @redditor_overview_mode.setter
+    def redditor_overview_mode(self, new_redditor_overview_mode: bool) -> None:
+        """
+        Watch each redditor through a single stream of their /user/<name>/overview.
+
+        Rather than separate streams of their profile, comments and submissions.
+        Only takes effect if set before the inputs are created.
+        :param new_redditor_overview_mode:
+        :return:
+        """
+        self._redditor_overview_mode = bool(new_redditor_overview_mode)
+
+    @property
+    def batched_redditor_polling(self) -> bool:
+        """
+        Return whether the redditors are polled from a few shared tasks.
+
+        :return:
+        """
+        return self._batched_redditor_polling
+
+    @batched_redditor_polling.setter
+    def batched_redditor_polling(self, new_batched_redditor_polling: bool) -> None:
+        """
+        Poll the redditors from a few shared tasks - rather than with streams of their own.
+
+        For watchlists of hundreds or thousands of redditors.
+        Only takes effect if set before the inputs are created.
+        :param new_batched_redditor_polling:
+        :return:
+        """
+        self._batched_redditor_polling = bool(new_batched_redditor_polling)
+
+    @property
+    def min_poll_interval(self) -> float:
+        """
+        Return the shortest time (in seconds) any stream will wait between polls.
+
+        :return:
+        """
+        return self._min_poll_interval
+
+    @min_poll_interval.setter
+    def min_poll_interval(self, new_min_poll_interval: float) -> None:
+        """
+        Set the shortest time (in seconds) any stream will wait between polls.
+
+        Busy streams are polled this often.
+        :param new_min_poll_interval:
+        :return:
+        """
+        if float(new_min_poll_interval) <= 0:
+            raise AttributeError(
+                f"min_poll_interval must be positive - got {new_min_poll_interval}"
+            )
+        self._min_poll_interval = float(new_min_poll_interval)
+
+    @property
+    def max_poll_interval(self) -> float:
+        """
+        Return the longest time (in seconds) any stream will wait between polls.
+
+        :return:
+        """
+        return self._max_poll_interval
+
+    @max_poll_interval.setter
+    def max_poll_interval(self, new_max_poll_interval: float) -> None:
+        """
+        Set the longest time (in seconds) any stream will wait between polls.
+
+        Quiet streams back off until they are polled this often.
+        :param new_max_poll_interval:
+        :return:
+        """
+        if float(new_max_poll_interval) <= 0:
+            raise AttributeError(
+                f"max_poll_interval must be positive - got {new_max_poll_interval}"
+            )
+        self._max_poll_interval = float(new_max_poll_interval)
+
+    @property
+    def cache_capacity(self) -> int:
+        """
+        Return the default maximum number of entries in each cache of seen content.
+
+        :return:
+        """
+        return self._cache_capacity
+
+    @cache_capacity.setter
+    def cache_capacity(self, new_cache_capacity: int) -> None:
+        """
+        Set the default maximum number of entries in each cache of seen content.
+
+        Only takes effect if set before the inputs are created.
+        :param new_cache_capacity:
+        :return:
+        """
+        self._cache_capacity = int(new_cache_capacity)
+
+    @property
+    def cache_ttl(self) -> Optional[float]:
+        """
+        Return the seconds a cached entry can go unused before it's forgotten.
+
+        :return:
+        """
+        return self._cache_ttl
+
+    @cache_ttl.setter
+    def cache_ttl(self, new_cache_ttl: Optional[float]) -> None:
+        """
+        Set the seconds a cached entry can go unused before it's forgotten.
+
+        None means cached entries are only ever evicted to keep the caches under capacity.
+        Only takes effect if set before the inputs are created.
+        :param new_cache_ttl:
+        :return:
+        """
+        self._cache_ttl = None if new_cache_ttl is None else float(new_cache_ttl)
+
+    @property
+    def cache_capacities(self) -> Dict[str, int]:
+        """
+        Return the capacities set for individual caches - overriding cache_capacity.
+
+        :return:
+        """
+        return {} if self._cache_capacities is None else self._cache_capacities
+
+    @cache_capacities.setter
+    def cache_capacities(self, new_cache_capacities: Dict[str, int]) -> None:
+        """
+        Set the capacity of individual caches - keyed with the name of the cache.
+
+        e.g. {"seen_comment_contents": 50000}
+        Only takes effect if set before the inputs are created.
+        :param new_cache_capacities:
+        :return:
+        """
+        if not isinstance(new_cache_capacities, dict):
+            raise AttributeError("Please provide a mapping of cache names to capacities.")
+
+        self._cache_capacities = {
+            str(name): int(capacity) for name, capacity in new_cache_capacities.items()
+        }
+
+    @property
+    def seen_id_max_ranges(self) -> int:
+        """
+        Return the most ranges of ids each index of seen ids will hold.
+
+        :return:
+        """
+        return self._seen_id_max_ranges
+
+    @seen_id_max_ranges.setter
+    def seen_id_max_ranges(self, new_seen_id_max_ranges: int) -> None:
+        """
+        Set the most ranges of ids each index of seen ids will hold.
+
+        Each range takes 16 bytes - the oldest ids are forgotten past this.
+        :param new_seen_id_max_ranges:
+        :return:
+        """
+        self._seen_id_max_ranges = int(new_seen_id_max_ranges)
+
+    @property
+    def checkpoint_file(self) -> Optional[str]:
+        """
+        Return the path of the file recording how far each stream has got.
+
+        :return:
+        """
+        return self._checkpoint_file
+
+    @checkpoint_file.setter
+    def checkpoint_file(self, new_checkpoint_file: Optional[str]) -> None:
+        """
+        Set the file recording how far each stream has got.
+
+        On restart, each stream will resume from its checkpoint - rather than replaying the
+        latest items and missing anything older.
+        Only takes effect if set before the inputs are created.
+        :param new_checkpoint_file:
+        :return:
+        """
+        self._checkpoint_file = (
+            None if new_checkpoint_file is None else str(new_checkpoint_file)
+        )
+
+    @property
+    def record_traffic_file(self) -> Optional[str]:
+        """
+        Return the path of the file the traffic with reddit is recorded to.
+
+        :return:
+        """
+        return self._record_traffic_file
+
+    @record_traffic_file.setter
+    def record_traffic_file(self, new_record_traffic_file: Optional[str]) -> None:
+        """
+        Set the file to record every request to reddit (and the response to it) to.
+
+        The recording is appended to - so can be built up over several runs.
+        Only takes effect if set before the authorization flow is completed.
+        :param new_record_traffic_file:
+        :return:
+        """
+        self._record_traffic_file = (
+            None if new_record_traffic_file is None else str(new_record_traffic_file)
+        )
+
+    @property
+    def replay_traffic_file(self) -> Optional[str]:
+        """
+        Return the path of the recording requests to reddit are answered from.
+
+        :return:
+        """
+        return self._replay_traffic_file
+
+    @replay_traffic_file.setter
+    def replay_traffic_file(self, new_replay_traffic_file: Optional[str]) -> None:
+        """
+        Set a recording to answer requests from - rather than contacting reddit.
+
+        Takes precedence over record_traffic_file.
+        Only takes effect if set before the authorization flow is completed.
+        :param new_replay_traffic_file:
+        :return:
+        """
+        self._replay_traffic_file = (
+            None if new_replay_traffic_file is None else str(new_replay_traffic_file)
+        )
+
+    def requestor_overrides(self) -> Dict[str, Any]:
+        """
+        Return the arguments to asyncpraw.Reddit which record or replay the traffic.
+
+        :return: Empty if the traffic is neither recorded nor replayed
+        """
+        if self._replay_traffic_file is not None:
+            return {
+                "requestor_class": ReplayRequestor,
+                "requestor_kwargs": {
+                    "recording_path": self._replay_traffic_file,
+                    "speed": self._replay_speed,
+                },
+            }
+        if self._record_traffic_file is not None:
+            return {
+                "requestor_class": RecordingRequestor,
+                "requestor_kwargs": {"recording_path": self._record_traffic_file},
+            }
+        return {}
+
+    @property
+    def rate_limit_scheduler(self) -> Optional[RedditRateLimitScheduler]:
+        """
+        Return the scheduler sharing the request budget between the streams.
+
+        Will be None until the inputs have been created.
+        :return:
+        """
+        return self._rate_limit_scheduler
+
+    @property
+    def metrics(self) -> Optional[RedditInputMetrics]:
+        """
+        Return the throughput and latency metrics of every stream.
+
+        Will be None until the inputs have been created.
+        :return:
+        """
+        return self._metrics
+
     @staticmethod
     def enable_praw_logging() -> None:
         """
@@ -129,15 +733,55 @@ class RedditIOConfigBase(IOConfig):
          - RedditUserInput - for watching users
         :return:
         """
+        # The intervals can be set in either order - so are only checked against each other here
+        if self._max_poll_interval < self._min_poll_interval:
+            raise AttributeError(
+                f"max_poll_interval ({self._max_poll_interval}) must be no less than "
+                f"min_poll_interval ({self._min_poll_interval})"
+            )
+
         # Setup and store a praw_reddit instance
         # self.enable_praw_logging()
         self.complete_authorization_flow()
 
+        if self._rate_limit_scheduler is None:
+            self._rate_limit_scheduler = RedditRateLimitScheduler(
+                praw_reddit=self.praw_reddit
+            )
+
+        if self._metrics is None:
+            self._metrics = RedditInputMetrics()
+
+        if self._checkpoint_store is None and self._checkpoint_file is not None:
+            self._checkpoint_store = StreamCheckpointStore(self._checkpoint_file)
+
         inputs: List[Union[RedditSubredditInput, RedditRedditorInput]] = []
         if not self._subreddit_input:
             self._subreddit_input = RedditSubredditInput(
                 praw_reddit=self.praw_reddit,
                 subreddits=self._subreddits,
+                reddit_state=RedditState.create(
+                    target_subreddits=self._subreddits,
+                    cache_capacity=self._cache_capacity,
+                    cache_ttl=self._cache_ttl,
+                    cache_capacities=self._cache_capacities,
+                    seen_id_max_ranges=self._seen_id_max_ranges,
+                    resolve_authors=self._resolve_authors,
+                ),
+                multireddit_mode=self._multireddit_mode,
+                rate_limit_scheduler=self._rate_limit_scheduler,
+                min_poll_interval=self._min_poll_interval,
+                max_poll_interval=self._max_poll_interval,
+                checkpoint_store=self._checkpoint_store,
+                revisit_engine=self.make_revisit_engine(),
+                mod_log_mode=self._mod_log_mode,
+                firehose_mode=self._firehose_mode,
+                resolve_authors=self._resolve_authors,
+                render_sample_rate=self._render_sample_rate,
+                event_buffer=self.make_event_buffer(),
+                metrics=self._metrics,
+                metrics_port=self._metrics_port,
+                lightweight_events=self._lightweight_events,
             )
             inputs.append(self._subreddit_input)
         if not self._redditor_input:
@@ -145,11 +789,55 @@ class RedditIOConfigBase(IOConfig):
                 praw_reddit=self.praw_reddit,
                 redditors=self._redditors,
                 reddit_state=self._subreddit_input.reddit_state,
+                multireddit_mode=self._multireddit_mode,
+                rate_limit_scheduler=self._rate_limit_scheduler,
+                min_poll_interval=self._min_poll_interval,
+                max_poll_interval=self._max_poll_interval,
+                checkpoint_store=self._checkpoint_store,
+                revisit_engine=self.make_revisit_engine(),
+                mod_log_mode=self._mod_log_mode,
+                overview_mode=self._redditor_overview_mode,
+                batched_polling=self._batched_redditor_polling,
+                render_sample_rate=self._render_sample_rate,
+                event_buffer=self.make_event_buffer(),
+                metrics=self._metrics,
+                metrics_port=self._metrics_port,
+                lightweight_events=self._lightweight_events,
             )
             inputs.append(self._redditor_input)
 
         return inputs
 
+    def make_revisit_engine(self) -> Optional[RedditRevisitEngine]:
+        """
+        Make a revisit engine for an input - if revisit mode is on.
+
+        Each input hands revisited items to its own handler - so each gets its own engine.
+        :return:
+        """
+        if not self._revisit_mode:
+            return None
+
+        return RedditRevisitEngine(
+            praw_reddit=self.praw_reddit, rate_limit_scheduler=self._rate_limit_scheduler
+        )
+
+    def make_event_buffer(self) -> Optional[RedditEventBuffer]:
+        """
+        Make an event buffer for an input - if the buffer is bounded.
+
+        Each input drains into its own queue - so each gets its own buffer.
+        :return:
+        """
+        if self._event_buffer_capacity is None:
+            return None
+
+        return RedditEventBuffer(
+            capacity=self._event_buffer_capacity,
+            policy=self._event_buffer_policy,
+            coalesce_edits=self._coalesce_edits,
+        )
+
     @abc.abstractmethod
     def get_outputs(self) -> Sequence[Output]:
         """
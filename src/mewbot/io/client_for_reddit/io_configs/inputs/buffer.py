@@ -0,0 +1,374 @@
+"""
+A bounded buffer between the stream tasks and the input queue.
+
+With a choice of what to do when the behaviours fall behind.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Deque, Dict, Iterable, Mapping, Optional, Tuple, Type
+
+import asyncio
+import collections
+import logging
+
+from mewbot.api.v1 import InputEvent
+
+from ...events import (
+    SubRedditCommentCreationInputEvent,
+    SubRedditCommentDeletedInputEvent,
+    SubRedditCommentEditInputEvent,
+    SubRedditCommentRemovedInputEvent,
+    SubRedditSubmissionCreationInputEvent,
+    SubRedditSubmissionDeletedInputEvent,
+    SubRedditSubmissionEditInputEvent,
+    SubRedditSubmissionRemovedInputEvent,
+)
+
+DEFAULT_EVENT_BUFFER_CAPACITY: int = 10000
+
+# The most events the drain lets wait on the input queue - the rest wait in the buffer, where
+# the policy applies. (The bot's input queue is unbounded - filling it would bypass the policy)
+DEFAULT_DRAIN_HANDOFF_LIMIT: int = 16
+# How often the drain checks whether the behaviours have taken events off the input queue
+DRAIN_POLL_INTERVAL: float = 0.01
+
+# What to do with a new event when the buffer is full
+BUFFER_BLOCK: str = "block"  # Wait for room - the stream tasks fall behind reddit
+BUFFER_DROP_OLDEST: str = "drop_oldest"  # Make room by dropping the oldest event
+BUFFER_DROP_BY_PRIORITY: str = "drop_by_priority"  # Drop the oldest of the least important
+BUFFER_POLICIES: Tuple[str, ...] = (BUFFER_BLOCK, BUFFER_DROP_OLDEST, BUFFER_DROP_BY_PRIORITY)
+
+# Events which are rarer are worth more - a removal is only ever seen once, a creation is one
+# of thousands. Subclasses (e.g. the redditor events) inherit the priority of their base.
+DEFAULT_EVENT_PRIORITY: int = 1
+DEFAULT_EVENT_PRIORITIES: Dict[Type[InputEvent], int] = {
+    SubRedditCommentRemovedInputEvent: 3,
+    SubRedditSubmissionRemovedInputEvent: 3,
+    SubRedditCommentDeletedInputEvent: 3,
+    SubRedditSubmissionDeletedInputEvent: 3,
+    SubRedditCommentEditInputEvent: 2,
+    SubRedditSubmissionEditInputEvent: 2,
+    SubRedditCommentCreationInputEvent: 1,
+    SubRedditSubmissionCreationInputEvent: 1,
+}
+
+
+def edit_key(event: InputEvent) -> Optional[Tuple[str, str]]:
+    """
+    Identify the item an edit event is about - None if it's not an edit event.
+
+    :param event:
+    :return:
+    """
+    if isinstance(event, SubRedditCommentEditInputEvent):
+        return "comment", str(event.comment.id)
+    if isinstance(event, SubRedditSubmissionEditInputEvent):
+        return "submission", str(event.submission_id)
+    return None
+
+
+class RedditEventBuffer:  # pylint: disable=too-many-instance-attributes
+    """
+    Holds events on their way to the input queue - at most capacity of them.
+
+    The stream tasks put events in without waiting (unless the policy is to block).
+    A drain task moves them on to the input queue as fast as the behaviours take them.
+    When the buffer is full, the policy decides which event is lost.
+    With coalesce_edits, a later edit of an item still waiting in the buffer replaces the
+    earlier one - keeping its place in line and the content from before the first edit.
+    """
+
+    capacity: int
+    policy: str
+    coalesce_edits: bool
+
+    delivered: int
+    coalesced: int
+    blocked: int  # Times a put had to wait for room
+    # Keyed with the name of the event type
+    dropped: Dict[str, int]
+
+    # Keyed with the sequence number of the event - oldest first
+    _events: "collections.OrderedDict[int, InputEvent]"
+    # Sequence numbers of the waiting events of each priority - oldest first
+    _by_priority: Dict[int, Deque[int]]
+    # The sequence number of the edit waiting for each item
+    _edits: Dict[Tuple[str, str], int]
+    _priorities: Dict[Type[InputEvent], int]
+    _priority_cache: Dict[Type[InputEvent], int]
+    _next_sequence: int
+    _not_empty: asyncio.Event
+    _not_full: asyncio.Event
+    _logger: logging.Logger
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_EVENT_BUFFER_CAPACITY,
+        policy: str = BUFFER_BLOCK,
+        priorities: Optional[Mapping[Type[InputEvent], int]] = None,
+        coalesce_edits: bool = False,
+    ) -> None:
+        """
+        Startup an empty buffer.
+
+        :param capacity: The most events the buffer will hold
+        :param policy: One of BUFFER_POLICIES
+        :param priorities: Keyed with an event type and valued with its priority (higher is
+                           more important) - for BUFFER_DROP_BY_PRIORITY.
+                           Defaults to DEFAULT_EVENT_PRIORITIES.
+        :param coalesce_edits: Replace a waiting edit of an item with a later edit of it
+        """
+        if capacity < 1:
+            raise AttributeError(f"Buffer capacity must be at least 1 - got {capacity}")
+        if policy not in BUFFER_POLICIES:
+            raise AttributeError(
+                f"Unknown buffer policy {policy} - expected one of {BUFFER_POLICIES}"
+            )
+
+        self.capacity = capacity
+        self.policy = policy
+        self.coalesce_edits = coalesce_edits
+
+        self.delivered = 0
+        self.coalesced = 0
+        self.blocked = 0
+        self.dropped = collections.defaultdict(int)
+
+        self._events = collections.OrderedDict()
+        self._by_priority = collections.defaultdict(collections.deque)
+        self._edits = {}
+        self._priorities = dict(
+            DEFAULT_EVENT_PRIORITIES if priorities is None else priorities
+        )
+        self._priority_cache = {}
+        self._next_sequence = 0
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+        self._logger = logging.getLogger(__name__ + ":" + type(self).__name__)
+
+    def __len__(self) -> int:
+        """
+        Return the number of events waiting.
+
+        :return:
+        """
+        return len(self._events)
+
+    def priority(self, event: InputEvent) -> int:
+        """
+        Return the priority of an event - from the closest of its types with one.
+
+        :param event:
+        :return:
+        """
+        event_type = type(event)
+        if event_type not in self._priority_cache:
+            self._priority_cache[event_type] = next(
+                (
+                    self._priorities[base]
+                    for base in event_type.__mro__
+                    if base in self._priorities
+                ),
+                DEFAULT_EVENT_PRIORITY,
+            )
+        return self._priority_cache[event_type]
+
+    def _coalesce(self, event: InputEvent) -> bool:
+        """
+        Fold an edit into an edit of the same item which is still waiting - if there is one.
+
+        :param event:
+        :return: Was the event folded into a waiting one?
+        """
+        key = edit_key(event)
+        if key is None:
+            return False
+
+        sequence = self._edits.get(key)
+        if sequence is None or sequence not in self._events:
+            return False
+
+        waiting: Any = self._events[sequence]
+        later: Any = event
+        # The content before the first edit is what the behaviours want to compare against
+        if isinstance(event, SubRedditCommentEditInputEvent):
+            later.pre_edit_message = waiting.pre_edit_message
+        else:
+            later.pre_edit_submission = waiting.pre_edit_submission
+
+        self._events[sequence] = event
+        self.coalesced += 1
+        return True
+
+    def _drop(self, sequence: int) -> None:
+        """
+        Drop a waiting event.
+
+        :param sequence:
+        :return:
+        """
+        event = self._events.pop(sequence)
+        self._by_priority[self.priority(event)].remove(sequence)
+        self.dropped[type(event).__name__] += 1
+
+        key = edit_key(event) if self.coalesce_edits else None
+        if key is not None and self._edits.get(key) == sequence:
+            del self._edits[key]
+
+    def _make_room(self, event: InputEvent) -> bool:
+        """
+        Drop a waiting event to make room for a new one - as the policy says.
+
+        :param event: The new event
+        :return: Should the new event be added? (If not, it has been dropped itself)
+        """
+        if self.policy == BUFFER_DROP_OLDEST:
+            self._drop(next(iter(self._events)))
+            return True
+
+        # Drop by priority - the oldest of the least important waiting events
+        lowest = min(priority for priority, waiting in self._by_priority.items() if waiting)
+        if self.priority(event) < lowest:
+            self.dropped[type(event).__name__] += 1
+            return False
+
+        self._drop(self._by_priority[lowest][0])
+        return True
+
+    def _add(self, event: InputEvent) -> None:
+        """
+        Add an event to the back of the line.
+
+        :param event:
+        :return:
+        """
+        sequence = self._next_sequence
+        self._next_sequence += 1
+
+        self._events[sequence] = event
+        self._by_priority[self.priority(event)].append(sequence)
+
+        if self.coalesce_edits:
+            key = edit_key(event)
+            if key is not None:
+                self._edits[key] = sequence
+
+        self._not_empty.set()
+        if len(self._events) >= self.capacity:
+            self._not_full.clear()
+
+    def offer(self, event: InputEvent) -> bool:
+        """
+        Add an event - without waiting.
+
+        :param event:
+        :return: False if the buffer is full and the policy is to block
+        """
+        if self.coalesce_edits and self._coalesce(event):
+            return True
+
+        if len(self._events) >= self.capacity:
+            if self.policy == BUFFER_BLOCK:
+                return False
+            if not self._make_room(event):
+                return True
+
+        self._add(event)
+        return True
+
+    async def put(self, event: InputEvent) -> None:
+        """
+        Add an event - waiting for room if the buffer is full and the policy is to block.
+
+        :param event:
+        :return:
+        """
+        while not self.offer(event):
+            self.blocked += 1
+            await self._not_full.wait()
+
+    async def put_batch(self, events: Iterable[InputEvent]) -> None:
+        """
+        Add a batch of events - in order.
+
+        :param events:
+        :return:
+        """
+        for event in events:
+            if not self.offer(event):
+                await self.put(event)
+
+    def get_nowait(self) -> InputEvent:
+        """
+        Take the oldest waiting event.
+
+        :return:
+        """
+        if not self._events:
+            raise asyncio.QueueEmpty()
+
+        sequence, event = self._events.popitem(last=False)
+        # Events leave in order - so it's the oldest of its priority too
+        self._by_priority[self.priority(event)].popleft()
+
+        key = edit_key(event) if self.coalesce_edits else None
+        if key is not None and self._edits.get(key) == sequence:
+            del self._edits[key]
+
+        self.delivered += 1
+        if not self._events:
+            self._not_empty.clear()
+        self._not_full.set()
+        return event
+
+    async def get(self) -> InputEvent:
+        """
+        Take the oldest waiting event - waiting for one, if there are none.
+
+        :return:
+        """
+        while not self._events:
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    async def drain_to(
+        self,
+        queue: "asyncio.Queue[InputEvent]",
+        handoff_limit: int = DEFAULT_DRAIN_HANDOFF_LIMIT,
+    ) -> None:
+        """
+        Move events on to the input queue - as the behaviours take them, forever.
+
+        An event is only handed on while fewer than handoff_limit are waiting on the queue.
+        So when the behaviours fall behind, the backlog builds up in the buffer - not the queue.
+        :param queue:
+        :param handoff_limit: The most events left waiting on the queue
+        :return:
+        """
+        if handoff_limit < 1:
+            raise AttributeError(f"handoff_limit must be at least 1 - got {handoff_limit}")
+
+        while True:
+            event = await self.get()
+            while queue.qsize() >= handoff_limit:
+                await asyncio.sleep(DRAIN_POLL_INTERVAL)
+            await queue.put(event)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters for the buffer - for monitoring.
+
+        :return:
+        """
+        return {
+            "waiting": len(self._events),
+            "capacity": self.capacity,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "blocked": self.blocked,
+            "dropped": sum(self.dropped.values()),
+            "dropped_by_type": dict(self.dropped),
+        }
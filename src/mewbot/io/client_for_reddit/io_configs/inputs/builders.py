@@ -0,0 +1,671 @@
+"""
+Works out what has happened to the comments and submissions polled - and builds their events.
+
+What has happened to each item (created, edited, deleted or removed) is worked out in a single
+pass, and the event built by the builder for that change - looked up in a dispatch table.
+Building never awaits - so a whole page of events can be built at once.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import logging
+import time
+
+import asyncpraw  # type: ignore
+from mewbot.api.v1 import Input, InputEvent
+
+from ...events import (
+    SubRedditCommentCreationInputEvent,
+    SubRedditCommentDeletedInputEvent,
+    SubRedditCommentEditInputEvent,
+    SubRedditCommentRemovedInputEvent,
+    SubRedditSubmissionCreationInputEvent,
+    SubRedditSubmissionDeletedInputEvent,
+    SubRedditSubmissionEditInputEvent,
+    SubRedditSubmissionRemovedInputEvent,
+)
+from ...payloads import CommentPayload, SubmissionPayload
+from ...snapshots import CommentSnapshot, SubmissionSnapshot
+from .revisit import RedditRevisitEngine
+from .state import RedditState
+from .utils import GenericRedditTools
+
+# What can have happened to a comment or submission when it's seen in a stream
+CONTENT_CREATED: str = "created"
+CONTENT_EDITED: str = "edited"
+CONTENT_DELETED: str = "deleted"
+CONTENT_REMOVED: str = "removed"
+CONTENT_CHANGES: Tuple[str, ...] = (
+    CONTENT_CREATED,
+    CONTENT_EDITED,
+    CONTENT_DELETED,
+    CONTENT_REMOVED,
+)
+
+
+class RedditEventBuilders(Input, GenericRedditTools):  # pylint: disable=abstract-method
+    """
+    Works out what has happened to the comments and submissions polled - and builds the events.
+
+    Each of CONTENT_CHANGES has its own builder, which updates the state and returns the event
+    - without putting it on the wire.
+    """
+
+    _logger: logging.Logger
+
+    praw_reddit: asyncpraw.Reddit
+
+    reddit_state: RedditState
+    revisit_engine: Optional[RedditRevisitEngine]
+    lightweight_events: bool
+
+    # Lower case names of the subreddits whose removals are read off the mod log
+    mod_log_subreddits: Set[str]
+
+    # Keyed with one of CONTENT_CHANGES - and valued with the method building the event for it
+    _comment_event_builders: Dict[
+        str, Callable[[str, asyncpraw.reddit.Comment, bool], Optional[InputEvent]]
+    ]
+    _submission_event_builders: Dict[
+        str, Callable[[str, asyncpraw.reddit.Submission], Optional[InputEvent]]
+    ]
+
+    def __init__(
+        self,
+        praw_reddit: asyncpraw.Reddit,
+        reddit_state: RedditState,
+        revisit_engine: Optional[RedditRevisitEngine] = None,
+        lightweight_events: bool = False,
+    ) -> None:
+        """
+        Startup the builders - and the dispatch tables for them.
+
+        :param praw_reddit:
+        :param reddit_state: The content the builders have seen - to report edits against
+        :param revisit_engine: New items are tracked with it - if provided
+        :param lightweight_events: Events carry payloads of the comments and submissions -
+                                   rather than the asyncpraw objects
+        """
+        super().__init__()
+
+        self.praw_reddit = praw_reddit
+        self.reddit_state = reddit_state
+        self.revisit_engine = revisit_engine
+        self.lightweight_events = lightweight_events
+
+        self.mod_log_subreddits = set()
+
+        self._comment_event_builders = {
+            CONTENT_CREATED: self.build_subreddit_created_comment_on_submission_event,
+            CONTENT_EDITED: self.build_subreddit_edited_comment_on_submission_event,
+            CONTENT_DELETED: self.build_subreddit_deleted_comment_on_submission_event,
+            CONTENT_REMOVED: self.build_subreddit_removed_comment_on_submission_event,
+        }
+        self._submission_event_builders = {
+            CONTENT_CREATED: self.build_subreddit_created_submission_event,
+            CONTENT_EDITED: self.build_subreddit_edited_submission_event,
+            CONTENT_DELETED: self.build_subreddit_deleted_submission_event,
+            CONTENT_REMOVED: self.build_subreddit_removed_submission_event,
+        }
+
+    def is_comment_top_level(self, reddit_comment: asyncpraw.reddit.Comment) -> bool:
+        """
+        Return True if a comment is top level and False otherwise.
+
+        :param reddit_comment:
+        :return:
+        """
+        # Parse the parent_id to determine the type of comment this is
+        comment_parent_id = reddit_comment.parent_id
+
+        # Comment is definitely attached to another comment - so note it as such in the event
+        if comment_parent_id.startswith("t1_"):
+            top_level = False
+        # Comment has the submission id of a parent as a post - so it's definitely top level
+        elif comment_parent_id.startswith("t3_"):
+            top_level = True
+        else:
+            # This should never happen
+            self._logger.info(
+                "Unexpected case when trying to comment_parent_id - %s", comment_parent_id
+            )
+            top_level = False
+
+        return top_level
+
+    def removals_from_mod_log(self, subreddit: str) -> bool:
+        """
+        Return whether removals in this subreddit are being read off the mod log.
+
+        :param subreddit:
+        :return:
+        """
+        return subreddit.lower() in self.mod_log_subreddits
+
+    @staticmethod
+    def resolve_declared_subreddit(
+        reddit_item: Union[asyncpraw.reddit.Comment, asyncpraw.reddit.Submission],
+        declared_subreddits: Dict[str, str],
+    ) -> str:
+        """
+        Work out which of the watched subreddits an item from a multireddit (or r/all) came from.
+
+        Reddit does not preserve the case of the names used to build the multireddit.
+        So they're matched case-insensitively - and the name as the user declared it is returned.
+        :param reddit_item: A comment or submission pulled off a multireddit (or r/all) stream
+        :param declared_subreddits: Keyed with the lower case subreddit name and valued with
+                                    the name as it was declared
+        :return:
+        """
+        display_name = str(reddit_item.subreddit.display_name)
+        return declared_subreddits.get(display_name.lower(), display_name)
+
+    def classify_comment(
+        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment
+    ) -> Optional[str]:
+        """
+        Work out what has happened to a comment - one of CONTENT_CHANGES.
+
+        :param subreddit: The declared subreddit we are polling from
+        :param reddit_comment:
+        :return: None if nothing should be reported
+        """
+        # "Detect" removed or deleted comments - a poor method, but the best that can be done atm
+        # Note - there may be issues where this does not work for non-english language subreddits
+        if reddit_comment.body == r"[removed]":
+            if self.removals_from_mod_log(subreddit):
+                # The mod log reports the removal - with who the author was
+                return None
+
+            # Per notes in reddit-dev-notes.md
+            # Not sure if removed events are being broadcast by the API
+            if reddit_comment.author == r"[deleted]":
+                return CONTENT_REMOVED
+
+        if reddit_comment.body == r"[deleted]":
+            return CONTENT_DELETED
+
+        # Not sure if editing a comment produces a separate event in this result
+        # Or if it just happens to change the status of the observed event to edited
+        # Given this is intended to be the backend for a _display_ system - it probably
+        # DOES NOT produce a separate event
+
+        # Note - depending on the cache size events will start falling out of it
+        # So it's fairly certain that we won't be able to provide the pre-edit content
+
+        # If a comment has been edited, then it needs to go on the wire as an edited event
+        if reddit_comment.edited:
+            return CONTENT_EDITED
+
+        # If a message is not declared as edited, deleted or removed, just put it on the wire
+        return CONTENT_CREATED
+
+    def build_comment_event(
+        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment
+    ) -> Optional[InputEvent]:
+        """
+        Classify a comment and build the event for it - without putting it on the wire.
+
+        :param subreddit: The declared subreddit we are polling from
+        :param reddit_comment:
+        :return: None if nothing should be reported
+        """
+        change = self.classify_comment(subreddit, reddit_comment)
+        if change is None:
+            return None
+
+        return self._comment_event_builders[change](
+            subreddit, reddit_comment, self.is_comment_top_level(reddit_comment)
+        )
+
+    def build_subreddit_created_comment_on_submission_event(
+        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
+    ) -> Optional[InputEvent]:
+        """
+        A comment has been created in a monitored subreddit/profile - on a submission.
+
+        Subreddit first.
+        :param subreddit:
+        :param reddit_comment:
+        :param top_level:
+        :return: The event to put on the wire - None if there is nothing to report
+        """
+        # The same comment can turn up in more than one stream (e.g. a monitored redditor
+        # posting in a monitored subreddit) - it should only go on the wire once
+        if not self.reddit_state.seen_comments.add(reddit_comment.id):
+            return None
+
+        if self.revisit_engine is not None:
+            self.revisit_engine.track(
+                reddit_comment.fullname, reddit_comment.created_utc, context=subreddit
+            )
+
+        # Hash work here?
+        self.reddit_state.seen_comment_contents[
+            reddit_comment.id
+        ] = CommentSnapshot.from_comment(reddit_comment)
+
+        comment_creation_input_event = SubRedditCommentCreationInputEvent(
+            comment=self.comment_payload(reddit_comment),
+            subreddit=subreddit,
+            parent_id=reddit_comment.parent_id,
+            author_str=self.reddit_state.observe_author(reddit_comment),
+            top_level=top_level,
+            creation_timestamp=reddit_comment.created_utc,
+        )
+
+        return comment_creation_input_event
+
+    def build_subreddit_edited_comment_on_submission_event(
+        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
+    ) -> Optional[InputEvent]:
+        """
+        A comment has been edited in a monitored subreddit.
+
+        :param subreddit:
+        :param reddit_comment:
+        :param top_level:
+        :return: The event to put on the wire - None if there is nothing to report
+        """
+        message_id = reddit_comment.id
+
+        # Check if we have an existing old message to assign to this message
+        message_hash = self.hash_comment(reddit_comment)
+        if message_hash in self.reddit_state.previous_comment_map:
+            old_message = self.reddit_state.previous_comment_map[message_hash]
+        else:
+            old_message = self.reddit_state.seen_comment_contents.get(message_id, None)
+
+        comment_edit_input_event = SubRedditCommentEditInputEvent(
+            comment=self.comment_payload(reddit_comment),
+            subreddit=subreddit,
+            parent_id=reddit_comment.parent_id,
+            author_str=self.reddit_state.observe_author(reddit_comment),
+            top_level=top_level,
+            # If we have it in our internal cache
+            pre_edit_message=old_message,
+            # This may be the best we can do - as the message doesn't seem to have a "last edited"
+            # or similar field
+            edit_timestamp=str(time.time()),
+        )
+
+        self.reddit_state.previous_comment_map[message_hash] = old_message
+        # Store the current state of the message - in case it's edited again
+        self.reddit_state.seen_comment_contents[message_id] = CommentSnapshot.from_comment(
+            reddit_comment
+        )
+
+        return comment_edit_input_event
+
+    def build_subreddit_deleted_comment_on_submission_event(
+        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
+    ) -> Optional[InputEvent]:
+        """
+        A comment has been deleted from a submission (on from somewhere in its comment forest).
+
+        :param subreddit:
+        :param reddit_comment:
+        :param top_level:
+        :return: The event to put on the wire - None if there is nothing to report
+        """
+        # Check to see if we have an old message
+        comment_hash = self.hash_comment(reddit_comment)
+        old_reddit_message = self.reddit_state.previous_comment_map.get(comment_hash, None)
+
+        # If we don't, try in the seen comments
+        if old_reddit_message is None:
+            old_reddit_message = self.reddit_state.seen_comment_contents.get(
+                reddit_comment.id, None
+            )
+
+        # Update the cache - if a message has been removed it should never change again
+        self.reddit_state.previous_comment_map[comment_hash] = None
+        # Indicate that the comment is gone by setting the contents to None
+        self.reddit_state.seen_comment_contents[reddit_comment.id] = None
+
+        # The cached copy may have been evicted - in which case the author is unknown
+        old_author_str = "" if old_reddit_message is None else old_reddit_message.author
+
+        deleted_message_event = SubRedditCommentDeletedInputEvent(
+            comment=self.comment_payload(reddit_comment),
+            subreddit=subreddit,
+            author_str=old_author_str,
+            top_level=top_level,
+            del_timestamp=str(time.time()),
+            parent_id=reddit_comment.parent_id,
+        )
+
+        return deleted_message_event
+
+    def build_subreddit_removed_comment_on_submission_event(
+        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
+    ) -> Optional[InputEvent]:
+        """
+        A comment has been removed from a submission (on from somewhere in its comment forest).
+
+        Subreddit first.
+        :param subreddit:
+        :param reddit_comment:
+        :param top_level:
+        :return: The event to put on the wire - None if there is nothing to report
+        """
+
+        # Check to see if we have an old message
+        comment_hash = self.hash_comment(reddit_comment)
+        old_reddit_message = self.reddit_state.previous_comment_map.get(comment_hash, None)
+
+        # If we don't, try in the seen comments
+        if old_reddit_message is None:
+            old_reddit_message = self.reddit_state.seen_comment_contents.get(
+                reddit_comment.id, None
+            )
+
+        # Update the cache - if a message has been removed it should never change again
+        self.reddit_state.previous_comment_map[comment_hash] = None
+
+        # Indicate that the comment is gone by setting the contents to None
+        self.reddit_state.seen_comment_contents[reddit_comment.id] = None
+
+        # Without the old message there is no good way to know who the author was
+        old_author_str = "" if old_reddit_message is None else old_reddit_message.author
+
+        removed_message_event = SubRedditCommentRemovedInputEvent(
+            comment=self.comment_payload(reddit_comment),
+            subreddit=subreddit,
+            author_str=old_author_str,
+            top_level=top_level,
+            remove_timestamp=str(time.time()),
+            parent_id=reddit_comment.parent_id,
+        )
+
+        return removed_message_event
+
+    def classify_submission(
+        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
+    ) -> Optional[str]:
+        """
+        Work out what has happened to a submission - one of CONTENT_CHANGES.
+
+        :param subreddit: The declared subreddit we are polling from
+        :param reddit_submission:
+        :return: None if nothing should be reported
+        """
+        # "Detect" removed or deleted comments - a poor method, but the best that can be done atm
+        # Note - there may be issues where this does not work for non-english language subreddits
+        if reddit_submission.selftext == r"[removed]":
+            if self.removals_from_mod_log(subreddit):
+                # The mod log reports the removal - with who the author was
+                return None
+
+            # Per notes in reddit-dev-notes.md
+            # Not sure if removed events are being broadcast by the API
+            if reddit_submission.author == r"[deleted]":
+                return CONTENT_REMOVED
+
+        if reddit_submission.selftext == r"[deleted]":
+            return CONTENT_DELETED
+
+        # Not sure if editing a submission produces a separate event in this stream
+        # Or if it just happens to change the status of the observed event to edited
+        # Given this is intended to be the backend for a _display_ system - it probably
+        # DOES NOT produce a separate event
+
+        # Note - depending on the cache size events will start falling out of it
+        # So it's fairly certain that we won't be able to provide the pre-edit content
+
+        # If a submission has been edited, then it needs to go on the wire as an edited event
+        if reddit_submission.edited:
+            return CONTENT_EDITED
+
+        # If a message is not declared as edited, deleted or removed, just put it on the wire
+        return CONTENT_CREATED
+
+    def build_submission_event(
+        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
+    ) -> Optional[InputEvent]:
+        """
+        Classify a submission and build the event for it - without putting it on the wire.
+
+        :param subreddit: The declared subreddit we are polling from
+        :param reddit_submission:
+        :return: None if nothing should be reported
+        """
+        change = self.classify_submission(subreddit, reddit_submission)
+        if change is None:
+            return None
+
+        return self._submission_event_builders[change](subreddit, reddit_submission)
+
+    def build_subreddit_created_submission_event(
+        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
+    ) -> Optional[InputEvent]:
+        """
+        A submission has been created in a monitored subreddit.
+
+        :param subreddit:
+        :param reddit_submission:
+        :return: The event to put on the wire - None if there is nothing to report
+        """
+        # The same submission can turn up in more than one stream - only put it on the wire once
+        if not self.reddit_state.seen_submissions.add(reddit_submission.id):
+            return None
+
+        if self.revisit_engine is not None:
+            self.revisit_engine.track(
+                reddit_submission.fullname, reddit_submission.created_utc, context=subreddit
+            )
+
+        # Keep the original content - to report on it if the submission is edited or deleted
+        self.reddit_state.seen_submission_contents[
+            reddit_submission.id
+        ] = SubmissionSnapshot.from_submission(reddit_submission)
+
+        submission_creation_input_event = SubRedditSubmissionCreationInputEvent(
+            subreddit=subreddit,
+            submission_id=reddit_submission.id,
+            submission=self.submission_payload(reddit_submission),
+            author_str=self.reddit_state.observe_author(reddit_submission),
+            creation_timestamp=reddit_submission.created_utc,
+            submission_content=reddit_submission.selftext,
+            submission_image=reddit_submission.url,
+            submission_title=reddit_submission.title,
+        )
+
+        return submission_creation_input_event
+
+    def build_subreddit_edited_submission_event(
+        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
+    ) -> Optional[InputEvent]:
+        """
+        A submission has been edited in a monitored subreddit.
+
+        :param subreddit:
+        :param reddit_submission:
+        :return: The event to put on the wire - None if there is nothing to report
+        """
+
+        message_id = reddit_submission.id
+
+        # Check if we have an existing old message to assign to this message
+        message_hash = self.hash_submission(reddit_submission)
+        if message_hash in self.reddit_state.previous_submission_map:
+            old_message = self.reddit_state.previous_submission_map[message_hash]
+        else:
+            old_message = self.reddit_state.seen_submission_contents.get(message_id, None)
+
+        submission_edit_input_event = SubRedditSubmissionEditInputEvent(
+            submission=self.submission_payload(reddit_submission),
+            author_str=self.reddit_state.observe_author(reddit_submission),
+            submission_image=None,
+            submission_title=reddit_submission.title,
+            # If we have it in our internal cache
+            pre_edit_submission=old_message,
+            # This may be the best we can do - as the message doesn't seem to have a "last edited"
+            # or similar field
+            edit_timestamp=str(time.time()),
+            subreddit=subreddit,
+            submission_content=reddit_submission.selftext,
+            submission_id=reddit_submission.id,
+        )
+
+        self.reddit_state.previous_submission_map[message_hash] = old_message
+
+        # Store the current state of the message - in case it's edited again
+        self.reddit_state.seen_submission_contents[
+            message_id
+        ] = SubmissionSnapshot.from_submission(reddit_submission)
+
+        return submission_edit_input_event
+
+    def build_subreddit_deleted_submission_event(
+        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
+    ) -> Optional[InputEvent]:
+        """
+        A submission has been deleted in a monitored subreddit.
+
+        :param subreddit:
+        :param reddit_submission:
+        :return: The event to put on the wire - None if there is nothing to report
+        """
+
+        # Check to see if we have an old message
+        submission_hash = self.hash_submission(reddit_submission)
+        old_reddit_submission = self.reddit_state.previous_submission_map.get(
+            submission_hash, None
+        )
+
+        # If we don't, try in the seen submissions
+        if old_reddit_submission is None:
+            old_reddit_submission = self.reddit_state.seen_submission_contents.get(
+                reddit_submission.id, None
+            )
+
+        # Update the cache - if a message has been removed it should never change again
+        self.reddit_state.previous_submission_map[submission_hash] = None
+        # Indicate that the submission is gone by setting the contents to None
+        self.reddit_state.seen_submission_contents[reddit_submission.id] = None
+
+        # The cached copy may have been evicted - in which case the author is unknown
+        old_author_str = "" if old_reddit_submission is None else old_reddit_submission.author
+
+        deleted_message_event = SubRedditSubmissionDeletedInputEvent(
+            submission=self.submission_payload(reddit_submission),
+            subreddit=subreddit,
+            submission_title=reddit_submission.title,
+            author_str=old_author_str,
+            del_timestamp=str(time.time()),
+            submission_content=reddit_submission.selftext,
+            submission_id=reddit_submission.id,
+            submission_image=None,
+        )
+
+        return deleted_message_event
+
+    def build_subreddit_removed_submission_event(
+        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
+    ) -> Optional[InputEvent]:
+        """
+        A submission has been deleted in a monitored subreddit.
+
+        :param subreddit:
+        :param reddit_submission:
+        :return: The event to put on the wire - None if there is nothing to report
+        """
+
+        # Check to see if we have an old message
+        submission_hash = self.hash_submission(reddit_submission)
+        old_reddit_submission = self.reddit_state.previous_submission_map.get(
+            submission_hash, None
+        )
+
+        # If we don't, try in the seen submissions
+        if old_reddit_submission is None:
+            old_reddit_submission = self.reddit_state.seen_submission_contents.get(
+                reddit_submission.id, None
+            )
+
+        # Update the cache - if a message has been removed it should never change again
+        self.reddit_state.previous_submission_map[submission_hash] = None
+        # Indicate that the submission is gone by setting the contents to None
+        self.reddit_state.seen_submission_contents[reddit_submission.id] = None
+
+        # Without the old message there is no good way to know who the author was
+        old_author_str = "" if old_reddit_submission is None else old_reddit_submission.author
+
+        removed_message_event = SubRedditSubmissionRemovedInputEvent(
+            submission_id=reddit_submission.id,
+            submission_title=reddit_submission.title,
+            submission=self.submission_payload(reddit_submission),
+            subreddit=subreddit,
+            author_str=old_author_str,
+            remove_timestamp=str(time.time()),
+            submission_content=reddit_submission.selftext,
+            submission_image=reddit_submission.url,
+        )
+
+        return removed_message_event
+
+    def comment_payload(self, reddit_comment: asyncpraw.reddit.Comment) -> Any:
+        """
+        Return what an event should carry for a comment.
+
+        :param reddit_comment:
+        :return: The comment - or, with lightweight events, a payload of it
+        """
+        if not self.lightweight_events:
+            return reddit_comment
+        return CommentPayload.from_comment(reddit_comment)
+
+    def submission_payload(self, reddit_submission: asyncpraw.reddit.Submission) -> Any:
+        """
+        Return what an event should carry for a submission.
+
+        :param reddit_submission:
+        :return: The submission - or, with lightweight events, a payload of it
+        """
+        if not self.lightweight_events:
+            return reddit_submission
+        return SubmissionPayload.from_submission(reddit_submission)
+
+    def lazy_comment(self, comment_id: str) -> Any:
+        """
+        Return what an event should carry for a comment - when only its id is known.
+
+        :param comment_id:
+        :return: A lazy comment - or, with lightweight events, a payload with just the id
+        """
+        if not self.lightweight_events:
+            return asyncpraw.models.Comment(self.praw_reddit, id=comment_id)
+        return CommentPayload(id=comment_id)
+
+    def lazy_submission(self, submission_id: str) -> Any:
+        """
+        Return what an event should carry for a submission - when only its id is known.
+
+        :param submission_id:
+        :return: A lazy submission - or, with lightweight events, a payload with just the id
+        """
+        if not self.lightweight_events:
+            return asyncpraw.models.Submission(self.praw_reddit, id=submission_id)
+        return SubmissionPayload(id=submission_id)
+
+    def page_to_events(
+        self,
+        page: Iterable[Tuple[str, Any]],
+        build_event: Callable[[str, Any], Optional[InputEvent]],
+    ) -> List[InputEvent]:
+        """
+        Build the events for a whole page of items - in one pass, with no awaits.
+
+        :param page: The declared subreddit each item came from - and the item
+        :param build_event: build_comment_event or build_submission_event
+        :return: In the same order as the page
+        """
+        events = []
+        for subreddit, reddit_item in page:
+            event = build_event(subreddit, reddit_item)
+            if event is not None:
+                events.append(event)
+        return events
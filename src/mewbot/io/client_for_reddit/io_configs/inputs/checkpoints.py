@@ -0,0 +1,142 @@
+"""
+Records how far each stream has got - so a restart can pick up where the last run left off.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import dataclasses
+import json
+import logging
+import os
+import pathlib
+import time
+
+
+@dataclasses.dataclass
+class StreamCheckpoint:
+    """
+    The newest item a stream has processed.
+    """
+
+    fullname: str  # e.g. t1_abc123 - the id of the item with its type prefix
+    created_utc: float  # When that item was created
+
+
+class StreamCheckpointStore:
+    """
+    Keeps a checkpoint for every stream - persisted as a small JSON file.
+
+    Writes are throttled - at most one every save_interval seconds.
+    So a crash can lose (and will then replay) up to that much progress.
+    The streams save whatever is left when they stop - and while they're idle.
+    """
+
+    path: pathlib.Path
+    save_interval: float
+
+    _checkpoints: Dict[str, StreamCheckpoint]
+    _dirty: bool
+    _last_save: float
+    _logger: logging.Logger
+
+    def __init__(self, path: str | os.PathLike[str], save_interval: float = 10.0) -> None:
+        """
+        Startup the store - loading any checkpoints left by the last run.
+
+        :param path: Where the checkpoints are kept
+        :param save_interval: The minimum time (in seconds) between writes to disk
+        """
+        self.path = pathlib.Path(path)
+        self.save_interval = save_interval
+
+        self._logger = logging.getLogger(__name__ + ":" + type(self).__name__)
+
+        self._checkpoints = self._load()
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def _load(self) -> Dict[str, StreamCheckpoint]:
+        """
+        Read the checkpoints from disk - if there are any.
+
+        :return:
+        """
+        if not self.path.exists():
+            return {}
+
+        try:
+            with self.path.open("r", encoding="utf-8") as checkpoint_file:
+                raw_checkpoints = json.load(checkpoint_file)
+            return {
+                stream_key: StreamCheckpoint(
+                    fullname=str(raw["fullname"]), created_utc=float(raw["created_utc"])
+                )
+                for stream_key, raw in raw_checkpoints.items()
+            }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self._logger.warning(
+                "Could not read stream checkpoints from '%s' - starting fresh", self.path
+            )
+            return {}
+
+    def get(self, stream_key: str) -> Optional[StreamCheckpoint]:
+        """
+        Return the checkpoint for a stream - if one has been recorded.
+
+        :param stream_key:
+        :return:
+        """
+        return self._checkpoints.get(stream_key)
+
+    def update(self, stream_key: str, fullname: str, created_utc: float) -> None:
+        """
+        Record the newest item processed by a stream.
+
+        :param stream_key:
+        :param fullname: Fullname of the newest item
+        :param created_utc: When the newest item was created
+        :return:
+        """
+        self._checkpoints[stream_key] = StreamCheckpoint(
+            fullname=fullname, created_utc=float(created_utc)
+        )
+        self._dirty = True
+        self.save_if_due()
+
+    def save_if_due(self) -> None:
+        """
+        Write the checkpoints to disk - if save_interval has passed since the last write.
+
+        :return:
+        """
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self) -> None:
+        """
+        Write the checkpoints to disk - if they have changed since the last write.
+
+        The file is replaced atomically - so a crash mid-write will not corrupt it.
+        :return:
+        """
+        if not self._dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with temp_path.open("w", encoding="utf-8") as checkpoint_file:
+            json.dump(
+                {
+                    stream_key: dataclasses.asdict(checkpoint)
+                    for stream_key, checkpoint in self._checkpoints.items()
+                },
+                checkpoint_file,
+                indent=2,
+            )
+        os.replace(temp_path, self.path)
+
+        self._dirty = False
+        self._last_save = time.monotonic()
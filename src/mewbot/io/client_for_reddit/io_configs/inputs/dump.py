@@ -0,0 +1,395 @@
+"""
+Replays comments and submissions from Pushshift style dumps - for backtesting behaviours.
+
+A dump is a file of newline delimited JSON (NDJSON) - one comment or submission per line.
+Dumps can be plain (.ndjson), gzipped (.ndjson.gz) or zstandard compressed (.ndjson.zst).
+They are decoded a line at a time - so however large a dump is, only a line (and a batch of
+events) is held at once.
+"""
+
+from __future__ import annotations
+
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Type,
+    cast,
+)
+
+import asyncio
+import gzip
+import heapq
+import io
+import json
+import logging
+import time
+import zlib
+
+from mewbot.api.v1 import Input, InputEvent
+
+from ...events import (
+    SubRedditCommentCreationInputEvent,
+    SubRedditSubmissionCreationInputEvent,
+)
+from ...payloads import CommentPayload, SubmissionPayload
+from .utils import put_events
+
+try:
+    import orjson
+
+    loads: Callable[[bytes], Any] = orjson.loads  # pylint: disable=no-member
+except ImportError:
+    loads = json.loads
+
+# Only needed for .ndjson.zst dumps
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None
+
+# Errors which mean the rest of a dump can't be read - e.g. it was truncated
+DUMP_READ_ERRORS: tuple[Type[Exception], ...] = (OSError, EOFError, zlib.error) + (
+    () if zstandard is None else (zstandard.ZstdError,)
+)
+
+DUMP_SUFFIXES: tuple[str, ...] = (".ndjson", ".ndjson.gz", ".ndjson.zst")
+
+# Pushshift compressed its dumps with a long window - which has to be allowed explicitly
+ZSTD_MAX_WINDOW_SIZE: int = 2**31
+
+# Events put on the wire together - the reader yields to the loop between batches
+DEFAULT_DUMP_BATCH_SIZE: int = 100
+
+
+def open_dump(path: str) -> BinaryIO:
+    """
+    Open a dump for reading - decompressing it as it's read, if needed.
+
+    :param path: Ending in one of DUMP_SUFFIXES
+    :return:
+    """
+    if path.endswith(".ndjson"):
+        return open(path, "rb")  # pylint: disable=consider-using-with
+
+    if path.endswith(".ndjson.gz"):
+        return cast(BinaryIO, gzip.open(path, "rb"))
+
+    if path.endswith(".ndjson.zst"):
+        if zstandard is None:
+            raise ImportError(f"Reading {path} needs the zstandard package installed")
+
+        decompressor = zstandard.ZstdDecompressor(max_window_size=ZSTD_MAX_WINDOW_SIZE)
+        reader = decompressor.stream_reader(
+            open(path, "rb"), closefd=True  # pylint: disable=consider-using-with
+        )
+        return cast(BinaryIO, io.BufferedReader(reader))
+
+    raise AttributeError(f"Cannot read {path} - dumps must end in one of {DUMP_SUFFIXES}")
+
+
+def record_created_utc(record: Dict[str, Any]) -> float:
+    """
+    When a record was created - some dumps hold it as a string.
+
+    :param record:
+    :return:
+    """
+    return float(record["created_utc"])
+
+
+class RedditDumpInput(Input):  # pylint: disable=too-many-instance-attributes
+    """
+    Produces creation events from dumps of comments and submissions - rather than from reddit.
+
+    The events are the same as those from RedditSubredditInput - but carry payloads of the
+    comment or submission, built from the records, rather than asyncpraw objects.
+    The dumps are merged in order of creation - so each should be sorted by created_utc, as
+    Pushshift dumps are.
+    """
+
+    _logger: logging.Logger
+
+    # Lower case names of the subreddits to keep - None to keep everything
+    subreddits: Optional[Set[str]]
+
+    records_read: int
+    # Lines which could not be decoded - or turned into events
+    records_skipped: int
+    events_sent: int
+    finished: asyncio.Event
+
+    _replay_task: Optional[asyncio.Task[None]]
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        dump_files: List[str],
+        subreddits: Optional[List[str]] = None,
+        speed: Optional[float] = None,
+        batch_size: int = DEFAULT_DUMP_BATCH_SIZE,
+        override_logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """
+        Startup the input - nothing is read until it's run.
+
+        :param dump_files: Each ending in one of DUMP_SUFFIXES
+        :param subreddits: Only produce events for these subreddits - if None, for all of them
+        :param speed: Replay the items at this many times the pace they were created at - if
+                      None, as fast as the behaviours take them
+        :param batch_size: Events put on the wire together
+        :param override_logger:
+        """
+        for path in dump_files:
+            if not path.endswith(DUMP_SUFFIXES):
+                raise AttributeError(
+                    f"Cannot read {path} - dumps must end in one of {DUMP_SUFFIXES}"
+                )
+        if speed is not None and speed <= 0:
+            raise AttributeError(f"speed must be positive - got {speed}")
+        if batch_size < 1:
+            raise AttributeError(f"batch_size must be at least 1 - got {batch_size}")
+
+        super().__init__()
+
+        self.dump_files = list(dump_files)
+        self.subreddits = (
+            None if subreddits is None else {subreddit.lower() for subreddit in subreddits}
+        )
+        self.speed = speed
+        self.batch_size = batch_size
+
+        self.records_read = 0
+        self.records_skipped = 0
+        self.events_sent = 0
+        self.finished = asyncio.Event()
+
+        self._replay_task = None
+
+        self._logger = (
+            logging.getLogger(__name__ + ":" + type(self).__name__)
+            if override_logger is None
+            else override_logger
+        )
+
+    @staticmethod
+    def produces_inputs() -> Set[Type[InputEvent]]:
+        """
+        Dumps only record what was created.
+
+        :return:
+        """
+        return {SubRedditCommentCreationInputEvent, SubRedditSubmissionCreationInputEvent}
+
+    async def run(self) -> None:
+        """
+        Start replaying the dumps - in the background.
+
+        :return:
+        """
+        self._logger.info("About to replay dumps - %s", self.dump_files)
+        # Held - so the task isn't collected while it runs
+        self._replay_task = asyncio.get_running_loop().create_task(self.replay())
+
+    def read_dump(self, path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Decode the records in a dump - one line at a time, counting the lines skipped.
+
+        A dump which can't be read (e.g. a truncated .gz or .zst) ends where it breaks off.
+        :param path:
+        :return:
+        """
+        try:
+            with open_dump(path) as dump:
+                for line in dump:
+                    record = self.decode_record(line)
+                    if record is not None:
+                        yield record
+        except DUMP_READ_ERRORS:
+            self._logger.exception("Reading %s failed - skipping the rest of it", path)
+
+    def decode_record(self, line: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Decode a line of a dump - with its created_utc converted to a float.
+
+        Lines which can't be decoded - or have a created_utc which is not a number - are
+        counted as skipped.
+        :param line:
+        :return: None if the line does not hold a record
+        """
+        if not line.strip():
+            return None
+        try:
+            record = loads(line)
+        except ValueError:
+            self.records_skipped += 1
+            return None
+        if not isinstance(record, dict) or "created_utc" not in record:
+            return None
+
+        try:
+            record["created_utc"] = record_created_utc(record)
+        except (TypeError, ValueError):
+            self.records_skipped += 1
+            return None
+        return record
+
+    def records(self) -> Iterable[Dict[str, Any]]:
+        """
+        Every record in the dumps - merged in order of creation.
+
+        :return:
+        """
+        return heapq.merge(
+            *(self.read_dump(path) for path in self.dump_files),
+            key=record_created_utc,
+        )
+
+    async def replay(self) -> None:
+        """
+        Put the events for every record in the dumps on the wire - and then set finished.
+
+        :return:
+        """
+        try:
+            await self._replay_records()
+        finally:
+            self.finished.set()
+
+    async def _replay_records(self) -> None:
+        """
+        Put the events for every record in the dumps on the wire.
+
+        :return:
+        """
+        started_at = time.monotonic()
+        first_created_utc: Optional[float] = None
+
+        batch: List[InputEvent] = []
+        for record in self.records():
+            self.records_read += 1
+            event = self.checked_record_to_event(record)
+            if event is None:
+                continue
+
+            if self.speed is not None:
+                created_utc = record_created_utc(record)
+                if first_created_utc is None:
+                    first_created_utc = created_utc
+                due = started_at + (created_utc - first_created_utc) / self.speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await self.send_batch(batch)
+                    batch = []
+                    await asyncio.sleep(delay)
+
+            batch.append(event)
+            if len(batch) >= self.batch_size:
+                await self.send_batch(batch)
+                batch = []
+                # Reading is synchronous - give the rest of the loop a turn
+                await asyncio.sleep(0)
+
+        await self.send_batch(batch)
+
+        self._logger.info(
+            "Finished replaying dumps - %i records read, %i events sent, %i records skipped",
+            self.records_read,
+            self.events_sent,
+            self.records_skipped,
+        )
+
+    def checked_record_to_event(self, record: Dict[str, Any]) -> Optional[InputEvent]:
+        """
+        Build the creation event for a record - counting it as skipped if it's malformed.
+
+        e.g. a record with no id - one bad record should not stop the replay.
+        :param record:
+        :return: None if the record is not wanted - or could not be built
+        """
+        try:
+            return self.record_to_event(record)
+        except (KeyError, TypeError, ValueError):
+            self._logger.warning("Skipping a record which could not be read - %s", record)
+            self.records_skipped += 1
+            return None
+
+    def record_to_event(self, record: Dict[str, Any]) -> Optional[InputEvent]:
+        """
+        Build the creation event for a comment or submission record.
+
+        :param record:
+        :return: None if the record is not wanted - or is neither
+        """
+        subreddit = record.get("subreddit")
+        if not isinstance(subreddit, str):
+            return None
+        if self.subreddits is not None and subreddit.lower() not in self.subreddits:
+            return None
+
+        if "title" in record:
+            return self.build_submission_event(subreddit, record)
+        if "body" in record:
+            return self.build_comment_event(subreddit, record)
+        return None
+
+    @staticmethod
+    def build_comment_event(
+        subreddit: str, record: Dict[str, Any]
+    ) -> SubRedditCommentCreationInputEvent:
+        """
+        Build the creation event for a comment record.
+
+        :param subreddit:
+        :param record:
+        :return:
+        """
+        payload = CommentPayload.from_record(record)
+        return SubRedditCommentCreationInputEvent(
+            comment=payload,
+            subreddit=subreddit,
+            parent_id=payload.parent_id,
+            author_str=payload.author,
+            top_level=payload.parent_id.startswith("t3_"),
+            creation_timestamp=record_created_utc(record),
+        )
+
+    @staticmethod
+    def build_submission_event(
+        subreddit: str, record: Dict[str, Any]
+    ) -> SubRedditSubmissionCreationInputEvent:
+        """
+        Build the creation event for a submission record.
+
+        :param subreddit:
+        :param record:
+        :return:
+        """
+        payload = SubmissionPayload.from_record(record)
+        return SubRedditSubmissionCreationInputEvent(
+            subreddit=subreddit,
+            submission_id=payload.id,
+            submission=payload,
+            author_str=payload.author,
+            creation_timestamp=record_created_utc(record),
+            submission_content=payload.selftext,
+            submission_image=payload.url,
+            submission_title=payload.title,
+        )
+
+    async def send_batch(self, reddit_input_events: List[InputEvent]) -> None:
+        """
+        Put a batch of events on the wire - in order.
+
+        Waits whenever the queue is full - so the dumps are only read as fast as the
+        behaviours keep up.
+        :param reddit_input_events:
+        :return:
+        """
+        self.events_sent += len(reddit_input_events)
+        await put_events(self.queue, reddit_input_events)
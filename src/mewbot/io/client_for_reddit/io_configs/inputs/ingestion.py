@@ -0,0 +1,127 @@
+"""
+Estimates the request cost of the ways a watchlist of subreddits can be ingested.
+
+ - per-subreddit - a comment and a submission stream for each subreddit
+ - multireddit - a comment and a submission stream for each chunk of up to 100 subreddits
+ - firehose - a single comment and submission stream of r/all - filtered locally
+
+Each stream is assumed to be polled the way AdaptivePollInterval polls it.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import math
+
+from .streams import (
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    MAX_LISTING_LIMIT,
+)
+from .utils import MULTIREDDIT_MAX_SUBREDDITS
+
+# Rough rates for all of reddit - the firehose has to keep up with these whatever is watched
+DEFAULT_FIREHOSE_COMMENTS_PER_SECOND: float = 40.0
+DEFAULT_FIREHOSE_SUBMISSIONS_PER_SECOND: float = 5.0
+
+INGESTION_MODES: List[str] = ["per-subreddit", "multireddit", "firehose"]
+
+
+def stream_requests_per_second(  # pylint: disable=too-many-arguments
+    items_per_second: float,
+    min_poll_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+    max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+    target_items_per_poll: int = 25,
+    limit: int = MAX_LISTING_LIMIT,
+) -> float:
+    """
+    Estimate the requests a single stream makes per second - given how busy it is.
+
+    A quiet stream backs off to the max interval.
+    A busy stream is polled often enough to pick up target_items_per_poll each time - no more
+    often than the min interval.
+    If even that can't keep up, each poll is followed by pages back to close the gap - so it
+    takes a request for every limit items.
+    :param items_per_second: How many items arrive in the stream per second
+    :param min_poll_interval:
+    :param max_poll_interval:
+    :param target_items_per_poll:
+    :param limit: Items per page
+    :return:
+    """
+    polls_per_second = min(
+        max(items_per_second / target_items_per_poll, 1 / max_poll_interval),
+        1 / min_poll_interval,
+    )
+    return max(polls_per_second, items_per_second / limit)
+
+
+def estimate_ingestion_costs(  # pylint: disable=too-many-arguments
+    subreddit_count: int,
+    comments_per_second: float,
+    submissions_per_second: float,
+    *,
+    firehose_comments_per_second: float = DEFAULT_FIREHOSE_COMMENTS_PER_SECOND,
+    firehose_submissions_per_second: float = DEFAULT_FIREHOSE_SUBMISSIONS_PER_SECOND,
+    min_poll_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+    max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+    multireddit_count: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Estimate the requests per minute each ingestion mode would make for a watchlist.
+
+    Activity is assumed to be spread evenly over the watched subreddits.
+    :param subreddit_count: The number of subreddits being watched
+    :param comments_per_second: Across all the watched subreddits
+    :param submissions_per_second: Across all the watched subreddits
+    :param firehose_comments_per_second: Across all of reddit
+    :param firehose_submissions_per_second: Across all of reddit
+    :param min_poll_interval:
+    :param max_poll_interval:
+    :param multireddit_count: The number of multireddits the watchlist would be split into -
+                              estimated from the number of subreddits, if not given
+    :return: Keyed with the mode (see INGESTION_MODES) and valued with requests per minute
+    """
+    if subreddit_count < 1:
+        return {mode: 0.0 for mode in INGESTION_MODES}
+
+    def streams_cost(stream_count: int) -> float:
+        """
+        Requests per minute for the comment and submission streams - split stream_count ways.
+
+        :param stream_count:
+        :return:
+        """
+        per_stream = stream_requests_per_second(
+            comments_per_second / stream_count, min_poll_interval, max_poll_interval
+        ) + stream_requests_per_second(
+            submissions_per_second / stream_count, min_poll_interval, max_poll_interval
+        )
+        return 60.0 * stream_count * per_stream
+
+    firehose = stream_requests_per_second(
+        firehose_comments_per_second, min_poll_interval, max_poll_interval
+    ) + stream_requests_per_second(
+        firehose_submissions_per_second, min_poll_interval, max_poll_interval
+    )
+
+    return {
+        "per-subreddit": streams_cost(subreddit_count),
+        "multireddit": streams_cost(
+            math.ceil(subreddit_count / MULTIREDDIT_MAX_SUBREDDITS)
+            if multireddit_count is None
+            else multireddit_count
+        ),
+        "firehose": 60.0 * firehose,
+    }
+
+
+def cheapest_ingestion_mode(costs: Dict[str, float]) -> str:
+    """
+    Return the mode which makes the fewest requests - preferring the more targeted on a tie.
+
+    :param costs: As returned by estimate_ingestion_costs
+    :return:
+    """
+    return min(INGESTION_MODES, key=lambda mode: (costs[mode], INGESTION_MODES.index(mode)))
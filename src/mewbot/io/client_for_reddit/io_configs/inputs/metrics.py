@@ -0,0 +1,392 @@
+"""
+Per-stream throughput and latency metrics for the reddit inputs.
+
+Exposed as a snapshot dict - and in the Prometheus text format, optionally served over HTTP.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import asyncio
+import bisect
+import collections
+import logging
+import time
+
+# Upper bounds of the histogram buckets - in seconds
+POLL_DURATION_BUCKETS: Tuple[float, ...] = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+INGESTION_LAG_BUCKETS: Tuple[float, ...] = (
+    1.0,
+    5.0,
+    15.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+    900.0,
+    3600.0,
+)
+
+PROMETHEUS_PREFIX: str = "mewbot_reddit"
+PROMETHEUS_CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """
+    Counts observations into fixed buckets - as a Prometheus histogram does.
+    """
+
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    buckets: Tuple[float, ...]
+    counts: List[int]  # Observations in each bucket - the last is for anything above them all
+    total: float
+    count: int
+
+    def __init__(self, buckets: Iterable[float]) -> None:
+        """
+        Startup an empty histogram.
+
+        :param buckets: The upper bounds of the buckets
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Record an observation.
+
+        :param value:
+        :return:
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """
+        Estimate a quantile - as the upper bound of the bucket it falls in.
+
+        :param fraction: e.g. 0.99
+        :return: None if there have been no observations - inf if it's above every bucket
+        """
+        if not self.count:
+            return None
+
+        rank = fraction * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the state of the histogram - bucket counts are cumulative, as Prometheus has them.
+
+        :return:
+        """
+        cumulative: Dict[str, int] = {}
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            cumulative[repr(bound)] = seen
+        cumulative["+Inf"] = self.count
+
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative,
+        }
+
+
+class StreamMetrics:
+    """
+    The metrics of a single stream.
+    """
+
+    polls: int
+    empty_polls: int
+    items_fetched: int
+    # Keyed with the name of the event type
+    events_emitted: Dict[str, int]
+
+    poll_duration: Histogram  # Seconds each poll took - including any pages back
+    ingestion_lag: Histogram  # Seconds between an item being created and it being polled
+
+    def __init__(self) -> None:
+        """
+        Startup with everything zeroed.
+        """
+        self.polls = 0
+        self.empty_polls = 0
+        self.items_fetched = 0
+        self.events_emitted = collections.defaultdict(int)
+
+        self.poll_duration = Histogram(POLL_DURATION_BUCKETS)
+        self.ingestion_lag = Histogram(INGESTION_LAG_BUCKETS)
+
+    def record_poll(self, duration: float, new_items: List[Any]) -> None:
+        """
+        Record a poll of the stream.
+
+        :param duration: Seconds the poll took
+        :param new_items: The items the poll found which had not been seen before
+        :return:
+        """
+        self.polls += 1
+        self.poll_duration.observe(duration)
+
+        if not new_items:
+            self.empty_polls += 1
+            return
+
+        self.items_fetched += len(new_items)
+        now = time.time()
+        for item in new_items:
+            self.ingestion_lag.observe(max(now - float(item.created_utc), 0.0))
+
+    def record_events(self, events: Iterable[Any]) -> None:
+        """
+        Record the events the stream's items were turned into.
+
+        :param events:
+        :return:
+        """
+        for event in events:
+            self.events_emitted[type(event).__name__] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the state of the metrics.
+
+        :return:
+        """
+        return {
+            "polls": self.polls,
+            "empty_polls": self.empty_polls,
+            "items_fetched": self.items_fetched,
+            "events_emitted": dict(self.events_emitted),
+            "poll_duration_seconds": self.poll_duration.snapshot(),
+            "ingestion_lag_seconds": self.ingestion_lag.snapshot(),
+        }
+
+
+def _escape_label(value: str) -> str:
+    """
+    Escape a value for use in a Prometheus label.
+
+    :param value:
+    :return:
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RedditInputMetrics:
+    """
+    The metrics of every stream of the inputs - keyed with the stream key.
+
+    Can be shared between inputs - their stream keys do not collide.
+    """
+
+    streams: Dict[str, StreamMetrics]
+    # Every event put on the wire - from any stream or revisit - keyed with the event type
+    events_sent: Dict[str, int]
+
+    _server: Optional[asyncio.Server]
+    # Held while the server starts - so inputs starting together don't both bind the port
+    _server_lock: asyncio.Lock
+    _logger: logging.Logger
+
+    def __init__(self) -> None:
+        """
+        Startup with no streams.
+        """
+        self.streams = {}
+        self.events_sent = collections.defaultdict(int)
+        self._server = None
+        self._server_lock = asyncio.Lock()
+
+        self._logger = logging.getLogger(__name__ + ":" + type(self).__name__)
+
+    def stream(self, stream_key: str) -> StreamMetrics:
+        """
+        Return the metrics for a stream - starting them if this is a new stream.
+
+        :param stream_key:
+        :return:
+        """
+        if stream_key not in self.streams:
+            self.streams[stream_key] = StreamMetrics()
+        return self.streams[stream_key]
+
+    def record_sent(self, events: Iterable[Any]) -> None:
+        """
+        Record events being put on the wire.
+
+        :param events:
+        :return:
+        """
+        for event in events:
+            self.events_sent[type(event).__name__] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the metrics of every stream - and the events sent.
+
+        :return:
+        """
+        return {
+            "streams": {
+                stream_key: metrics.snapshot() for stream_key, metrics in self.streams.items()
+            },
+            "events_sent": dict(self.events_sent),
+        }
+
+    def prometheus_text(self, prefix: str = PROMETHEUS_PREFIX) -> str:
+        """
+        Render the metrics of every stream in the Prometheus text exposition format.
+
+        :param prefix: For the names of the metrics
+        :return:
+        """
+        lines: List[str] = []
+
+        def counter(name: str, help_text: str, values: Iterable[Tuple[str, float]]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.extend(f"{prefix}_{name}{{{labels}}} {value}" for labels, value in values)
+
+        def histogram(name: str, help_text: str, attribute: str) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for stream_label, metrics in labelled:
+                values: Histogram = getattr(metrics, attribute)
+                seen = 0
+                for bound, bucket_count in zip(values.buckets, values.counts):
+                    seen += bucket_count
+                    lines.append(
+                        f'{prefix}_{name}_bucket{{{stream_label},le="{bound!r}"}} {seen}'
+                    )
+                lines.append(
+                    f'{prefix}_{name}_bucket{{{stream_label},le="+Inf"}} {values.count}'
+                )
+                lines.append(f"{prefix}_{name}_sum{{{stream_label}}} {values.total}")
+                lines.append(f"{prefix}_{name}_count{{{stream_label}}} {values.count}")
+
+        labelled = [
+            (f'stream="{_escape_label(stream_key)}"', metrics)
+            for stream_key, metrics in sorted(self.streams.items())
+        ]
+
+        counter(
+            "polls_total",
+            "Polls of the stream",
+            ((label, stream.polls) for label, stream in labelled),
+        )
+        counter(
+            "empty_polls_total",
+            "Polls of the stream which found nothing new",
+            ((label, stream.empty_polls) for label, stream in labelled),
+        )
+        counter(
+            "items_fetched_total",
+            "New items found by polling the stream",
+            ((label, stream.items_fetched) for label, stream in labelled),
+        )
+        counter(
+            "events_emitted_total",
+            "Events put on the wire from the stream's items",
+            (
+                (f'{label},event_type="{_escape_label(event_type)}"', count)
+                for label, stream in labelled
+                for event_type, count in sorted(stream.events_emitted.items())
+            ),
+        )
+        counter(
+            "events_sent_total",
+            "Events put on the wire - from any stream",
+            (
+                (f'event_type="{_escape_label(event_type)}"', count)
+                for event_type, count in sorted(self.events_sent.items())
+            ),
+        )
+        histogram(
+            "poll_duration_seconds", "Seconds each poll of the stream took", "poll_duration"
+        )
+        histogram(
+            "ingestion_lag_seconds",
+            "Seconds between an item being created and it being polled",
+            "ingestion_lag",
+        )
+
+        return "\n".join(lines) + "\n"
+
+    async def _handle_request(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Answer a single HTTP request with the metrics - whatever the path.
+
+        :param reader:
+        :param writer:
+        :return:
+        """
+        try:
+            # The request line and headers - the body (if any) is ignored
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+
+            body = self.prometheus_text().encode("utf-8")
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                + f"Content-Type: {PROMETHEUS_CONTENT_TYPE}\r\n".encode("ascii")
+                + f"Content-Length: {len(body)}\r\n".encode("ascii")
+                + b"Connection: close\r\n\r\n"
+                + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9464) -> asyncio.Server:
+        """
+        Serve the metrics in the Prometheus text format - over plain HTTP.
+
+        Binds to localhost by default - the metrics are not meant to be public.
+        Only one server is started - however many inputs share the metrics.
+        :param host:
+        :param port: 0 to pick a free port
+        :return: The running server
+        """
+        async with self._server_lock:
+            if self._server is not None:
+                return self._server
+
+            self._server = await asyncio.start_server(
+                self._handle_request, host=host, port=port
+            )
+            self._logger.info(
+                "Serving reddit input metrics on %s",
+                [sock.getsockname() for sock in self._server.sockets],
+            )
+            return self._server
+
+    async def close(self) -> None:
+        """
+        Stop serving the metrics - if they're being served.
+
+        :return:
+        """
+        if self._server is None:
+            return
+
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
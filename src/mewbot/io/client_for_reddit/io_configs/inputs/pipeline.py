@@ -0,0 +1,502 @@
+"""
+Puts the events for pages of comments and submissions on the wire - a page at a time.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Union
+
+import asyncio
+
+import asyncpraw  # type: ignore
+from mewbot.api.v1 import InputEvent
+
+from ...events import (
+    SubRedditCommentRemovedInputEvent,
+    SubRedditSubmissionRemovedInputEvent,
+)
+from ...snapshots import CommentSnapshot, SubmissionSnapshot, author_name
+from .buffer import RedditEventBuffer
+from .builders import RedditEventBuilders
+from .metrics import RedditInputMetrics
+from .revisit import RedditRevisitEngine
+from .state import RedditState
+from .utils import log_rendering, put_events
+
+
+class RedditPagePipeline(RedditEventBuilders):  # pylint: disable=abstract-method
+    """
+    Puts the events built for pages of comments and submissions on the wire.
+
+    A page is built in one pass and sent as a single batch - through the event buffer, if
+    there is one, or straight onto the input queue.
+    Single items (e.g. from revisits or the mod log) go through the same builders.
+    """
+
+    _loop: Optional[asyncio.events.AbstractEventLoop]
+
+    render_sample_rate: float
+    event_buffer: Optional[RedditEventBuffer]
+    metrics: RedditInputMetrics
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        praw_reddit: asyncpraw.Reddit,
+        reddit_state: RedditState,
+        *,
+        revisit_engine: Optional[RedditRevisitEngine] = None,
+        lightweight_events: bool = False,
+        render_sample_rate: float = 1.0,
+        event_buffer: Optional[RedditEventBuffer] = None,
+        metrics: Optional[RedditInputMetrics] = None,
+    ) -> None:
+        """
+        Startup the pipeline.
+
+        :param praw_reddit:
+        :param reddit_state: The content the builders have seen - to report edits against
+        :param revisit_engine: New items are tracked with it - if provided
+        :param lightweight_events: Events carry payloads of the comments and submissions -
+                                   rather than the asyncpraw objects
+        :param render_sample_rate: The fraction of items polled which are rendered to the
+                                   render logger - when it's enabled for DEBUG
+        :param event_buffer: Bounded buffer between the pipeline and the input queue - if
+                             None, events go straight on the queue
+        :param metrics: Records the events built and sent - if None, the pipeline makes its own
+        """
+        if not 0.0 <= render_sample_rate <= 1.0:
+            raise AttributeError(
+                f"render_sample_rate must be between 0 and 1 - got {render_sample_rate}"
+            )
+
+        super().__init__(
+            praw_reddit=praw_reddit,
+            reddit_state=reddit_state,
+            revisit_engine=revisit_engine,
+            lightweight_events=lightweight_events,
+        )
+
+        self.render_sample_rate = render_sample_rate
+        self.event_buffer = event_buffer
+        self.metrics = RedditInputMetrics() if metrics is None else metrics
+
+        self._loop = None
+
+    @property
+    def loop(self) -> asyncio.events.AbstractEventLoop:
+        """
+        Gets the current event loop.
+
+        :return:
+        """
+        if self._loop is not None:
+            return self._loop
+        self._loop = asyncio.get_running_loop()
+        return self._loop
+
+    def log_rendering(
+        self,
+        render: Callable[[Any, str], str],
+        reddit_item: Any,
+        prefix: str = "subreddit",
+    ) -> None:
+        """
+        Render an item to the render logger - if it's enabled, and the item is sampled.
+
+        :param render: render_comment or render_submission
+        :param reddit_item:
+        :param prefix: To prepend to all the rendered lines
+        :return:
+        """
+        log_rendering(render, reddit_item, prefix=prefix, sample_rate=self.render_sample_rate)
+
+    async def comment_page_to_events(
+        self, page: Iterable[Tuple[str, Any]], stream_key: Optional[str] = None
+    ) -> int:
+        """
+        Put the events for a page of comments on the wire - as a single batch.
+
+        :param page: The declared subreddit each comment came from - and the comment
+        :param stream_key: The stream the page came from - to record the events against
+        :return: The number of events put on the wire
+        """
+        events = self.page_to_events(page, self.build_comment_event)
+        if stream_key is not None:
+            self.metrics.stream(stream_key).record_events(events)
+        await self.send_batch(events)
+        return len(events)
+
+    async def submission_page_to_events(
+        self, page: Iterable[Tuple[str, Any]], stream_key: Optional[str] = None
+    ) -> int:
+        """
+        Put the events for a page of submissions on the wire - as a single batch.
+
+        :param page: The declared subreddit each submission came from - and the submission
+        :param stream_key: The stream the page came from - to record the events against
+        :return: The number of events put on the wire
+        """
+        events = self.page_to_events(page, self.build_submission_event)
+        if stream_key is not None:
+            self.metrics.stream(stream_key).record_events(events)
+        await self.send_batch(events)
+        return len(events)
+
+    async def subreddit_comment_to_event(
+        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment
+    ) -> None:
+        """
+        Takes a comment posted in a subreddit and puts it on the wire as an event.
+
+        :param subreddit: The declared subreddit we are polling from
+                          (There may be multi-subreddit or composite subreddit shennanigans
+                          going on - so just declaring the subreddit mewbot _thinks_ its
+                          drawing from)
+        :param reddit_comment:
+        :return:
+        """
+        event = self.build_comment_event(subreddit, reddit_comment)
+        if event is not None:
+            await self.send(event)
+
+    async def process_subreddit_created_comment_on_submission(
+        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
+    ) -> None:
+        """
+        A comment has been created in a monitored subreddit/profile - on a submission.
+
+        Puts the event from build_subreddit_created_comment_on_submission_event on the wire.
+        :param subreddit:
+        :param reddit_comment:
+        :param top_level:
+        :return:
+        """
+        event = self.build_subreddit_created_comment_on_submission_event(
+            subreddit, reddit_comment, top_level
+        )
+        if event is not None:
+            await self.send(event)
+
+    async def process_subreddit_edited_comment_on_submission(
+        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
+    ) -> None:
+        """
+        A comment has been edited in a monitored subreddit.
+
+        Puts the event from build_subreddit_edited_comment_on_submission_event on the wire.
+        :param subreddit:
+        :param reddit_comment:
+        :param top_level:
+        :return:
+        """
+        event = self.build_subreddit_edited_comment_on_submission_event(
+            subreddit, reddit_comment, top_level
+        )
+        if event is not None:
+            await self.send(event)
+
+    async def process_subreddit_deleted_comment_on_submission(
+        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
+    ) -> None:
+        """
+        A comment has been deleted from a submission (on from somewhere in its comment forest).
+
+        Puts the event from build_subreddit_deleted_comment_on_submission_event on the wire.
+        :param subreddit:
+        :param reddit_comment:
+        :param top_level:
+        :return:
+        """
+        event = self.build_subreddit_deleted_comment_on_submission_event(
+            subreddit, reddit_comment, top_level
+        )
+        if event is not None:
+            await self.send(event)
+
+    async def process_subreddit_removed_comment_on_submission(
+        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
+    ) -> None:
+        """
+        A comment has been removed from a submission (on from somewhere in its comment forest).
+
+        Puts the event from build_subreddit_removed_comment_on_submission_event on the wire.
+        :param subreddit:
+        :param reddit_comment:
+        :param top_level:
+        :return:
+        """
+        event = self.build_subreddit_removed_comment_on_submission_event(
+            subreddit, reddit_comment, top_level
+        )
+        if event is not None:
+            await self.send(event)
+
+    async def subreddit_submission_to_event(
+        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
+    ) -> None:
+        """
+        Takes a reddit comment and puts it on the wire as an event.
+
+        :param subreddit: The declared subreddit we are polling from
+                          (There may be multi-subreddit or composite subreddit shennanigans
+                          going on - so just declaring the subreddit mewbot _thinks_ its
+                          drawing from)
+        :param reddit_submission:
+        :return:
+        """
+        event = self.build_submission_event(subreddit, reddit_submission)
+        if event is not None:
+            await self.send(event)
+
+    async def process_subreddit_created_submission(
+        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
+    ) -> None:
+        """
+        A submission has been created in a monitored subreddit.
+
+        Puts the event from build_subreddit_created_submission_event on the wire.
+        :param subreddit:
+        :param reddit_submission:
+        :return:
+        """
+        event = self.build_subreddit_created_submission_event(subreddit, reddit_submission)
+        if event is not None:
+            await self.send(event)
+
+    async def process_subreddit_edited_submission(
+        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
+    ) -> None:
+        """
+        A submission has been edited in a monitored subreddit.
+
+        Puts the event from build_subreddit_edited_submission_event on the wire.
+        :param subreddit:
+        :param reddit_submission:
+        :return:
+        """
+        event = self.build_subreddit_edited_submission_event(subreddit, reddit_submission)
+        if event is not None:
+            await self.send(event)
+
+    async def process_subreddit_deleted_submission(
+        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
+    ) -> None:
+        """
+        A submission has been deleted in a monitored subreddit.
+
+        Puts the event from build_subreddit_deleted_submission_event on the wire.
+        :param subreddit:
+        :param reddit_submission:
+        :return:
+        """
+        event = self.build_subreddit_deleted_submission_event(subreddit, reddit_submission)
+        if event is not None:
+            await self.send(event)
+
+    async def process_subreddit_removed_submission(
+        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
+    ) -> None:
+        """
+        A submission has been deleted in a monitored subreddit.
+
+        Puts the event from build_subreddit_removed_submission_event on the wire.
+        :param subreddit:
+        :param reddit_submission:
+        :return:
+        """
+        event = self.build_subreddit_removed_submission_event(subreddit, reddit_submission)
+        if event is not None:
+            await self.send(event)
+
+    async def revisited_item_to_event(
+        self,
+        subreddit: str,
+        reddit_item: Union[asyncpraw.reddit.Comment, asyncpraw.reddit.Submission],
+    ) -> None:
+        """
+        Take the current state of an item, fetched by the revisit engine, and act on any change.
+
+        Changed items go through the same edited/deleted/removed paths as if a stream had
+        returned them.
+        Unchanged items (the usual case) are dropped.
+        :param subreddit: The declared subreddit the item was first seen in
+        :param reddit_item:
+        :return:
+        """
+        if reddit_item.fullname.startswith("t1_"):
+            snapshot: Optional[Union[CommentSnapshot, SubmissionSnapshot]]
+            snapshot = self.reddit_state.seen_comment_contents.get(reddit_item.id)
+            content = reddit_item.body
+            unchanged = snapshot is not None and snapshot.body == content
+        else:
+            snapshot = self.reddit_state.seen_submission_contents.get(reddit_item.id)
+            content = reddit_item.selftext
+            unchanged = (
+                snapshot is not None
+                and snapshot.selftext == content
+                and snapshot.author == author_name(reddit_item)
+            )
+
+        # A deleted link post keeps its (empty) selftext - only the author is blanked
+        link_deleted = (
+            not reddit_item.fullname.startswith("t1_")
+            and content not in (r"[deleted]", r"[removed]")
+            and author_name(reddit_item) == r"[deleted]"
+        )
+        gone = link_deleted or content in (r"[deleted]", r"[removed]")
+        if not gone and (unchanged or snapshot is None):
+            # Without a snapshot there is nothing to say the item has changed
+            return
+
+        if gone and self.revisit_engine is not None:
+            # Nothing more can happen to it
+            self.revisit_engine.untrack(reddit_item.fullname)
+
+        if content == r"[removed]" and self.removals_from_mod_log(subreddit):
+            # Left to the mod log
+            return
+
+        if link_deleted:
+            await self.process_subreddit_deleted_submission(subreddit, reddit_item)
+        elif reddit_item.fullname.startswith("t1_"):
+            await self.subreddit_comment_to_event(subreddit, reddit_item)
+        else:
+            await self.subreddit_submission_to_event(subreddit, reddit_item)
+
+    async def mod_action_to_event(
+        self, subreddit: str, mod_action: asyncpraw.models.ModAction
+    ) -> None:
+        """
+        Take an entry from the mod log and put it on the wire - if it's a removal.
+
+        :param subreddit: The declared subreddit the action was taken in
+        :param mod_action:
+        :return:
+        """
+        if mod_action.action == "removecomment":
+            await self.process_mod_log_removed_comment(subreddit, mod_action)
+        elif mod_action.action == "removelink":
+            await self.process_mod_log_removed_submission(subreddit, mod_action)
+
+    async def process_mod_log_removed_comment(
+        self, subreddit: str, mod_action: asyncpraw.models.ModAction
+    ) -> None:
+        """
+        A comment has been removed by a moderator - as recorded in the mod log.
+
+        The content cache is checked for the comment - to report the author and parent as they
+        were before the removal.
+        The comment on the event is lazy - it has not been fetched.
+        :param subreddit:
+        :param mod_action:
+        :return:
+        """
+        comment_id = mod_action.target_fullname.partition("_")[2]
+
+        old_reddit_message = self.reddit_state.seen_comment_contents.get(comment_id, None)
+        # Indicate that the comment is gone by setting the contents to None
+        self.reddit_state.seen_comment_contents[comment_id] = None
+
+        if self.revisit_engine is not None:
+            self.revisit_engine.untrack(mod_action.target_fullname)
+
+        if old_reddit_message is not None:
+            author_str = old_reddit_message.author
+            parent_id = old_reddit_message.parent_id
+        else:
+            # The mod log has the author - but not where the comment was
+            author_str = str(mod_action.target_author or "")
+            parent_id = ""
+
+        removed_message_event = SubRedditCommentRemovedInputEvent(
+            comment=self.lazy_comment(comment_id),
+            subreddit=subreddit,
+            author_str=author_str,
+            top_level=parent_id.startswith("t3_"),
+            remove_timestamp=str(mod_action.created_utc),
+            parent_id=parent_id,
+        )
+
+        await self.send(removed_message_event)
+
+    async def process_mod_log_removed_submission(
+        self, subreddit: str, mod_action: asyncpraw.models.ModAction
+    ) -> None:
+        """
+        A submission has been removed by a moderator - as recorded in the mod log.
+
+        The content cache is checked for the submission - to report it as it was before the
+        removal.
+        The submission on the event is lazy - it has not been fetched.
+        :param subreddit:
+        :param mod_action:
+        :return:
+        """
+        submission_id = mod_action.target_fullname.partition("_")[2]
+
+        old_reddit_submission = self.reddit_state.seen_submission_contents.get(
+            submission_id, None
+        )
+        # Indicate that the submission is gone by setting the contents to None
+        self.reddit_state.seen_submission_contents[submission_id] = None
+
+        if self.revisit_engine is not None:
+            self.revisit_engine.untrack(mod_action.target_fullname)
+
+        if old_reddit_submission is not None:
+            removed_message_event = SubRedditSubmissionRemovedInputEvent(
+                submission_id=submission_id,
+                submission_title=old_reddit_submission.title,
+                submission=self.lazy_submission(submission_id),
+                subreddit=subreddit,
+                author_str=old_reddit_submission.author,
+                remove_timestamp=str(mod_action.created_utc),
+                submission_content=old_reddit_submission.selftext,
+                submission_image=old_reddit_submission.url,
+            )
+        else:
+            # The mod log has a copy of the title and body
+            removed_message_event = SubRedditSubmissionRemovedInputEvent(
+                submission_id=submission_id,
+                submission_title=str(mod_action.target_title or ""),
+                submission=self.lazy_submission(submission_id),
+                subreddit=subreddit,
+                author_str=str(mod_action.target_author or ""),
+                remove_timestamp=str(mod_action.created_utc),
+                submission_content=str(mod_action.target_body or ""),
+                submission_image=None,
+            )
+
+        await self.send(removed_message_event)
+
+    async def send_batch(self, reddit_input_events: List[InputEvent]) -> None:
+        """
+        Put a batch of created InputEvents on the wire - in order.
+
+        Only waits if the queue is full - rather than once for every event.
+        :param reddit_input_events:
+        :return:
+        """
+        self.metrics.record_sent(reddit_input_events)
+
+        if self.event_buffer is not None:
+            await self.event_buffer.put_batch(reddit_input_events)
+            return
+
+        await put_events(self.queue, reddit_input_events)
+
+    async def send(self, reddit_input_event: InputEvent) -> None:
+        """
+        Put a created InputEvent on the wire.
+
+        :param reddit_input_event:
+        :return:
+        """
+        self.metrics.record_sent((reddit_input_event,))
+
+        if self.event_buffer is not None:
+            await self.event_buffer.put(reddit_input_event)
+            return
+
+        if self.queue is not None:
+            await self.queue.put(reddit_input_event)
@@ -0,0 +1,198 @@
+"""
+Polls a large number of redditors from a few tasks - the most active redditors most often.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import asyncio
+import heapq
+import logging
+import time
+
+import asyncprawcore  # type: ignore
+
+from .streams import RedditListingStream
+
+# Small overview pages - most redditors post a handful of items between polls at most
+DEFAULT_REDDITOR_BATCH_LIMIT: int = 10
+DEFAULT_REDDITOR_POLL_CONCURRENCY: int = 4
+
+
+class RedditRedditorPoller:
+    """
+    Keeps every watched redditor in a priority queue - ordered by when they are next due.
+
+    Each redditor has a listing stream of their overview - which makes a single request per
+    poll, and decides from the redditor's past activity how long to wait before the next.
+    A few worker tasks take the redditor which is due soonest, poll them, hand the new items
+    to the handler and put the redditor back in the queue.
+    Each poll waits its turn with the rate limit scheduler (if the streams have one) - so the
+    workers poll as many redditors as the rate budget allows, and no more.
+    """
+
+    concurrency: int
+
+    polls: int  # Overview requests made
+
+    # Keyed with the name of the redditor
+    _streams: Dict[str, RedditListingStream]
+    # When each redditor is next due (on the monotonic clock) - soonest first
+    _due: List[Tuple[float, str]]
+    _logger: logging.Logger
+
+    def __init__(self, concurrency: int = DEFAULT_REDDITOR_POLL_CONCURRENCY) -> None:
+        """
+        Startup the poller - with no redditors.
+
+        :param concurrency: The number of worker tasks polling redditors
+        """
+        if concurrency < 1:
+            raise AttributeError(f"concurrency must be at least 1 - got {concurrency}")
+
+        self.concurrency = concurrency
+        self.polls = 0
+
+        self._streams = {}
+        self._due = []
+
+        self._logger = logging.getLogger(__name__ + ":" + type(self).__name__)
+
+    def __len__(self) -> int:
+        """
+        Return the number of redditors being polled.
+
+        :return:
+        """
+        return len(self._streams)
+
+    def add(self, redditor: str, stream: RedditListingStream) -> None:
+        """
+        Start polling a redditor - they are due straight away.
+
+        :param redditor:
+        :param stream: Of the redditor's overview
+        :return:
+        """
+        if redditor in self._streams:
+            return
+
+        self._streams[redditor] = stream
+        heapq.heappush(self._due, (time.monotonic(), redditor))
+
+    def next_due(self) -> Optional[float]:
+        """
+        Return when the next redditor is due - None if there are no redditors.
+
+        :return:
+        """
+        return self._due[0][0] if self._due else None
+
+    def take_due(self, now: Optional[float] = None) -> Optional[str]:
+        """
+        Take the redditor which has been due longest - if any are due.
+
+        The redditor is out of the queue until they are rescheduled.
+        :param now: The current time on the monotonic clock
+        :return:
+        """
+        now = time.monotonic() if now is None else now
+
+        if not self._due or self._due[0][0] > now:
+            return None
+        return heapq.heappop(self._due)[1]
+
+    def reschedule(
+        self, redditor: str, wait_seconds: float, now: Optional[float] = None
+    ) -> None:
+        """
+        Put a redditor back in the queue - due after the given wait.
+
+        :param redditor:
+        :param wait_seconds:
+        :param now: The current time on the monotonic clock
+        :return:
+        """
+        now = time.monotonic() if now is None else now
+        heapq.heappush(self._due, (now + wait_seconds, redditor))
+
+    async def poll_redditor(
+        self, redditor: str, handler: Callable[[Any], Awaitable[None]]
+    ) -> float:
+        """
+        Poll a redditor once - handing each new item to the handler.
+
+        :param redditor:
+        :param handler: Called with each new item - oldest first
+        :return: How long to wait before polling the redditor again
+        """
+        stream = self._streams[redditor]
+
+        self.polls += 1
+        new_items = await stream.poll()
+
+        for reddit_item in new_items:
+            await handler(reddit_item)
+        stream.record_checkpoint(new_items)
+
+        return stream.poll_interval.record_poll(
+            [float(reddit_item.created_utc) for reddit_item in new_items]
+        )
+
+    async def worker(self, handler: Callable[[Any], Awaitable[None]]) -> None:
+        """
+        Poll whichever redditor is due next - forever.
+
+        :param handler: Called with each new item - oldest first
+        :return:
+        """
+        while True:
+            redditor = self.take_due()
+            if redditor is None:
+                next_due = self.next_due()
+                wait_seconds = 1.0 if next_due is None else next_due - time.monotonic()
+                await asyncio.sleep(min(max(wait_seconds, 0.0), 1.0))
+                continue
+
+            # Backing off is the fallback - if the poll does not say how long to wait
+            wait_seconds = self._streams[redditor].poll_interval.max_interval
+            try:
+                wait_seconds = await self.poll_redditor(redditor, handler)
+            except asyncprawcore.exceptions.AsyncPrawcoreException:
+                # One redditor (e.g. a suspended account) should not stop the rest
+                self._logger.exception("Polling redditor %s failed - backing off", redditor)
+            except Exception:  # pylint: disable=broad-exception-caught
+                # Nor should one item the handler could not deal with
+                self._logger.exception(
+                    "Handling an item from redditor %s failed - backing off", redditor
+                )
+            finally:
+                # The redditor is back in the queue - even if the worker is being cancelled
+                self.reschedule(redditor, wait_seconds)
+
+    async def run(self, handler: Callable[[Any], Awaitable[None]]) -> None:
+        """
+        Poll the redditors forever - from concurrency worker tasks.
+
+        :param handler: Called with each new item - oldest first
+        :return:
+        """
+        results = await asyncio.gather(
+            *(self.worker(handler) for _ in range(self.concurrency)), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                self._logger.error("Redditor poll worker stopped", exc_info=result)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return the counters for the poller - for monitoring.
+
+        :return:
+        """
+        return {
+            "redditors": len(self._streams),
+            "polls": self.polls,
+            "waiting": len(self._due),
+        }
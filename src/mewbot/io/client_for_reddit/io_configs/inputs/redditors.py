@@ -4,7 +4,7 @@ Redditor focussed input config - for watching redditors actions.
 
 from __future__ import annotations
 
-from typing import List, Optional, Set, Type
+from typing import List, Optional, Set, Type, Union
 
 import logging
 
@@ -15,9 +15,28 @@ from mewbot.io.client_for_reddit.events import (
     USER_FOSCUSSED_INPUT_EVENTS,
     RedditUserCreatedSubredditSubmissionInputEvent,
 )
+from mewbot.io.client_for_reddit.io_configs.inputs.buffer import RedditEventBuffer
+from mewbot.io.client_for_reddit.io_configs.inputs.checkpoints import (
+    StreamCheckpointStore,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.metrics import RedditInputMetrics
+from mewbot.io.client_for_reddit.io_configs.inputs.redditor_poller import (
+    DEFAULT_REDDITOR_BATCH_LIMIT,
+    DEFAULT_REDDITOR_POLL_CONCURRENCY,
+    RedditRedditorPoller,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.revisit import RedditRevisitEngine
+from mewbot.io.client_for_reddit.io_configs.inputs.scheduler import (
+    RedditRateLimitScheduler,
+)
 from mewbot.io.client_for_reddit.io_configs.inputs.state import RedditState
+from mewbot.io.client_for_reddit.io_configs.inputs.streams import (
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+)
 from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
 from mewbot.io.client_for_reddit.io_configs.inputs.utils import GenericRedditTools
+from mewbot.io.client_for_reddit.snapshots import SubmissionSnapshot
 
 
 class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
@@ -25,11 +44,28 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
     Watches for events generated by a monitored list of redditors.
     """
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments,too-many-locals
         self,
         praw_reddit: asyncpraw.Reddit,
         redditors: Optional[List[str]] = None,
+        *,
         reddit_state: Optional[RedditState] = None,
+        multireddit_mode: bool = False,
+        rate_limit_scheduler: Optional[RedditRateLimitScheduler] = None,
+        min_poll_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+        max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+        checkpoint_store: Optional[StreamCheckpointStore] = None,
+        revisit_engine: Optional[RedditRevisitEngine] = None,
+        mod_log_mode: bool = False,
+        overview_mode: bool = False,
+        batched_polling: bool = False,
+        batch_limit: int = DEFAULT_REDDITOR_BATCH_LIMIT,
+        poll_concurrency: int = DEFAULT_REDDITOR_POLL_CONCURRENCY,
+        render_sample_rate: float = 1.0,
+        event_buffer: Optional[RedditEventBuffer] = None,
+        metrics: Optional[RedditInputMetrics] = None,
+        metrics_port: Optional[int] = None,
+        lightweight_events: bool = False,
     ) -> None:
         """
         Initialise the classe - reddit connection happens on the IOConfig level.
@@ -38,6 +74,29 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
                             passed in
         :param redditors: A list of the redditors to watch. They might be up to something.
         :param reddit_state: Allows passing in an override stored state of reddit
+        :param multireddit_mode: Watch the redditor profiles through combined multireddit
+                                 streams - rather than one stream per profile
+        :param rate_limit_scheduler: Shared scheduler handing out the request budget
+        :param min_poll_interval: The shortest time (in seconds) any stream waits between polls
+        :param max_poll_interval: The longest time (in seconds) any stream waits between polls
+        :param checkpoint_store: Records how far each stream has got - for resuming after restart
+        :param revisit_engine: Looks at new items again as they age - to catch edits and deletes
+        :param mod_log_mode: Read removals off the mod log - where the account is a moderator
+        :param overview_mode: Watch each redditor through a single stream of their overview
+                              (comments and submissions together) - rather than separate
+                              streams of their profile, comments and submissions
+        :param batched_polling: Poll every redditor's overview from a few shared tasks - the
+                                most active redditors most often.
+                                For large watchlists - rather than one stream per redditor
+        :param batch_limit: When batched polling - how many items to ask for in each poll
+        :param poll_concurrency: When batched polling - how many redditors to poll at once
+        :param render_sample_rate: The fraction of items polled which are rendered to the
+                                   render logger - when it's enabled for DEBUG
+        :param event_buffer: Bounded buffer between the streams and the input queue
+        :param metrics: Records the throughput and latency of every stream
+        :param metrics_port: Serve the metrics on this (local) port - None not to serve them
+        :param lightweight_events: Events carry compact, immutable payloads of the comments and
+                                   submissions - rather than the asyncpraw objects
         """
         redditors = redditors if redditors is not None else []
 
@@ -49,6 +108,18 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
             praw_reddit=praw_reddit,
             subreddits=self.get_redditor_profile_names(redditors),
             reddit_state=reddit_state,
+            multireddit_mode=multireddit_mode,
+            rate_limit_scheduler=rate_limit_scheduler,
+            min_poll_interval=min_poll_interval,
+            max_poll_interval=max_poll_interval,
+            checkpoint_store=checkpoint_store,
+            revisit_engine=revisit_engine,
+            mod_log_mode=mod_log_mode,
+            render_sample_rate=render_sample_rate,
+            event_buffer=event_buffer,
+            metrics=metrics,
+            metrics_port=metrics_port,
+            lightweight_events=lightweight_events,
         )
 
         self._logger.info("Monitoring redditors - %s", self.reddit_state.target_redditors)
@@ -56,6 +127,12 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
         self.reddit_state.target_redditors = redditors
 
         self.praw_reddit = praw_reddit
+        self.overview_mode = overview_mode
+
+        self.redditor_poller = (
+            RedditRedditorPoller(concurrency=poll_concurrency) if batched_polling else None
+        )
+        self.batch_limit = batch_limit
 
         self._loop = None
 
@@ -125,6 +202,20 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
 
         :return:
         """
+        if self.redditor_poller is not None:
+            await self.start_redditor_poller(self.redditor_poller)
+
+            self.start_background_tasks()
+            return
+
+        if self.overview_mode:
+            # The overview has everything the profile, comment and submission streams would
+            for redditor in self.reddit_state.target_redditors:
+                self.loop.create_task(self.monitor_redditor_overview(redditor))
+
+            self.start_background_tasks()
+            return
+
         # Monitoring the redditor's profiles - which act like subreddits
         # Currently yielding the wrong type of events
         await super().run(profiles=profiles)
@@ -133,6 +224,75 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
             self.loop.create_task(self.monitor_redditor_comments(redditor))
             self.loop.create_task(self.monitor_redditor_submissions(redditor))
 
+    # ----------------
+    # MONITOR OVERVIEW
+
+    async def monitor_redditor_overview(self, target_redditor: str) -> None:
+        """
+        Monitor everything the target redditor posts - via the single /user/<name>/overview.
+
+        :param target_redditor:
+        :return:
+        """
+        self.reddit_state.started_redditors.add(target_redditor)
+
+        self._logger.info("Monitoring redditor '%s' overview", target_redditor)
+
+        redditor = await self.praw_reddit.redditor(name=target_redditor)
+
+        # Redditor.new is the overview - newest first
+        async for reddit_item in self.listing_stream(
+            redditor.new, f"redditor_overview:{target_redditor}"
+        ):
+            await self.redditor_overview_item_to_event(reddit_item)
+
+    async def start_redditor_poller(self, redditor_poller: RedditRedditorPoller) -> None:
+        """
+        Poll the overview of every watched redditor from the shared poller.
+
+        :param redditor_poller:
+        :return:
+        """
+        self._logger.info(
+            "Monitoring %s redditors with batched polling",
+            len(self.reddit_state.target_redditors),
+        )
+
+        for target_redditor in self.reddit_state.target_redditors:
+            # Lazy - no request is made until the overview is polled
+            redditor = await self.praw_reddit.redditor(name=target_redditor)
+            redditor_poller.add(
+                target_redditor,
+                self.listing_stream(
+                    redditor.new,
+                    f"redditor_overview:{target_redditor}",
+                    limit=self.batch_limit,
+                ),
+            )
+            self.reddit_state.started_redditors.add(target_redditor)
+
+        self.loop.create_task(redditor_poller.run(self.redditor_overview_item_to_event))
+
+    async def redditor_overview_item_to_event(
+        self, reddit_item: Union[asyncpraw.reddit.Comment, asyncpraw.reddit.Submission]
+    ) -> None:
+        """
+        Send an item from a redditor's overview down the comment or submission path.
+
+        :param reddit_item: A comment (t1) or a submission (t3)
+        :return:
+        """
+        item_type = reddit_item.fullname.partition("_")[0]
+
+        if item_type == "t1":
+            await self.redditor_comment_to_event(reddit_comment=reddit_item)
+        elif item_type == "t3":
+            await self.redditor_submission_to_event(reddit_submission=reddit_item)
+        else:
+            self._logger.warning(
+                "Unexpected item %s in a redditor overview - ignoring", reddit_item.fullname
+            )
+
     # ----------------
     # MONITOR COMMENTS
 
@@ -149,10 +309,10 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
 
         redditor = await self.praw_reddit.redditor(name=target_redditor)
 
-        async for comment in redditor.stream.comments():
-            print("-------------")
-            print(self.render_comment(comment, prefix="redditor"))
-            print("-------------")
+        async for comment in self.listing_stream(
+            redditor.comments.new, f"redditor_comments:{target_redditor}"
+        ):
+            self.log_rendering(self.render_comment, comment, prefix="redditor")
             await self.redditor_comment_to_event(reddit_comment=comment)
 
     async def redditor_comment_to_event(
@@ -216,7 +376,7 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
         :return:
         """
         await self.process_subreddit_created_comment_on_submission(
-            subreddit=reddit_comment.subreddit,
+            subreddit=str(reddit_comment.subreddit),
             reddit_comment=reddit_comment,
             top_level=top_level,
         )
@@ -233,7 +393,7 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
         """
 
         await self.process_subreddit_edited_comment_on_submission(
-            subreddit=reddit_comment.subreddit,
+            subreddit=str(reddit_comment.subreddit),
             reddit_comment=reddit_comment,
             top_level=top_level,
         )
@@ -265,7 +425,7 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
         :return:
         """
         await self.process_subreddit_removed_comment_on_submission(
-            subreddit=reddit_comment.subreddit,
+            subreddit=str(reddit_comment.subreddit),
             reddit_comment=reddit_comment,
             top_level=top_level,
         )
@@ -287,10 +447,10 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
 
         redditor = await self.praw_reddit.redditor(name=target_redditor)
 
-        async for submission in redditor.stream.submissions():
-            print("-------------")
-            print(self.render_submission(submission, prefix="redditor"))
-            print("-------------")
+        async for submission in self.listing_stream(
+            redditor.submissions.new, f"redditor_submissions:{target_redditor}"
+        ):
+            self.log_rendering(self.render_submission, submission, prefix="redditor")
             await self.redditor_submission_to_event(reddit_submission=submission)
 
     async def redditor_submission_to_event(
@@ -343,12 +503,30 @@ class RedditRedditorInput(RedditSubredditInput, GenericRedditTools):
         :param reddit_submission: The submission which is noted as having been edited
         :return:
         """
+        # The same submission can turn up in more than one stream - only put it on the wire once
+        if not self.reddit_state.seen_submissions.add(reddit_submission.id):
+            return
+
+        if self.revisit_engine is not None:
+            self.revisit_engine.track(
+                reddit_submission.fullname,
+                reddit_submission.created_utc,
+                context=str(reddit_submission.subreddit),
+            )
+
+        # Keep the original content - to report on it if the submission is edited or deleted
+        self.reddit_state.seen_submission_contents[
+            reddit_submission.id
+        ] = SubmissionSnapshot.from_submission(reddit_submission)
+
+        author = self.reddit_state.observe_author(reddit_submission)
+
         submission_creation_input_event = RedditUserCreatedSubredditSubmissionInputEvent(
-            user_id=str(reddit_submission.author),
-            subreddit=reddit_submission.subreddit,
-            author_str=str(reddit_submission.author),
+            user_id=author,
+            subreddit=str(reddit_submission.subreddit),
+            author_str=author,
             creation_timestamp=reddit_submission.created_utc,
-            submission=reddit_submission,
+            submission=self.submission_payload(reddit_submission),
             submission_content=reddit_submission.selftext,
             submission_id=reddit_submission.id,
             submission_image=reddit_submission.url,
@@ -0,0 +1,327 @@
+"""
+Revisits recently seen comments and submissions - to catch them being edited, deleted or removed.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import asyncio
+import collections
+import heapq
+import logging
+import time
+
+import asyncpraw  # type: ignore
+import asyncprawcore  # type: ignore
+
+from .scheduler import RedditRateLimitScheduler
+
+# /api/info will return at most this many items per request
+MAX_INFO_BATCH_SIZE: int = 100
+
+# Seconds after an item was created at which it's looked at again.
+# Most edits and deletions happen soon after posting - so young items are revisited often and
+# old items rarely. Past the last delay an item is no longer tracked.
+DEFAULT_REVISIT_DELAYS: Tuple[float, ...] = (
+    60.0,
+    300.0,
+    900.0,
+    3600.0,
+    4 * 3600.0,
+    12 * 3600.0,
+)
+
+DEFAULT_MAX_TRACKED: int = 10000
+
+
+class RedditRevisitEngine:  # pylint: disable=too-many-instance-attributes
+    """
+    Re-fetches the items it's tracking in batches - via /api/info.
+
+    Reddit does not push edits, deletions or removals to the listings the inputs poll.
+    So the only way to see them is to look at the item again.
+    /api/info returns up to 100 items per request - so a whole batch of tracked items can be
+    revisited for the cost of one request.
+
+    Each tracked item is due for a revisit at each of the revisit_delays after it was created.
+    Items which come due at about the same time are revisited together - a batch is made of
+    everything due within coalesce_seconds, so batches are as full as they can be.
+    """
+
+    praw_reddit: asyncpraw.Reddit
+    rate_limit_scheduler: Optional[RedditRateLimitScheduler]
+
+    revisit_delays: Tuple[float, ...]
+    batch_size: int
+    max_tracked: int
+    coalesce_seconds: float
+
+    requests: int  # Requests made to /api/info
+    revisited: int  # Items returned by those requests
+    dropped: int  # Items no longer tracked because too many were being tracked
+
+    # Keyed with the fullname of the item, valued with the context it was tracked with (e.g.
+    # the declared subreddit it came from), when it was created and the revisits made so far.
+    # Oldest tracked first - so they are the first to go if too many are tracked.
+    _tracked: "collections.OrderedDict[str, Tuple[str, float, int]]"
+    # When each item is next due - entries for untracked items are skipped when they come up
+    _due: List[Tuple[float, str, int]]
+    _logger: logging.Logger
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        praw_reddit: asyncpraw.Reddit,
+        *,
+        rate_limit_scheduler: Optional[RedditRateLimitScheduler] = None,
+        revisit_delays: Sequence[float] = DEFAULT_REVISIT_DELAYS,
+        batch_size: int = MAX_INFO_BATCH_SIZE,
+        max_tracked: int = DEFAULT_MAX_TRACKED,
+        coalesce_seconds: float = 30.0,
+    ) -> None:
+        """
+        Startup the engine - nothing is revisited until it's run.
+
+        :param praw_reddit: The shared asyncpraw instance
+        :param rate_limit_scheduler: Shared scheduler handing out the request budget
+        :param revisit_delays: Seconds after creation at which each item is revisited
+        :param batch_size: The most items to revisit in one request
+        :param max_tracked: The most items to track at once - the oldest are dropped past this
+        :param coalesce_seconds: Items due within this long of a batch are revisited with it
+        """
+        if not revisit_delays or list(revisit_delays) != sorted(revisit_delays):
+            raise AttributeError(
+                f"revisit_delays must be a non-empty, increasing sequence - got {revisit_delays}"
+            )
+
+        self.praw_reddit = praw_reddit
+        self.rate_limit_scheduler = rate_limit_scheduler
+
+        self.revisit_delays = tuple(float(delay) for delay in revisit_delays)
+        self.batch_size = min(batch_size, MAX_INFO_BATCH_SIZE)
+        self.max_tracked = max_tracked
+        self.coalesce_seconds = coalesce_seconds
+
+        self.requests = 0
+        self.revisited = 0
+        self.dropped = 0
+
+        self._tracked = collections.OrderedDict()
+        self._due = []
+
+        self._logger = logging.getLogger(__name__ + ":" + type(self).__name__)
+
+    def __len__(self) -> int:
+        """
+        Return the number of items being tracked.
+
+        :return:
+        """
+        return len(self._tracked)
+
+    def __contains__(self, fullname: object) -> bool:
+        """
+        Check if an item is being tracked.
+
+        :param fullname:
+        :return:
+        """
+        return fullname in self._tracked
+
+    def track(self, fullname: str, created_utc: float, context: str) -> None:
+        """
+        Start tracking an item - it will be revisited at each of the revisit delays.
+
+        :param fullname: e.g. t1_abc123
+        :param created_utc: When the item was created
+        :param context: Handed back with the item when it's revisited
+        :return:
+        """
+        if fullname in self._tracked:
+            return
+
+        self._tracked[fullname] = (context, float(created_utc), 0)
+        self._schedule(fullname, 0)
+
+        while len(self._tracked) > self.max_tracked:
+            self._tracked.popitem(last=False)
+            self.dropped += 1
+
+    def untrack(self, fullname: str) -> None:
+        """
+        Stop tracking an item - e.g. because it has been deleted.
+
+        :param fullname:
+        :return:
+        """
+        self._tracked.pop(fullname, None)
+
+    def _schedule(self, fullname: str, revisits: int) -> None:
+        """
+        Note when an item is next due - or stop tracking it if it's had all its revisits.
+
+        Revisits which were due too long ago to be worth making (e.g. for an old item only
+        just seen) are skipped.
+        :param fullname:
+        :param revisits: The revisits counted so far
+        :return:
+        """
+        context, created_utc, _ = self._tracked[fullname]
+
+        cutoff = time.time() - self.coalesce_seconds
+        while (
+            revisits < len(self.revisit_delays)
+            and created_utc + self.revisit_delays[revisits] < cutoff
+        ):
+            revisits += 1
+
+        if revisits >= len(self.revisit_delays):
+            self.untrack(fullname)
+            return
+
+        self._tracked[fullname] = (context, created_utc, revisits)
+        heapq.heappush(
+            self._due, (created_utc + self.revisit_delays[revisits], fullname, revisits)
+        )
+
+    def next_due(self) -> Optional[float]:
+        """
+        Return when the next tracked item is due - None if nothing is being tracked.
+
+        :return:
+        """
+        while self._due:
+            _, fullname, revisits = self._due[0]
+            tracked = self._tracked.get(fullname)
+            if tracked is not None and tracked[2] == revisits:
+                return self._due[0][0]
+            # Stale - the item has been untracked, or has been rescheduled since
+            heapq.heappop(self._due)
+        return None
+
+    def due_batch(self, now: Optional[float] = None) -> List[str]:
+        """
+        Take the items which are due (or nearly due) - up to a batch worth.
+
+        :param now: The current time - defaults to time.time()
+        :return: The fullnames of the items in the batch
+        """
+        now = time.time() if now is None else now
+
+        batch: List[str] = []
+        while len(batch) < self.batch_size:
+            due_at = self.next_due()
+            if due_at is None or due_at > now + self.coalesce_seconds:
+                break
+
+            _, fullname, _ = heapq.heappop(self._due)
+            batch.append(fullname)
+
+        return batch
+
+    def _requeue(self, batch: List[str], delay: float = 0.0) -> None:
+        """
+        Make the items in a batch due again - after the request for them failed.
+
+        :param batch: Fullnames of the items
+        :param delay: Seconds from now until they're due
+        :return:
+        """
+        due_at = time.time() + delay
+        for fullname in batch:
+            if fullname in self._tracked:
+                heapq.heappush(self._due, (due_at, fullname, self._tracked[fullname][2]))
+
+    async def revisit(self, batch: List[str]) -> List[Tuple[str, Any]]:
+        """
+        Fetch the current state of a batch of items - in a single request.
+
+        Each item is scheduled for its next revisit.
+        Items reddit no longer returns are no longer tracked.
+        :param batch: Fullnames of the items to revisit
+        :return: The context each item was tracked with - and the item
+        """
+        if self.rate_limit_scheduler is not None:
+            await self.rate_limit_scheduler.acquire("revisit")
+
+        self.requests += 1
+        try:
+            items = [item async for item in self.praw_reddit.info(fullnames=batch)]
+        except asyncprawcore.exceptions.TooManyRequests as exp:
+            if self.rate_limit_scheduler is not None:
+                self.rate_limit_scheduler.report_rate_limited(
+                    float(exp.retry_after) if exp.retry_after is not None else None
+                )
+            self._logger.info("Revisit of %s items was rate limited - retrying", len(batch))
+            self._requeue(batch)
+            return []
+        except asyncprawcore.exceptions.AsyncPrawcoreException:
+            # e.g. a 5xx or a dropped connection - the engine should outlast it
+            self._logger.exception("Revisit of %s items failed - retrying", len(batch))
+            self._requeue(batch, delay=self.coalesce_seconds)
+            return []
+
+        return self._reschedule_revisited(batch, items)
+
+    def _reschedule_revisited(
+        self, batch: List[str], items: List[Any]
+    ) -> List[Tuple[str, Any]]:
+        """
+        Schedule the next revisit of each item reddit returned - and stop tracking the rest.
+
+        :param batch: Fullnames of the items asked for
+        :param items: The items reddit returned
+        :return: The context each item was tracked with - and the item
+        """
+        self.revisited += len(items)
+
+        results = []
+        returned = set()
+        for item in items:
+            if item.fullname not in self._tracked:
+                continue
+            returned.add(item.fullname)
+
+            context, _, revisits = self._tracked[item.fullname]
+            self._schedule(item.fullname, revisits + 1)
+
+            results.append((context, item))
+
+        for fullname in set(batch) - returned:
+            self.untrack(fullname)
+
+        return results
+
+    async def run(self, handler: Callable[[str, Any], Awaitable[None]]) -> None:
+        """
+        Revisit the tracked items forever - handing each one to the handler.
+
+        :param handler: Called with the context the item was tracked with and the item
+        :return:
+        """
+        while True:
+            due_at = self.next_due()
+            if due_at is None or due_at > time.time():
+                wait_seconds = 1.0 if due_at is None else due_at - time.time()
+                await asyncio.sleep(min(max(wait_seconds, 0.0), self.coalesce_seconds))
+                continue
+
+            batch = self.due_batch()
+            if not batch:
+                continue
+
+            for context, item in await self.revisit(batch):
+                await handler(context, item)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the counters for the engine - for monitoring.
+
+        :return:
+        """
+        return {
+            "tracked": len(self._tracked),
+            "requests": self.requests,
+            "revisited": self.revisited,
+            "dropped": self.dropped,
+        }
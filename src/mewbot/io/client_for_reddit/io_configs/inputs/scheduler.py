@@ -0,0 +1,185 @@
+"""
+Shares the reddit API rate limit budget out between all the polling streams.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import asyncio
+import collections
+import logging
+import time
+
+import asyncpraw  # type: ignore
+
+# Reddit allows OAuth clients 600 requests every 10 minutes
+DEFAULT_REQUEST_BUDGET: int = 600
+DEFAULT_WINDOW_SECONDS: float = 600.0
+
+
+class RedditRateLimitScheduler:  # pylint: disable=too-many-instance-attributes
+    """
+    Hands out request slots to the stream tasks from a single token bucket.
+
+    Reddit reports the remaining budget, and when it resets, in the X-Ratelimit-Remaining and
+    X-Ratelimit-Reset headers of every response.
+    asyncprawcore records these on the rate limiter of the shared asyncpraw.Reddit instance.
+    The bucket is refilled at the rate which would spend the remaining budget evenly over the
+    time left until the reset - so requests are paced out, rather than being spent in a burst
+    and then waiting for the window to reset.
+
+    Waiting streams are served in the order they asked - so every stream gets its turn.
+    """
+
+    praw_reddit: Optional[asyncpraw.Reddit]
+
+    _tokens: float
+    _last_refill: float
+    _lock: asyncio.Lock
+    _logger: logging.Logger
+
+    def __init__(
+        self,
+        praw_reddit: Optional[asyncpraw.Reddit] = None,
+        max_burst: int = 5,
+        reserved_requests: int = 10,
+        default_budget: int = DEFAULT_REQUEST_BUDGET,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+    ) -> None:
+        """
+        Startup the scheduler.
+
+        :param praw_reddit: The shared asyncpraw instance - the rate limit headers are read off it
+        :param max_burst: The most requests which can be made back to back
+        :param reserved_requests: Requests kept back from the streams - for anything else which
+                                  needs to talk to reddit (fetches, lookups e.t.c.)
+        :param default_budget: Budget assumed before reddit has told us what it actually is
+        :param window_seconds: Length of the window the default budget is spread over
+        """
+        self.praw_reddit = praw_reddit
+
+        self.max_burst = max_burst
+        self.reserved_requests = reserved_requests
+        self.default_budget = default_budget
+        self.window_seconds = window_seconds
+
+        self.remaining: Optional[float] = None
+        self.reset_timestamp: Optional[float] = None
+
+        self.granted: Dict[str, int] = collections.defaultdict(int)
+        self.rate_limited_count: int = 0
+
+        self._tokens = float(max_burst)
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+        self._logger = logging.getLogger(__name__ + ":" + type(self).__name__)
+
+    @property
+    def refill_rate(self) -> float:
+        """
+        The number of request slots which become available per second.
+
+        :return:
+        """
+        # No headers seen yet - or they have expired along with the window they describe
+        if self.remaining is None or self.reset_timestamp is None:
+            return self.default_budget / self.window_seconds
+        if self.reset_timestamp <= time.time():
+            return self.default_budget / self.window_seconds
+
+        seconds_to_reset = max(self.reset_timestamp - time.time(), 1.0)
+        usable = max(self.remaining - self.reserved_requests, 0.0)
+
+        # Once the budget is gone, wait for the reset - then one request will discover the new
+        # budget
+        return max(usable / seconds_to_reset, 1.0 / seconds_to_reset)
+
+    def update_from_headers(self, remaining: float, seconds_to_reset: float) -> None:
+        """
+        Update the budget from the values in the X-Ratelimit-* response headers.
+
+        :param remaining: The value of X-Ratelimit-Remaining
+        :param seconds_to_reset: The value of X-Ratelimit-Reset
+        :return:
+        """
+        self._refill()
+
+        self.remaining = float(remaining)
+        self.reset_timestamp = time.time() + float(seconds_to_reset)
+
+    def sync_with_praw(self) -> None:
+        """
+        Read the latest rate limit header values off the shared asyncpraw instance.
+
+        asyncprawcore keeps them on a private attribute - praw_reddit._core._rate_limiter.
+        :return:
+        """
+        if self.praw_reddit is None:
+            return
+
+        # asyncprawcore updates its rate limiter from the X-Ratelimit-* headers of every response
+        rate_limiter = getattr(
+            getattr(self.praw_reddit, "_core", None), "_rate_limiter", None
+        )
+        if rate_limiter is None or rate_limiter.remaining is None:
+            return
+
+        if rate_limiter.reset_timestamp is None:
+            return
+
+        self.update_from_headers(
+            remaining=rate_limiter.remaining,
+            seconds_to_reset=rate_limiter.reset_timestamp - time.time(),
+        )
+
+    def report_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """
+        Reddit has responded with a 429 - empty the bucket and hold off every stream.
+
+        :param retry_after: Seconds reddit asked us to wait - if it said
+        :return:
+        """
+        self.rate_limited_count += 1
+
+        wait_seconds = retry_after if retry_after is not None else 1.0 / self.refill_rate
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - wait_seconds * self.refill_rate
+
+        self._logger.warning(
+            "Rate limited by reddit - holding off all streams for %.1f seconds", wait_seconds
+        )
+
+    def _refill(self) -> None:
+        """
+        Add the slots which have become available since the bucket was last refilled.
+
+        :return:
+        """
+        now = time.monotonic()
+        self._tokens = min(
+            self._tokens + (now - self._last_refill) * self.refill_rate, float(self.max_burst)
+        )
+        self._last_refill = now
+
+    async def acquire(self, stream_key: str) -> None:
+        """
+        Wait until a request slot is available for the given stream - then take it.
+
+        :param stream_key: Identifies the stream asking - used to report how the budget is spent
+        :return:
+        """
+        # asyncio.Lock wakes its waiters in the order they started waiting
+        async with self._lock:
+            self.sync_with_praw()
+            self._refill()
+
+            while self._tokens < 1.0:
+                await asyncio.sleep((1.0 - self._tokens) / self.refill_rate)
+
+                self.sync_with_praw()
+                self._refill()
+
+            self._tokens -= 1.0
+            self.granted[stream_key] += 1
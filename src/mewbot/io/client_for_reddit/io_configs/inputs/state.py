@@ -3,11 +3,394 @@ Holds specialized dataclasses for holding the cached state of reddit.
 """
 
 
-from typing import Dict, List, Set
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
+import array
+import bisect
+import collections
 import dataclasses
+import time
 
-import asyncpraw  # type: ignore
+from mewbot.io.client_for_reddit.snapshots import (
+    AuthorSnapshot,
+    CommentSnapshot,
+    SubmissionSnapshot,
+    author_fullname,
+    author_name,
+)
+
+from .utils import reddit_id_to_int
+
+KeyT = TypeVar("KeyT")
+ValueT = TypeVar("ValueT")
+
+DEFAULT_CACHE_CAPACITY: int = 10000
+DEFAULT_CACHE_TTL: float = 24 * 60 * 60.0
+
+# Each range in a SeenIdIndex takes 16 bytes - so this is 64MB at most
+DEFAULT_SEEN_ID_MAX_RANGES: int = 4_000_000
+
+
+class BoundedCache(MutableMapping[KeyT, ValueT]):
+    """
+    A dict which holds at most capacity entries - and forgets entries after ttl seconds.
+
+    Entries are expired if they have not been read or written for ttl seconds.
+    When the cache is full, the least recently used entry is evicted to make room.
+    Counts are kept of the entries lost to each - so the limits can be tuned.
+    """
+
+    capacity: int
+    ttl: Optional[float]
+
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+
+    # Valued with the value and the last time it was used - least recently used first
+    _entries: "collections.OrderedDict[KeyT, Tuple[ValueT, float]]"
+
+    def __init__(self, capacity: int = DEFAULT_CACHE_CAPACITY, ttl: Optional[float] = None):
+        """
+        Startup an empty cache.
+
+        :param capacity: The most entries the cache will hold
+        :param ttl: Seconds an entry can go unused before it's expired - None to never expire
+        """
+        if capacity < 1:
+            raise AttributeError(f"Cache capacity must be at least 1 - got {capacity}")
+
+        self.capacity = capacity
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._entries = collections.OrderedDict()
+
+    def expire(self) -> None:
+        """
+        Remove every entry which has not been used for ttl seconds.
+
+        :return:
+        """
+        if self.ttl is None:
+            return
+
+        cutoff = time.monotonic() - self.ttl
+
+        # Entries are kept least recently used first - so stop at the first fresh one
+        while self._entries:
+            _, (_, last_used) = next(iter(self._entries.items()))
+            if last_used > cutoff:
+                break
+            self._entries.popitem(last=False)
+            self.expirations += 1
+
+    def __getitem__(self, key: KeyT) -> ValueT:
+        """
+        Retrieve an entry - marking it as recently used.
+
+        :param key:
+        :return:
+        """
+        self.expire()
+
+        try:
+            value, _ = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self.hits += 1
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: KeyT, value: ValueT) -> None:
+        """
+        Store an entry - evicting the least recently used entries if the cache is full.
+
+        :param key:
+        :param value:
+        :return:
+        """
+        self.expire()
+
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __delitem__(self, key: KeyT) -> None:
+        """
+        Remove an entry.
+
+        :param key:
+        :return:
+        """
+        del self._entries[key]
+
+    def __contains__(self, key: Any) -> bool:
+        """
+        Check for a (not expired) entry - without marking it as used.
+
+        :param key:
+        :return:
+        """
+        self.expire()
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[KeyT]:
+        """
+        Iterate over the keys - least recently used first.
+
+        :return:
+        """
+        self.expire()
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        """
+        Return the number of (not expired) entries.
+
+        :return:
+        """
+        self.expire()
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the counters for the cache - for monitoring.
+
+        :return:
+        """
+        return {
+            "size": len(self),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SeenIdIndex:
+    """
+    A compact set of the reddit ids which have been seen.
+
+    Reddit ids are base36 integers, handed out (more or less) in order.
+    So they are stored as the integers they encode - as sorted, non-overlapping ranges held in
+    a pair of array("Q") (start and end of each range, inclusive).
+    An isolated id costs 16 bytes, and a run of consecutive ids costs 16 bytes in total - where
+    a str in a set costs 100 or so.
+
+    Membership is a binary search - O(log n).
+    As new ids are (nearly) always the largest seen so far, adding one is (nearly) always an
+    append or an extension of the last range.
+
+    When the index holds more than max_ranges ranges, the oldest (lowest) ranges are evicted
+    in bulk - a fraction of the index at a time, so the cost of shifting the arrays is rare.
+    """
+
+    max_ranges: int
+    eviction_fraction: float
+
+    evictions: int  # Ids lost when the index was full
+    evicted_below: int  # Everything below this may have been seen - but has been forgotten
+
+    _starts: array.array  # type: ignore
+    _ends: array.array  # type: ignore
+    _size: int
+
+    def __init__(
+        self, max_ranges: int = DEFAULT_SEEN_ID_MAX_RANGES, eviction_fraction: float = 0.1
+    ) -> None:
+        """
+        Startup an empty index.
+
+        :param max_ranges: The most ranges of ids to hold before evicting the oldest
+        :param eviction_fraction: The fraction of the ranges to evict when the index is full
+        """
+        if max_ranges < 1:
+            raise AttributeError(
+                f"Seen id index must hold at least one range - got {max_ranges}"
+            )
+        if not 0 < eviction_fraction <= 1:
+            raise AttributeError(
+                f"eviction_fraction must be in (0, 1] - got {eviction_fraction}"
+            )
+
+        self.max_ranges = max_ranges
+        self.eviction_fraction = eviction_fraction
+
+        self.evictions = 0
+        self.evicted_below = 0
+
+        self._starts = array.array("Q")
+        self._ends = array.array("Q")
+        self._size = 0
+
+    @staticmethod
+    def _to_int(reddit_id: Union[str, int]) -> int:
+        """
+        Decode an id (or fullname) to its integer - ints are passed through.
+
+        :param reddit_id:
+        :return:
+        """
+        return reddit_id if isinstance(reddit_id, int) else reddit_id_to_int(reddit_id)
+
+    def __contains__(self, reddit_id: object) -> bool:
+        """
+        Check if an id (e.g. "abc123" or "t1_abc123") has been seen.
+
+        :param reddit_id:
+        :return:
+        """
+        if not isinstance(reddit_id, (str, int)):
+            return False
+
+        value = self._to_int(reddit_id)
+        position = bisect.bisect_right(self._starts, value) - 1
+        return position >= 0 and value <= self._ends[position]
+
+    def add(self, reddit_id: Union[str, int]) -> bool:
+        """
+        Record an id as seen.
+
+        :param reddit_id:
+        :return: True if the id was new - False if it had already been seen
+        """
+        value = self._to_int(reddit_id)
+        starts, ends = self._starts, self._ends
+
+        # Fast path - the newest id so far
+        if not starts or value > ends[-1]:
+            if starts and value == ends[-1] + 1:
+                ends[-1] = value
+            else:
+                starts.append(value)
+                ends.append(value)
+            self._size += 1
+            self._evict_if_full()
+            return True
+
+        position = bisect.bisect_right(starts, value) - 1
+        if position >= 0 and value <= ends[position]:
+            return False
+
+        joins_previous = position >= 0 and ends[position] + 1 == value
+        joins_next = position + 1 < len(starts) and starts[position + 1] - 1 == value
+
+        if joins_previous and joins_next:
+            ends[position] = ends[position + 1]
+            del starts[position + 1]
+            del ends[position + 1]
+        elif joins_previous:
+            ends[position] = value
+        elif joins_next:
+            starts[position + 1] = value
+        else:
+            starts.insert(position + 1, value)
+            ends.insert(position + 1, value)
+
+        self._size += 1
+        self._evict_if_full()
+        return True
+
+    def evict_below(self, reddit_id: Union[str, int]) -> int:
+        """
+        Forget every id lower than the given one - e.g. ids too old to ever be seen again.
+
+        :param reddit_id:
+        :return: The number of ids forgotten
+        """
+        value = self._to_int(reddit_id)
+        starts, ends = self._starts, self._ends
+
+        # Ranges which lie entirely below the cutoff go in one slice
+        cut = bisect.bisect_left(ends, value)
+        removed: int = sum(end - start + 1 for start, end in zip(starts[:cut], ends[:cut]))
+        del starts[:cut]
+        del ends[:cut]
+
+        # A range which straddles the cutoff is trimmed
+        if starts and starts[0] < value:
+            removed += value - starts[0]
+            starts[0] = value
+
+        self._size -= removed
+        self.evicted_below = max(self.evicted_below, value)
+        return int(removed)
+
+    def _evict_if_full(self) -> None:
+        """
+        Evict the oldest ranges in bulk - if there are too many.
+
+        :return:
+        """
+        if len(self._starts) <= self.max_ranges:
+            return
+
+        to_evict = max(1, int(len(self._starts) * self.eviction_fraction))
+        self.evictions += self.evict_below(self._ends[to_evict - 1] + 1)
+
+    def __len__(self) -> int:
+        """
+        Return the number of ids held.
+
+        :return:
+        """
+        return self._size
+
+    @property
+    def range_count(self) -> int:
+        """
+        The number of ranges the ids are stored as.
+
+        :return:
+        """
+        return len(self._starts)
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate memory used by the ids - the used part of the arrays.
+
+        :return:
+        """
+        return (len(self._starts) + len(self._ends)) * self._starts.itemsize
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the counters for the index - for monitoring.
+
+        :return:
+        """
+        return {
+            "size": len(self),
+            "ranges": self.range_count,
+            "max_ranges": self.max_ranges,
+            "memory_bytes": self.memory_bytes(),
+            "evictions": self.evictions,
+        }
 
 
 @dataclasses.dataclass
@@ -16,14 +399,14 @@ class CommentContentsState:
     Holds the state of a set of comments.
     """
 
-    # Keyed with the subreddit and valued with a set of the ids which have been seen
-    seen_comments: Dict[str, Set[str]]
-    # Keyed with the id of the comment (which should not change) and valued with the current val
-    # of that comment. The idea being to retrieve the original value
+    # The ids of every comment which has been seen - so duplicates can be dropped
+    seen_comments: SeenIdIndex
+    # Keyed with the id of the comment (which should not change) and valued with a snapshot of the
+    # current val of that comment. The idea being to retrieve the original value
     # Then update it with the new value
-    # The size of this cache needs to be kept under control - as it stores every comment the system
+    # The size of this cache is bounded - as it would otherwise store every comment the system
     # sees
-    seen_comment_contents: Dict[str, asyncpraw.Reddit.comment]
+    seen_comment_contents: BoundedCache[str, Optional[CommentSnapshot]]
     # Used after an edit - in case we see the same comment multiple times
     # (the problem is some subreddits are composed of composites of other subreddits - so it might
     # well be that you see the same comment in multiple different subreddits.
@@ -31,9 +414,9 @@ class CommentContentsState:
     # So it will be updated the first time that an edit occurs
     # In order to have the old message contents available we need to cache it before it's
     # overwritten in seen_comment_contents hence
-    # Keyed with the hash of a comment and valued with the value of the previous message of that
-    # hash
-    previous_comment_map: Dict[str, asyncpraw.Reddit.comment]
+    # Keyed with the fingerprint of a comment and valued with the value of the previous message
+    # of that fingerprint
+    previous_comment_map: BoundedCache[bytes, Optional[CommentSnapshot]]
 
 
 @dataclasses.dataclass
@@ -43,13 +426,104 @@ class SubmissionContentState:
     """
 
     # Likewise we have submissions
-    seen_submissions: Dict[str, Set[str]]
-    seen_submission_contents: Dict[str, asyncpraw.Reddit.submission]
-    previous_submission_map: Dict[str, asyncpraw.Reddit.submission]
+    seen_submissions: SeenIdIndex
+    seen_submission_contents: BoundedCache[str, Optional[SubmissionSnapshot]]
+    previous_submission_map: BoundedCache[bytes, Optional[SubmissionSnapshot]]
 
 
 @dataclasses.dataclass
-class RedditState(CommentContentsState, SubmissionContentState):
+class AuthorState:
+    """
+    Holds what is known about the authors of the content which has been seen.
+    """
+
+    # Keyed with the lower case name of the author (reddit names are case-insensitive)
+    # Filled from the author fields which come with every listing - so building an event never
+    # has to fetch a Redditor
+    authors: BoundedCache[str, AuthorSnapshot]
+    # The fullnames of authors whose details have not been looked up yet - looked up in bulk
+    unresolved_authors: Set[str]
+    # Only collect unresolved authors if something is going to look them up
+    resolve_authors: bool
+
+    def observe_author(self, reddit_item: Any) -> str:
+        """
+        Record the author of a comment or submission - and return their name.
+
+        Only the fields already on the item are read - nothing is fetched.
+        :param reddit_item:
+        :return:
+        """
+        name = author_name(reddit_item)
+        if name == "[deleted]":
+            return name
+
+        key = name.lower()
+        fullname = author_fullname(reddit_item)
+
+        known = self.authors.get(key)
+        if known is None:
+            known = AuthorSnapshot(name=name, fullname=fullname)
+            self.authors[key] = known
+        elif known.fullname is None:
+            known.fullname = fullname
+
+        if (
+            self.resolve_authors
+            and not known.resolved
+            and known.fullname is not None
+            and len(self.unresolved_authors) < self.authors.capacity
+        ):
+            self.unresolved_authors.add(known.fullname)
+
+        return name
+
+    def author(self, name: str) -> Optional[AuthorSnapshot]:
+        """
+        Return what is known about an author - None if they have not been seen (recently).
+
+        :param name:
+        :return:
+        """
+        return self.authors.get(name.lower())
+
+    def take_unresolved_authors(self, limit: int = 100) -> List[str]:
+        """
+        Take up to limit fullnames of authors whose details should be looked up.
+
+        :param limit:
+        :return:
+        """
+        taken: List[str] = []
+        while self.unresolved_authors and len(taken) < limit:
+            taken.append(self.unresolved_authors.pop())
+        return taken
+
+    def record_author(self, partial_redditor: Any) -> AuthorSnapshot:
+        """
+        Record the details of an author - as returned by the bulk user data endpoint.
+
+        :param partial_redditor: An asyncpraw PartialRedditor
+        :return:
+        """
+        snapshot = AuthorSnapshot.from_partial_redditor(partial_redditor)
+        self.authors[snapshot.name.lower()] = snapshot
+        self.unresolved_authors.discard(str(snapshot.fullname))
+        return snapshot
+
+
+# The caches held by the state - which can each be given their own capacity
+BOUNDED_CACHE_NAMES: Tuple[str, ...] = (
+    "seen_comment_contents",
+    "previous_comment_map",
+    "seen_submission_contents",
+    "previous_submission_map",
+    "authors",
+)
+
+
+@dataclasses.dataclass
+class RedditState(CommentContentsState, SubmissionContentState, AuthorState):
     """
     Contains cached comments and the state of the monitored subreddits.
     """
@@ -57,10 +531,83 @@ class RedditState(CommentContentsState, SubmissionContentState):
     # To provide services related to edited/deleted/remove comments (such as "what was the contents
     # of this before the event") it's necessary to cache the contents of some messages against
     # future need.
-    # This is done with dicts - this will change later bcause it presents a severe memory leak
+    # This is done with bounded caches - which forget the least recently used (and the stale)
+    # entries, so memory use stays flat however long the bot runs.
 
     target_subreddits: List[str]  # All the subreddits to be monitored by the bot
     started_subreddits: Set[str]  # The subreddits where monitoring has started
 
     target_redditors: List[str]  # All of the redditors to be monitored
     started_redditors: Set[str]  # The redditors where monitoring has started
+
+    @classmethod
+    def create(  # pylint: disable=too-many-arguments
+        cls,
+        target_subreddits: List[str],
+        target_redditors: Optional[List[str]] = None,
+        *,
+        cache_capacity: int = DEFAULT_CACHE_CAPACITY,
+        cache_ttl: Optional[float] = DEFAULT_CACHE_TTL,
+        cache_capacities: Optional[Mapping[str, int]] = None,
+        seen_id_max_ranges: int = DEFAULT_SEEN_ID_MAX_RANGES,
+        resolve_authors: bool = False,
+    ) -> "RedditState":
+        """
+        Create an empty state - with every cache bounded.
+
+        :param target_subreddits: The subreddits to be monitored
+        :param target_redditors: The redditors to be monitored
+        :param cache_capacity: The default maximum number of entries in each cache
+        :param cache_ttl: Seconds an entry can go unused before it's forgotten
+        :param cache_capacities: Keyed with the name of a cache (see BOUNDED_CACHE_NAMES) and
+                                 valued with the capacity for that cache - overriding the default
+        :param seen_id_max_ranges: The most ranges of ids each seen id index will hold
+        :param resolve_authors: Collect the authors seen - so their details can be looked up
+        :return:
+        """
+        cache_capacities = {} if cache_capacities is None else dict(cache_capacities)
+
+        unknown_caches = set(cache_capacities) - set(BOUNDED_CACHE_NAMES)
+        if unknown_caches:
+            raise AttributeError(
+                f"Unknown caches {sorted(unknown_caches)} - expected some of "
+                f"{BOUNDED_CACHE_NAMES}"
+            )
+
+        def capacity(name: str) -> int:
+            return cache_capacities.get(name, cache_capacity)
+
+        return cls(
+            target_subreddits=target_subreddits,
+            started_subreddits=set(),
+            target_redditors=[] if target_redditors is None else target_redditors,
+            started_redditors=set(),
+            seen_comments=SeenIdIndex(max_ranges=seen_id_max_ranges),
+            seen_submissions=SeenIdIndex(max_ranges=seen_id_max_ranges),
+            unresolved_authors=set(),
+            resolve_authors=resolve_authors,
+            seen_comment_contents=BoundedCache(
+                capacity=capacity("seen_comment_contents"), ttl=cache_ttl
+            ),
+            previous_comment_map=BoundedCache(
+                capacity=capacity("previous_comment_map"), ttl=cache_ttl
+            ),
+            seen_submission_contents=BoundedCache(
+                capacity=capacity("seen_submission_contents"), ttl=cache_ttl
+            ),
+            previous_submission_map=BoundedCache(
+                capacity=capacity("previous_submission_map"), ttl=cache_ttl
+            ),
+            authors=BoundedCache(capacity=capacity("authors"), ttl=cache_ttl),
+        )
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Return the counters for each of the bounded caches.
+
+        :return:
+        """
+        stats = {name: getattr(self, name).stats() for name in BOUNDED_CACHE_NAMES}
+        stats["seen_comments"] = self.seen_comments.stats()
+        stats["seen_submissions"] = self.seen_submissions.stats()
+        return stats
@@ -0,0 +1,484 @@
+"""
+Polls reddit listings for new items - adapting how often each listing is polled to its activity.
+"""
+
+from __future__ import annotations
+
+from typing import Any, AsyncIterator, Callable, Deque, Dict, FrozenSet, List, Optional
+
+import asyncio
+import collections
+import logging
+import time
+
+import asyncprawcore  # type: ignore
+from asyncpraw.models.util import BoundedSet  # type: ignore
+
+from .checkpoints import StreamCheckpoint, StreamCheckpointStore
+from .metrics import StreamMetrics
+from .scheduler import RedditRateLimitScheduler
+from .utils import reddit_id_to_int
+
+# Reddit will not return more than this many items in a single listing request
+MAX_LISTING_LIMIT: int = 100
+
+DEFAULT_MIN_POLL_INTERVAL: float = 2.0
+DEFAULT_MAX_POLL_INTERVAL: float = 120.0
+
+# The prefixes of the fullnames of things with base36 ids handed out in order
+REDDIT_THING_TYPES: FrozenSet[str] = frozenset(("t1", "t2", "t3", "t4", "t5", "t6"))
+
+
+def item_fullname(reddit_item: Any) -> str:
+    """
+    Return the name reddit knows a listing item by - and pages the listing with.
+
+    For comments, submissions e.t.c. that's the fullname (e.g. t1_abc123).
+    Mod log entries have no fullname - they go by their id (e.g. ModAction_<uuid>).
+    :param reddit_item:
+    :return:
+    """
+    fullname = getattr(reddit_item, "fullname", None)
+    return str(reddit_item.id) if fullname is None else str(fullname)
+
+
+def is_at_or_before(reddit_item: Any, fullname: str, created_utc: float) -> bool:
+    """
+    Return True if the item is the given one (by fullname) - or older than it.
+
+    Ids are only ordered within a type of thing (t1, t3 e.t.c.) - so items of other types
+    (and things which are not reddit things at all - like mod log entries) are compared by
+    time.
+    :param reddit_item:
+    :param fullname: Of the item to compare against
+    :param created_utc: Of the item to compare against
+    :return:
+    """
+    reddit_item_fullname = item_fullname(reddit_item)
+    item_type = reddit_item_fullname.partition("_")[0]
+    if item_type == fullname.partition("_")[0] and item_type in REDDIT_THING_TYPES:
+        return reddit_id_to_int(reddit_item_fullname) <= reddit_id_to_int(fullname)
+    return float(reddit_item.created_utc) <= created_utc
+
+
+class AdaptivePollInterval:
+    """
+    Decides how long a stream should wait before it next polls.
+
+    The arrival rate of a stream is estimated from the created_utc of the most recent items
+    it has seen.
+    A busy stream is polled often enough that each poll should only pick up a fraction of a
+    listing page - so nothing falls off the end of the page between polls.
+    A quiet stream backs off exponentially - up to the max interval.
+    """
+
+    min_interval: float
+    max_interval: float
+
+    _created_times: Deque[float]
+    _interval: float
+
+    def __init__(
+        self,
+        min_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+        max_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+        window_size: int = 50,
+        target_items_per_poll: int = 25,
+        backoff_factor: float = 2.0,
+    ) -> None:
+        """
+        Startup the interval tracker.
+
+        :param min_interval: The shortest time (in seconds) to ever wait between polls
+        :param max_interval: The longest time (in seconds) to ever wait between polls
+        :param window_size: How many of the most recent items to estimate the arrival rate from
+        :param target_items_per_poll: Poll often enough to expect about this many items per poll
+        :param backoff_factor: Multiply the interval by this after each poll which finds nothing
+        """
+        if min_interval <= 0 or max_interval < min_interval:
+            raise AttributeError(
+                f"Bad poll intervals - {min_interval = } must be positive and no more than "
+                f"{max_interval = }"
+            )
+
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_items_per_poll = target_items_per_poll
+        self.backoff_factor = backoff_factor
+
+        self._created_times = collections.deque(maxlen=window_size)
+        self._interval = min_interval
+
+    @property
+    def arrival_rate(self) -> float:
+        """
+        Estimated number of new items arriving per second.
+
+        Measured from the oldest item in the window until now - so the estimate decays while a
+        stream is quiet.
+        :return:
+        """
+        if not self._created_times:
+            return 0.0
+
+        elapsed = max(time.time() - min(self._created_times), 1.0)
+        return len(self._created_times) / elapsed
+
+    @property
+    def interval(self) -> float:
+        """
+        The time (in seconds) to wait before the next poll.
+
+        :return:
+        """
+        return self._interval
+
+    def record_poll(self, created_times: List[float]) -> float:
+        """
+        Note the creation times of the new items found by a poll - and update the interval.
+
+        :param created_times: The created_utc of each new item found by the poll
+        :return: The time to wait before the next poll
+        """
+        self._created_times.extend(created_times)
+
+        if not created_times:
+            self._interval = min(self._interval * self.backoff_factor, self.max_interval)
+            return self._interval
+
+        rate = self.arrival_rate
+        target_interval = self.target_items_per_poll / rate if rate > 0 else self.max_interval
+        self._interval = min(max(target_interval, self.min_interval), self.max_interval)
+        return self._interval
+
+
+class RedditListingStream:  # pylint: disable=too-many-instance-attributes
+    """
+    Streams new items from a reddit listing (such as Subreddit.comments or Subreddit.new).
+
+    Each poll is a single listing request - which waits its turn with the rate limit scheduler
+    (if there is one).
+    New items are yielded oldest first.
+    Between polls the stream waits for as long as its AdaptivePollInterval suggests.
+
+    If a checkpoint store is provided, the newest item processed is recorded after each poll.
+    When the stream starts again (e.g. after a restart) it pages back through the listing
+    to the checkpoint - so items which arrived while the bot was down are picked up, and items
+    which were processed before it went down are not repeated.
+
+    If a poll finds a full page of new items, the listing may have overflowed since the last
+    poll - so the stream pages back until it meets the newest item of the last poll.
+    The items recovered that way - and an estimate of any which could not be - are counted.
+    """
+
+    listing_function: Callable[..., AsyncIterator[Any]]
+    stream_key: str
+
+    rate_limit_scheduler: Optional[RedditRateLimitScheduler]
+    poll_interval: AdaptivePollInterval
+
+    checkpoint_store: Optional[StreamCheckpointStore]
+    metrics: Optional[StreamMetrics]
+
+    gaps_detected: int  # Polls which did not meet up with the one before
+    items_recovered: int  # Items found by paging back to close a gap
+    items_lost: int  # Estimate of the items in gaps which could not be closed
+
+    _resume_from: Optional[StreamCheckpoint]
+    _newest_item: Optional[StreamCheckpoint]  # The newest item found by the last poll
+    _seen_fullnames: BoundedSet
+    _logger: logging.Logger
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        listing_function: Callable[..., AsyncIterator[Any]],
+        stream_key: str,
+        *,
+        rate_limit_scheduler: Optional[RedditRateLimitScheduler] = None,
+        poll_interval: Optional[AdaptivePollInterval] = None,
+        limit: int = MAX_LISTING_LIMIT,
+        checkpoint_store: Optional[StreamCheckpointStore] = None,
+        max_backfill_pages: int = 10,
+        metrics: Optional[StreamMetrics] = None,
+    ) -> None:
+        """
+        Startup the stream - no requests are made until it's iterated over.
+
+        :param listing_function: The asyncpraw listing to poll
+        :param stream_key: Identifies this stream - in logs and to the scheduler
+        :param rate_limit_scheduler: Shared scheduler handing out the request budget
+        :param poll_interval: Decides how long to wait between polls
+        :param limit: How many items to ask for in each poll
+        :param checkpoint_store: Records how far the stream has got - and where to resume from
+        :param max_backfill_pages: The most pages to request when paging back to a checkpoint
+                                   (or to the last poll)
+        :param metrics: Records the throughput and latency of the stream - if provided
+        """
+        self.listing_function = listing_function
+        self.stream_key = stream_key
+
+        self.rate_limit_scheduler = rate_limit_scheduler
+        self.poll_interval = (
+            poll_interval if poll_interval is not None else AdaptivePollInterval()
+        )
+
+        self.limit = min(limit, MAX_LISTING_LIMIT)
+
+        self.checkpoint_store = checkpoint_store
+        self.max_backfill_pages = max_backfill_pages
+        self.metrics = metrics
+        self._resume_from = (
+            checkpoint_store.get(stream_key) if checkpoint_store is not None else None
+        )
+
+        self.gaps_detected = 0
+        self.items_recovered = 0
+        self.items_lost = 0
+        self._newest_item = None
+
+        # A few pages worth - enough to recognise everything in the last listing
+        self._seen_fullnames = BoundedSet(3 * self.limit + 1)
+
+        self._logger = logging.getLogger(__name__ + ":" + type(self).__name__)
+
+    async def fetch_listing(self, **params: Any) -> List[Any]:
+        """
+        Make a single request to the listing - newest item first, as reddit returns them.
+
+        A request which fails returns nothing - so the stream backs off, and tries again.
+        :param params: Any additional parameters for the request (e.g. before or after)
+        :return:
+        """
+        if self.rate_limit_scheduler is not None:
+            await self.rate_limit_scheduler.acquire(self.stream_key)
+
+        try:
+            return [
+                item async for item in self.listing_function(limit=self.limit, params=params)
+            ]
+        except asyncprawcore.exceptions.TooManyRequests as exp:
+            if self.rate_limit_scheduler is not None:
+                self.rate_limit_scheduler.report_rate_limited(
+                    float(exp.retry_after) if exp.retry_after is not None else None
+                )
+            self._logger.info("Stream %s was rate limited - skipping a poll", self.stream_key)
+            return []
+        except asyncprawcore.exceptions.AsyncPrawcoreException:
+            # e.g. a 5xx or a dropped connection - the poll interval backs off, and it's retried
+            self._logger.exception(
+                "Stream %s failed to poll - skipping a poll", self.stream_key
+            )
+            return []
+
+    async def page_back(
+        self, listing: List[Any], reached: Callable[[Any], bool]
+    ) -> List[Any]:
+        """
+        Extend a listing with older pages - until reached is True for its oldest item.
+
+        Pages back from the oldest item in the listing using the "after" parameter.
+        Stops early if the listing runs out, or after max_backfill_pages requests.
+        :param listing: Items - newest first, as reddit returns them
+        :param reached: True for an item which is old enough to stop paging back at
+        :return: The extended listing - still newest first
+        """
+        extended = list(listing)
+
+        for _ in range(self.max_backfill_pages):
+            if not extended or reached(extended[-1]):
+                break
+
+            older_items = await self.fetch_listing(after=item_fullname(extended[-1]))
+            if not older_items:
+                break
+            extended.extend(older_items)
+
+        return extended
+
+    async def resume_from_checkpoint(
+        self, listing: List[Any], checkpoint: StreamCheckpoint
+    ) -> List[Any]:
+        """
+        Fill the gap between the stored checkpoint and the newest items in the listing.
+
+        Items processed before the checkpoint was written are dropped.
+        :param listing: The first listing of this run - newest first
+        :param checkpoint: How far the stream got last run
+        :return: The items which have not been processed - newest first
+        """
+
+        def already_processed(item: Any) -> bool:
+            """
+            Return True if the item was processed before the checkpoint was written.
+
+            :param item:
+            :return:
+            """
+            return is_at_or_before(item, checkpoint.fullname, checkpoint.created_utc)
+
+        listing = await self.page_back(listing, reached=already_processed)
+
+        if listing and not already_processed(listing[-1]):
+            self._logger.warning(
+                "Stream %s could not page back to its checkpoint %s - items may have been "
+                "missed while the bot was down",
+                self.stream_key,
+                checkpoint.fullname,
+            )
+
+        # Everything before the checkpoint still needs to be recognised as seen
+        for item in listing:
+            if already_processed(item):
+                self._seen_fullnames.add(item_fullname(item))
+
+        return [item for item in listing if not already_processed(item)]
+
+    def record_checkpoint(self, processed_items: List[Any]) -> None:
+        """
+        Note the newest of the given items as the checkpoint for this stream.
+
+        :param processed_items: Items which have been fully processed - oldest first
+        :return:
+        """
+        if self.checkpoint_store is None or not processed_items:
+            return
+
+        newest_item = processed_items[-1]
+        self.checkpoint_store.update(
+            self.stream_key, item_fullname(newest_item), float(newest_item.created_utc)
+        )
+
+    async def close_gap(self, listing: List[Any], newest_item: StreamCheckpoint) -> List[Any]:
+        """
+        Page back from a listing which may have overflowed - until it meets the last poll.
+
+        :param listing: The listing from this poll - newest first
+        :param newest_item: The newest item found by the last poll
+        :return: The listing extended with the items recovered - still newest first
+        """
+
+        def reached(item: Any) -> bool:
+            """
+            Return True if the item was found by the last poll (or before).
+
+            :param item:
+            :return:
+            """
+            return is_at_or_before(item, newest_item.fullname, newest_item.created_utc)
+
+        # A page which is not full cannot have overflowed
+        # A page which reaches back to the last poll has no gap
+        if len(listing) < self.limit or reached(listing[-1]):
+            return listing
+
+        self.gaps_detected += 1
+
+        page_size = len(listing)
+        extended = await self.page_back(listing, reached=reached)
+        gap_reached = reached(extended[-1])
+
+        # Items from the last poll (or before) may have dropped out of the seen fullnames
+        recovered = [item for item in extended[page_size:] if not reached(item)]
+        self.items_recovered += len(recovered)
+
+        if not gap_reached:
+            # Give up - estimating what was missed from the recent arrival rate
+            missed_seconds = max(float(extended[-1].created_utc) - newest_item.created_utc, 0)
+            lost = round(missed_seconds * self.poll_interval.arrival_rate)
+            self.items_lost += lost
+            self._logger.warning(
+                "Stream %s could not page back to its last poll - about %s items were missed",
+                self.stream_key,
+                lost,
+            )
+
+        return listing + recovered
+
+    async def poll(self) -> List[Any]:
+        """
+        Poll the listing once - returning the items which have not been seen before.
+
+        :return: The new items - oldest first
+        """
+        poll_started = time.monotonic()
+        listing = await self.fetch_listing()
+
+        if self._resume_from is not None:
+            # The first poll after a restart fills in anything missed while the bot was down
+            # An empty listing (e.g. a poll which was rate limited) can't be - so keep trying
+            if listing:
+                listing = await self.resume_from_checkpoint(listing, self._resume_from)
+                self._resume_from = None
+        elif self._newest_item is not None:
+            # Later polls fill in anything which fell off the listing since the last poll
+            listing = await self.close_gap(listing, self._newest_item)
+
+        new_items = []
+        for item in reversed(listing):
+            if item_fullname(item) in self._seen_fullnames:
+                continue
+            self._seen_fullnames.add(item_fullname(item))
+            new_items.append(item)
+
+        if new_items:
+            self._newest_item = StreamCheckpoint(
+                fullname=item_fullname(new_items[-1]),
+                created_utc=float(new_items[-1].created_utc),
+            )
+
+        if self.metrics is not None:
+            self.metrics.record_poll(time.monotonic() - poll_started, new_items)
+
+        return new_items
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return the counters for the stream - for monitoring (and sizing the poll intervals).
+
+        :return:
+        """
+        return {
+            "gaps_detected": self.gaps_detected,
+            "items_recovered": self.items_recovered,
+            "items_lost": self.items_lost,
+            "poll_interval": self.poll_interval.interval,
+        }
+
+    async def pages(self) -> AsyncIterator[List[Any]]:
+        """
+        Poll the listing forever - yielding the new items found by each poll.
+
+        The checkpoint is saved when the stream stops (e.g. when its task is cancelled).
+        :return:
+        """
+        try:
+            while True:
+                new_items = await self.poll()
+
+                wait_seconds = self.poll_interval.record_poll(
+                    [float(item.created_utc) for item in new_items]
+                )
+
+                if new_items:
+                    yield new_items
+
+                    # The consumer is done with the page by the time it asks for the next one
+                    self.record_checkpoint(new_items)
+                elif self.checkpoint_store is not None:
+                    # Nothing new - so the last checkpoint is not written by the next update
+                    self.checkpoint_store.save_if_due()
+
+                await asyncio.sleep(wait_seconds)
+        finally:
+            if self.checkpoint_store is not None:
+                self.checkpoint_store.save()
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        """
+        Poll the listing forever - yielding new items one at a time.
+
+        :return:
+        """
+        async for page in self.pages():
+            for item in page:
+                yield item
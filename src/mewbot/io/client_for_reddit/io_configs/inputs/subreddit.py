@@ -5,15 +5,26 @@ Designed to take input from events happening to a watched list of subreddits.
 
 from __future__ import annotations
 
-from typing import List, Optional, Set, Type, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Set,
+    Type,
+    Union,
+)
 
 import asyncio
 import logging
-import time
+import math
 
 import asyncpraw  # type: ignore
 import asyncprawcore  # type: ignore
-from mewbot.api.v1 import Input, InputEvent
+from mewbot.api.v1 import InputEvent
 
 from ...events import (
     RedditUserBannedFromSubredditInputEvent,
@@ -29,30 +40,70 @@ from ...events import (
     SubRedditSubmissionPinnedInputEvent,
     SubRedditSubmissionRemovedInputEvent,
 )
+from .buffer import RedditEventBuffer
+from .checkpoints import StreamCheckpointStore
+from .ingestion import cheapest_ingestion_mode, estimate_ingestion_costs
+from .metrics import RedditInputMetrics
+from .pipeline import RedditPagePipeline
+from .revisit import RedditRevisitEngine
+from .scheduler import RedditRateLimitScheduler
 from .state import RedditState
-from .utils import GenericRedditTools
+from .streams import (
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    MAX_LISTING_LIMIT,
+    AdaptivePollInterval,
+    RedditListingStream,
+)
+from .subreddit_cache import RedditSubredditCache
+
+# How often authors seen since the last lookup are looked up in bulk
+AUTHOR_RESOLVE_INTERVAL: float = 30.0
+# How often the estimated cost of each ingestion mode is logged - the first estimate waits
+# until the streams have polled for a while, as the cost depends on how busy they are
+INGESTION_COSTS_LOG_INTERVAL: float = 900.0
+# The most authors /api/user_data_by_account_ids will look up in a request
+MAX_AUTHOR_BATCH_SIZE: int = 100
 
 
-class RedditSubredditInput(Input, GenericRedditTools):
+class RedditSubredditInput(
+    RedditPagePipeline
+):  # pylint: disable=too-many-instance-attributes
     """
     Receives input from reddit.
 
     In particular, watches for events generated by a monitored list of subreddits.
     """
 
-    _loop: Union[None, asyncio.events.AbstractEventLoop]
-    _logger: logging.Logger
+    # Keyed with the stream key - every stream this input has started
+    streams: Dict[str, RedditListingStream]
 
-    praw_reddit: asyncpraw.Reddit
+    # Items from r/all which were (and were not) from a watched subreddit - in firehose mode
+    firehose_matched: int
+    firehose_dropped: int
 
-    reddit_state: RedditState
-
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments,too-many-locals
         self,
         praw_reddit: asyncpraw.Reddit,
         subreddits: List[str],
+        *,
         override_logger: Optional[logging.Logger] = None,
         reddit_state: Optional[RedditState] = None,
+        multireddit_mode: bool = False,
+        rate_limit_scheduler: Optional[RedditRateLimitScheduler] = None,
+        min_poll_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+        max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+        checkpoint_store: Optional[StreamCheckpointStore] = None,
+        revisit_engine: Optional[RedditRevisitEngine] = None,
+        mod_log_mode: bool = False,
+        firehose_mode: bool = False,
+        resolve_authors: bool = False,
+        subreddit_cache: Optional[RedditSubredditCache] = None,
+        render_sample_rate: float = 1.0,
+        event_buffer: Optional[RedditEventBuffer] = None,
+        metrics: Optional[RedditInputMetrics] = None,
+        metrics_port: Optional[int] = None,
+        lightweight_events: bool = False,
     ) -> None:
         """
         Startup the input, watching a list of subreddits.
@@ -60,27 +111,90 @@ class RedditSubredditInput(Input, GenericRedditTools):
         :param praw_reddit: There can only be one asyncpraw instance - so it needs to be
                             passed in
         :param subreddits: The subreddits to monitor
-        """
+        :param multireddit_mode: If True, the subreddits are joined into a few "a+b+c"
+                                 multireddits - each of which is polled as a single stream.
+                                 Rather than polling each subreddit separately.
+        :param rate_limit_scheduler: Shared between all the inputs - hands out the request
+                                     budget between all the streams.
+                                     If not provided, each stream polls as fast as asyncpraw
+                                     lets it.
+        :param min_poll_interval: The shortest time (in seconds) any stream waits between polls
+                                  - busy streams are polled this often
+        :param max_poll_interval: The longest time (in seconds) any stream waits between polls
+                                  - quiet streams back off to this
+        :param checkpoint_store: Records how far each stream has got - so a restart resumes
+                                 from there, rather than replaying the latest items
+        :param revisit_engine: Looks at new comments and submissions again (in batches) as they
+                               age - to catch them being edited, deleted or removed.
+                               If not provided, those are only seen if a stream happens to
+                               return the item again.
+        :param mod_log_mode: For the watched subreddits the account moderates, removals are
+                             read off the mod log - rather than guessed at from "[removed]"
+                             bodies
+        :param firehose_mode: Poll the comments and submissions of r/all - and keep the ones
+                              from watched subreddits.
+                              For watchlists of hundreds of subreddits or more - where that
+                              takes fewer requests than polling them
+        :param resolve_authors: Look up the details (e.g. account age) of the authors seen -
+                                in bulk, in the background.
+                                Events are built from the author fields on the listings
+                                either way - so building them never fetches a Redditor
+        :param subreddit_cache: Resolves and validates the watched subreddits - shared by all
+                                their streams. If not provided, the input makes its own
+        :param render_sample_rate: The fraction of items polled which are rendered to the
+                                   render logger - when it's enabled for DEBUG
+        :param event_buffer: Bounded buffer between the streams and the input queue - which
+                             decides what to drop when the behaviours fall behind.
+                             If not provided, the streams put events straight on the queue -
+                             waiting for room if it's full
+        :param metrics: Records the throughput and latency of every stream. Can be shared
+                        between inputs. If not provided, the input makes its own
+        :param metrics_port: Serve the metrics in the Prometheus text format on this (local)
+                             port - if None, they are not served
+        :param lightweight_events: Events carry compact, immutable payloads of the comments and
+                                   submissions - rather than the asyncpraw objects.
+                                   They can be pickled, and don't keep the Reddit instance
+                                   alive. The asyncpraw object can be made again from the
+                                   payload, on demand
+        """
+        super().__init__(
+            praw_reddit=praw_reddit,
+            reddit_state=(
+                RedditState.create(
+                    target_subreddits=subreddits, resolve_authors=resolve_authors
+                )
+                if reddit_state is None
+                else reddit_state
+            ),
+            revisit_engine=revisit_engine,
+            lightweight_events=lightweight_events,
+            render_sample_rate=render_sample_rate,
+            event_buffer=event_buffer,
+            metrics=metrics,
+        )
 
-        super().__init__()
+        self.multireddit_mode = multireddit_mode
+        self.rate_limit_scheduler = rate_limit_scheduler
 
-        self.praw_reddit = praw_reddit
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
 
-        self.reddit_state = (
-            RedditState(
-                target_subreddits=subreddits,
-                started_subreddits=set(),
-                target_redditors=[],
-                started_redditors=set(),
-                seen_comments={},
-                seen_comment_contents={},
-                previous_comment_map={},
-                seen_submissions={},
-                seen_submission_contents={},
-                previous_submission_map={},
-            )
-            if reddit_state is None
-            else reddit_state
+        self.checkpoint_store = checkpoint_store
+        self.streams = {}
+
+        self.mod_log_mode = mod_log_mode
+
+        self.firehose_mode = firehose_mode
+        self.firehose_matched = 0
+        self.firehose_dropped = 0
+
+        self.resolve_authors = resolve_authors
+        self.metrics_port = metrics_port
+
+        self.subreddit_cache = (
+            RedditSubredditCache(praw_reddit, rate_limit_scheduler=rate_limit_scheduler)
+            if subreddit_cache is None
+            else subreddit_cache
         )
 
         self._logger = (
@@ -90,8 +204,6 @@ class RedditSubredditInput(Input, GenericRedditTools):
         )
         self._logger.info("Monitoring subreddits - %s", self.reddit_state.target_subreddits)
 
-        self._loop = None
-
     @staticmethod
     def produces_inputs() -> Set[Type[InputEvent]]:
         """
@@ -135,18 +247,6 @@ class RedditSubredditInput(Input, GenericRedditTools):
         """
         self.reddit_state.target_subreddits = values
 
-    @property
-    def loop(self) -> asyncio.events.AbstractEventLoop:
-        """
-        Gets the current event loop.
-
-        :return:
-        """
-        if self._loop is not None:
-            return self._loop
-        self._loop = asyncio.get_running_loop()
-        return self._loop
-
     async def run(self, profiles: bool = False) -> None:
         """
         Start polling Reddit.
@@ -172,512 +272,487 @@ class RedditSubredditInput(Input, GenericRedditTools):
                 current_user,
             )
 
-        for subreddit in self.reddit_state.target_subreddits:
-            self.loop.create_task(self.monitor_subreddit_comments(subreddit))
-            self.loop.create_task(self.monitor_subreddit_submissions(subreddit))
+        # Every subreddit is checked before any stream starts - so bad names are reported
+        # together, rather than as each stream fails
+        await self.subreddit_cache.validate(self.reddit_state.target_subreddits)
+        target_subreddits = self.subreddit_cache.valid(self.reddit_state.target_subreddits)
 
-            self.reddit_state.started_subreddits.add(subreddit)
+        if self.mod_log_mode:
+            await self.start_mod_log_streams()
 
-    # ----------------
-    # MONITOR COMMENTS
+        if self.firehose_mode:
+            declared_subreddits = {name.lower(): name for name in target_subreddits}
+            self.loop.create_task(self.monitor_firehose_comments(declared_subreddits))
+            self.loop.create_task(self.monitor_firehose_submissions(declared_subreddits))
 
-    async def monitor_subreddit_comments(self, target_subreddit: str) -> None:
-        """
-        Monitor a subreddit for comments and put them on the wire.
+            self.reddit_state.started_subreddits.update(target_subreddits)
 
-        :param target_subreddit:
-        :return:
-        """
-        self._logger.info(
-            "Monitoring subreddit '%s' for comments",
-            target_subreddit,
-        )
+            self.start_background_tasks()
 
-        multireddit = await self.praw_reddit.subreddit(target_subreddit, fetch=True)
+            return
 
-        # async-praw offers a comment stream - so processing comments as they come off the stream
-        async for comment in multireddit.stream.comments():
-            print("-------------")
-            print(self.render_comment(comment))
-            print("-------------")
-            await self.subreddit_comment_to_event(
-                subreddit=target_subreddit, reddit_comment=comment
-            )
+        if self.multireddit_mode:
+            for subreddit_chunk in self.chunk_multireddit_names(target_subreddits):
+                self.loop.create_task(self.monitor_multireddit_comments(subreddit_chunk))
+                self.loop.create_task(self.monitor_multireddit_submissions(subreddit_chunk))
 
-    def is_comment_top_level(self, reddit_comment: asyncpraw.reddit.Comment) -> bool:
-        """
-        Return True if a comment is top level and False otherwise.
+                self.reddit_state.started_subreddits.update(subreddit_chunk)
 
-        :param reddit_comment:
-        :return:
-        """
-        # Parse the parent_id to determine the type of comment this is
-        comment_parent_id = reddit_comment.parent_id
+            self.start_background_tasks()
 
-        # Comment is definitely attached to another comment - so note it as such in the event
-        if comment_parent_id.startswith("t1_"):
-            top_level = False
-        # Comment has the submission id of a parent as a post - so it's definitely top level
-        elif comment_parent_id.startswith("t3_"):
-            top_level = True
-        else:
-            # This should never happen
-            self._logger.info(
-                "Unexpected case when trying to comment_parent_id - %s", comment_parent_id
-            )
-            top_level = False
+            return
 
-        return top_level
+        for subreddit in target_subreddits:
+            self.loop.create_task(self.monitor_subreddit_comments(subreddit))
+            self.loop.create_task(self.monitor_subreddit_submissions(subreddit))
 
-    async def subreddit_comment_to_event(
-        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment
-    ) -> None:
+            self.reddit_state.started_subreddits.add(subreddit)
+
+        self.start_background_tasks()
+
+    def start_background_tasks(self) -> None:
         """
-        Takes a comment posted in a subreddit and puts it on the wire as an event.
+        Start the tasks which support the streams.
 
-        :param subreddit: The declared subreddit we are polling from
-                          (There may be multi-subreddit or composite subreddit shennanigans
-                          going on - so just declaring the subreddit mewbot _thinks_ its
-                          drawing from)
-        :param reddit_comment:
+        Revisits, the buffer, author lookups, the ingestion cost log and the metrics endpoint.
         :return:
         """
-        top_level = self.is_comment_top_level(reddit_comment)
-
-        # "Detect" removed or deleted comments - a poor method, but the best that can be done atm
-        # Note - there may be issues where this does not work for non-english language subreddits
-        if reddit_comment.body == r"[removed]":
-            # Per notes in reddit-dev-notes.md
-            # Not sure if removed events are being broadcast by the API
-            if reddit_comment.author == r"[deleted]":
-                await self.process_subreddit_removed_comment_on_submission(
-                    subreddit, reddit_comment, top_level=top_level
-                )
-
-                return
-
-        if reddit_comment.body == r"[deleted]":
-            await self.process_subreddit_deleted_comment_on_submission(
-                subreddit, reddit_comment, top_level
-            )
+        self.start_revisits()
 
-            return
+        if self.event_buffer is not None and self.queue is not None:
+            self.loop.create_task(self.event_buffer.drain_to(self.queue))
 
-        # Not sure if editing a comment produces a separate event in this result
-        # Or if it just happens to change the status of the observed event to edited
-        # Given this is intended to be the backend for a _display_ system - it probably
-        # DOES NOT produce a separate event
+        if self.resolve_authors:
+            self.loop.create_task(self.monitor_authors())
 
-        # Note - depending on the cache size events will start falling out of it
-        # So it's fairly certain that we won't be able to provide the pre-edit content
+        self.loop.create_task(self.monitor_ingestion_costs())
 
-        # If a comment has been edited, then it needs to go on the wire as an edited event
-        if reddit_comment.edited:
-            await self.process_subreddit_edited_comment_on_submission(
-                subreddit, reddit_comment, top_level
-            )
+        if self.metrics_port is not None:
+            self.loop.create_task(self.metrics.serve(port=self.metrics_port))
 
-            return
+    def start_revisits(self) -> None:
+        """
+        Start revisiting the items seen by the input - if it has a revisit engine.
 
-        # If a message is not declared as edited, deleted or removed, just put it on the wire
-        await self.process_subreddit_created_comment_on_submission(
-            subreddit, reddit_comment, top_level
-        )
+        :return:
+        """
+        if self.revisit_engine is not None:
+            self.loop.create_task(self.revisit_engine.run(self.revisited_item_to_event))
 
-    async def process_subreddit_created_comment_on_submission(
-        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
-    ) -> None:
+    async def resolve_author_batch(self) -> int:
         """
-        A comment has been created in a monitored subreddit/profile - on a submission.
+        Look up the details of a batch of the authors seen since the last lookup.
 
-        Subreddit first.
-        :param subreddit:
-        :param reddit_comment:
-        :param top_level:
-        :return:
+        Takes a single request, for up to MAX_AUTHOR_BATCH_SIZE authors.
+        :return: The number of authors whose details were found
         """
-        # Hash work here?
-        self.reddit_state.seen_comment_contents[reddit_comment.id] = reddit_comment
+        fullnames = self.reddit_state.take_unresolved_authors(MAX_AUTHOR_BATCH_SIZE)
+        if not fullnames:
+            return 0
 
-        comment_creation_input_event = SubRedditCommentCreationInputEvent(
-            comment=reddit_comment,
-            subreddit=subreddit,
-            parent_id=reddit_comment.parent_id,
-            author_str=str(reddit_comment.author),
-            top_level=top_level,
-            creation_timestamp=reddit_comment.created_utc,
-        )
+        if self.rate_limit_scheduler is not None:
+            await self.rate_limit_scheduler.acquire("authors")
 
-        await self.send(comment_creation_input_event)
+        resolved = 0
+        try:
+            async for partial_redditor in self.praw_reddit.redditors.partial_redditors(
+                fullnames
+            ):
+                self.reddit_state.record_author(partial_redditor)
+                resolved += 1
+        except asyncprawcore.exceptions.TooManyRequests as exp:
+            if self.rate_limit_scheduler is not None:
+                self.rate_limit_scheduler.report_rate_limited(
+                    float(exp.retry_after) if exp.retry_after is not None else None
+                )
+            self._logger.info("Lookup of %s authors was rate limited", len(fullnames))
+            self.reddit_state.unresolved_authors.update(fullnames)
+        except asyncprawcore.exceptions.AsyncPrawcoreException:
+            # The authors are tried again next time - rather than ending the lookups
+            self._logger.exception("Lookup of %s authors failed", len(fullnames))
+            self.reddit_state.unresolved_authors.update(fullnames)
 
-    async def process_subreddit_edited_comment_on_submission(
-        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
-    ) -> None:
+        return resolved
+
+    async def monitor_authors(self) -> None:
         """
-        A comment has been edited in a monitored subreddit.
+        Look up the details of the authors seen - in bulk, forever.
 
-        :param subreddit:
-        :param reddit_comment:
-        :param top_level:
         :return:
         """
-        message_id = reddit_comment.id
+        while True:
+            await asyncio.sleep(AUTHOR_RESOLVE_INTERVAL)
 
-        # Check if we have an existing old message to assign to this message
-        message_hash = self.hash_comment(reddit_comment)
-        if message_hash in self.reddit_state.previous_comment_map:
-            old_message = self.reddit_state.previous_comment_map[message_hash]
-        else:
-            old_message = self.reddit_state.seen_comment_contents.get(message_id, None)
-
-        comment_edit_input_event = SubRedditCommentEditInputEvent(
-            comment=reddit_comment,
-            subreddit=subreddit,
-            parent_id=reddit_comment.parent_id,
-            author_str=str(reddit_comment.author),
-            top_level=top_level,
-            # If we have it in our internal cache
-            pre_edit_message=old_message,
-            # This may be the best we can do - as the message doesn't seem to have a "last edited"
-            # or similar field
-            edit_timestamp=str(time.time()),
-        )
-        await self.send(comment_edit_input_event)
+            # Only the authors waiting now - ones put back after a failed lookup wait for next time
+            pending = len(self.reddit_state.unresolved_authors)
+            for _ in range(math.ceil(pending / MAX_AUTHOR_BATCH_SIZE)):
+                if not await self.resolve_author_batch():
+                    # Nothing found (e.g. the lookup failed) - back off until the next round
+                    break
 
-        self.reddit_state.previous_comment_map[message_hash] = old_message
-        # Store the current state of the message - in case it's edited again
-        self.reddit_state.seen_comment_contents[message_id] = reddit_comment
+    def listing_stream(
+        self,
+        listing_function: Callable[..., AsyncIterator[Any]],
+        stream_key: str,
+        limit: int = MAX_LISTING_LIMIT,
+    ) -> RedditListingStream:
+        """
+        Stream new items from a listing - polled as often as the activity on it warrants.
+
+        Each request waits its turn on the shared rate limit budget (if there is one).
+        If there is a checkpoint store, the stream resumes from where it last got to.
+        :param listing_function: e.g. Subreddit.comments or Subreddit.new
+        :param stream_key: Identifies the stream in the logs and to the scheduler
+        :param limit: How many items to ask for in each poll
+        :return:
+        """
+        stream = RedditListingStream(
+            listing_function=listing_function,
+            stream_key=stream_key,
+            rate_limit_scheduler=self.rate_limit_scheduler,
+            poll_interval=AdaptivePollInterval(
+                min_interval=self.min_poll_interval, max_interval=self.max_poll_interval
+            ),
+            checkpoint_store=self.checkpoint_store,
+            limit=limit,
+            metrics=self.metrics.stream(stream_key),
+        )
+        self.streams[stream_key] = stream
+        return stream
 
-    async def process_subreddit_deleted_comment_on_submission(
-        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
-    ) -> None:
+    def stream_stats(self) -> Dict[str, Dict[str, float]]:
         """
-        A comment has been deleted from a submission (on from somewhere in its comment forest).
+        Return the counters for each stream - keyed with the stream key.
 
-        :param subreddit:
-        :param reddit_comment:
-        :param top_level:
+        Includes the items recovered from (and lost to) gaps in busy streams.
         :return:
         """
-        # Check to see if we have an old message
-        comment_hash = self.hash_comment(reddit_comment)
-        old_reddit_message = self.reddit_state.previous_comment_map.get(comment_hash, None)
+        return {stream_key: stream.stats() for stream_key, stream in self.streams.items()}
 
-        # If we don't, try in the seen comments
-        if old_reddit_message is None:
-            old_reddit_message = self.reddit_state.seen_comment_contents[subreddit].get(
-                reddit_comment.id, None
-            )
-
-        # Update the cache - if a message has been removed it should never change again
-        self.reddit_state.previous_comment_map[comment_hash] = None
-        # Indicate that the comment is gone by setting the contents to None
-        self.reddit_state.seen_comment_contents[subreddit][reddit_comment.id] = None
-
-        deleted_message_event = SubRedditCommentDeletedInputEvent(
-            comment=reddit_comment,
-            subreddit=reddit_comment.subreddit,
-            author_str=old_reddit_message.author.id,
-            top_level=top_level,
-            del_timestamp=str(time.time()),
-            parent_id=reddit_comment.parent_id,
-        )
-        await self.send(deleted_message_event)
+    # -------------------
+    # MOD LOG
 
-    async def process_subreddit_removed_comment_on_submission(
-        self, subreddit: str, reddit_comment: asyncpraw.reddit.Comment, top_level: bool
-    ) -> None:
+    async def start_mod_log_streams(self) -> None:
         """
-        A comment has been removed from a submission (on from somewhere in its comment forest).
+        Start a mod log stream for the watched subreddits the account moderates.
 
-        Subreddit first.
-        :param subreddit:
-        :param reddit_comment:
-        :param top_level:
+        The mod log of several subreddits can be read as one - so there is one stream per
+        chunk of subreddits, as for multireddits.
         :return:
         """
+        moderated = {
+            str(subreddit.display_name).lower()
+            async for subreddit in self.praw_reddit.user.moderator_subreddits(limit=None)
+        }
+        mod_log_subreddits = [
+            subreddit
+            for subreddit in self.reddit_state.target_subreddits
+            if subreddit.lower() in moderated
+        ]
+        if not mod_log_subreddits:
+            self._logger.info("Not a moderator of any watched subreddit - no mod log streams")
+            return
 
-        # Check to see if we have an old message
-        comment_hash = self.hash_comment(reddit_comment)
-        old_reddit_message = self.reddit_state.previous_comment_map.get(comment_hash, None)
-
-        # If we don't, try in the seen comments
-        if old_reddit_message is None:
-            old_reddit_message = self.reddit_state.seen_comment_contents[subreddit].get(
-                reddit_comment.id, None
-            )
+        for subreddit_chunk in self.chunk_multireddit_names(mod_log_subreddits):
+            self.mod_log_subreddits.update(subreddit.lower() for subreddit in subreddit_chunk)
+            self.loop.create_task(self.monitor_mod_log(subreddit_chunk))
 
-        # Update the cache - if a message has been removed it should never change again
-        self.reddit_state.previous_comment_map[comment_hash] = None
+    async def monitor_mod_log(self, target_subreddits: List[str]) -> None:
+        """
+        Monitor the mod log of a group of moderated subreddits - for removals.
 
-        # Indicate that the comment is gone by setting the contents to None
-        self.reddit_state.seen_comment_contents[subreddit][reddit_comment.id] = None
+        :param target_subreddits:
+        :return:
+        """
+        combined_name = "+".join(target_subreddits)
+        declared_subreddits = {name.lower(): name for name in target_subreddits}
 
-        # Without the old message there is no good way to know who the author was
-        old_author_str = (
-            "" if old_reddit_message is None else str(old_reddit_message.author.id)
-        )
+        self._logger.info("Monitoring the mod log of '%s' for removals", combined_name)
 
-        removed_message_event = SubRedditCommentRemovedInputEvent(
-            comment=reddit_comment,
-            subreddit=reddit_comment.subreddit,
-            author_str=old_author_str,
-            top_level=top_level,
-            remove_timestamp=str(time.time()),
-            parent_id=reddit_comment.parent_id,
-        )
+        subreddits = await self.praw_reddit.subreddit(combined_name)
 
-        await self.send(removed_message_event)
+        async for mod_action in self.listing_stream(
+            subreddits.mod.log, f"mod_log:{combined_name}"
+        ):
+            subreddit_name = str(mod_action.subreddit)
+            await self.mod_action_to_event(
+                subreddit=declared_subreddits.get(subreddit_name.lower(), subreddit_name),
+                mod_action=mod_action,
+            )
 
     # -------------------
-    # MONITOR SUBMISSIONS
+    # FIREHOSE
+
+    def ingestion_costs(self) -> Dict[str, float]:
+        """
+        Estimate the requests per minute each ingestion mode would take for the watchlist.
+
+        Uses the arrival rates of the streams which are running - so it's only a rough guess
+        (assuming every subreddit is quiet) until the streams have been running for a while.
+        :return: Keyed with the mode and valued with requests per minute
+        """
+        comments_per_second = 0.0
+        submissions_per_second = 0.0
+        for stream_key, stream in self.streams.items():
+            stream_type = stream_key.partition(":")[0]
+            if stream_type.endswith("_comments"):
+                comments_per_second += stream.poll_interval.arrival_rate
+            elif stream_type.endswith("_submissions"):
+                submissions_per_second += stream.poll_interval.arrival_rate
+
+        if self.firehose_mode:
+            # Only a fraction of what the firehose streams see is from the watchlist
+            seen = self.firehose_matched + self.firehose_dropped
+            matched_fraction = self.firehose_matched / seen if seen else 0.0
+            comments_per_second *= matched_fraction
+            submissions_per_second *= matched_fraction
+
+        return estimate_ingestion_costs(
+            subreddit_count=len(self.reddit_state.target_subreddits),
+            comments_per_second=comments_per_second,
+            submissions_per_second=submissions_per_second,
+            min_poll_interval=self.min_poll_interval,
+            max_poll_interval=self.max_poll_interval,
+            multireddit_count=len(
+                self.chunk_multireddit_names(self.reddit_state.target_subreddits)
+            ),
+        )
 
-    async def monitor_subreddit_submissions(self, target_subreddit: str) -> None:
+    async def monitor_ingestion_costs(self) -> None:
         """
-        Monitor a subreddit for submissions and put them on the wire.
+        Log the estimated cost of each ingestion mode - once the streams have warmed up.
 
-        :param target_subreddit:
         :return:
         """
-        self._logger.info(
-            "Monitoring subreddit '%s' for submissions",
-            target_subreddit,
-        )
+        while True:
+            await asyncio.sleep(INGESTION_COSTS_LOG_INTERVAL)
 
-        try:
-            multireddit = await self.praw_reddit.subreddit(target_subreddit, fetch=True)
-        except asyncprawcore.exceptions.NotFound:
+            costs = self.ingestion_costs()
             self._logger.info(
-                "Subreddit could not be found - hence polling cannot start - '%s'",
-                target_subreddit,
+                "Estimated requests per minute for each ingestion mode - %s - cheapest is %s",
+                costs,
+                cheapest_ingestion_mode(costs),
             )
-            return
 
-        # async-praw offers a comment stream - so processing comments as they come off the stream
-        async for submission in multireddit.stream.submissions():
-            print("-------------")
-            print(self.render_submission(submission))
-            print("-------------")
-            await self.subreddit_submission_to_event(
-                subreddit=target_subreddit, reddit_submission=submission
-            )
-
-    @staticmethod
-    def hash_submission(submission_comment: asyncpraw.reddit.Submission) -> str:
+    def firehose_filter(
+        self,
+        reddit_item: Union[asyncpraw.reddit.Comment, asyncpraw.reddit.Submission],
+        watched_subreddits: FrozenSet[str],
+    ) -> bool:
         """
-        Take a comment and return a hash for it.
+        Return whether an item from r/all is from one of the watched subreddits.
 
-        This is pretty simple - just a str of a tuple of the comment_id and contents
-        :param submission_comment:
+        :param reddit_item:
+        :param watched_subreddits: Lower case names of the watched subreddits
         :return:
         """
-        return str(
-            (submission_comment.id, submission_comment.selftext, submission_comment.author)
-        )
+        if str(reddit_item.subreddit.display_name).lower() in watched_subreddits:
+            self.firehose_matched += 1
+            return True
 
-    async def subreddit_submission_to_event(
-        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
-    ) -> None:
+        self.firehose_dropped += 1
+        return False
+
+    async def monitor_firehose_comments(self, declared_subreddits: Dict[str, str]) -> None:
         """
-        Takes a reddit comment and puts it on the wire as an event.
+        Monitor every comment on reddit - keeping the ones from watched subreddits.
 
-        :param subreddit: The declared subreddit we are polling from
-                          (There may be multi-subreddit or composite subreddit shennanigans
-                          going on - so just declaring the subreddit mewbot _thinks_ its
-                          drawing from)
-        :param reddit_submission:
+        :param declared_subreddits: Keyed with the lower case subreddit name and valued with
+                                    the name as it was declared
         :return:
         """
-        # "Detect" removed or deleted comments - a poor method, but the best that can be done atm
-        # Note - there may be issues where this does not work for non-english language subreddits
-        if reddit_submission.selftext == r"[removed]":
-            # Per notes in reddit-dev-notes.md
-            # Not sure if removed events are being broadcast by the API
-            if reddit_submission.author == r"[deleted]":
-                await self.process_subreddit_removed_submission(subreddit, reddit_submission)
-
-                return
-
-        if reddit_submission.selftext == r"[deleted]":
-            await self.process_subreddit_deleted_submission(subreddit, reddit_submission)
-
-            return
-
-        # Not sure if editing a submission produces a separate event in this stream
-        # Or if it just happens to change the status of the observed event to edited
-        # Given this is intended to be the backend for a _display_ system - it probably
-        # DOES NOT produce a separate event
+        watched_subreddits = frozenset(declared_subreddits)
 
-        # Note - depending on the cache size events will start falling out of it
-        # So it's fairly certain that we won't be able to provide the pre-edit content
-
-        # If a submission has been edited, then it needs to go on the wire as an edited event
-        if reddit_submission.edited:
-            await self.process_subreddit_edited_submission(subreddit, reddit_submission)
-
-            return
+        self._logger.info(
+            "Monitoring r/all for comments in %s subreddits", len(watched_subreddits)
+        )
 
-        # If a message is not declared as edited, deleted or removed, just put it on the wire
-        await self.process_subreddit_created_submission(subreddit, reddit_submission)
+        all_subreddits = await self.praw_reddit.subreddit("all")
+
+        stream = self.listing_stream(all_subreddits.comments, "firehose_comments")
+        async for page in stream.pages():
+            await self.comment_page_to_events(
+                (
+                    (self.resolve_declared_subreddit(comment, declared_subreddits), comment)
+                    for comment in page
+                    if self.firehose_filter(comment, watched_subreddits)
+                ),
+                stream_key=stream.stream_key,
+            )
 
-    async def process_subreddit_created_submission(
-        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
-    ) -> None:
+    async def monitor_firehose_submissions(self, declared_subreddits: Dict[str, str]) -> None:
         """
-        A submission has been created in a monitored subreddit.
+        Monitor every submission on reddit - keeping the ones from watched subreddits.
 
-        :param subreddit:
-        :param reddit_submission:
+        :param declared_subreddits: Keyed with the lower case subreddit name and valued with
+                                    the name as it was declared
         :return:
         """
-        submission_creation_input_event = SubRedditSubmissionCreationInputEvent(
-            subreddit=subreddit,
-            submission_id=reddit_submission.id,
-            submission=reddit_submission,
-            author_str=str(reddit_submission.author),
-            creation_timestamp=reddit_submission.created_utc,
-            submission_content=reddit_submission.selftext,
-            submission_image=reddit_submission.url,
-            submission_title=reddit_submission.title,
+        watched_subreddits = frozenset(declared_subreddits)
+
+        self._logger.info(
+            "Monitoring r/all for submissions in %s subreddits", len(watched_subreddits)
         )
 
-        await self.send(submission_creation_input_event)
+        all_subreddits = await self.praw_reddit.subreddit("all")
+
+        stream = self.listing_stream(all_subreddits.new, "firehose_submissions")
+        async for page in stream.pages():
+            await self.submission_page_to_events(
+                (
+                    (
+                        self.resolve_declared_subreddit(submission, declared_subreddits),
+                        submission,
+                    )
+                    for submission in page
+                    if self.firehose_filter(submission, watched_subreddits)
+                ),
+                stream_key=stream.stream_key,
+            )
+
+    # -------------------
+    # MONITOR MULTIREDDITS
 
-    async def process_subreddit_edited_submission(
-        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
-    ) -> None:
+    async def monitor_multireddit_comments(self, target_subreddits: List[str]) -> None:
         """
-        A submission has been edited in a monitored subreddit.
+        Monitor a group of subreddits for comments - via a single multireddit stream.
 
-        :param subreddit:
-        :param reddit_submission:
+        :param target_subreddits: The subreddits to combine into the multireddit
         :return:
         """
+        multireddit_name = "+".join(target_subreddits)
+        declared_subreddits = {name.lower(): name for name in target_subreddits}
 
-        message_id = reddit_submission.id
-
-        # Check if we have an existing old message to assign to this message
-        message_hash = self.hash_submission(reddit_submission)
-        if message_hash in self.reddit_state.previous_submission_map:
-            old_message = self.reddit_state.previous_submission_map[message_hash]
-        else:
-            old_message = self.reddit_state.seen_submission_contents.get(message_id, None)
-
-        submission_edit_input_event = SubRedditSubmissionEditInputEvent(
-            submission=reddit_submission,
-            author_str=str(reddit_submission.author),
-            submission_image=None,
-            submission_title=reddit_submission.title,
-            # If we have it in our internal cache
-            pre_edit_submission=old_message,
-            # This may be the best we can do - as the message doesn't seem to have a "last edited"
-            # or similar field
-            edit_timestamp=str(time.time()),
-            subreddit=subreddit,
-            submission_content=reddit_submission.selftext,
-            submission_id=reddit_submission.id,
+        self._logger.info(
+            "Monitoring multireddit '%s' for comments",
+            multireddit_name,
         )
-        await self.send(submission_edit_input_event)
 
-        self.reddit_state.previous_submission_map[message_hash] = old_message
+        # Combined subreddits cannot be fetched - so it's left lazy
+        multireddit = await self.praw_reddit.subreddit(multireddit_name)
 
-        # Store the current state of the message - in case it's edited again
-        self.reddit_state.seen_submission_contents[message_id] = reddit_submission
+        stream = self.listing_stream(
+            multireddit.comments, f"multireddit_comments:{multireddit_name}"
+        )
+        async for page in stream.pages():
+            for comment in page:
+                self.log_rendering(self.render_comment, comment)
+
+            await self.comment_page_to_events(
+                (
+                    (self.resolve_declared_subreddit(comment, declared_subreddits), comment)
+                    for comment in page
+                ),
+                stream_key=stream.stream_key,
+            )
 
-    async def process_subreddit_deleted_submission(
-        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
-    ) -> None:
+    async def monitor_multireddit_submissions(self, target_subreddits: List[str]) -> None:
         """
-        A submission has been deleted in a monitored subreddit.
+        Monitor a group of subreddits for submissions - via a single multireddit stream.
 
-        :param subreddit:
-        :param reddit_submission:
+        :param target_subreddits: The subreddits to combine into the multireddit
         :return:
         """
+        multireddit_name = "+".join(target_subreddits)
+        declared_subreddits = {name.lower(): name for name in target_subreddits}
 
-        # Check to see if we have an old message
-        submission_hash = self.hash_submission(reddit_submission)
-        old_reddit_submission = self.reddit_state.previous_submission_map.get(
-            submission_hash, None
+        self._logger.info(
+            "Monitoring multireddit '%s' for submissions",
+            multireddit_name,
         )
 
-        # If we don't, try in the seen submissions
-        if old_reddit_submission is None:
-            old_reddit_submission = self.reddit_state.seen_submission_contents[subreddit].get(
-                reddit_submission.id, None
-            )
+        # Combined subreddits cannot be fetched - so it's left lazy
+        multireddit = await self.praw_reddit.subreddit(multireddit_name)
 
-        # Update the cache - if a message has been removed it should never change again
-        self.reddit_state.previous_submission_map[submission_hash] = None
-        # Indicate that the submission is gone by setting the contents to None
-        self.reddit_state.seen_submission_contents[subreddit][reddit_submission.id] = None
-
-        deleted_message_event = SubRedditSubmissionDeletedInputEvent(
-            submission=reddit_submission,
-            subreddit=reddit_submission.subreddit,
-            submission_title=reddit_submission.title,
-            author_str=old_reddit_submission.author.id,
-            del_timestamp=str(time.time()),
-            submission_content=reddit_submission.selftext,
-            submission_id=reddit_submission.id,
-            submission_image=None,
+        stream = self.listing_stream(
+            multireddit.new, f"multireddit_submissions:{multireddit_name}"
         )
-        await self.send(deleted_message_event)
+        async for page in stream.pages():
+            for submission in page:
+                self.log_rendering(self.render_submission, submission)
+
+            await self.submission_page_to_events(
+                (
+                    (
+                        self.resolve_declared_subreddit(submission, declared_subreddits),
+                        submission,
+                    )
+                    for submission in page
+                ),
+                stream_key=stream.stream_key,
+            )
 
-    async def process_subreddit_removed_submission(
-        self, subreddit: str, reddit_submission: asyncpraw.reddit.Submission
-    ) -> None:
+    # ----------------
+    # MONITOR COMMENTS
+
+    async def monitor_subreddit_comments(self, target_subreddit: str) -> None:
         """
-        A submission has been deleted in a monitored subreddit.
+        Monitor a subreddit for comments and put them on the wire.
 
-        :param subreddit:
-        :param reddit_submission:
+        :param target_subreddit:
         :return:
         """
-
-        # Check to see if we have an old message
-        submission_hash = self.hash_submission(reddit_submission)
-        old_reddit_submission = self.reddit_state.previous_submission_map.get(
-            submission_hash, None
+        self._logger.info(
+            "Monitoring subreddit '%s' for comments",
+            target_subreddit,
         )
 
-        # If we don't, try in the seen submissions
-        if old_reddit_submission is None:
-            old_reddit_submission = self.reddit_state.seen_submission_contents[subreddit].get(
-                reddit_submission.id, None
+        # Shared with the submission stream - the subreddit is only looked up once
+        multireddit = await self.subreddit_cache.get(target_subreddit)
+        if multireddit is None:
+            self._logger.info(
+                "Subreddit cannot be polled (%s) - hence polling cannot start - '%s'",
+                self.subreddit_cache.status(target_subreddit),
+                target_subreddit,
             )
+            return
 
-        # Update the cache - if a message has been removed it should never change again
-        self.reddit_state.previous_submission_map[submission_hash] = None
-        # Indicate that the submission is gone by setting the contents to None
-        self.reddit_state.seen_submission_contents[subreddit][reddit_submission.id] = None
-
-        # Without the old message there is no good way to know who the author was
-        old_author_str = (
-            "" if old_reddit_submission is None else str(old_reddit_submission.author.id)
-        )
-
-        removed_message_event = SubRedditSubmissionRemovedInputEvent(
-            submission_id=reddit_submission.id,
-            submission_title=reddit_submission.title,
-            submission=reddit_submission,
-            subreddit=reddit_submission.subreddit,
-            author_str=old_author_str,
-            remove_timestamp=str(time.time()),
-            submission_content=reddit_submission.selftext,
-            submission_image=reddit_submission.url,
+        # Each poll of the stream yields a page of new comments - processed as a batch
+        stream = self.listing_stream(
+            multireddit.comments, f"subreddit_comments:{target_subreddit}"
         )
+        async for page in stream.pages():
+            for comment in page:
+                self.log_rendering(self.render_comment, comment)
 
-        await self.send(removed_message_event)
+            await self.comment_page_to_events(
+                ((target_subreddit, comment) for comment in page),
+                stream_key=stream.stream_key,
+            )
 
     # -------------------
+    # MONITOR SUBMISSIONS
 
-    async def send(self, reddit_input_event: InputEvent) -> None:
+    async def monitor_subreddit_submissions(self, target_subreddit: str) -> None:
         """
-        Put a created InputEvent on the wire.
+        Monitor a subreddit for submissions and put them on the wire.
 
-        :param reddit_input_event:
+        :param target_subreddit:
         :return:
         """
-        if self.queue is not None:
-            await self.queue.put(reddit_input_event)
+        self._logger.info(
+            "Monitoring subreddit '%s' for submissions",
+            target_subreddit,
+        )
+
+        multireddit = await self.subreddit_cache.get(target_subreddit)
+        if multireddit is None:
+            self._logger.info(
+                "Subreddit cannot be polled (%s) - hence polling cannot start - '%s'",
+                self.subreddit_cache.status(target_subreddit),
+                target_subreddit,
+            )
+            return
+
+        # Each poll of the stream yields a page of new submissions - processed as a batch
+        stream = self.listing_stream(
+            multireddit.new, f"subreddit_submissions:{target_subreddit}"
+        )
+        async for page in stream.pages():
+            for submission in page:
+                self.log_rendering(self.render_submission, submission)
+
+            await self.submission_page_to_events(
+                ((target_subreddit, submission) for submission in page),
+                stream_key=stream.stream_key,
+            )
@@ -0,0 +1,276 @@
+"""
+Resolves and validates the watched subreddits - once, in bulk, before any stream starts.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+import asyncio
+import logging
+
+import asyncpraw  # type: ignore
+import asyncprawcore  # type: ignore
+
+from .scheduler import RedditRateLimitScheduler
+
+# The most names /api/info?sr_name= will take in a request
+MAX_SUBREDDIT_INFO_BATCH_SIZE: int = 100
+DEFAULT_SUBREDDIT_VALIDATION_CONCURRENCY: int = 8
+
+SUBREDDIT_OK: str = "ok"
+SUBREDDIT_NOT_FOUND: str = "not_found"
+SUBREDDIT_PRIVATE: str = "private"
+SUBREDDIT_BANNED: str = "banned"
+
+
+class RedditSubredditCache:  # pylint: disable=too-many-instance-attributes
+    """
+    Holds the Subreddit object - and the status - of every watched subreddit.
+
+    Validation is done in two passes
+     - the whole watchlist is looked up through /api/info?sr_name= - 100 names a request
+     - any names that did not come back are fetched one by one (a few at a time) - to find out
+       why. Reddit redirects to search for subreddits which do not exist, answers 404 for banned
+       subreddits and 403 for private ones.
+    Every stream of a subreddit then shares the one object - rather than each fetching its own.
+    """
+
+    praw_reddit: asyncpraw.Reddit
+    rate_limit_scheduler: Optional[RedditRateLimitScheduler]
+    concurrency: int
+
+    requests: int  # Requests made to resolve subreddits
+
+    # Keyed with the lower case name of the subreddit
+    _subreddits: Dict[str, asyncpraw.models.Subreddit]
+    _statuses: Dict[str, str]
+    # Lookups in progress - so concurrent callers share them
+    _pending: Dict[str, asyncio.Future[Optional[str]]]
+    _logger: logging.Logger
+
+    def __init__(
+        self,
+        praw_reddit: asyncpraw.Reddit,
+        rate_limit_scheduler: Optional[RedditRateLimitScheduler] = None,
+        concurrency: int = DEFAULT_SUBREDDIT_VALIDATION_CONCURRENCY,
+    ) -> None:
+        """
+        Startup an empty cache.
+
+        :param praw_reddit:
+        :param rate_limit_scheduler: Shared scheduler handing out the request budget
+        :param concurrency: The most subreddits fetched one by one at once
+        """
+        if concurrency < 1:
+            raise AttributeError(f"concurrency must be at least 1 - got {concurrency}")
+
+        self.praw_reddit = praw_reddit
+        self.rate_limit_scheduler = rate_limit_scheduler
+        self.concurrency = concurrency
+
+        self.requests = 0
+
+        self._subreddits = {}
+        self._statuses = {}
+        self._pending = {}
+
+        self._logger = logging.getLogger(__name__ + ":" + type(self).__name__)
+
+    def status(self, subreddit: str) -> Optional[str]:
+        """
+        Return the status of a subreddit - None if it has not been looked up.
+
+        :param subreddit:
+        :return:
+        """
+        return self._statuses.get(subreddit.lower())
+
+    async def _acquire(self) -> None:
+        """
+        Wait for a request slot - if there is a scheduler.
+
+        :return:
+        """
+        if self.rate_limit_scheduler is not None:
+            await self.rate_limit_scheduler.acquire("subreddit_metadata")
+        self.requests += 1
+
+    def _record(self, subreddit: asyncpraw.models.Subreddit) -> str:
+        """
+        Record a subreddit reddit returned - and work out its status.
+
+        :param subreddit:
+        :return:
+        """
+        key = str(subreddit.display_name).lower()
+        status = (
+            SUBREDDIT_PRIVATE
+            if getattr(subreddit, "subreddit_type", None) == "private"
+            else SUBREDDIT_OK
+        )
+
+        self._subreddits[key] = subreddit
+        self._statuses[key] = status
+        return status
+
+    async def _fetch_one(self, subreddit: str) -> Optional[str]:
+        """
+        Fetch a single subreddit - to find out why it was not returned in bulk.
+
+        :param subreddit:
+        :return: The status of the subreddit - None if the fetch failed
+        """
+        await self._acquire()
+
+        key = subreddit.lower()
+        try:
+            fetched = await self.praw_reddit.subreddit(subreddit, fetch=True)
+        except asyncprawcore.exceptions.Redirect:
+            status = SUBREDDIT_NOT_FOUND
+        except asyncprawcore.exceptions.NotFound:
+            status = SUBREDDIT_BANNED
+        except asyncprawcore.exceptions.Forbidden:
+            status = SUBREDDIT_PRIVATE
+        except asyncprawcore.exceptions.AsyncPrawcoreException:
+            # Left unresolved - so it is looked up again next time
+            self._logger.exception("Failed to fetch subreddit %s", subreddit)
+            return None
+        else:
+            return self._record(fetched)
+
+        self._statuses[key] = status
+        return status
+
+    async def _look_up(self, unknown: List[str]) -> None:
+        """
+        Look up subreddits in bulk - then fetch, one at a time, any reddit did not return.
+
+        :param unknown: The subreddits to look up
+        :return:
+        """
+        for start in range(0, len(unknown), MAX_SUBREDDIT_INFO_BATCH_SIZE):
+            end = start + MAX_SUBREDDIT_INFO_BATCH_SIZE
+            await self._acquire()
+            try:
+                async for subreddit in self.praw_reddit.info(subreddits=unknown[start:end]):
+                    self._record(subreddit)
+            except asyncprawcore.exceptions.AsyncPrawcoreException:
+                # The batch is fetched one by one below instead
+                self._logger.exception("Failed to look up a batch of subreddits")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch_one(name: str) -> None:
+            async with semaphore:
+                await self._fetch_one(name)
+
+        # One failed fetch should not stop the rest of the watchlist being resolved
+        results = await asyncio.gather(
+            *(fetch_one(name) for name in unknown if name.lower() not in self._statuses),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                self._logger.error("Failed to fetch a subreddit", exc_info=result)
+
+    async def _wait_for_pending(self, subreddits: List[str]) -> None:
+        """
+        Wait on lookups started by someone else - rather than repeating them.
+
+        :param subreddits:
+        :return:
+        """
+        for name in subreddits:
+            if name.lower() in self._pending:
+                await self._pending[name.lower()]
+
+    async def validate(self, subreddits: Iterable[str]) -> Dict[str, str]:
+        """
+        Resolve every subreddit given which has not been already - and report on the rest.
+
+        :param subreddits:
+        :return: Keyed with the name of the subreddit (as given) and valued with its status -
+                 subreddits whose lookup failed are left out
+        """
+        subreddits = list(subreddits)
+        unknown = list(
+            {
+                name.lower(): name
+                for name in subreddits
+                if name.lower() not in self._statuses and name.lower() not in self._pending
+            }.values()
+        )
+
+        loop = asyncio.get_running_loop()
+        futures: Dict[str, asyncio.Future[Optional[str]]] = {
+            name.lower(): loop.create_future() for name in unknown
+        }
+        self._pending.update(futures)
+
+        try:
+            await self._look_up(unknown)
+        finally:
+            # None if the lookup failed - the subreddit will be looked up again next time
+            for key, future in futures.items():
+                del self._pending[key]
+                future.set_result(self._statuses.get(key))
+
+        await self._wait_for_pending(subreddits)
+
+        report = {
+            name: self._statuses[name.lower()]
+            for name in subreddits
+            if name.lower() in self._statuses
+        }
+
+        for status in (SUBREDDIT_NOT_FOUND, SUBREDDIT_PRIVATE, SUBREDDIT_BANNED):
+            names = sorted(name for name, found in report.items() if found == status)
+            if names:
+                self._logger.warning(
+                    "%s watched subreddits are %s - they will not be polled - %s",
+                    len(names),
+                    status.replace("_", " "),
+                    names,
+                )
+
+        return report
+
+    async def get(self, subreddit: str) -> Optional[asyncpraw.models.Subreddit]:
+        """
+        Return the subreddit - looking it up if it has not been already.
+
+        :param subreddit:
+        :return: None if the subreddit cannot be polled
+        """
+        if subreddit.lower() not in self._statuses:
+            await self.validate([subreddit])
+
+        if self._statuses.get(subreddit.lower()) != SUBREDDIT_OK:
+            return None
+        return self._subreddits[subreddit.lower()]
+
+    def valid(self, subreddits: Iterable[str]) -> List[str]:
+        """
+        Filter a watchlist down to the subreddits which can be polled.
+
+        :param subreddits:
+        :return:
+        """
+        return [name for name in subreddits if self.status(name) == SUBREDDIT_OK]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the counters for the cache - for monitoring.
+
+        :return:
+        """
+        stats = {"subreddits": len(self._statuses), "requests": self.requests}
+        for status in (
+            SUBREDDIT_OK,
+            SUBREDDIT_NOT_FOUND,
+            SUBREDDIT_PRIVATE,
+            SUBREDDIT_BANNED,
+        ):
+            stats[status] = sum(1 for found in self._statuses.values() if found == status)
+        return stats
@@ -5,7 +5,143 @@ Generic methods which are used in several Inputs.
 
 from __future__ import annotations
 
+from typing import Any, Callable, Iterable, List, Optional
+
+import asyncio
+import hashlib
+import logging
+import random
+import unicodedata
+
 import asyncpraw  # type: ignore
+from mewbot.api.v1 import InputEvent
+
+# Reddit will reject (or silently truncate) very long request paths.
+# The "a+b+c" joined name of a multireddit is the bulk of that path - so it's kept well under
+# the limit, leaving room for the rest of the url and the query string.
+MULTIREDDIT_MAX_NAME_LENGTH: int = 1800
+# Reddit also seems to stop honouring the combination past a certain number of subreddits
+MULTIREDDIT_MAX_SUBREDDITS: int = 100
+
+# Size of the fingerprints used to recognise content which has been seen before.
+# 16 bytes makes an accidental collision vanishingly unlikely for any number of items a bot
+# could see in its lifetime.
+FINGERPRINT_SIZE: int = 16
+
+# Human-readable renderings of every item polled are logged here at DEBUG - off unless enabled
+RENDER_LOGGER_NAME: str = "mewbot.io.client_for_reddit.render"
+render_logger: logging.Logger = logging.getLogger(RENDER_LOGGER_NAME)
+
+
+def reddit_id_to_int(reddit_id: str) -> int:
+    """
+    Decode a reddit id (or fullname - e.g. "t1_abc123") into the integer it represents.
+
+    Reddit ids are base36 integers - handed out (more or less) in order.
+    So, for items of the same type, a larger id means a newer item.
+    :param reddit_id:
+    :return:
+    """
+    return int(reddit_id.rpartition("_")[2], 36)
+
+
+def content_fingerprint(*fields: str) -> bytes:
+    """
+    Return a fixed size fingerprint of some text fields - e.g. the id and body of a comment.
+
+    A BLAKE2b digest of the normalised fields.
+    Each field is length prefixed - so ("ab", "c") and ("a", "bc") have different fingerprints.
+    Unicode is normalised (NFC) - so the same text sent in a different form is still the same.
+    :param fields:
+    :return:
+    """
+    hasher = hashlib.blake2b(digest_size=FINGERPRINT_SIZE)
+    for field in fields:
+        encoded = unicodedata.normalize("NFC", field).encode("utf-8")
+        hasher.update(len(encoded).to_bytes(8, "little"))
+        hasher.update(encoded)
+    return hasher.digest()
+
+
+class LazyRendering:  # pylint: disable=too-few-public-methods
+    """
+    Renders a reddit item when (and only if) it's formatted into a log message.
+    """
+
+    __slots__ = ("render", "reddit_item", "prefix")
+
+    render: Callable[[Any, str], str]
+    reddit_item: Any
+    prefix: str
+
+    def __init__(
+        self, render: Callable[[Any, str], str], reddit_item: Any, prefix: str
+    ) -> None:
+        """
+        Hold on to the item - and how to render it.
+
+        :param render: e.g. GenericRedditTools.render_comment
+        :param reddit_item:
+        :param prefix: To prepend to all the rendered lines
+        """
+        self.render = render
+        self.reddit_item = reddit_item
+        self.prefix = prefix
+
+    def __str__(self) -> str:
+        """
+        Render the item.
+
+        :return:
+        """
+        return self.render(self.reddit_item, self.prefix)
+
+
+def log_rendering(
+    render: Callable[[Any, str], str],
+    reddit_item: Any,
+    prefix: str = "subreddit",
+    sample_rate: float = 1.0,
+) -> bool:
+    """
+    Log a human-readable rendering of an item to the render logger - if it's enabled for DEBUG.
+
+    When it's not, this costs a level check - nothing is formatted and no attribute of the
+    item is touched.
+    :param render: e.g. GenericRedditTools.render_comment
+    :param reddit_item:
+    :param prefix: To prepend to all the rendered lines
+    :param sample_rate: The fraction of items to render - for busy streams
+    :return: Was the item logged?
+    """
+    if not render_logger.isEnabledFor(logging.DEBUG):
+        return False
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return False
+
+    render_logger.debug("%s", LazyRendering(render, reddit_item, prefix))
+    return True
+
+
+async def put_events(
+    queue: Optional[asyncio.Queue[InputEvent]], events: Iterable[InputEvent]
+) -> None:
+    """
+    Put events on an input queue - in order.
+
+    Only waits if the queue is full - rather than once for every event.
+    :param queue: The queue the input is bound to - None if it's not bound yet
+    :param events:
+    :return:
+    """
+    if queue is None:
+        return
+
+    for event in events:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            await queue.put(event)
 
 
 class GenericRedditTools:
@@ -60,25 +196,68 @@ class GenericRedditTools:
         return "\n".join(comment_contents)
 
     @staticmethod
-    def hash_comment(reddit_comment: asyncpraw.reddit.Comment) -> str:
+    def chunk_multireddit_names(
+        subreddits: List[str],
+        max_name_length: int = MULTIREDDIT_MAX_NAME_LENGTH,
+        max_subreddits: int = MULTIREDDIT_MAX_SUBREDDITS,
+    ) -> List[List[str]]:
+        """
+        Split a list of subreddits into groups which can be joined into "a+b+c" multireddits.
+
+        Each group, once joined with "+", will be no longer than max_name_length.
+        Duplicate names (compared case-insensitively) are dropped - they'd just produce the same
+        items twice.
+        :param subreddits: The subreddits to group
+        :param max_name_length: The maximum length of the joined "a+b+c" name
+        :param max_subreddits: The maximum number of subreddits in any one group
+        :return:
         """
-        Take a comment and return a hash for it.
+        chunks: List[List[str]] = []
+        current_chunk: List[str] = []
+        current_length = 0
+        seen_names = set()
+
+        for subreddit in subreddits:
+            if subreddit.lower() in seen_names:
+                continue
+            seen_names.add(subreddit.lower())
+
+            # +1 for the "+" joining this name to the one before it
+            new_length = current_length + len(subreddit) + (1 if current_chunk else 0)
+            if current_chunk and (
+                new_length > max_name_length or len(current_chunk) >= max_subreddits
+            ):
+                chunks.append(current_chunk)
+                current_chunk = []
+                new_length = len(subreddit)
+
+            current_chunk.append(subreddit)
+            current_length = new_length
 
-        This is pretty simple - just a str of a tuple of the comment_id and contents
+        if current_chunk:
+            chunks.append(current_chunk)
+
+        return chunks
+
+    @staticmethod
+    def hash_comment(reddit_comment: asyncpraw.reddit.Comment) -> bytes:
+        """
+        Take a comment and return a fingerprint of its content.
+
+        Covers the comment id and body - see content_fingerprint.
         :param reddit_comment:
         :return:
         """
-        return str((reddit_comment.id, reddit_comment.body))
+        return content_fingerprint(reddit_comment.id, reddit_comment.body)
 
     @staticmethod
-    def hash_submission(submission_comment: asyncpraw.reddit.Submission) -> str:
+    def hash_submission(reddit_submission: asyncpraw.reddit.Submission) -> bytes:
         """
-        Take a comment and return a hash for it.
+        Take a submission and return a fingerprint of its content.
 
-        This is pretty simple - just a str of a tuple of the comment_id and contents
-        :param submission_comment:
+        Covers the submission id and selftext - see content_fingerprint.
+        (The id already fixes the author - so the author does not need to be fetched).
+        :param reddit_submission:
         :return:
         """
-        return str(
-            (submission_comment.id, submission_comment.selftext, submission_comment.author)
-        )
+        return content_fingerprint(reddit_submission.id, reddit_submission.selftext)
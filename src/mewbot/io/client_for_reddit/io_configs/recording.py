@@ -0,0 +1,398 @@
+"""
+Records the traffic between asyncpraw and reddit - and replays it, offline.
+
+Both are asyncprawcore requestors - passed to asyncpraw.Reddit as its requestor_class.
+A recording is a gzip file of JSON lines - one for each request and the response to it.
+It's only ever appended to - each line is written as a gzip member of its own (the members
+read back as one stream), and each run starts with a line marking the start of the run.
+A run which is killed loses at most the member it was writing - which is cut off the
+recording when the next run starts, and skipped when reading.
+Request headers and bodies (which carry the credentials) are never written - and tokens are
+redacted from the responses.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import asyncio
+import collections
+import gzip
+import json
+import logging
+import os
+import time
+import zlib
+from urllib.parse import urlsplit
+
+from asyncprawcore import Requestor  # type: ignore
+from asyncprawcore.exceptions import RequestException  # type: ignore
+from multidict import CIMultiDict, CIMultiDictProxy
+
+# Response headers which are not worth keeping - or should not be kept
+UNRECORDED_HEADERS: frozenset[str] = frozenset(("set-cookie", "date", "connection"))
+REDACTED_FIELDS: Tuple[str, ...] = ("access_token", "refresh_token")
+
+# Read from the recording at a time - when looking for the gzip members in it
+RECORDING_CHUNK_SIZE: int = 64 * 1024
+
+# Identifies a request - its method, path and query parameters
+RequestKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+
+
+def request_key(method: str, url: str, params: Optional[Dict[str, Any]]) -> RequestKey:
+    """
+    Identify a request - regardless of the host it was sent to.
+
+    :param method:
+    :param url:
+    :param params:
+    :return:
+    """
+    path = urlsplit(url).path.strip("/")
+    query = tuple(sorted((str(key), str(value)) for key, value in (params or {}).items()))
+    return method.upper(), path, query
+
+
+def redact(path: str, body: str) -> str:
+    """
+    Blank the tokens out of a token response.
+
+    :param path:
+    :param body:
+    :return:
+    """
+    if not path.endswith("access_token"):
+        return body
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return body
+    for field in REDACTED_FIELDS:
+        if field in payload:
+            payload[field] = "redacted"
+    return json.dumps(payload)
+
+
+class RecordedResponse:
+    """
+    Stands in for an aiohttp ClientResponse - for the parts asyncprawcore reads.
+    """
+
+    def __init__(self, status: int, headers: List[List[str]], body: str) -> None:
+        """
+        Startup the response.
+
+        :param status:
+        :param headers: Name and value pairs
+        :param body:
+        """
+        self.status = status
+        self.headers = CIMultiDictProxy(CIMultiDict((name, value) for name, value in headers))
+        self.body = body
+
+    async def text(self) -> str:
+        """
+        The body of the response.
+
+        :return:
+        """
+        return self.body
+
+    async def read(self) -> bytes:
+        """
+        The body of the response - as bytes.
+
+        :return:
+        """
+        return self.body.encode("utf-8")
+
+    async def json(self) -> Any:
+        """
+        The body of the response - parsed.
+
+        :return:
+        """
+        return json.loads(self.body)
+
+    def release(self) -> None:
+        """
+        Nothing to release - the body is already in memory.
+
+        :return:
+        """
+
+
+class RecordingRequestor(Requestor):  # type: ignore
+    """
+    Makes requests as normal - writing each request and response to the recording.
+    """
+
+    def __init__(self, *args: Any, recording_path: str, **kwargs: Any) -> None:
+        """
+        Startup the requestor.
+
+        :param args: For the asyncprawcore Requestor
+        :param recording_path: The recording to append to
+        :param kwargs: For the asyncprawcore Requestor
+        """
+        super().__init__(*args, **kwargs)
+
+        self.recording_path = recording_path
+        self.recorded = 0
+
+        self._started_at = time.monotonic()
+        self._logger = logging.getLogger(__name__ + ":" + type(self).__name__)
+
+        if os.path.exists(recording_path):
+            self._cut_torn_member()
+        self._recording = open(recording_path, "ab")  # pylint: disable=consider-using-with
+        self._write({"run_started": time.time()})
+
+    def _cut_torn_member(self) -> None:
+        """
+        Cut off a member left part written by a run which was killed - so this run follows on.
+
+        :return:
+        """
+        complete = 0
+        for complete, _ in read_members(self.recording_path):
+            pass
+
+        if complete < os.path.getsize(self.recording_path):
+            self._logger.warning(
+                "%s ends part way through an exchange - cutting it off at byte %s",
+                self.recording_path,
+                complete,
+            )
+            os.truncate(self.recording_path, complete)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        """
+        Append a line to the recording - as a complete gzip member.
+
+        :param record:
+        :return:
+        """
+        self._recording.write(gzip.compress((json.dumps(record) + "\n").encode("utf-8")))
+        # Everything up to here can be read back - even if the run is killed
+        self._recording.flush()
+
+    async def request(
+        self, *args: Any, timeout: Optional[float] = None, **kwargs: Any
+    ) -> Any:
+        """
+        Make a request - and record it with the response.
+
+        :param args: The method and the URL
+        :param timeout:
+        :param kwargs: e.g. params
+        :return:
+        """
+        method, url = args[0], args[1]
+        sent_at = time.monotonic()
+        response = await super().request(*args, timeout=timeout, **kwargs)
+        # aiohttp keeps the body - asyncprawcore can read it again
+        body = (await response.read()).decode("utf-8", errors="replace")
+
+        key = request_key(method, url, kwargs.get("params"))
+        record = {
+            "at": sent_at - self._started_at,
+            "elapsed": time.monotonic() - sent_at,
+            "method": key[0],
+            "path": key[1],
+            "params": key[2],
+            "status": response.status,
+            "headers": [
+                [name, value]
+                for name, value in response.headers.items()
+                if name.lower() not in UNRECORDED_HEADERS
+            ],
+            "body": redact(key[1], body),
+        }
+        self._write(record)
+        self.recorded += 1
+
+        return response
+
+    async def close(self) -> None:
+        """
+        Close the session - and the recording.
+
+        :return:
+        """
+        await super().close()
+        self._recording.close()
+
+
+def read_members(recording_path: str) -> Iterator[Tuple[int, bytes]]:
+    """
+    Read the complete gzip members in a recording - stopping at one which was cut off.
+
+    :param recording_path:
+    :return: For each member - the offset it ends at, and what it decompresses to
+    """
+    end = 0
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    decompressed: List[bytes] = []
+
+    with open(recording_path, "rb") as recording:
+        data = recording.read(RECORDING_CHUNK_SIZE)
+        while data:
+            decompressed.append(decompressor.decompress(data))
+            if not decompressor.eof:
+                end += len(data)
+                data = recording.read(RECORDING_CHUNK_SIZE)
+                continue
+
+            # The rest of the data belongs to the next member
+            end += len(data) - len(decompressor.unused_data)
+            yield end, b"".join(decompressed)
+
+            data = decompressor.unused_data or recording.read(RECORDING_CHUNK_SIZE)
+            decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+            decompressed = []
+
+
+def read_recording(recording_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read back every exchange in a recording - in the order they were made.
+
+    Runs appended to the same recording follow on from each other - each starts where the
+    last finished. An exchange cut off by a run being killed is skipped.
+    :param recording_path:
+    :return:
+    """
+    offset = 0.0
+    finished_at = 0.0
+    for _, member in read_members(recording_path):
+        for line in member.decode("utf-8").splitlines():
+            record = json.loads(line)
+            # Each run starts its clock at 0 again
+            if "run_started" in record:
+                offset = finished_at
+                continue
+
+            record["at"] += offset
+            finished_at = max(finished_at, record["at"] + record["elapsed"])
+            yield record
+
+
+class ReplayRequestor(Requestor):  # type: ignore  # pylint: disable=too-many-instance-attributes
+    """
+    Answers requests from a recording - without touching the network.
+
+    Requests are matched to recorded ones by method, path and query parameters - in the order
+    they were recorded. Responses are held back until the time they came in the recording -
+    scaled by the speed.
+    A request with no recorded response waits until the requestor is closed - as a stream
+    waits at the end of the recording.
+    """
+
+    # pylint: disable-next=too-many-arguments,too-many-positional-arguments
+    def __init__(  # pylint: disable=super-init-not-called,unused-argument
+        self,
+        user_agent: str,
+        oauth_url: str = "https://oauth.reddit.com",
+        reddit_url: str = "https://www.reddit.com",
+        session: Any = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        timeout: float = 16.0,
+        *,
+        recording_path: str,
+        speed: Optional[float] = 1.0,
+    ) -> None:
+        """
+        Load the recording - no session is opened.
+
+        :param user_agent: Unused - for the asyncprawcore Requestor interface
+        :param oauth_url:
+        :param reddit_url:
+        :param session: Unused
+        :param loop: Unused
+        :param timeout: Unused
+        :param recording_path: The recording to replay
+        :param speed: 1.0 for the pace it was recorded at, 10.0 for ten times faster e.t.c.
+                      None to answer every request as fast as possible
+        """
+        if speed is not None and speed <= 0:
+            raise AttributeError(f"Replay speed must be positive - got {speed}")
+
+        self.user_agent = user_agent
+        self.oauth_url = oauth_url
+        self.reddit_url = reddit_url
+        self.timeout = timeout
+        self.recording_path = recording_path
+        self.speed = speed
+
+        self.replayed = 0
+        self.unmatched = 0
+        self.finished = asyncio.Event()
+
+        self._exchanges: Dict[RequestKey, Deque[Dict[str, Any]]] = collections.defaultdict(
+            collections.deque
+        )
+        self.total = 0
+        for record in read_recording(recording_path):
+            key = (record["method"], record["path"], tuple(map(tuple, record["params"])))
+            self._exchanges[key].append(record)
+            self.total += 1
+
+        self._started_at: Optional[float] = None
+        self._closed = asyncio.Event()
+        self._logger = logging.getLogger(__name__ + ":" + type(self).__name__)
+
+    def __getattr__(self, attribute: str) -> Any:
+        """
+        There is no session to pass attributes on to.
+
+        :param attribute:
+        :return:
+        """
+        raise AttributeError(attribute)
+
+    async def request(
+        self, *args: Any, timeout: Optional[float] = None, **kwargs: Any
+    ) -> Any:
+        """
+        Answer a request with the next recorded response to it.
+
+        :param args: The method and the URL
+        :param timeout: Unused
+        :param kwargs: e.g. params
+        :return:
+        """
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+
+        key = request_key(args[0], args[1], kwargs.get("params"))
+        exchanges = self._exchanges.get(key)
+        if not exchanges:
+            self.unmatched += 1
+            self._logger.warning("No recorded response to %s %s %s - waiting", *key)
+            await self._closed.wait()
+            raise RequestException(
+                ConnectionResetError("The replay was closed"), args, kwargs
+            )
+
+        record = exchanges.popleft()
+        if self.speed is not None:
+            due = self._started_at + (record["at"] + record["elapsed"]) / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        self.replayed += 1
+        if self.replayed == self.total:
+            self.finished.set()
+
+        return RecordedResponse(record["status"], record["headers"], record["body"])
+
+    async def close(self) -> None:
+        """
+        Release anything waiting on a response which will never come.
+
+        :return:
+        """
+        self._closed.set()
@@ -105,6 +105,7 @@ class RedditBotOauthIOConfig(RedditIOConfigBase):
             client_secret=self.bot_credentials.client_secret,
             redirect_uri=self.bot_credentials.redirect_uri,
             user_agent=self.bot_credentials.user_agent,
+            **self.requestor_overrides(),
         )
 
         print(reddit.auth.url(scopes=["identity"], state="...", duration="permanent"))
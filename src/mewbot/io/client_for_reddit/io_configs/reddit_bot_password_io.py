@@ -4,7 +4,7 @@
 IOConfig for a bot which acquires its user credentials via plain text stored passwords.
 """
 
-from typing import Sequence
+from typing import Any, Dict, Optional, Sequence
 
 import logging
 
@@ -41,6 +41,10 @@ class RedditBotPasswordIOConfig(RedditIOConfigBase):
 
     _subreddits: list[str]
 
+    # Where the reddit API is - if None, the real one.
+    # Set to point the bot at a local stand in (e.g. for load testing)
+    _base_url: Optional[str] = None
+
     _logger: logging.Logger
 
     @property
@@ -153,12 +157,41 @@ class RedditBotPasswordIOConfig(RedditIOConfigBase):
         """
         self.hybrid_credentials.password = value
 
+    @property
+    def base_url(self) -> Optional[str]:
+        """
+        Get the URL of the reddit API being used - None if it's the real one.
+
+        :return:
+        """
+        return self._base_url
+
+    @base_url.setter
+    def base_url(self, value: Optional[str]) -> None:
+        """
+        Point the bot at another reddit API - must happen before connection.
+
+        e.g. a local stand in for load testing.
+        Both the token requests and the API requests go to the given URL.
+        :param value: e.g. http://127.0.0.1:8080 - None for the real reddit
+        :return:
+        """
+        if value is not None and not value.startswith(("http://", "https://")):
+            raise AttributeError(f"base_url must be an http(s) URL - got {value}")
+        self._base_url = None if value is None else value.rstrip("/")
+
     def complete_authorization_flow(self) -> None:
         """
         Login to reddit using bot credentials - with pre-added password.
 
         :return:
         """
+        url_overrides: Dict[str, Any] = (
+            {}
+            if self._base_url is None
+            else {"oauth_url": self._base_url, "reddit_url": self._base_url}
+        )
+
         reddit = asyncpraw.Reddit(
             username=self.hybrid_credentials.username,
             password=self.hybrid_credentials.password,
@@ -167,6 +200,8 @@ class RedditBotPasswordIOConfig(RedditIOConfigBase):
             # Must be set. Will be used if you have 2fa on your persoanl account
             redirect_uri=self.hybrid_credentials.redirect_uri,
             user_agent=self.hybrid_credentials.user_agent,
+            **url_overrides,
+            **self.requestor_overrides(),
         )
 
         self.praw_reddit = reddit
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+"""
+IOConfig for backtesting behaviours against dumps of reddit - rather than reddit itself.
+"""
+
+from typing import List, Optional, Sequence, Union
+
+import logging
+
+from mewbot.api.v1 import Input, Output
+
+from .inputs.dump import DEFAULT_DUMP_BATCH_SIZE, RedditDumpInput
+from .replay import RedditReplayConfigBase
+
+
+class RedditDumpIOConfig(RedditReplayConfigBase):
+    """
+    Replays comments and submissions from Pushshift style NDJSON dumps.
+
+    No credentials are needed - reddit is never contacted.
+    """
+
+    _dump_input: Optional[RedditDumpInput] = None
+
+    _dump_files: List[str]
+    # Only replay these subreddits - if None, everything in the dumps
+    _subreddits: Optional[List[str]] = None
+    # Times the pace the items were created at - if None, as fast as the behaviours keep up
+    _replay_speed: Optional[float] = None
+    _batch_size: int = DEFAULT_DUMP_BATCH_SIZE
+
+    _logger: logging.Logger
+
+    def __init__(self) -> None:
+        super().__init__()
+
+        self._dump_files = []
+        self._logger = logging.getLogger(__name__ + ":" + type(self).__name__)
+
+    @property
+    def display_name(self) -> str:
+        """
+        The name of this IOConfig - for display and printing purposes.
+
+        :return:
+        """
+        return str(type(self).__name__)
+
+    @property
+    def dump_files(self) -> List[str]:
+        """
+        Return the dumps being replayed.
+
+        :return:
+        """
+        return self._dump_files
+
+    @dump_files.setter
+    def dump_files(self, new_dump_files: List[str]) -> None:
+        """
+        Set the dumps to replay - .ndjson, .ndjson.gz or .ndjson.zst files.
+
+        :param new_dump_files:
+        :return:
+        """
+        self._dump_files = [str(path) for path in new_dump_files]
+
+    @property
+    def subreddits(self) -> Optional[List[str]]:
+        """
+        Return the subreddits replayed from the dumps - None for all of them.
+
+        :return:
+        """
+        return self._subreddits
+
+    @subreddits.setter
+    def subreddits(self, new_subreddits: Optional[List[str]]) -> None:
+        """
+        Only replay items from these subreddits.
+
+        :param new_subreddits: None to replay everything in the dumps
+        :return:
+        """
+        self._subreddits = None if new_subreddits is None else list(new_subreddits)
+
+    @property
+    def batch_size(self) -> int:
+        """
+        Return how many events are put on the wire together.
+
+        :return:
+        """
+        return self._batch_size
+
+    @batch_size.setter
+    def batch_size(self, new_batch_size: Union[str, int]) -> None:
+        """
+        Set how many events are put on the wire together.
+
+        :param new_batch_size:
+        :return:
+        """
+        if int(new_batch_size) < 1:
+            raise AttributeError(f"batch_size must be at least 1 - got {new_batch_size}")
+        self._batch_size = int(new_batch_size)
+
+    def get_inputs(self) -> Sequence[Input]:
+        """
+        Return the input replaying the dumps.
+
+        :return:
+        """
+        if self._dump_input is None:
+            self._dump_input = RedditDumpInput(
+                dump_files=self._dump_files,
+                subreddits=self._subreddits,
+                speed=self._replay_speed,
+                batch_size=self._batch_size,
+            )
+        return [self._dump_input]
+
+    def get_outputs(self) -> Sequence[Output]:
+        """
+        Nothing can be sent to a dump.
+
+        :return:
+        """
+        return []
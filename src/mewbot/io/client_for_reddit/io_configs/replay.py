@@ -0,0 +1,43 @@
+"""
+Settings shared by the IOConfigs which can replay reddit - from a recording or from dumps.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Union
+
+from mewbot.api.v1 import IOConfig
+
+
+class RedditReplayConfigBase(IOConfig):  # pylint: disable=abstract-method
+    """
+    Base class for IOConfigs which can replay what happened on reddit - at a chosen pace.
+    """
+
+    # Times the pace it happened at - None for as fast as possible
+    _replay_speed: Optional[float] = None
+
+    @property
+    def replay_speed(self) -> Optional[float]:
+        """
+        Return how many times faster than it happened reddit is replayed.
+
+        :return:
+        """
+        return self._replay_speed
+
+    @replay_speed.setter
+    def replay_speed(self, new_replay_speed: Optional[Union[str, float]]) -> None:
+        """
+        Set how many times faster than it happened reddit is replayed.
+
+        :param new_replay_speed: None to replay as fast as possible
+        :return:
+        """
+        if new_replay_speed is None:
+            self._replay_speed = None
+            return
+
+        if float(new_replay_speed) <= 0:
+            raise AttributeError(f"replay_speed must be positive - got {new_replay_speed}")
+        self._replay_speed = float(new_replay_speed)
@@ -0,0 +1,436 @@
+# SPDX-FileCopyrightText: 2023 Mewbot Developers <mewbot@quicksilver.london>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""
+Compact, immutable stand ins for asyncpraw comments and submissions - to carry on events.
+
+An asyncpraw object holds the Reddit instance - so an event carrying one keeps the whole
+object graph alive, and can't be pickled or handed to another process.
+A payload holds just the fields reddit sent which the behaviours are likely to read.
+It's built from the raw listing JSON (or from an asyncpraw object, without fetching anything).
+The asyncpraw object can be made again, on demand, with materialize.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, NoReturn, Optional, Tuple, Union
+
+import abc
+
+import asyncpraw  # type: ignore
+
+from .snapshots import author_name
+
+
+class RedditPayload(abc.ABC):
+    """
+    Base class for the payloads - immutable, slotted and picklable.
+
+    Subclasses declare their fields in __slots__ - and take them, by name, on init.
+    """
+
+    __slots__: Tuple[str, ...] = ()
+
+    # The prefix of the fullnames of the things this is a payload for - e.g. "t1"
+    KIND: str = ""
+
+    id: str
+    created_utc: Optional[float]
+
+    def _freeze(self, *values: Any) -> None:
+        """
+        Set every field - the only time they can be set.
+
+        :param values: In the order of __slots__
+        :return:
+        """
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> NoReturn:
+        """
+        Payloads are immutable.
+
+        :param name:
+        :param value:
+        :return:
+        """
+        raise AttributeError(f"{type(self).__name__} is immutable - cannot set {name}")
+
+    def __delattr__(self, name: str) -> NoReturn:
+        """
+        Payloads are immutable.
+
+        :param name:
+        :return:
+        """
+        raise AttributeError(f"{type(self).__name__} is immutable - cannot delete {name}")
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
+        """
+        Pickle as the class and its fields - __setattr__ can't be used to restore them.
+
+        :return:
+        """
+        return restore_payload, (
+            type(self),
+            {name: getattr(self, name) for name in self.__slots__},
+        )
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Payloads are equal if they have the same type and fields.
+
+        :param other:
+        :return:
+        """
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self) -> int:
+        """
+        Hash on the fullname - which identifies the thing.
+
+        :return:
+        """
+        return hash(self.fullname)
+
+    def __repr__(self) -> str:
+        """
+        Represent the payload - by what it's a payload for.
+
+        :return:
+        """
+        return f"{type(self).__name__}(fullname={self.fullname!r})"
+
+    @property
+    def fullname(self) -> str:
+        """
+        The fullname of the thing - e.g. t1_abc123.
+
+        :return:
+        """
+        return f"{self.KIND}_{self.id}"
+
+    def as_record(self) -> Dict[str, Any]:
+        """
+        The fields of the payload - as the raw JSON reddit sent.
+
+        :return:
+        """
+        record = {name: getattr(self, name) for name in self.__slots__}
+        record["name"] = self.fullname
+        return record
+
+    @abc.abstractmethod
+    def materialize(self, praw_reddit: asyncpraw.Reddit) -> Any:
+        """
+        Make the asyncpraw object for the thing - without making any requests.
+
+        If only the id is known, the object is lazy - and fetched when it's first used.
+        :param praw_reddit: The instance the object should belong to
+        :return:
+        """
+
+
+def restore_payload(payload_class: Any, fields: Dict[str, Any]) -> RedditPayload:
+    """
+    Make a payload again from its fields - when it's unpickled.
+
+    :param payload_class: e.g. CommentPayload
+    :param fields: By name
+    :return:
+    """
+    payload: RedditPayload = payload_class(**fields)
+    return payload
+
+
+class CommentPayload(RedditPayload):
+    """
+    A comment - as it was when it was seen.
+    """
+
+    __slots__ = (
+        "id",
+        "subreddit",
+        "author",
+        "author_fullname",
+        "body",
+        "parent_id",
+        "link_id",
+        "permalink",
+        "created_utc",
+        "edited",
+        "distinguished",
+        "stickied",
+    )
+
+    KIND = "t1"
+
+    subreddit: str
+    author: str  # The name of the author - "[deleted]" if there is none
+    author_fullname: Optional[str]
+    body: str
+    parent_id: str
+    link_id: str
+    permalink: str
+    edited: Union[bool, float]  # False - or when the comment was last edited
+    distinguished: Optional[str]
+    stickied: bool
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        id: str,  # pylint: disable=redefined-builtin
+        *,
+        subreddit: str = "",
+        author: str = "[deleted]",
+        author_fullname: Optional[str] = None,
+        body: str = "",
+        parent_id: str = "",
+        link_id: str = "",
+        permalink: str = "",
+        created_utc: Optional[float] = None,
+        edited: Union[bool, float] = False,
+        distinguished: Optional[str] = None,
+        stickied: bool = False,
+    ) -> None:
+        """
+        Record the fields of a comment.
+
+        :param id:
+        :param subreddit: The display name of the subreddit
+        :param author:
+        :param author_fullname:
+        :param body:
+        :param parent_id:
+        :param link_id: The fullname of the submission the comment is on
+        :param permalink:
+        :param created_utc: None if only the id is known
+        :param edited:
+        :param distinguished:
+        :param stickied:
+        """
+        self._freeze(
+            id,
+            subreddit,
+            author,
+            author_fullname,
+            body,
+            parent_id,
+            link_id,
+            permalink,
+            created_utc,
+            edited,
+            distinguished,
+            stickied,
+        )
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> CommentPayload:
+        """
+        Build the payload from the raw JSON of a comment - from a listing, or a dump.
+
+        :param record:
+        :return:
+        """
+        return cls(
+            id=record["id"],
+            subreddit=str(record.get("subreddit", "")),
+            author=record.get("author") or "[deleted]",
+            author_fullname=record.get("author_fullname"),
+            body=record.get("body", ""),
+            parent_id=record.get("parent_id", ""),
+            link_id=record.get("link_id", ""),
+            permalink=record.get("permalink", ""),
+            created_utc=(
+                None if record.get("created_utc") is None else float(record["created_utc"])
+            ),
+            edited=record.get("edited", False),
+            distinguished=record.get("distinguished"),
+            stickied=bool(record.get("stickied", False)),
+        )
+
+    @classmethod
+    def from_comment(cls, reddit_comment: Any) -> CommentPayload:
+        """
+        Build the payload from an asyncpraw comment - reading only what the listing sent.
+
+        :param reddit_comment:
+        :return:
+        """
+        author_fullname = getattr(reddit_comment, "author_fullname", None)
+        return cls(
+            id=reddit_comment.id,
+            subreddit=str(reddit_comment.subreddit),
+            author=author_name(reddit_comment),
+            author_fullname=None if author_fullname is None else str(author_fullname),
+            body=reddit_comment.body,
+            parent_id=reddit_comment.parent_id,
+            link_id=getattr(reddit_comment, "link_id", ""),
+            permalink=getattr(reddit_comment, "permalink", ""),
+            created_utc=float(reddit_comment.created_utc),
+            edited=reddit_comment.edited,
+            distinguished=getattr(reddit_comment, "distinguished", None),
+            stickied=bool(getattr(reddit_comment, "stickied", False)),
+        )
+
+    def materialize(self, praw_reddit: asyncpraw.Reddit) -> asyncpraw.models.Comment:
+        """
+        Make the asyncpraw comment - without making any requests.
+
+        :param praw_reddit:
+        :return:
+        """
+        if self.created_utc is None:
+            return asyncpraw.models.Comment(praw_reddit, id=self.id)
+        return asyncpraw.models.Comment(praw_reddit, _data=self.as_record())
+
+
+class SubmissionPayload(RedditPayload):
+    """
+    A submission - as it was when it was seen.
+    """
+
+    __slots__ = (
+        "id",
+        "subreddit",
+        "author",
+        "author_fullname",
+        "title",
+        "selftext",
+        "url",
+        "permalink",
+        "created_utc",
+        "edited",
+        "is_self",
+        "stickied",
+        "over_18",
+    )
+
+    KIND = "t3"
+
+    subreddit: str
+    author: str  # The name of the author - "[deleted]" if there is none
+    author_fullname: Optional[str]
+    title: str
+    selftext: str
+    url: str
+    permalink: str
+    edited: Union[bool, float]  # False - or when the submission was last edited
+    is_self: bool
+    stickied: bool
+    over_18: bool
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        id: str,  # pylint: disable=redefined-builtin
+        *,
+        subreddit: str = "",
+        author: str = "[deleted]",
+        author_fullname: Optional[str] = None,
+        title: str = "",
+        selftext: str = "",
+        url: str = "",
+        permalink: str = "",
+        created_utc: Optional[float] = None,
+        edited: Union[bool, float] = False,
+        is_self: bool = False,
+        stickied: bool = False,
+        over_18: bool = False,
+    ) -> None:
+        """
+        Record the fields of a submission.
+
+        :param id:
+        :param subreddit: The display name of the subreddit
+        :param author:
+        :param author_fullname:
+        :param title:
+        :param selftext:
+        :param url:
+        :param permalink:
+        :param created_utc: None if only the id is known
+        :param edited:
+        :param is_self:
+        :param stickied:
+        :param over_18:
+        """
+        self._freeze(
+            id,
+            subreddit,
+            author,
+            author_fullname,
+            title,
+            selftext,
+            url,
+            permalink,
+            created_utc,
+            edited,
+            is_self,
+            stickied,
+            over_18,
+        )
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> SubmissionPayload:
+        """
+        Build the payload from the raw JSON of a submission - from a listing, or a dump.
+
+        :param record:
+        :return:
+        """
+        return cls(
+            id=record["id"],
+            subreddit=str(record.get("subreddit", "")),
+            author=record.get("author") or "[deleted]",
+            author_fullname=record.get("author_fullname"),
+            title=record.get("title", ""),
+            selftext=record.get("selftext", ""),
+            url=record.get("url", ""),
+            permalink=record.get("permalink", ""),
+            created_utc=(
+                None if record.get("created_utc") is None else float(record["created_utc"])
+            ),
+            edited=record.get("edited", False),
+            is_self=bool(record.get("is_self", False)),
+            stickied=bool(record.get("stickied", False)),
+            over_18=bool(record.get("over_18", False)),
+        )
+
+    @classmethod
+    def from_submission(cls, reddit_submission: Any) -> SubmissionPayload:
+        """
+        Build the payload from an asyncpraw submission - reading only what the listing sent.
+
+        :param reddit_submission:
+        :return:
+        """
+        author_fullname = getattr(reddit_submission, "author_fullname", None)
+        return cls(
+            id=reddit_submission.id,
+            subreddit=str(reddit_submission.subreddit),
+            author=author_name(reddit_submission),
+            author_fullname=None if author_fullname is None else str(author_fullname),
+            title=reddit_submission.title,
+            selftext=reddit_submission.selftext,
+            url=reddit_submission.url,
+            permalink=getattr(reddit_submission, "permalink", ""),
+            created_utc=float(reddit_submission.created_utc),
+            edited=reddit_submission.edited,
+            is_self=bool(getattr(reddit_submission, "is_self", False)),
+            stickied=bool(getattr(reddit_submission, "stickied", False)),
+            over_18=bool(getattr(reddit_submission, "over_18", False)),
+        )
+
+    def materialize(self, praw_reddit: asyncpraw.Reddit) -> asyncpraw.models.Submission:
+        """
+        Make the asyncpraw submission - without making any requests.
+
+        :param praw_reddit:
+        :return:
+        """
+        if self.created_utc is None:
+            return asyncpraw.models.Submission(praw_reddit, id=self.id)
+        return asyncpraw.models.Submission(praw_reddit, _data=self.as_record())
@@ -0,0 +1,262 @@
+# SPDX-FileCopyrightText: 2023 Mewbot Developers <mewbot@quicksilver.london>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""
+Compact, detached records of the content of comments and submissions.
+
+An asyncpraw object carries a reference to the Reddit instance, lazy Redditor and Subreddit
+objects and every attribute reddit sent for it.
+When all that's needed later is what the content _was_ (e.g. before an edit) and who wrote it,
+a snapshot holds just that - at a fraction of the memory.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Optional, Union
+
+
+def author_name(reddit_item: Any) -> str:
+    """
+    Return the name of the author of a comment or submission - without fetching anything.
+
+    The author of deleted content is None in asyncpraw - reddit displays it as "[deleted]".
+    :param reddit_item:
+    :return:
+    """
+    author = reddit_item.author
+    if author is None:
+        return "[deleted]"
+    # Lazy Redditors know their name - str does not trigger a fetch
+    return str(author)
+
+
+def author_fullname(reddit_item: Any) -> Optional[str]:
+    """
+    Return the fullname (t2_...) of the author of a comment or submission - if the listing had it.
+
+    Listings carry the author's fullname alongside their name - so this never fetches anything.
+    :param reddit_item:
+    :return:
+    """
+    fullname = getattr(reddit_item, "author_fullname", None)
+    return None if fullname is None else str(fullname)
+
+
+class CommentSnapshot:
+    """
+    The content of a comment at the time it was seen.
+    """
+
+    __slots__ = ("id", "body", "author", "parent_id", "created_utc", "edited")
+
+    id: str
+    body: str
+    author: str  # The name of the author
+    parent_id: str
+    created_utc: float
+    edited: Union[bool, float]  # False - or when the comment was last edited
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        id: str,  # pylint: disable=redefined-builtin
+        *,
+        body: str,
+        author: str,
+        parent_id: str,
+        created_utc: float,
+        edited: Union[bool, float],
+    ) -> None:
+        """
+        Record the content of a comment.
+
+        :param id:
+        :param body:
+        :param author:
+        :param parent_id:
+        :param created_utc:
+        :param edited:
+        """
+        self.id = id
+        self.body = body
+        self.author = author
+        self.parent_id = parent_id
+        self.created_utc = created_utc
+        self.edited = edited
+
+    @classmethod
+    def from_comment(cls, reddit_comment: Any) -> CommentSnapshot:
+        """
+        Take a snapshot of an asyncpraw comment.
+
+        :param reddit_comment:
+        :return:
+        """
+        return cls(
+            id=reddit_comment.id,
+            body=reddit_comment.body,
+            author=author_name(reddit_comment),
+            parent_id=reddit_comment.parent_id,
+            created_utc=float(reddit_comment.created_utc),
+            edited=reddit_comment.edited,
+        )
+
+    def __repr__(self) -> str:
+        """
+        Represent the snapshot - with the body cut down.
+
+        :return:
+        """
+        return (
+            f"{type(self).__name__}(id={self.id!r}, author={self.author!r}, "
+            f"body={self.body[:40]!r}, edited={self.edited!r})"
+        )
+
+
+class SubmissionSnapshot:
+    """
+    The content of a submission at the time it was seen.
+    """
+
+    __slots__ = ("id", "title", "selftext", "author", "url", "created_utc", "edited")
+
+    id: str
+    title: str
+    selftext: str
+    author: str  # The name of the author
+    url: str
+    created_utc: float
+    edited: Union[bool, float]  # False - or when the submission was last edited
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        id: str,  # pylint: disable=redefined-builtin
+        *,
+        title: str,
+        selftext: str,
+        author: str,
+        url: str,
+        created_utc: float,
+        edited: Union[bool, float],
+    ) -> None:
+        """
+        Record the content of a submission.
+
+        :param id:
+        :param title:
+        :param selftext:
+        :param author:
+        :param url:
+        :param created_utc:
+        :param edited:
+        """
+        self.id = id
+        self.title = title
+        self.selftext = selftext
+        self.author = author
+        self.url = url
+        self.created_utc = created_utc
+        self.edited = edited
+
+    @classmethod
+    def from_submission(cls, reddit_submission: Any) -> SubmissionSnapshot:
+        """
+        Take a snapshot of an asyncpraw submission.
+
+        :param reddit_submission:
+        :return:
+        """
+        return cls(
+            id=reddit_submission.id,
+            title=reddit_submission.title,
+            selftext=reddit_submission.selftext,
+            author=author_name(reddit_submission),
+            url=reddit_submission.url,
+            created_utc=float(reddit_submission.created_utc),
+            edited=reddit_submission.edited,
+        )
+
+    def __repr__(self) -> str:
+        """
+        Represent the snapshot - with the selftext cut down.
+
+        :return:
+        """
+        return (
+            f"{type(self).__name__}(id={self.id!r}, author={self.author!r}, "
+            f"title={self.title[:40]!r}, edited={self.edited!r})"
+        )
+
+
+class AuthorSnapshot:
+    """
+    What is known about the author of some content - without fetching their Redditor.
+    """
+
+    __slots__ = ("name", "fullname", "created_utc", "link_karma", "comment_karma")
+
+    name: str
+    fullname: Optional[str]  # t2_... - None if the listing did not say
+    # Only known once the author has been looked up in bulk
+    created_utc: Optional[float]
+    link_karma: Optional[int]
+    comment_karma: Optional[int]
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        fullname: Optional[str] = None,
+        created_utc: Optional[float] = None,
+        link_karma: Optional[int] = None,
+        comment_karma: Optional[int] = None,
+    ) -> None:
+        """
+        Record what is known about an author.
+
+        :param name:
+        :param fullname:
+        :param created_utc:
+        :param link_karma:
+        :param comment_karma:
+        """
+        self.name = name
+        self.fullname = fullname
+        self.created_utc = created_utc
+        self.link_karma = link_karma
+        self.comment_karma = comment_karma
+
+    @property
+    def resolved(self) -> bool:
+        """
+        Return whether the author's details have been looked up - not just their name known.
+
+        :return:
+        """
+        return self.created_utc is not None
+
+    @classmethod
+    def from_partial_redditor(cls, partial_redditor: Any) -> AuthorSnapshot:
+        """
+        Take a snapshot of an asyncpraw PartialRedditor - from /api/user_data_by_account_ids.
+
+        :param partial_redditor:
+        :return:
+        """
+        return cls(
+            name=partial_redditor.name,
+            fullname=partial_redditor.fullname,
+            created_utc=float(partial_redditor.created_utc),
+            link_karma=getattr(partial_redditor, "link_karma", None),
+            comment_karma=getattr(partial_redditor, "comment_karma", None),
+        )
+
+    def __repr__(self) -> str:
+        """
+        Represent the snapshot.
+
+        :return:
+        """
+        return (
+            f"{type(self).__name__}(name={self.name!r}, fullname={self.fullname!r}, "
+            f"resolved={self.resolved!r})"
+        )
@@ -0,0 +1,366 @@
+"""
+A local stand in for the reddit API - so asyncpraw can be exercised without the network.
+
+The real asyncpraw/asyncprawcore HTTP path can be load tested against it.
+Serves (on both the www and the oauth side)
+ - /api/v1/access_token - any credentials get a token
+ - /api/v1/me
+ - /api/info - subreddits by sr_name and things by id
+ - /r/<sub>/about, /r/<sub>/comments, /r/<sub>/new - "a+b" multireddits too
+ - /user/<name>/comments, /user/<name>/submitted, /user/<name>/ (the overview)
+Every listing fills with new items at a configurable rate, as time passes on the server clock.
+Responses carry X-Ratelimit-* headers for a fixed window budget - and are answered with a 429
+once the budget is spent (or when one is forced).
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import collections
+import itertools
+import re
+import time
+
+from aiohttp import web
+
+# The budget reddit gives an OAuth client - per window
+DEFAULT_RATELIMIT_BUDGET: int = 600
+DEFAULT_RATELIMIT_WINDOW: int = 600
+
+# Items older than this many are dropped from a listing - as reddit does at about 1000
+MAX_LISTING_LENGTH: int = 1000
+
+LISTING_PATH = re.compile(
+    r"^(?:r/(?P<subreddit>[^/]+)/(?P<sort>comments|new)"
+    r"|user/(?P<redditor>[^/]+)(?:/(?P<section>comments|submitted|overview))?)$"
+)
+ABOUT_PATH = re.compile(r"^r/(?P<subreddit>[^/]+)/about$")
+
+
+def to_base36(number: int) -> str:
+    """
+    Render a number the way reddit renders ids.
+
+    :param number:
+    :return:
+    """
+    digits = []
+    while number:
+        number, digit = divmod(number, 36)
+        digits.append("0123456789abcdefghijklmnopqrstuvwxyz"[digit])
+    return "".join(reversed(digits)) or "0"
+
+
+class FakeRedditServer:  # pylint: disable=too-many-instance-attributes
+    """
+    Serves synthetic reddit traffic over HTTP.
+    """
+
+    def __init__(
+        self,
+        items_per_second: float = 10.0,
+        ratelimit_budget: int = DEFAULT_RATELIMIT_BUDGET,
+        ratelimit_window: int = DEFAULT_RATELIMIT_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Startup the server - it does not listen until started.
+
+        :param items_per_second: How fast each listing fills with new items
+        :param ratelimit_budget: Requests allowed in each rate limit window
+        :param ratelimit_window: Length of the rate limit window - in seconds
+        :param clock: Drives the traffic and the rate limit windows - can be replaced to
+                      control time in tests
+        """
+        self.items_per_second = items_per_second
+        self.ratelimit_budget = ratelimit_budget
+        self.ratelimit_window = ratelimit_window
+        self.clock = clock
+
+        self.requests: List[str] = []  # The path of every request served
+        self.rate_limited = 0  # Requests answered with a 429
+
+        self._started_at = clock()
+        self._ids = itertools.count(36**5)
+        # Keyed with the listing (e.g. "r/test/comments") - newest item last
+        self._listings: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._produced: Dict[str, int] = {}
+        self._things: Dict[str, Dict[str, Any]] = {}
+        self._window_started_at = clock()
+        self._window_used = 0
+        self._forced_rate_limits = 0
+
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Start listening.
+
+        :param host:
+        :param port: 0 to pick a free port
+        :return: The base URL to point asyncpraw at - for both reddit_url and oauth_url
+        """
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self.handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host=host, port=port)
+        await site.start()
+
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.base_url = f"http://{bound_host}:{bound_port}"
+        return self.base_url
+
+    async def close(self) -> None:
+        """
+        Stop listening.
+
+        :return:
+        """
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def force_rate_limit(self, count: int = 1) -> None:
+        """
+        Answer the next count API requests with a 429 - whatever the budget.
+
+        :param count:
+        :return:
+        """
+        self._forced_rate_limits += count
+
+    # -------------------
+    # TRAFFIC
+
+    def _make_thing(self, kind: str, subreddit: str, author: str) -> Dict[str, Any]:
+        """
+        Make a new comment (t1) or submission (t3) - as the JSON reddit would return.
+
+        :param kind:
+        :param subreddit:
+        :param author:
+        :return:
+        """
+        item_id = to_base36(next(self._ids))
+        fullname = f"{kind}_{item_id}"
+        data: Dict[str, Any] = {
+            "id": item_id,
+            "name": fullname,
+            "author": author,
+            "author_fullname": f"t2_{author}",
+            "subreddit": subreddit,
+            "subreddit_id": f"t5_{subreddit}",
+            "created_utc": time.time(),
+            "edited": False,
+            "distinguished": None,
+            "stickied": False,
+        }
+        if kind == "t1":
+            data.update(
+                body=f"comment {item_id}",
+                parent_id="t3_fake",
+                link_id="t3_fake",
+                is_submitter=False,
+                permalink=f"/r/{subreddit}/comments/fake/_/{item_id}/",
+            )
+        else:
+            data.update(
+                title=f"submission {item_id}",
+                selftext=f"submission body {item_id}",
+                url=f"https://reddit.invalid/{item_id}",
+                is_self=True,
+                permalink=f"/r/{subreddit}/comments/{item_id}/_/",
+            )
+
+        thing = {"kind": kind, "data": data}
+        self._things[fullname] = thing
+        return thing
+
+    def _listing(
+        self, key: str, kinds: Tuple[str, ...], subreddit: str, author: str
+    ) -> Deque[Dict[str, Any]]:
+        """
+        Return a listing - topped up with the items which have arrived since it was last read.
+
+        :param key: Identifies the listing
+        :param kinds: The kinds of thing the listing holds - taken in turn
+        :param subreddit: Where the items are - "a+b" spreads them over a and b
+        :param author: Who the items are by - "" for a different author each time
+        :return:
+        """
+        if key not in self._listings:
+            self._listings[key] = collections.deque(maxlen=MAX_LISTING_LENGTH)
+            self._produced[key] = 0
+
+        due = int((self.clock() - self._started_at) * self.items_per_second)
+        subreddits = subreddit.split("+")
+        listing = self._listings[key]
+        for number in range(self._produced[key], due):
+            listing.append(
+                self._make_thing(
+                    kinds[number % len(kinds)],
+                    subreddits[number % len(subreddits)],
+                    author or f"author_{number % 100}",
+                )
+            )
+        self._produced[key] = max(due, self._produced[key])
+        return listing
+
+    @staticmethod
+    def _page(
+        listing: Deque[Dict[str, Any]], limit: int, after: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Render a page of a listing - newest first, starting after the given fullname.
+
+        :param listing: Newest item last
+        :param limit:
+        :param after: The fullname to page back from - if any
+        :return:
+        """
+        newest_first = list(reversed(listing))
+        if after is not None:
+            names = [thing["data"]["name"] for thing in newest_first]
+            start = names.index(after) + 1 if after in names else len(newest_first)
+            newest_first = newest_first[start:]
+
+        children = newest_first[:limit]
+        return {
+            "kind": "Listing",
+            "data": {
+                "after": children[-1]["data"]["name"] if len(children) == limit else None,
+                "before": None,
+                "dist": len(children),
+                "children": children,
+            },
+        }
+
+    @staticmethod
+    def _subreddit(name: str) -> Dict[str, Any]:
+        """
+        Render a subreddit - every subreddit exists, and is public.
+
+        :param name:
+        :return:
+        """
+        return {
+            "kind": "t5",
+            "data": {
+                "display_name": name,
+                "id": name.lower(),
+                "name": f"t5_{name.lower()}",
+                "subreddit_type": "public",
+            },
+        }
+
+    # -------------------
+    # HTTP
+
+    def _ratelimit_headers(self) -> Dict[str, str]:
+        """
+        Spend a request from the budget - and describe what's left of it.
+
+        :return:
+        """
+        now = self.clock()
+        if now - self._window_started_at >= self.ratelimit_window:
+            self._window_started_at = now
+            self._window_used = 0
+
+        self._window_used += 1
+        seconds_to_reset = self.ratelimit_window - (now - self._window_started_at)
+        return {
+            "X-Ratelimit-Used": str(self._window_used),
+            "X-Ratelimit-Remaining": str(max(self.ratelimit_budget - self._window_used, 0)),
+            "X-Ratelimit-Reset": str(max(int(seconds_to_reset), 0)),
+        }
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        """
+        Answer any request.
+
+        :param request:
+        :return:
+        """
+        path = request.match_info["path"].strip("/")
+        self.requests.append(path)
+
+        if path == "api/v1/access_token":
+            return web.json_response(
+                {
+                    "access_token": "fake-access-token",
+                    "token_type": "bearer",
+                    "expires_in": 3600,
+                    "scope": "*",
+                }
+            )
+
+        headers = self._ratelimit_headers()
+        over_budget = self._window_used > self.ratelimit_budget
+        if self._forced_rate_limits or over_budget:
+            self._forced_rate_limits = max(self._forced_rate_limits - 1, 0)
+            self.rate_limited += 1
+            headers["Retry-After"] = headers["X-Ratelimit-Reset"]
+            return web.json_response(
+                {"message": "Too Many Requests", "error": 429}, status=429, headers=headers
+            )
+
+        body = self.route(path, request.query)
+        if body is None:
+            return web.json_response(
+                {"message": "Not Found", "error": 404}, status=404, headers=headers
+            )
+        return web.json_response(body, headers=headers)
+
+    def route(self, path: str, query: Any) -> Optional[Dict[str, Any]]:
+        """
+        Work out the JSON for an API path.
+
+        :param path: Without the leading or trailing slash
+        :param query: The query string parameters
+        :return: None if there's nothing at the path
+        """
+        if path == "api/v1/me":
+            return {"name": "fake_bot", "id": "fakebot", "created_utc": 0.0}
+
+        if path == "api/info":
+            if "sr_name" in query:
+                things = [self._subreddit(name) for name in query["sr_name"].split(",")]
+            else:
+                names = query.get("id", "").split(",")
+                things = [self._things[name] for name in names if name in self._things]
+            return {"kind": "Listing", "data": {"after": None, "children": things}}
+
+        about = ABOUT_PATH.match(path)
+        if about is not None:
+            return self._subreddit(about["subreddit"])
+
+        match = LISTING_PATH.match(path)
+        if match is None:
+            return None
+
+        limit = min(int(query.get("limit", 25)), 100)
+        after = query.get("after")
+
+        if match["subreddit"] is not None:
+            kinds: Tuple[str, ...] = ("t1",) if match["sort"] == "comments" else ("t3",)
+            listing = self._listing(path, kinds, match["subreddit"], author="")
+        else:
+            section = match["section"] or "overview"
+            section_kinds: Dict[str, Tuple[str, ...]] = {
+                "comments": ("t1",),
+                "submitted": ("t3",),
+            }
+            kinds = section_kinds.get(section, ("t1", "t3"))
+            listing = self._listing(
+                f"user/{match['redditor']}/{section}",
+                kinds,
+                f"u_{match['redditor']}",
+                author=match["redditor"],
+            )
+
+        return self._page(listing, limit, after)
@@ -0,0 +1,93 @@
+"""
+Stand ins for asyncpraw objects, listings and clocks - shared by the reddit tests.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+import time
+
+
+class FakeListing:  # pylint: disable=too-few-public-methods
+    """
+    Stands in for an asyncpraw listing function - returning pre-set pages, newest first.
+
+    A page can be an exception instead - which is raised when that page is asked for.
+    """
+
+    def __init__(self, pages: List[Union[List[Any], Exception]]) -> None:
+        """
+        Startup the listing - with the pages it will return.
+
+        :param pages: Returned (or raised) one per call - then empty pages
+        """
+        self.pages = pages
+        self.calls: List[Dict[str, Any]] = []
+
+    async def __call__(self, **kwargs: Any) -> AsyncIterator[Any]:
+        """
+        Return the next page - recording the arguments it was asked for with.
+
+        :param kwargs: e.g. limit and params
+        :return:
+        """
+        self.calls.append(kwargs)
+        page = self.pages.pop(0) if self.pages else []
+        if isinstance(page, Exception):
+            raise page
+        for item in page:
+            yield item
+
+
+class ManualClock:  # pylint: disable=too-few-public-methods
+    """
+    Server time which only moves when told to.
+    """
+
+    def __init__(self) -> None:
+        """
+        Startup the clock - at 0.
+        """
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """
+        Return the time.
+
+        :return:
+        """
+        return self.now
+
+
+def make_comment(  # pylint: disable=too-many-arguments
+    comment_id: str = "abc123",
+    body: str = "a comment",
+    edited: bool = False,
+    author: Any = "someone",
+    created_utc: Optional[float] = None,
+    **fields: Any,
+) -> Any:
+    """
+    Make something which looks enough like an asyncpraw comment for the subreddit input.
+
+    :param comment_id:
+    :param body:
+    :param edited:
+    :param author:
+    :param created_utc: Defaults to now
+    :param fields: Any other fields the comment should have - e.g. author_fullname
+    :return:
+    """
+    return SimpleNamespace(
+        id=comment_id,
+        fullname=f"t1_{comment_id}",
+        body=body,
+        edited=edited,
+        author=author,
+        parent_id="t3_xyz",
+        subreddit="test",
+        created_utc=time.time() if created_utc is None else created_utc,
+        **fields,
+    )
@@ -0,0 +1,137 @@
+"""
+Tests caching what is known about authors - without fetching their Redditors.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Iterable, List, Optional
+
+import asyncio
+
+import asyncprawcore  # type: ignore
+from reddit_fakes import make_comment
+
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+
+
+class FakeRedditors:  # pylint: disable=too-few-public-methods
+    """
+    Stands in for asyncpraw's Reddit.redditors - answering bulk lookups from a dict.
+
+    If given an exception, every lookup raises it instead.
+    """
+
+    def __init__(self, error: Optional[Exception] = None) -> None:
+        self.requests: List[List[str]] = []
+        self.error = error
+
+    async def partial_redditors(self, ids: Iterable[str]) -> AsyncIterator[Any]:
+        """
+        Return a partial redditor for each fullname.
+
+        :param ids:
+        :return:
+        """
+        ids = sorted(ids)
+        self.requests.append(ids)
+        if self.error is not None:
+            raise self.error
+        for fullname in ids:
+            yield SimpleNamespace(
+                fullname=fullname,
+                name=f"Author_{fullname}",
+                created_utc=1_500_000_000.0,
+                link_karma=1,
+                comment_karma=2,
+            )
+
+
+class TestAuthorCache:
+    """
+    Tests filling the author cache from listings - and in bulk.
+    """
+
+    @staticmethod
+    async def test_authors_are_cached_from_listings_and_looked_up_in_bulk() -> None:
+        """
+        Events take the author from the listing - their details are looked up in one request.
+
+        :return:
+        """
+        reddit_input = RedditSubredditInput(
+            praw_reddit=SimpleNamespace(redditors=FakeRedditors()),
+            subreddits=["test"],
+            resolve_authors=True,
+        )
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        reddit_input.bind(queue)
+
+        authors = [("Author_t2_a", "t2_a"), ("Author_t2_b", "t2_b"), ("author_t2_a", "t2_a")]
+        for index, (author, fullname) in enumerate(authors):
+            await reddit_input.subreddit_comment_to_event(
+                "test", make_comment(f"abc{index}", author=author, author_fullname=fullname)
+            )
+        await reddit_input.subreddit_comment_to_event(
+            "test", make_comment("abc3", author=None, author_fullname=None)
+        )
+
+        events: List[Any] = [queue.get_nowait() for _ in range(queue.qsize())]
+        assert [event.author_str for event in events] == [
+            "Author_t2_a",
+            "Author_t2_b",
+            "author_t2_a",
+            "[deleted]",
+        ]
+
+        state = reddit_input.reddit_state
+        assert state.unresolved_authors == {"t2_a", "t2_b"}
+        assert not state.author("AUTHOR_T2_A").resolved  # type: ignore
+
+        assert await reddit_input.resolve_author_batch() == 2
+        assert await reddit_input.resolve_author_batch() == 0
+        assert reddit_input.praw_reddit.redditors.requests == [["t2_a", "t2_b"]]
+
+        snapshot = state.author("author_t2_b")
+        assert snapshot is not None and snapshot.resolved
+        assert snapshot.comment_karma == 2
+
+    @staticmethod
+    async def test_failed_lookups_are_tried_again() -> None:
+        """
+        A lookup which fails should leave the authors waiting - not end the lookups.
+
+        :return:
+        """
+        reddit_input = RedditSubredditInput(
+            praw_reddit=SimpleNamespace(
+                redditors=FakeRedditors(
+                    asyncprawcore.exceptions.RequestException(OSError("down"), (), {})
+                )
+            ),
+            subreddits=["test"],
+            resolve_authors=True,
+        )
+        reddit_input.bind(asyncio.Queue())
+        await reddit_input.subreddit_comment_to_event(
+            "test", make_comment("abc0", author="someone", author_fullname="t2_a")
+        )
+
+        assert await reddit_input.resolve_author_batch() == 0
+        assert reddit_input.reddit_state.unresolved_authors == {"t2_a"}
+
+    @staticmethod
+    async def test_authors_are_not_collected_unless_resolved() -> None:
+        """
+        Without author resolution nothing should build up waiting to be looked up.
+
+        :return:
+        """
+        reddit_input = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+        reddit_input.bind(asyncio.Queue())
+        await reddit_input.subreddit_comment_to_event(
+            "test", make_comment("abc0", author="someone", author_fullname="t2_a")
+        )
+
+        assert reddit_input.reddit_state.author("someone") is not None
+        assert not reddit_input.reddit_state.unresolved_authors
@@ -0,0 +1,262 @@
+"""
+Tests replaying comments and submissions from NDJSON dumps.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import time
+
+import pytest
+
+from mewbot.io.client_for_reddit import RedditDumpIOConfig
+from mewbot.io.client_for_reddit.events import (
+    SubRedditCommentCreationInputEvent,
+    SubRedditSubmissionCreationInputEvent,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.dump import RedditDumpInput
+from mewbot.io.client_for_reddit.payloads import CommentPayload
+
+
+def comment_record(
+    item_id: str, created_utc: float, subreddit: str = "test"
+) -> Dict[str, Any]:
+    """
+    A comment - as Pushshift dumped them.
+
+    :param item_id:
+    :param created_utc:
+    :param subreddit:
+    :return:
+    """
+    return {
+        "id": item_id,
+        "body": f"comment {item_id}",
+        "author": "some_author",
+        "parent_id": "t3_parent",
+        "link_id": "t3_parent",
+        "subreddit": subreddit,
+        "created_utc": str(int(created_utc)),
+        "edited": False,
+    }
+
+
+def submission_record(
+    item_id: str, created_utc: float, subreddit: str = "test"
+) -> Dict[str, Any]:
+    """
+    A submission - as Pushshift dumped them.
+
+    :param item_id:
+    :param created_utc:
+    :param subreddit:
+    :return:
+    """
+    return {
+        "id": item_id,
+        "title": f"submission {item_id}",
+        "selftext": "",
+        "author": None,
+        "url": f"https://reddit.invalid/{item_id}",
+        "subreddit": subreddit,
+        "created_utc": created_utc,
+        "edited": False,
+    }
+
+
+def write_dump(name: str, records: List[Dict[str, Any]]) -> str:
+    """
+    Write records to a dump - compressed according to its name.
+
+    :param name: e.g. "RC.ndjson.gz"
+    :param records:
+    :return: The path to the dump
+    """
+    path = os.path.join(tempfile.mkdtemp(), name)
+    lines = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+    if name.endswith(".gz"):
+        with gzip.open(path, "wb") as dump:
+            dump.write(lines)
+    elif name.endswith(".zst"):
+        zstandard = pytest.importorskip("zstandard")
+        with open(path, "wb") as dump:
+            dump.write(zstandard.ZstdCompressor().compress(lines))
+    else:
+        with open(path, "wb") as dump:
+            dump.write(lines)
+    return path
+
+
+async def replay(reddit_input: RedditDumpInput) -> List[Any]:
+    """
+    Run the input until the dumps are exhausted - returning everything put on the wire.
+
+    :param reddit_input:
+    :return:
+    """
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+    reddit_input.bind(queue)
+    await reddit_input.run()
+    await asyncio.wait_for(reddit_input.finished.wait(), timeout=10)
+
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+class TestRedditDumpInput:
+    """
+    Tests reading dumps - and the events built from them.
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize("name", ["RC.ndjson", "RC.ndjson.gz", "RC.ndjson.zst"])
+    def test_dump_formats_are_read(name: str) -> None:
+        """
+        Every format should decode to the same records - skipping lines which are not JSON.
+
+        created_utc comes out as a float - however it was dumped.
+
+        :param name:
+        :return:
+        """
+        records = [comment_record("a", 100), comment_record("b", 101)]
+        path = write_dump(name, records)
+        if name == "RC.ndjson":
+            with open(path, "ab") as dump:
+                dump.write(b"not json\n\n")
+
+        reddit_input = RedditDumpInput([path])
+        assert list(reddit_input.read_dump(path)) == [
+            dict(record, created_utc=float(record["created_utc"])) for record in records
+        ]
+        assert reddit_input.records_skipped == (1 if name == "RC.ndjson" else 0)
+
+    @staticmethod
+    async def test_dumps_become_creation_events() -> None:
+        """
+        Comments and submissions should be merged in creation order - and filtered.
+
+        :return:
+        """
+        comments = write_dump(
+            "RC.ndjson.gz",
+            [
+                comment_record("c1", 100),
+                comment_record("c2", 102, subreddit="elsewhere"),
+                comment_record("c3", 104),
+            ],
+        )
+        submissions = write_dump(
+            "RS.ndjson", [submission_record("s1", 101), submission_record("s2", 103)]
+        )
+        reddit_input = RedditDumpInput([comments, submissions], subreddits=["Test"])
+
+        events = await replay(reddit_input)
+
+        assert [type(event) for event in events] == [
+            SubRedditCommentCreationInputEvent,
+            SubRedditSubmissionCreationInputEvent,
+            SubRedditSubmissionCreationInputEvent,
+            SubRedditCommentCreationInputEvent,
+        ]
+        assert isinstance(events[0].comment, CommentPayload)
+        assert events[0].top_level
+        assert events[0].creation_timestamp == 100.0
+        assert events[1].author_str == "[deleted]"
+        assert events[1].submission_title == "submission s1"
+        assert reddit_input.records_read == 5
+        assert reddit_input.events_sent == 4
+
+    @staticmethod
+    async def test_bad_records_are_skipped() -> None:
+        """
+        A record with no id - or a created_utc which is not a number - should not stop the replay.
+
+        :return:
+        """
+        no_id = comment_record("gone", 101)
+        del no_id["id"]
+        path = write_dump(
+            "RC.ndjson",
+            [
+                comment_record("a", 100),
+                no_id,
+                dict(comment_record("later", 102), created_utc="soon"),
+                comment_record("b", 103),
+            ],
+        )
+        reddit_input = RedditDumpInput([path])
+
+        events = await replay(reddit_input)
+
+        assert [event.comment.id for event in events] == ["a", "b"]
+        assert reddit_input.records_skipped == 2
+
+    @staticmethod
+    @pytest.mark.parametrize("name", ["RC.ndjson.gz", "RC.ndjson.zst"])
+    async def test_unreadable_dumps_still_finish(name: str) -> None:
+        """
+        A truncated dump should end where it breaks off - the other dumps are still replayed.
+
+        :param name:
+        :return:
+        """
+        path = write_dump(name, [comment_record(f"c{i}", 100 + i) for i in range(50)])
+        with open(path, "rb") as dump:
+            data = dump.read()
+        with open(path, "wb") as dump:
+            dump.write(data[: len(data) // 2])
+        others = write_dump("RS.ndjson", [submission_record("s1", 200)])
+        reddit_input = RedditDumpInput([path, others], batch_size=1)
+
+        events = await replay(reddit_input)
+
+        assert reddit_input.finished.is_set()
+        assert len(events) == reddit_input.events_sent < 51
+        assert isinstance(events[-1], SubRedditSubmissionCreationInputEvent)
+
+    @staticmethod
+    async def test_replay_is_time_scaled() -> None:
+        """
+        At 100x, items created a second apart should be replayed about 10ms apart.
+
+        :return:
+        """
+        path = write_dump("RC.ndjson", [comment_record(f"c{i}", 1000 + i) for i in range(6)])
+        reddit_input = RedditDumpInput([path], speed=100.0, batch_size=1)
+
+        started = time.monotonic()
+        events = await replay(reddit_input)
+
+        assert len(events) == 6
+        assert time.monotonic() - started >= 0.05
+
+    @staticmethod
+    def test_bad_settings_are_refused() -> None:
+        """
+        Unknown formats and non-positive speeds should be refused.
+
+        :return:
+        """
+        with pytest.raises(AttributeError):
+            RedditDumpInput(["RC.json"])
+        with pytest.raises(AttributeError):
+            RedditDumpInput(["RC.ndjson"], speed=0)
+
+        config = RedditDumpIOConfig()
+        with pytest.raises(AttributeError):
+            config.replay_speed = -1
+        config.dump_files = ["RC.ndjson.zst"]
+        config.replay_speed = "2"
+        (dump_input,) = config.get_inputs()
+        assert isinstance(dump_input, RedditDumpInput)
+        assert dump_input.speed == 2.0
+        assert not config.get_outputs()
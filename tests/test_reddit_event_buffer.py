@@ -0,0 +1,174 @@
+"""
+Tests the bounded buffer between the streams and the input queue.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+import asyncio
+
+from mewbot.api.v1 import InputEvent
+
+from mewbot.io.client_for_reddit.events import (
+    SubRedditCommentCreationInputEvent,
+    SubRedditCommentEditInputEvent,
+    SubRedditCommentInputEvent,
+    SubRedditCommentRemovedInputEvent,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.buffer import (
+    BUFFER_DROP_BY_PRIORITY,
+    BUFFER_DROP_OLDEST,
+    RedditEventBuffer,
+)
+from mewbot.io.client_for_reddit.snapshots import CommentSnapshot
+
+
+def make_event(event_type: Any, comment_id: str, pre_edit_body: Optional[str] = None) -> Any:
+    """
+    Make a comment event - with just enough filled in for the buffer.
+
+    :param event_type:
+    :param comment_id:
+    :param pre_edit_body: For edit events - the body before the edit
+    :return:
+    """
+    fields = {
+        "comment": SimpleNamespace(id=comment_id),
+        "subreddit": "test",
+        "parent_id": "t3_xyz",
+        "author_str": "someone",
+        "top_level": True,
+    }
+    if event_type is SubRedditCommentCreationInputEvent:
+        fields["creation_timestamp"] = 0.0
+    elif event_type is SubRedditCommentEditInputEvent:
+        fields["edit_timestamp"] = "0"
+        fields["pre_edit_message"] = CommentSnapshot(
+            id=comment_id,
+            body=str(pre_edit_body),
+            author="someone",
+            parent_id="t3_xyz",
+            created_utc=0.0,
+            edited=False,
+        )
+    else:
+        fields["remove_timestamp"] = "0"
+    return event_type(**fields)
+
+
+def comment_id_of(event: InputEvent) -> str:
+    """
+    Return the id of the comment a comment event is about.
+
+    :param event:
+    :return:
+    """
+    assert isinstance(event, SubRedditCommentInputEvent)
+    return str(event.comment.id)
+
+
+class TestRedditEventBuffer:
+    """
+    Tests the overflow policies and coalescing.
+    """
+
+    @staticmethod
+    def test_drop_oldest_keeps_the_newest() -> None:
+        """
+        A full buffer should make room by losing the oldest event - and count it.
+
+        :return:
+        """
+        buffer = RedditEventBuffer(capacity=2, policy=BUFFER_DROP_OLDEST)
+        for comment_id in ("a", "b", "c"):
+            assert buffer.offer(make_event(SubRedditCommentCreationInputEvent, comment_id))
+
+        assert [comment_id_of(buffer.get_nowait()) for _ in range(2)] == ["b", "c"]
+        assert buffer.stats()["dropped_by_type"] == {"SubRedditCommentCreationInputEvent": 1}
+
+    @staticmethod
+    def test_drop_by_priority_keeps_the_rare_events() -> None:
+        """
+        Creations should be lost before removals - and a creation arriving when only removals
+        are waiting should be lost itself.
+
+        :return:
+        """
+        buffer = RedditEventBuffer(capacity=2, policy=BUFFER_DROP_BY_PRIORITY)
+        buffer.offer(make_event(SubRedditCommentCreationInputEvent, "a"))
+        buffer.offer(make_event(SubRedditCommentRemovedInputEvent, "b"))
+        buffer.offer(make_event(SubRedditCommentRemovedInputEvent, "c"))
+        buffer.offer(make_event(SubRedditCommentCreationInputEvent, "d"))
+
+        assert [comment_id_of(buffer.get_nowait()) for _ in range(2)] == ["b", "c"]
+        assert buffer.stats()["dropped"] == 2
+
+    @staticmethod
+    def test_repeated_edits_are_coalesced() -> None:
+        """
+        A second edit of a waiting comment should replace the first - in its place in line,
+        with the content from before the first edit.
+
+        :return:
+        """
+        buffer = RedditEventBuffer(capacity=10, coalesce_edits=True)
+        buffer.offer(make_event(SubRedditCommentEditInputEvent, "a", pre_edit_body="v1"))
+        buffer.offer(make_event(SubRedditCommentCreationInputEvent, "b"))
+        buffer.offer(make_event(SubRedditCommentEditInputEvent, "a", pre_edit_body="v2"))
+
+        first = buffer.get_nowait()
+        assert isinstance(first, SubRedditCommentEditInputEvent)
+        assert first.pre_edit_message is not None and first.pre_edit_message.body == "v1"
+        assert comment_id_of(buffer.get_nowait()) == "b"
+        assert len(buffer) == 0
+        assert buffer.coalesced == 1
+
+    @staticmethod
+    async def test_block_waits_for_room() -> None:
+        """
+        With the block policy, a put into a full buffer should wait until an event is taken.
+
+        :return:
+        """
+        buffer = RedditEventBuffer(capacity=1)
+        await buffer.put(make_event(SubRedditCommentCreationInputEvent, "a"))
+
+        putting = asyncio.create_task(
+            buffer.put(make_event(SubRedditCommentCreationInputEvent, "b"))
+        )
+        await asyncio.sleep(0)
+        assert not putting.done()
+
+        assert comment_id_of(await buffer.get()) == "a"
+        await putting
+        assert comment_id_of(await buffer.get()) == "b"
+        assert buffer.blocked == 1
+
+    @staticmethod
+    async def test_slow_behaviours_leave_the_backlog_in_the_buffer() -> None:
+        """
+        Draining into the bot's unbounded queue should not outrun the behaviours.
+
+        The backlog has to stay in the buffer - where the policy drops the oldest events.
+        :return:
+        """
+        buffer = RedditEventBuffer(capacity=5, policy=BUFFER_DROP_OLDEST)
+        queue: asyncio.Queue[InputEvent] = asyncio.Queue()
+        draining = asyncio.create_task(buffer.drain_to(queue, handoff_limit=2))
+
+        taken: List[str] = []
+        for index in range(50):
+            await buffer.put(make_event(SubRedditCommentCreationInputEvent, f"c{index}"))
+            await asyncio.sleep(0)
+            if index % 10 == 0:
+                # The behaviours only keep up with a fraction of the events
+                taken.append(comment_id_of(await queue.get()))
+            assert queue.qsize() <= 2
+
+        draining.cancel()
+        await asyncio.gather(draining, return_exceptions=True)
+
+        assert buffer.stats()["dropped"] > 0
+        assert taken[0] == "c0"
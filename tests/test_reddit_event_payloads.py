@@ -0,0 +1,173 @@
+"""
+Tests the compact payloads events can carry - instead of asyncpraw objects.
+"""
+
+from __future__ import annotations
+
+from typing import Any, AsyncIterator, Dict, List
+
+import pickle
+
+import asyncpraw  # type: ignore
+import pytest
+
+from mewbot.io.client_for_reddit.events import (
+    SubRedditCommentCreationInputEvent,
+    SubRedditCommentDeletedInputEvent,
+    SubRedditCommentRemovedInputEvent,
+    SubRedditSubmissionDeletedInputEvent,
+    SubRedditSubmissionRemovedInputEvent,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+from mewbot.io.client_for_reddit.payloads import CommentPayload, SubmissionPayload
+
+COMMENT_RECORD: Dict[str, Any] = {
+    "id": "abc123",
+    "name": "t1_abc123",
+    "subreddit": "test",
+    "author": "someone",
+    "author_fullname": "t2_someone",
+    "body": "hello",
+    "parent_id": "t3_xyz",
+    "link_id": "t3_xyz",
+    "permalink": "/r/test/comments/xyz/_/abc123/",
+    "created_utc": 1700000000.0,
+    "edited": False,
+    "distinguished": None,
+    "stickied": False,
+    "score": 12,
+}
+
+SUBMISSION_RECORD: Dict[str, Any] = {
+    "id": "xyz",
+    "name": "t3_xyz",
+    "subreddit": "test",
+    "author": "[deleted]",
+    "title": "a submission",
+    "selftext": "[deleted]",
+    "url": "https://www.reddit.com/r/test/comments/xyz/_/",
+    "permalink": "/r/test/comments/xyz/_/",
+    "created_utc": 1700000000.0,
+    "edited": False,
+    "is_self": True,
+}
+
+
+@pytest.fixture(name="praw_reddit")
+async def fixture_praw_reddit() -> AsyncIterator[asyncpraw.Reddit]:
+    """
+    An asyncpraw instance which never makes a request.
+
+    :return:
+    """
+    praw_reddit = asyncpraw.Reddit(
+        client_id="id", client_secret="secret", user_agent="payload tests"
+    )
+    yield praw_reddit
+    await praw_reddit.close()
+
+
+class TestEventPayloads:
+    """
+    Tests building, pickling and materializing payloads.
+    """
+
+    @staticmethod
+    def test_payloads_are_immutable_and_picklable() -> None:
+        """
+        Fields can't be changed - and the payload survives a round trip through pickle.
+
+        :return:
+        """
+        payload = CommentPayload.from_record(COMMENT_RECORD)
+
+        with pytest.raises(AttributeError):
+            payload.body = "changed"
+        with pytest.raises(AttributeError):
+            payload.score = 12
+
+        assert not hasattr(payload, "__dict__")
+        assert pickle.loads(pickle.dumps(payload)) == payload
+        assert payload.fullname == "t1_abc123"
+        assert hash(payload) == hash(CommentPayload.from_record(COMMENT_RECORD))
+
+    @staticmethod
+    async def test_payload_from_praw_matches_record(praw_reddit: asyncpraw.Reddit) -> None:
+        """
+        A payload of a listing comment should match one built from its JSON - and materialize
+        back into the same comment, without a request.
+
+        :param praw_reddit:
+        :return:
+        """
+        comment = asyncpraw.models.Comment(praw_reddit, _data=dict(COMMENT_RECORD))
+        payload = CommentPayload.from_comment(comment)
+
+        assert payload == CommentPayload.from_record(COMMENT_RECORD)
+
+        materialized = payload.materialize(praw_reddit)
+        assert isinstance(materialized, asyncpraw.models.Comment)
+        assert materialized.body == "hello"
+        assert str(materialized.author) == "someone"
+        assert str(materialized.subreddit) == "test"
+
+    @staticmethod
+    async def test_id_only_payload_materializes_lazily(praw_reddit: asyncpraw.Reddit) -> None:
+        """
+        With only the id known, the asyncpraw object should be left to fetch itself.
+
+        :param praw_reddit:
+        :return:
+        """
+        materialized = SubmissionPayload(id="xyz").materialize(praw_reddit)
+
+        assert isinstance(materialized, asyncpraw.models.Submission)
+        assert materialized.id == "xyz"
+        assert not materialized._fetched  # pylint: disable=protected-access
+
+    @staticmethod
+    async def test_lightweight_events_carry_payloads(praw_reddit: asyncpraw.Reddit) -> None:
+        """
+        In lightweight mode every event should pickle - there's no Reddit instance on them.
+
+        :param praw_reddit:
+        :return:
+        """
+        reddit_input = RedditSubredditInput(
+            praw_reddit=praw_reddit, subreddits=["test"], lightweight_events=True
+        )
+        comment = asyncpraw.models.Comment(praw_reddit, _data=dict(COMMENT_RECORD))
+
+        event = reddit_input.build_comment_event("test", comment)
+
+        assert isinstance(event, SubRedditCommentCreationInputEvent)
+        assert isinstance(event.comment, CommentPayload)
+        assert pickle.loads(pickle.dumps(event)) == event
+        assert isinstance(reddit_input.lazy_comment("abc123"), CommentPayload)
+
+        # Deleted and removed events too - with the subreddit as a string
+        submission = asyncpraw.models.Submission(praw_reddit, _data=dict(SUBMISSION_RECORD))
+
+        events: List[Any] = [
+            reddit_input.build_subreddit_deleted_comment_on_submission_event(
+                "test", comment, True
+            ),
+            reddit_input.build_subreddit_removed_comment_on_submission_event(
+                "test", comment, True
+            ),
+            reddit_input.build_subreddit_deleted_submission_event("test", submission),
+            reddit_input.build_subreddit_removed_submission_event("test", submission),
+        ]
+
+        assert [type(gone_event) for gone_event in events] == [
+            SubRedditCommentDeletedInputEvent,
+            SubRedditCommentRemovedInputEvent,
+            SubRedditSubmissionDeletedInputEvent,
+            SubRedditSubmissionRemovedInputEvent,
+        ]
+        for gone_event in events:
+            assert isinstance(gone_event.subreddit, str)
+            assert gone_event.subreddit == "test"
+            assert pickle.loads(pickle.dumps(gone_event)) == gone_event
+        assert isinstance(events[0].comment, CommentPayload)
+        assert isinstance(events[2].submission, SubmissionPayload)
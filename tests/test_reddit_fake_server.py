@@ -0,0 +1,153 @@
+"""
+Tests the inputs over the real asyncpraw HTTP path - against a local stand in for reddit.
+"""
+
+from __future__ import annotations
+
+from typing import AsyncIterator, List
+
+import asyncio
+
+import asyncpraw  # type: ignore
+import pytest
+from fake_reddit_server import FakeRedditServer
+from reddit_fakes import ManualClock
+
+from mewbot.io.client_for_reddit import RedditBotPasswordIOConfig
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+
+
+@pytest.fixture(name="clock")
+def fixture_clock() -> ManualClock:
+    """
+    Server time for the fake reddit.
+
+    :return:
+    """
+    return ManualClock()
+
+
+@pytest.fixture(name="server")
+async def fixture_server(clock: ManualClock) -> AsyncIterator[FakeRedditServer]:
+    """
+    A fake reddit - ten new items a second in every listing, on the manual clock.
+
+    :param clock:
+    :return:
+    """
+    server = FakeRedditServer(items_per_second=10.0, clock=clock)
+    await server.start()
+    yield server
+    await server.close()
+
+
+@pytest.fixture(name="praw_reddit")
+async def fixture_praw_reddit(server: FakeRedditServer) -> AsyncIterator[asyncpraw.Reddit]:
+    """
+    An asyncpraw instance logged in to the fake reddit - through the password IOConfig.
+
+    :param server:
+    :return:
+    """
+    config = RedditBotPasswordIOConfig()
+    config.base_url = server.base_url
+    config.complete_authorization_flow()
+    yield config.praw_reddit
+    await config.praw_reddit.close()
+
+
+class TestFakeRedditServer:
+    """
+    Tests talking to the fake reddit through asyncpraw.
+    """
+
+    @staticmethod
+    async def test_login_uses_base_url(
+        server: FakeRedditServer, praw_reddit: asyncpraw.Reddit
+    ) -> None:
+        """
+        The token and the API requests should both go to the overridden URL.
+
+        :param server:
+        :param praw_reddit:
+        :return:
+        """
+        me = await praw_reddit.user.me()
+
+        assert me.name == "fake_bot"
+        assert server.requests[:2] == ["api/v1/access_token", "api/v1/me"]
+
+    @staticmethod
+    def test_base_url_must_be_http() -> None:
+        """
+        Anything which is not a URL should be refused.
+
+        :return:
+        """
+        config = RedditBotPasswordIOConfig()
+        with pytest.raises(AttributeError):
+            config.base_url = "localhost:8080"
+
+    @staticmethod
+    async def test_listing_pages_back_over_http(
+        clock: ManualClock, praw_reddit: asyncpraw.Reddit
+    ) -> None:
+        """
+        A listing which overflows between polls should be paged back through with "after".
+
+        :param clock:
+        :param praw_reddit:
+        :return:
+        """
+        reddit_input = RedditSubredditInput(praw_reddit=praw_reddit, subreddits=["test"])
+        queue: asyncio.Queue[object] = asyncio.Queue()
+        reddit_input.bind(queue)  # type: ignore
+
+        subreddit = await praw_reddit.subreddit("test")
+        stream = reddit_input.listing_stream(
+            subreddit.comments, "subreddit_comments:test", 10
+        )
+
+        clock.now = 0.5
+        assert len(await stream.poll()) == 5
+
+        # 25 more comments - too many for one page of 10
+        clock.now = 3.0
+        page = await stream.poll()
+        assert len(page) == 25
+        assert stream.stats()["items_recovered"] == 15
+
+        await reddit_input.comment_page_to_events(
+            [(comment.subreddit.display_name, comment) for comment in page]
+        )
+        assert queue.qsize() == 25
+
+        # The rate limit headers have been read
+        assert (
+            praw_reddit._core._rate_limiter.remaining  # pylint: disable=protected-access
+            is not None
+        )
+
+    @staticmethod
+    async def test_rate_limited_poll_is_skipped(
+        clock: ManualClock, server: FakeRedditServer, praw_reddit: asyncpraw.Reddit
+    ) -> None:
+        """
+        A 429 should skip the poll - and the items be picked up by the next one.
+
+        :param clock:
+        :param server:
+        :param praw_reddit:
+        :return:
+        """
+        reddit_input = RedditSubredditInput(praw_reddit=praw_reddit, subreddits=["test"])
+        subreddit = await praw_reddit.subreddit("test")
+        stream = reddit_input.listing_stream(subreddit.new, "subreddit_submissions:test")
+
+        clock.now = 1.0
+        server.force_rate_limit()
+        skipped: List[object] = await stream.poll()
+
+        assert not skipped
+        assert server.rate_limited == 1
+        assert len(await stream.poll()) == 10
@@ -0,0 +1,126 @@
+"""
+Tests choosing how to ingest a watchlist - and filtering r/all down to it.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, List
+
+import asyncio
+import logging
+import time
+
+import pytest
+
+from mewbot.io.client_for_reddit.events import SubRedditCommentCreationInputEvent
+from mewbot.io.client_for_reddit.io_configs.inputs.ingestion import (
+    cheapest_ingestion_mode,
+    estimate_ingestion_costs,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+
+
+class TestIngestionCosts:
+    """
+    Tests the request cost model for the ingestion modes.
+    """
+
+    @staticmethod
+    def test_small_watchlists_are_polled_directly() -> None:
+        """
+        A single quiet subreddit should not be worth reading the whole of reddit for.
+
+        :return:
+        """
+        costs = estimate_ingestion_costs(
+            subreddit_count=1, comments_per_second=0.01, submissions_per_second=0.001
+        )
+
+        assert costs["per-subreddit"] == costs["multireddit"]
+        assert cheapest_ingestion_mode(costs) == "per-subreddit"
+
+    @staticmethod
+    def test_huge_watchlists_use_the_firehose() -> None:
+        """
+        Thousands of busy subreddits should be cheaper to pick out of r/all.
+
+        :return:
+        """
+        costs = estimate_ingestion_costs(
+            subreddit_count=5000, comments_per_second=30.0, submissions_per_second=3.0
+        )
+
+        assert costs["multireddit"] < costs["per-subreddit"]
+        assert cheapest_ingestion_mode(costs) == "firehose"
+
+    @staticmethod
+    async def test_costs_are_logged_after_the_warm_up(
+        monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """
+        Nothing should be logged until the streams have had time to poll.
+
+        :return:
+        """
+        monkeypatch.setattr(
+            "mewbot.io.client_for_reddit.io_configs.inputs.subreddit."
+            "INGESTION_COSTS_LOG_INTERVAL",
+            0.05,
+        )
+        reddit_input = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+
+        with caplog.at_level(logging.INFO):
+            task = asyncio.create_task(reddit_input.monitor_ingestion_costs())
+            await asyncio.sleep(0.01)
+            assert "ingestion mode" not in caplog.text
+
+            await asyncio.sleep(0.1)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        assert "cheapest is per-subreddit" in caplog.text
+
+
+class TestFirehoseFilter:  # pylint: disable=too-few-public-methods
+    """
+    Tests keeping only the items from watched subreddits.
+    """
+
+    @staticmethod
+    async def test_only_watched_subreddits_are_kept() -> None:
+        """
+        Items from other subreddits should be counted and dropped - matching ignores case.
+
+        :return:
+        """
+        reddit_input = RedditSubredditInput(
+            praw_reddit=None, subreddits=["Test"], firehose_mode=True
+        )
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        reddit_input.bind(queue)
+
+        declared_subreddits = {"test": "Test"}
+        watched_subreddits = frozenset(declared_subreddits)
+        for index, subreddit in enumerate(("test", "python", "TEST", "AskReddit")):
+            comment = SimpleNamespace(
+                id=f"abc{index}",
+                fullname=f"t1_abc{index}",
+                body="a comment",
+                edited=False,
+                author="someone",
+                parent_id="t3_xyz",
+                subreddit=SimpleNamespace(display_name=subreddit),
+                created_utc=time.time(),
+            )
+            if reddit_input.firehose_filter(comment, watched_subreddits):
+                await reddit_input.subreddit_comment_to_event(
+                    reddit_input.resolve_declared_subreddit(comment, declared_subreddits),
+                    comment,
+                )
+
+        events: List[Any] = [queue.get_nowait() for _ in range(queue.qsize())]
+
+        assert [type(event) for event in events] == [SubRedditCommentCreationInputEvent] * 2
+        assert reddit_input.firehose_matched == 2
+        assert reddit_input.firehose_dropped == 2
@@ -0,0 +1,169 @@
+"""
+Tests the generic tools shared between the reddit inputs.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any
+
+import logging
+
+import pytest
+
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+from mewbot.io.client_for_reddit.io_configs.inputs.utils import (
+    FINGERPRINT_SIZE,
+    RENDER_LOGGER_NAME,
+    GenericRedditTools,
+    content_fingerprint,
+    log_rendering,
+)
+
+
+class TestMultiredditChunking:
+    """
+    Tests splitting a watchlist into multireddits.
+    """
+
+    @staticmethod
+    def test_small_watchlist_is_one_chunk() -> None:
+        """
+        A short list of subreddits should fit into a single multireddit.
+
+        :return:
+        """
+        chunks = GenericRedditTools.chunk_multireddit_names(["python", "thinkpad", "linux"])
+
+        assert chunks == [["python", "thinkpad", "linux"]]
+
+    @staticmethod
+    def test_chunks_respect_name_length() -> None:
+        """
+        No joined multireddit name should be longer than the limit.
+
+        :return:
+        """
+        subreddits = [f"subreddit_{i}" for i in range(200)]
+
+        chunks = GenericRedditTools.chunk_multireddit_names(subreddits, max_name_length=100)
+
+        assert all(len("+".join(chunk)) <= 100 for chunk in chunks)
+        assert [name for chunk in chunks for name in chunk] == subreddits
+
+    @staticmethod
+    def test_chunks_respect_subreddit_count() -> None:
+        """
+        No chunk should hold more than the maximum number of subreddits.
+
+        :return:
+        """
+        subreddits = [f"s{i}" for i in range(25)]
+
+        chunks = GenericRedditTools.chunk_multireddit_names(subreddits, max_subreddits=10)
+
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+
+    @staticmethod
+    def test_duplicates_are_dropped() -> None:
+        """
+        The same subreddit (in any case) should only be polled once.
+
+        :return:
+        """
+        chunks = GenericRedditTools.chunk_multireddit_names(["Python", "python", "linux"])
+
+        assert chunks == [["Python", "linux"]]
+
+    @staticmethod
+    def test_items_are_routed_to_the_declared_name() -> None:
+        """
+        Items from a multireddit should be reported against the subreddit name as declared.
+
+        :return:
+        """
+        item = SimpleNamespace(subreddit=SimpleNamespace(display_name="ThinkPad"))
+
+        declared = {"thinkpad": "thinkpad", "python": "Python"}
+
+        assert RedditSubredditInput.resolve_declared_subreddit(item, declared) == "thinkpad"
+
+
+class TestContentFingerprints:
+    """
+    Tests the fingerprints used to recognise content which has been seen before.
+    """
+
+    @staticmethod
+    def test_fingerprints_are_fixed_size() -> None:
+        """
+        However long the content, the fingerprint should be the same size.
+
+        :return:
+        """
+        short = GenericRedditTools.hash_comment(SimpleNamespace(id="a", body="hi"))
+        long = GenericRedditTools.hash_comment(SimpleNamespace(id="a", body="hi" * 10000))
+
+        assert len(short) == len(long) == FINGERPRINT_SIZE
+        assert short != long
+
+    @staticmethod
+    def test_field_boundaries_matter() -> None:
+        """
+        Moving text from one field to the next should change the fingerprint.
+
+        :return:
+        """
+        assert content_fingerprint("ab", "c") != content_fingerprint("a", "bc")
+        assert content_fingerprint("caf\u00e9") == content_fingerprint("cafe\u0301")
+
+
+class Untouchable:  # pylint: disable=too-few-public-methods
+    """
+    An item which fails the test if any of its attributes are read.
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        raise AssertionError(f"{name} was read")
+
+
+class TestRenderLogging:
+    """
+    Tests the opt-in debug rendering of polled items.
+    """
+
+    @staticmethod
+    def test_disabled_rendering_touches_nothing(caplog: pytest.LogCaptureFixture) -> None:
+        """
+        With the render logger off, not a single attribute of the item should be read.
+
+        :return:
+        """
+        with caplog.at_level(logging.INFO, logger=RENDER_LOGGER_NAME):
+            assert not log_rendering(GenericRedditTools.render_comment, Untouchable())
+
+    @staticmethod
+    def test_enabled_rendering_is_logged(caplog: pytest.LogCaptureFixture) -> None:
+        """
+        With the render logger at DEBUG, the rendering should be logged - unless sampled out.
+
+        :return:
+        """
+        submission = SimpleNamespace(
+            id="abc",
+            subreddit="test",
+            name="t3_abc",
+            title="a title",
+            author="someone",
+            stickied=False,
+            selftext="some text",
+            url="https://example.com",
+        )
+
+        with caplog.at_level(logging.DEBUG, logger=RENDER_LOGGER_NAME):
+            assert log_rendering(GenericRedditTools.render_submission, submission)
+            assert not log_rendering(
+                GenericRedditTools.render_submission, Untouchable(), sample_rate=0.0
+            )
+
+        assert "subreddit_submission.title: a title" in caplog.text
@@ -0,0 +1,278 @@
+"""
+Tests polling reddit listings for new items.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import asyncio
+import pathlib
+import time
+
+import asyncprawcore  # type: ignore
+import pytest
+from reddit_fakes import FakeListing
+
+from mewbot.io.client_for_reddit import RedditBotPasswordIOConfig
+from mewbot.io.client_for_reddit.io_configs.inputs.checkpoints import (
+    StreamCheckpoint,
+    StreamCheckpointStore,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.streams import (
+    AdaptivePollInterval,
+    RedditListingStream,
+)
+
+
+def make_item(item_id: int, created_utc: float = 0.0) -> SimpleNamespace:
+    """
+    Make something which looks enough like a comment for the stream.
+
+    :param item_id:
+    :param created_utc:
+    :return:
+    """
+    return SimpleNamespace(fullname=f"t1_{item_id}", id=str(item_id), created_utc=created_utc)
+
+
+class TestAdaptivePollInterval:
+    """
+    Tests choosing how long to wait between polls.
+    """
+
+    @staticmethod
+    def test_quiet_streams_back_off() -> None:
+        """
+        Each poll which finds nothing should double the interval - up to the max.
+
+        :return:
+        """
+        interval = AdaptivePollInterval(min_interval=1, max_interval=5)
+
+        assert [interval.record_poll([]) for _ in range(4)] == [2, 4, 5, 5]
+
+    @staticmethod
+    def test_busy_streams_are_polled_often() -> None:
+        """
+        A stream with many recent items should be polled at the min interval.
+
+        :return:
+        """
+        interval = AdaptivePollInterval(min_interval=1, max_interval=60)
+        for _ in range(3):
+            interval.record_poll([])
+
+        now = time.time()
+        assert interval.record_poll([now - i * 0.01 for i in range(50)]) == 1
+
+    @staticmethod
+    def test_bad_config_intervals_are_refused() -> None:
+        """
+        The config should refuse bad intervals - rather than the stream tasks failing later.
+
+        :return:
+        """
+        config = RedditBotPasswordIOConfig()
+        with pytest.raises(AttributeError):
+            config.min_poll_interval = 0
+        with pytest.raises(AttributeError):
+            config.max_poll_interval = -1
+
+        config.max_poll_interval = 1
+        config.min_poll_interval = 5
+        with pytest.raises(AttributeError):
+            config.get_inputs()
+
+
+class TestRedditListingStream:
+    """
+    Tests polling a listing.
+    """
+
+    @staticmethod
+    async def test_poll_returns_new_items_oldest_first() -> None:
+        """
+        Items already returned by an earlier poll should not be returned again.
+
+        :return:
+        """
+        listing = FakeListing(
+            [
+                [make_item(2), make_item(1)],
+                [make_item(3), make_item(2), make_item(1)],
+            ]
+        )
+        stream = RedditListingStream(listing, stream_key="test")
+
+        assert [item.id for item in await stream.poll()] == ["1", "2"]
+        assert [item.id for item in await stream.poll()] == ["3"]
+        assert listing.calls[0]["limit"] == 100
+
+    @staticmethod
+    async def test_failed_polls_are_skipped() -> None:
+        """
+        A poll which fails should find nothing - and the stream carry on with the next.
+
+        :return:
+        """
+        listing = FakeListing(
+            [
+                asyncprawcore.exceptions.RequestException(
+                    ConnectionResetError("dropped"), (), {}
+                ),
+                [make_item(1)],
+            ]
+        )
+        stream = RedditListingStream(listing, stream_key="test")
+
+        assert not await stream.poll()
+        assert [item.id for item in await stream.poll()] == ["1"]
+        assert len(listing.calls) == 2
+
+
+class TestGapDetection:
+    """
+    Tests recovering the items which fell off a busy listing between polls.
+    """
+
+    @staticmethod
+    async def test_overflowed_listing_is_paged_back() -> None:
+        """
+        A full page which does not meet the last poll should be extended back to it.
+
+        :return:
+        """
+        listing = FakeListing(
+            [
+                [make_item(2, 2), make_item(1, 1)],
+                [make_item(6, 6), make_item(5, 5)],
+                [make_item(4, 4), make_item(3, 3)],
+                [make_item(2, 2), make_item(1, 1)],
+            ]
+        )
+        stream = RedditListingStream(listing, stream_key="test", limit=2)
+
+        assert [item.id for item in await stream.poll()] == ["1", "2"]
+        assert [item.id for item in await stream.poll()] == ["3", "4", "5", "6"]
+        assert listing.calls[2]["params"] == {"after": "t1_5"}
+        assert stream.stats()["gaps_detected"] == 1
+        assert stream.stats()["items_recovered"] == 2
+        assert stream.stats()["items_lost"] == 0
+
+    @staticmethod
+    async def test_gaps_too_big_to_close_are_counted() -> None:
+        """
+        If paging back runs out before meeting the last poll, the gap should be reported.
+
+        :return:
+        """
+        now = time.time()
+        listing = FakeListing(
+            [
+                [make_item(2, now - 100), make_item(1, now - 101)],
+                [make_item(8, now - 1), make_item(7, now - 2)],
+                [make_item(6, now - 3), make_item(5, now - 4)],
+            ]
+        )
+        stream = RedditListingStream(
+            listing, stream_key="test", limit=2, max_backfill_pages=1
+        )
+        stream.poll_interval.record_poll([now - i for i in range(10)])
+
+        await stream.poll()
+        assert [item.id for item in await stream.poll()] == ["5", "6", "7", "8"]
+        assert stream.items_recovered == 2
+        assert stream.items_lost > 0
+
+
+class TestStreamCheckpoints:
+    """
+    Tests resuming a stream from a checkpoint written by an earlier run.
+    """
+
+    @staticmethod
+    def test_checkpoints_survive_a_restart(tmp_path: pathlib.Path) -> None:
+        """
+        A checkpoint saved by one store should be read back by the next.
+
+        :return:
+        """
+        store = StreamCheckpointStore(tmp_path / "checkpoints.json", save_interval=0)
+        store.update("test", "t1_abc", 1234.0)
+
+        reloaded = StreamCheckpointStore(tmp_path / "checkpoints.json")
+
+        assert reloaded.get("test") == StreamCheckpoint(fullname="t1_abc", created_utc=1234.0)
+        assert reloaded.get("other") is None
+
+    @staticmethod
+    async def test_resume_pages_back_to_the_checkpoint(tmp_path: pathlib.Path) -> None:
+        """
+        The first poll should page back to the checkpoint - and skip anything before it.
+
+        :return:
+        """
+        store = StreamCheckpointStore(tmp_path / "checkpoints.json", save_interval=0)
+        store.update("test", "t1_3", 3.0)
+
+        listing = FakeListing(
+            [
+                [make_item(i, i) for i in range(8, 5, -1)],
+                [make_item(i, i) for i in range(5, 2, -1)],
+                [make_item(i, i) for i in range(2, 0, -1)],
+            ]
+        )
+        stream = RedditListingStream(
+            listing, stream_key="test", checkpoint_store=store, limit=3
+        )
+
+        assert [item.id for item in await stream.poll()] == ["4", "5", "6", "7", "8"]
+        assert listing.calls[1]["params"] == {"after": "t1_6"}
+        assert len(listing.calls) == 2
+
+    @staticmethod
+    async def test_empty_first_poll_keeps_the_checkpoint(tmp_path: pathlib.Path) -> None:
+        """
+        A first poll which finds nothing (e.g. rate limited) should not lose the checkpoint.
+
+        :return:
+        """
+        store = StreamCheckpointStore(tmp_path / "checkpoints.json", save_interval=0)
+        store.update("test", "t1_3", 3.0)
+
+        listing = FakeListing([[], [make_item(i, i) for i in range(5, 0, -1)]])
+        stream = RedditListingStream(listing, stream_key="test", checkpoint_store=store)
+
+        assert not await stream.poll()
+        assert [item.id for item in await stream.poll()] == ["4", "5"]
+
+    @staticmethod
+    async def test_checkpoint_is_saved_when_the_stream_stops(tmp_path: pathlib.Path) -> None:
+        """
+        Progress not yet written (because of the save interval) should be saved on stopping.
+
+        :return:
+        """
+        store = StreamCheckpointStore(tmp_path / "checkpoints.json", save_interval=3600)
+        listing = FakeListing([[make_item(2, 2.0), make_item(1, 1.0)]])
+        stream = RedditListingStream(
+            listing,
+            stream_key="test",
+            checkpoint_store=store,
+            poll_interval=AdaptivePollInterval(min_interval=0.01, max_interval=0.01),
+        )
+
+        async def consume() -> None:
+            async for _ in stream:
+                pass
+
+        task = asyncio.get_running_loop().create_task(consume())
+        while len(listing.calls) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        reloaded = StreamCheckpointStore(tmp_path / "checkpoints.json")
+        assert reloaded.get("test") == StreamCheckpoint(fullname="t1_2", created_utc=2.0)
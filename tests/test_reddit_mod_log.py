@@ -0,0 +1,91 @@
+"""
+Tests reading removals off the mod log.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, List
+
+import asyncio
+import time
+
+from reddit_fakes import make_comment
+
+from mewbot.io.client_for_reddit.events import (
+    SubRedditCommentCreationInputEvent,
+    SubRedditCommentRemovedInputEvent,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.streams import item_fullname
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+
+
+def make_mod_action(action: str, target_fullname: str) -> Any:
+    """
+    Make something which looks enough like an asyncpraw ModAction.
+
+    :param action:
+    :param target_fullname:
+    :return:
+    """
+    return SimpleNamespace(
+        id="ModAction_0f1e2d3c",
+        action=action,
+        target_fullname=target_fullname,
+        target_author="mod_log_author",
+        target_title=None,
+        target_body="the body",
+        subreddit="Test",
+        created_utc=time.time(),
+    )
+
+
+class TestModLogRemovals:
+    """
+    Tests turning mod log entries into removal events.
+    """
+
+    @staticmethod
+    async def test_removal_is_joined_with_the_content_cache() -> None:
+        """
+        A removecomment action should report the author and parent from the cached comment.
+
+        :return:
+        """
+        reddit_input = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+        reddit_input.mod_log_subreddits.add("test")
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        reddit_input.bind(queue)
+
+        comment = make_comment(body="first")
+        await reddit_input.subreddit_comment_to_event("test", comment)
+
+        # With the mod log in charge, the "[removed]" body is ignored
+        comment.body = "[removed]"
+        await reddit_input.subreddit_comment_to_event("test", comment)
+
+        await reddit_input.mod_action_to_event(
+            "test", make_mod_action("removecomment", "t1_abc123")
+        )
+        await reddit_input.mod_action_to_event(
+            "test", make_mod_action("approvecomment", "t1_abc123")
+        )
+
+        events: List[Any] = [queue.get_nowait() for _ in range(queue.qsize())]
+
+        assert [type(event) for event in events] == [
+            SubRedditCommentCreationInputEvent,
+            SubRedditCommentRemovedInputEvent,
+        ]
+        assert events[1].author_str == "someone"
+        assert events[1].top_level
+        assert reddit_input.reddit_state.seen_comment_contents["abc123"] is None
+
+    @staticmethod
+    def test_mod_actions_are_paged_by_id() -> None:
+        """
+        Mod log entries have no fullname - so the listing is paged by their id.
+
+        :return:
+        """
+        assert item_fullname(make_mod_action("removelink", "t3_abc")) == "ModAction_0f1e2d3c"
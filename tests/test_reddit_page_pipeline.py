@@ -0,0 +1,116 @@
+"""
+Tests turning a whole page of stream items into events in one pass.
+"""
+
+from __future__ import annotations
+
+from typing import Any, List
+
+import asyncio
+
+from reddit_fakes import make_comment
+
+from mewbot.io.client_for_reddit.events import (
+    SubRedditCommentCreationInputEvent,
+    SubRedditCommentDeletedInputEvent,
+    SubRedditCommentEditInputEvent,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.builders import (
+    CONTENT_CREATED,
+    CONTENT_DELETED,
+    CONTENT_EDITED,
+    CONTENT_REMOVED,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+
+
+class TestPagePipeline:
+    """
+    Tests the batched pipeline stage.
+    """
+
+    @staticmethod
+    def test_comments_are_classified() -> None:
+        """
+        Each kind of change should be recognised - removals only when reddit blanks the author.
+
+        :return:
+        """
+        reddit_input = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+
+        assert [
+            reddit_input.classify_comment("test", comment)
+            for comment in (
+                make_comment("a", "hello"),
+                make_comment("a", "hello again", edited=True),
+                make_comment("a", "[deleted]", author="[deleted]"),
+                make_comment("b", "[removed]", author="[deleted]"),
+            )
+        ] == [CONTENT_CREATED, CONTENT_EDITED, CONTENT_DELETED, CONTENT_REMOVED]
+
+    @staticmethod
+    async def test_page_matches_item_at_a_time() -> None:
+        """
+        A page should produce the same events, in the same order, as the items one by one.
+
+        :return:
+        """
+        page = [
+            make_comment("a", "first"),
+            make_comment("b", "second"),
+            make_comment("a", "first - edited", edited=True),
+            make_comment("b", "[deleted]", author="[deleted]"),
+            make_comment("a", "first - edited", edited=False),
+        ]
+
+        batched = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+        batched_queue: asyncio.Queue[Any] = asyncio.Queue()
+        batched.bind(batched_queue)
+        assert (
+            await batched.comment_page_to_events(("test", comment) for comment in page) == 4
+        )
+
+        one_by_one = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+        one_by_one_queue: asyncio.Queue[Any] = asyncio.Queue()
+        one_by_one.bind(one_by_one_queue)
+        for comment in page:
+            await one_by_one.subreddit_comment_to_event("test", comment)
+
+        batched_events: List[Any] = [
+            batched_queue.get_nowait() for _ in range(batched_queue.qsize())
+        ]
+        one_by_one_events: List[Any] = [
+            one_by_one_queue.get_nowait() for _ in range(one_by_one_queue.qsize())
+        ]
+
+        assert [type(event) for event in batched_events] == [
+            SubRedditCommentCreationInputEvent,
+            SubRedditCommentCreationInputEvent,
+            SubRedditCommentEditInputEvent,
+            SubRedditCommentDeletedInputEvent,
+        ]
+        assert [type(event) for event in batched_events] == [
+            type(event) for event in one_by_one_events
+        ]
+        assert batched_events[2].pre_edit_message.body == "first"
+
+    @staticmethod
+    async def test_full_queue_waits_for_room() -> None:
+        """
+        A batch bigger than the room left in the queue should wait - not drop anything.
+
+        :return:
+        """
+        reddit_input = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+        queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=2)
+        reddit_input.bind(queue)
+
+        page = [("test", make_comment(f"c{i}", "hello")) for i in range(5)]
+        sending = asyncio.create_task(reddit_input.comment_page_to_events(page))
+
+        received: List[Any] = []
+        while len(received) < 5:
+            received.append(await queue.get())
+
+        assert await sending == 5
+        assert [event.comment.id for event in received] == [f"c{i}" for i in range(5)]
@@ -0,0 +1,99 @@
+"""
+Tests the scheduler which shares the reddit rate limit budget between streams.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import asyncpraw  # type: ignore
+import asyncprawcore  # type: ignore
+
+from mewbot.io.client_for_reddit.io_configs.inputs.scheduler import (
+    RedditRateLimitScheduler,
+)
+
+
+class TestRedditRateLimitScheduler:
+    """
+    Tests handing out request slots from the token bucket.
+    """
+
+    @staticmethod
+    def test_refill_rate_follows_headers() -> None:
+        """
+        The remaining budget should be spread evenly over the time left in the window.
+
+        :return:
+        """
+        scheduler = RedditRateLimitScheduler(reserved_requests=0)
+
+        scheduler.update_from_headers(remaining=100, seconds_to_reset=50)
+
+        assert 1.9 < scheduler.refill_rate <= 2.1
+
+    @staticmethod
+    async def test_budget_is_read_off_asyncpraw() -> None:
+        """
+        The budget asyncprawcore records should be picked up - from where it keeps it.
+
+        :return:
+        """
+        praw_reddit = asyncpraw.Reddit(
+            client_id="id", client_secret="secret", user_agent="scheduler tests"
+        )
+        scheduler = RedditRateLimitScheduler(praw_reddit=praw_reddit, reserved_requests=0)
+
+        scheduler.sync_with_praw()
+        assert scheduler.remaining is None
+
+        # As asyncprawcore sets it from the X-Ratelimit-* headers of a response
+        rate_limiter = praw_reddit._core._rate_limiter  # pylint: disable=protected-access
+        assert isinstance(rate_limiter, asyncprawcore.rate_limit.RateLimiter)
+        rate_limiter.remaining = 100.0
+        rate_limiter.reset_timestamp = time.time() + 50
+
+        scheduler.sync_with_praw()
+        await praw_reddit.close()
+
+        assert scheduler.remaining == 100.0
+        assert 1.9 < scheduler.refill_rate <= 2.1
+
+    @staticmethod
+    async def test_slots_are_handed_out_in_turn() -> None:
+        """
+        Streams waiting on the bucket should be served in the order they asked.
+
+        :return:
+        """
+        scheduler = RedditRateLimitScheduler(max_burst=1, default_budget=6000)
+
+        # Empty the bucket - so every stream has to wait its turn
+        await scheduler.acquire("warmup")
+
+        served = []
+
+        async def stream(name: str) -> None:
+            for _ in range(3):
+                await scheduler.acquire(name)
+                served.append(name)
+
+        await asyncio.gather(stream("a"), stream("b"))
+
+        assert served == ["a", "b", "a", "b", "a", "b"]
+        assert scheduler.granted["a"] == scheduler.granted["b"] == 3
+
+    @staticmethod
+    def test_rate_limited_empties_the_bucket() -> None:
+        """
+        After a 429 no stream should be able to take a slot straight away.
+
+        :return:
+        """
+        scheduler = RedditRateLimitScheduler()
+
+        scheduler.report_rate_limited(retry_after=5)
+
+        assert scheduler.rate_limited_count == 1
+        assert scheduler._tokens < 0  # pylint: disable=protected-access
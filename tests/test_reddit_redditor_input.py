@@ -0,0 +1,204 @@
+"""
+Tests watching redditors.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, List
+
+import asyncio
+import time
+
+from reddit_fakes import FakeListing
+
+from mewbot.io.client_for_reddit.events import (
+    RedditUserCreatedSubredditSubmissionInputEvent,
+    SubRedditCommentCreationInputEvent,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.redditor_poller import (
+    RedditRedditorPoller,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.redditors import RedditRedditorInput
+from mewbot.io.client_for_reddit.io_configs.inputs.revisit import RedditRevisitEngine
+from mewbot.io.client_for_reddit.io_configs.inputs.streams import (
+    AdaptivePollInterval,
+    RedditListingStream,
+)
+
+
+def make_overview_item(fullname: str) -> Any:
+    """
+    Make something which looks enough like a comment or submission from an overview.
+
+    :param fullname:
+    :return:
+    """
+    return SimpleNamespace(
+        id=fullname.partition("_")[2],
+        fullname=fullname,
+        body="a comment",
+        selftext="a submission",
+        title="a title",
+        url="https://example.com",
+        edited=False,
+        author="someone",
+        parent_id="t3_xyz",
+        subreddit="test",
+        created_utc=time.time(),
+    )
+
+
+class TestRedditorOverview:
+    """
+    Tests watching a redditor through their overview.
+    """
+
+    @staticmethod
+    async def test_overview_items_are_routed_by_type() -> None:
+        """
+        Comments and submissions from the overview should go down their own paths.
+
+        :return:
+        """
+        reddit_input = RedditRedditorInput(
+            praw_reddit=None, redditors=["someone"], overview_mode=True
+        )
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        reddit_input.bind(queue)
+
+        for fullname in ("t1_abc", "t3_def", "t5_ghi"):
+            await reddit_input.redditor_overview_item_to_event(make_overview_item(fullname))
+
+        events: List[Any] = [queue.get_nowait() for _ in range(queue.qsize())]
+
+        assert [type(event) for event in events] == [
+            SubRedditCommentCreationInputEvent,
+            RedditUserCreatedSubredditSubmissionInputEvent,
+        ]
+
+    @staticmethod
+    async def test_submissions_are_sent_once_and_revisited() -> None:
+        """
+        A submission seen by more than one stream should go on the wire once - and be tracked.
+
+        :return:
+        """
+        revisit_engine = RedditRevisitEngine(praw_reddit=None)
+        reddit_input = RedditRedditorInput(
+            praw_reddit=None, redditors=["someone"], revisit_engine=revisit_engine
+        )
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        reddit_input.bind(queue)
+
+        for _ in range(2):
+            await reddit_input.redditor_submission_to_event(make_overview_item("t3_def"))
+
+        assert queue.qsize() == 1
+        assert "t3_def" in revisit_engine
+
+
+class TestRedditRedditorPoller:
+    """
+    Tests polling many redditors from shared tasks.
+    """
+
+    @staticmethod
+    async def test_active_redditors_are_due_sooner() -> None:
+        """
+        A redditor who posted recently should come round again before a quiet one.
+
+        :return:
+        """
+        listings = {
+            "busy": FakeListing([[make_overview_item(f"t1_{i}") for i in range(10, 0, -1)]]),
+            "quiet": FakeListing([[]]),
+        }
+        poller = RedditRedditorPoller()
+        for name, listing in listings.items():
+            poller.add(
+                name,
+                RedditListingStream(
+                    listing,
+                    stream_key=name,
+                    limit=10,
+                    poll_interval=AdaptivePollInterval(
+                        min_interval=1, max_interval=600, target_items_per_poll=1
+                    ),
+                ),
+            )
+
+        handled: List[Any] = []
+
+        async def handler(reddit_item: Any) -> None:
+            handled.append(reddit_item)
+
+        for _ in listings:
+            redditor = poller.take_due()
+            assert redditor is not None
+            poller.reschedule(redditor, await poller.poll_redditor(redditor, handler))
+
+        assert len(handled) == 10
+        assert listings["busy"].calls[0]["limit"] == 10
+        # The busy redditor is due again after the min interval - the quiet one backs off
+        assert poller.take_due(now=time.monotonic() + 1.5) == "busy"
+        assert poller.take_due(now=time.monotonic() + 1.5) is None
+
+    @staticmethod
+    async def test_a_failing_handler_does_not_stop_the_worker() -> None:
+        """
+        An item the handler cannot deal with should be logged - and the rest polled.
+
+        :return:
+        """
+        poller = RedditRedditorPoller(concurrency=1)
+        for name in ("broken", "fine"):
+            poller.add(
+                name,
+                RedditListingStream(
+                    FakeListing([[make_overview_item(f"t1_{name}")]]),
+                    stream_key=name,
+                    limit=10,
+                    poll_interval=AdaptivePollInterval(min_interval=60, max_interval=600),
+                ),
+            )
+
+        handled: List[Any] = []
+
+        async def handler(reddit_item: Any) -> None:
+            if reddit_item.id == "broken":
+                raise ValueError("cannot handle this item")
+            handled.append(reddit_item)
+
+        worker = asyncio.create_task(poller.worker(handler))
+        await asyncio.sleep(0.05)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+        assert [reddit_item.id for reddit_item in handled] == ["fine"]
+        assert poller.stats()["waiting"] == 2
+
+    @staticmethod
+    async def test_a_cancelled_poll_puts_the_redditor_back() -> None:
+        """
+        Cancelling a worker part way through a poll should not lose the redditor.
+
+        :return:
+        """
+        poller = RedditRedditorPoller(concurrency=1)
+        poller.add(
+            "someone",
+            RedditListingStream(
+                FakeListing([[make_overview_item("t1_abc")]]), stream_key="someone", limit=10
+            ),
+        )
+
+        async def handler(_: Any) -> None:
+            await asyncio.sleep(60)
+
+        worker = asyncio.create_task(poller.worker(handler))
+        await asyncio.sleep(0.05)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+        assert poller.stats()["waiting"] == 1
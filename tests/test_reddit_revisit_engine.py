@@ -0,0 +1,211 @@
+"""
+Tests revisiting seen items - to catch them being edited, deleted or removed.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List
+
+import asyncio
+import time
+
+import asyncprawcore  # type: ignore
+from reddit_fakes import make_comment
+
+from mewbot.io.client_for_reddit.events import (
+    SubRedditCommentCreationInputEvent,
+    SubRedditCommentDeletedInputEvent,
+    SubRedditCommentEditInputEvent,
+    SubRedditSubmissionCreationInputEvent,
+    SubRedditSubmissionDeletedInputEvent,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.revisit import RedditRevisitEngine
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+
+
+class FakeInfoReddit:  # pylint: disable=too-few-public-methods
+    """
+    Stands in for asyncpraw.Reddit - answering info requests from a dict of items.
+    """
+
+    def __init__(self, items: Dict[str, Any]) -> None:
+        self.items = items
+        self.requests: List[List[str]] = []
+
+    def info(self, fullnames: List[str]) -> AsyncIterator[Any]:
+        """
+        Return the items which (still) exist.
+
+        :param fullnames:
+        :return:
+        """
+        self.requests.append(list(fullnames))
+
+        async def generator() -> AsyncIterator[Any]:
+            for fullname in fullnames:
+                if fullname in self.items:
+                    yield self.items[fullname]
+
+        return generator()
+
+
+class FailingInfoReddit:  # pylint: disable=too-few-public-methods
+    """
+    Stands in for asyncpraw.Reddit - every info request fails, as if the connection dropped.
+    """
+
+    def info(self, fullnames: List[str]) -> AsyncIterator[Any]:
+        """
+        Fail part way through the request.
+
+        :param fullnames:
+        :return:
+        """
+
+        async def generator() -> AsyncIterator[Any]:
+            raise asyncprawcore.exceptions.RequestException(
+                ConnectionResetError("dropped"), (), {"fullnames": fullnames}
+            )
+            yield  # pylint: disable=unreachable
+
+        return generator()
+
+
+class TestRedditRevisitEngine:
+    """
+    Tests scheduling and batching revisits.
+    """
+
+    @staticmethod
+    async def test_due_items_are_revisited_in_batches() -> None:
+        """
+        Items due at about the same time should share requests - 100 at a time.
+
+        :return:
+        """
+        now = time.time()
+        items = {
+            f"t1_{i}": SimpleNamespace(fullname=f"t1_{i}", created_utc=now - 60)
+            for i in range(150)
+        }
+        reddit = FakeInfoReddit(items)
+        engine = RedditRevisitEngine(reddit, revisit_delays=(60, 600))
+        for fullname, item in items.items():
+            engine.track(fullname, item.created_utc, context="test")
+
+        first = await engine.revisit(engine.due_batch())
+        second = await engine.revisit(engine.due_batch())
+
+        assert [len(request) for request in reddit.requests] == [100, 50]
+        assert len(first) + len(second) == 150
+        assert not engine.due_batch()
+        assert engine.next_due() == now + 540
+
+    @staticmethod
+    async def test_old_and_vanished_items_are_dropped() -> None:
+        """
+        Items past their last revisit - or which reddit no longer returns - stop being tracked.
+
+        :return:
+        """
+        now = time.time()
+        engine = RedditRevisitEngine(FakeInfoReddit({}), revisit_delays=(60, 600))
+
+        engine.track("t1_old", now - 3600, context="test")
+        engine.track("t1_new", now - 60, context="test")
+        assert "t1_old" not in engine
+
+        await engine.revisit(engine.due_batch())
+        assert len(engine) == 0
+
+    @staticmethod
+    async def test_failed_requests_are_retried() -> None:
+        """
+        A failed request should not stop the engine - the batch is due again a little later.
+
+        :return:
+        """
+        now = time.time()
+        engine = RedditRevisitEngine(FailingInfoReddit(), revisit_delays=(60, 600))
+        engine.track("t1_abc", now - 60, context="test")
+
+        assert not await engine.revisit(engine.due_batch())
+        assert "t1_abc" in engine
+        assert engine.next_due() >= now + engine.coalesce_seconds  # type: ignore
+
+
+class TestRevisitedItemsToEvents:
+    """
+    Tests putting changes found by revisits on the wire.
+    """
+
+    @staticmethod
+    async def test_changes_go_through_the_existing_paths() -> None:
+        """
+        An unchanged item should produce nothing - an edit or delete the usual events.
+
+        :return:
+        """
+        reddit_input = RedditSubredditInput(
+            praw_reddit=None,
+            subreddits=["test"],
+            revisit_engine=RedditRevisitEngine(praw_reddit=None),
+        )
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        reddit_input.bind(queue)
+
+        await reddit_input.subreddit_comment_to_event("test", make_comment(body="first"))
+        assert "t1_abc123" in reddit_input.revisit_engine  # type: ignore
+
+        await reddit_input.revisited_item_to_event("test", make_comment(body="first"))
+        await reddit_input.revisited_item_to_event(
+            "test", make_comment(body="second", edited=True)
+        )
+        await reddit_input.revisited_item_to_event(
+            "test", make_comment(body="[deleted]", edited=True, author="[deleted]")
+        )
+
+        events: List[Any] = [queue.get_nowait() for _ in range(queue.qsize())]
+
+        assert [type(event) for event in events] == [
+            SubRedditCommentCreationInputEvent,
+            SubRedditCommentEditInputEvent,
+            SubRedditCommentDeletedInputEvent,
+        ]
+        assert events[1].pre_edit_message.body == "first"
+        assert "t1_abc123" not in reddit_input.revisit_engine  # type: ignore
+
+    @staticmethod
+    async def test_deleted_link_post_is_reported() -> None:
+        """
+        A link post has no selftext to blank - its deletion shows only in the author.
+
+        :return:
+        """
+        reddit_input = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        reddit_input.bind(queue)
+
+        def make_link_post(author: str) -> Any:
+            return SimpleNamespace(
+                id="xyz",
+                fullname="t3_xyz",
+                title="a link",
+                selftext="",
+                url="https://example.invalid",
+                edited=False,
+                author=author,
+                subreddit="test",
+                created_utc=time.time(),
+            )
+
+        await reddit_input.subreddit_submission_to_event("test", make_link_post("someone"))
+        await reddit_input.revisited_item_to_event("test", make_link_post("someone"))
+        await reddit_input.revisited_item_to_event("test", make_link_post("[deleted]"))
+
+        events: List[Any] = [queue.get_nowait() for _ in range(queue.qsize())]
+        assert [type(event) for event in events] == [
+            SubRedditSubmissionCreationInputEvent,
+            SubRedditSubmissionDeletedInputEvent,
+        ]
@@ -0,0 +1,166 @@
+"""
+Tests the cached state of reddit shared between the inputs.
+"""
+
+from __future__ import annotations
+
+from typing import Any, List
+
+import asyncio
+import time
+
+import pytest
+from reddit_fakes import make_comment
+
+from mewbot.io.client_for_reddit.events import (
+    SubRedditCommentDeletedInputEvent,
+    SubRedditCommentEditInputEvent,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.state import (
+    BoundedCache,
+    RedditState,
+    SeenIdIndex,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+from mewbot.io.client_for_reddit.snapshots import CommentSnapshot
+
+
+class TestBoundedCache:
+    """
+    Tests the cache used to hold seen content.
+    """
+
+    @staticmethod
+    def test_least_recently_used_is_evicted() -> None:
+        """
+        When the cache is full, the entry used least recently should go.
+
+        :return:
+        """
+        cache: BoundedCache[str, int] = BoundedCache(capacity=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        assert cache["a"] == 1
+        cache["c"] = 3
+
+        assert list(cache) == ["a", "c"]
+        assert cache.evictions == 1
+
+    @staticmethod
+    def test_stale_entries_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Entries unused for longer than the ttl should be forgotten.
+
+        :return:
+        """
+        now = [1000.0]
+        monkeypatch.setattr(time, "monotonic", lambda: now[0])
+
+        cache: BoundedCache[str, int] = BoundedCache(capacity=10, ttl=60)
+        cache["a"] = 1
+        now[0] += 30
+        cache["b"] = 2
+        now[0] += 45
+
+        assert "a" not in cache
+        assert cache.get("b") == 2
+        assert cache.expirations == 1
+
+    @staticmethod
+    def test_unknown_cache_capacity_is_rejected() -> None:
+        """
+        A capacity for a cache which does not exist is probably a typo in the config.
+
+        :return:
+        """
+        with pytest.raises(AttributeError):
+            RedditState.create(target_subreddits=[], cache_capacities={"seen_coments": 10})
+
+
+class TestSeenIdIndex:
+    """
+    Tests the compact index of seen ids.
+    """
+
+    @staticmethod
+    def test_consecutive_ids_share_a_range() -> None:
+        """
+        Ids are stored as ranges - which merge when the gap between them is filled.
+
+        :return:
+        """
+        index = SeenIdIndex()
+        for reddit_id in ("a1", "a3", "a2", "t1_a5"):
+            assert index.add(reddit_id)
+        assert not index.add("t1_a1")
+
+        assert "a2" in index
+        assert "t1_a3" in index
+        assert "a4" not in index
+        assert len(index) == 4
+        assert index.range_count == 2
+
+    @staticmethod
+    def test_oldest_ids_are_evicted_in_bulk() -> None:
+        """
+        When the index is full, the lowest ranges should be dropped together.
+
+        :return:
+        """
+        index = SeenIdIndex(max_ranges=10, eviction_fraction=0.5)
+        for value in range(0, 22, 2):
+            index.add(value)
+
+        assert index.range_count == 6
+        assert 0 not in index and 8 not in index
+        assert 10 in index and 20 in index
+        assert index.evictions == 5
+
+        assert index.evict_below(15) == 3
+        assert 14 not in index and 16 in index
+
+
+class TestCommentCachePaths:
+    """
+    Tests the edit and delete paths of the subreddit input against the bounded caches.
+    """
+
+    @staticmethod
+    async def test_edit_then_delete() -> None:
+        """
+        An edit should report the original content - and a delete the original author.
+
+        :return:
+        """
+        reddit_input = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        reddit_input.bind(queue)
+
+        await reddit_input.subreddit_comment_to_event("test", make_comment(body="first"))
+        await reddit_input.subreddit_comment_to_event(
+            "test", make_comment(body="second", edited=True)
+        )
+        await reddit_input.subreddit_comment_to_event(
+            "test", make_comment(body="[deleted]", author="[deleted]")
+        )
+
+        events: List[Any] = [queue.get_nowait() for _ in range(queue.qsize())]
+
+        assert isinstance(events[1], SubRedditCommentEditInputEvent)
+        assert isinstance(events[1].pre_edit_message, CommentSnapshot)
+        assert events[1].pre_edit_message.body == "first"
+        assert isinstance(events[2], SubRedditCommentDeletedInputEvent)
+        assert events[2].author_str == "someone"
+
+    @staticmethod
+    def test_snapshot_keeps_only_the_content() -> None:
+        """
+        A snapshot should hold the content of the comment - and not the comment itself.
+
+        :return:
+        """
+        snapshot = CommentSnapshot.from_comment(make_comment(body="first"))
+
+        assert snapshot.body == "first"
+        assert snapshot.author == "someone"
+        assert not hasattr(snapshot, "__dict__")
@@ -0,0 +1,186 @@
+"""
+Tests recording and exposing the throughput and latency of the streams.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from reddit_fakes import FakeListing, make_comment
+
+from mewbot.io.client_for_reddit.io_configs.inputs.metrics import (
+    Histogram,
+    RedditInputMetrics,
+)
+from mewbot.io.client_for_reddit.io_configs.inputs.streams import RedditListingStream
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+
+
+class TestHistogram:
+    """
+    Tests counting observations into buckets.
+    """
+
+    @staticmethod
+    def test_buckets_are_cumulative() -> None:
+        """
+        Each bucket should count everything at or below its bound.
+
+        :return:
+        """
+        histogram = Histogram((1.0, 5.0))
+        for value in (0.5, 1.0, 3.0, 10.0):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["buckets"] == {"1.0": 2, "5.0": 3, "+Inf": 4}
+        assert snapshot["count"] == 4
+        assert snapshot["sum"] == 14.5
+        assert snapshot["p50"] == 1.0
+        assert snapshot["p99"] == float("inf")
+
+    @staticmethod
+    def test_empty_histogram_has_no_quantiles() -> None:
+        """
+        With nothing observed, there is nothing to estimate.
+
+        :return:
+        """
+        assert Histogram((1.0,)).quantile(0.5) is None
+
+
+class TestStreamMetrics:
+    """
+    Tests recording the polls of a stream.
+    """
+
+    @staticmethod
+    async def test_polls_are_recorded() -> None:
+        """
+        Each poll should be timed - and its new items counted, with their lag.
+
+        :return:
+        """
+        now = time.time()
+        metrics = RedditInputMetrics()
+        stream = RedditListingStream(
+            FakeListing(
+                [
+                    [
+                        make_comment("2", created_utc=now - 10),
+                        make_comment("1", created_utc=now - 20),
+                    ],
+                    [],
+                ]
+            ),
+            stream_key="test",
+            metrics=metrics.stream("test"),
+        )
+
+        await stream.poll()
+        await stream.poll()
+
+        snapshot = metrics.snapshot()["streams"]["test"]
+        assert snapshot["polls"] == 2
+        assert snapshot["empty_polls"] == 1
+        assert snapshot["items_fetched"] == 2
+        assert snapshot["poll_duration_seconds"]["count"] == 2
+        assert snapshot["ingestion_lag_seconds"]["count"] == 2
+        assert snapshot["ingestion_lag_seconds"]["buckets"]["5.0"] == 0
+        assert snapshot["ingestion_lag_seconds"]["buckets"]["30.0"] == 2
+
+    @staticmethod
+    async def test_events_are_recorded_by_type() -> None:
+        """
+        The events built from a page should be counted against its stream - and as sent.
+
+        :return:
+        """
+        reddit_input = RedditSubredditInput(praw_reddit=None, subreddits=["test"])
+        reddit_input.bind(asyncio.Queue())
+
+        now = time.time()
+        await reddit_input.comment_page_to_events(
+            [
+                ("test", make_comment("1", created_utc=now)),
+                ("test", make_comment("2", created_utc=now)),
+            ],
+            stream_key="subreddit_comments:test",
+        )
+
+        snapshot = reddit_input.metrics.snapshot()
+        assert snapshot["streams"]["subreddit_comments:test"]["events_emitted"] == {
+            "SubRedditCommentCreationInputEvent": 2
+        }
+        assert snapshot["events_sent"] == {"SubRedditCommentCreationInputEvent": 2}
+
+
+class TestPrometheusText:
+    """
+    Tests exposing the metrics to Prometheus.
+    """
+
+    @staticmethod
+    def test_text_format() -> None:
+        """
+        Every metric should be declared - and labelled with its stream.
+
+        :return:
+        """
+        metrics = RedditInputMetrics()
+        metrics.stream('odd"name').record_poll(0.2, [])
+
+        text = metrics.prometheus_text()
+        assert "# TYPE mewbot_reddit_polls_total counter" in text
+        assert 'mewbot_reddit_polls_total{stream="odd\\"name"} 1' in text
+        assert (
+            'mewbot_reddit_poll_duration_seconds_bucket{stream="odd\\"name",le="0.25"} 1'
+            in text
+        )
+        assert (
+            'mewbot_reddit_poll_duration_seconds_bucket{stream="odd\\"name",le="0.1"} 0'
+            in text
+        )
+        assert text.endswith("\n")
+
+    @staticmethod
+    async def test_served_over_http() -> None:
+        """
+        The endpoint should answer any request with the metrics - and only start once.
+
+        :return:
+        """
+        metrics = RedditInputMetrics()
+        metrics.stream("test").record_poll(0.2, [])
+
+        server = await metrics.serve(port=0)
+        assert await metrics.serve(port=0) is server
+        port = server.sockets[0].getsockname()[1]
+
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+        finally:
+            await metrics.close()
+
+        assert response.startswith(b"HTTP/1.1 200 OK\r\n")
+        assert b'mewbot_reddit_polls_total{stream="test"} 1' in response
+
+    @staticmethod
+    async def test_concurrent_serves_start_one_server() -> None:
+        """
+        Inputs sharing the metrics start together - only one of them should start the server.
+
+        :return:
+        """
+        metrics = RedditInputMetrics()
+
+        try:
+            first, second = await asyncio.gather(metrics.serve(port=0), metrics.serve(port=0))
+        finally:
+            await metrics.close()
+
+        assert first is second
@@ -0,0 +1,145 @@
+"""
+Tests resolving and validating the watched subreddits in bulk.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List
+
+import asyncio
+
+import asyncprawcore  # type: ignore
+
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit_cache import (
+    SUBREDDIT_BANNED,
+    SUBREDDIT_NOT_FOUND,
+    SUBREDDIT_OK,
+    SUBREDDIT_PRIVATE,
+    RedditSubredditCache,
+)
+
+
+def make_response(status: int) -> Any:
+    """
+    Make something which looks enough like an aiohttp response for asyncprawcore exceptions.
+
+    :param status:
+    :return:
+    """
+    return SimpleNamespace(
+        status=status, headers={"location": "https://www.reddit.com/subreddits/search.json"}
+    )
+
+
+class FakeSubredditReddit:
+    """
+    Stands in for asyncpraw.Reddit - public subreddits come back from info, the rest do not.
+    """
+
+    def __init__(self, public: List[str], errors: Dict[str, Exception]) -> None:
+        self.public = public
+        self.errors = errors
+        self.info_requests: List[List[str]] = []
+        self.fetches: List[str] = []
+
+    def info(self, subreddits: List[str]) -> AsyncIterator[Any]:
+        """
+        Return the public subreddits asked for.
+
+        :param subreddits:
+        :return:
+        """
+        self.info_requests.append(list(subreddits))
+
+        async def generator() -> AsyncIterator[Any]:
+            for name in subreddits:
+                if name.lower() in self.public:
+                    yield SimpleNamespace(display_name=name.lower(), subreddit_type="public")
+
+        return generator()
+
+    async def subreddit(self, name: str, fetch: bool = False) -> Any:
+        """
+        Fetch a single subreddit - raising as reddit would for the bad ones.
+
+        :param name:
+        :param fetch:
+        :return:
+        """
+        assert fetch
+        self.fetches.append(name)
+        await asyncio.sleep(0)
+        raise self.errors[name]
+
+
+class TestRedditSubredditCache:
+    """
+    Tests validating a watchlist.
+    """
+
+    @staticmethod
+    async def test_watchlist_is_validated_in_bulk() -> None:
+        """
+        Good subreddits take a request per 100 - only the bad ones are fetched one by one.
+
+        :return:
+        """
+        public = [f"sub{i}" for i in range(150)]
+        errors = {
+            "gone": asyncprawcore.exceptions.Redirect(make_response(302)),
+            "banned": asyncprawcore.exceptions.NotFound(make_response(404)),
+            "secret": asyncprawcore.exceptions.Forbidden(make_response(403)),
+        }
+        reddit = FakeSubredditReddit(public, errors)
+        cache = RedditSubredditCache(reddit, concurrency=2)
+
+        watchlist = ["Sub0"] + public[1:] + list(errors)
+        report = await cache.validate(watchlist)
+
+        assert [len(request) for request in reddit.info_requests] == [100, 53]
+        assert sorted(reddit.fetches) == sorted(errors)
+        assert report["Sub0"] == SUBREDDIT_OK
+        assert report["gone"] == SUBREDDIT_NOT_FOUND
+        assert report["banned"] == SUBREDDIT_BANNED
+        assert report["secret"] == SUBREDDIT_PRIVATE
+        assert cache.valid(watchlist) == ["Sub0"] + public[1:]
+
+        # Both streams of a subreddit share the one lookup
+        assert await cache.get("sub0") is await cache.get("SUB0")
+        assert await cache.get("banned") is None
+        assert cache.requests == 5
+
+    @staticmethod
+    async def test_concurrent_lookups_are_shared() -> None:
+        """
+        The comment and submission streams starting together should make one lookup between them.
+
+        :return:
+        """
+        reddit = FakeSubredditReddit(["test"], {})
+        cache = RedditSubredditCache(reddit)
+
+        comments, submissions = await asyncio.gather(cache.get("test"), cache.get("Test"))
+
+        assert comments is submissions is not None
+        assert reddit.info_requests == [["test"]]
+
+    @staticmethod
+    async def test_failed_fetches_are_left_unresolved() -> None:
+        """
+        A subreddit which could not be fetched should be left out - and the rest still resolved.
+
+        :return:
+        """
+        errors = {
+            "flaky": asyncprawcore.exceptions.ServerError(make_response(503)),
+            "gone": asyncprawcore.exceptions.Redirect(make_response(302)),
+        }
+        reddit = FakeSubredditReddit(["test"], errors)
+        cache = RedditSubredditCache(reddit)
+
+        report = await cache.validate(["test", "flaky", "gone"])
+
+        assert report == {"test": SUBREDDIT_OK, "gone": SUBREDDIT_NOT_FOUND}
+        assert cache.status("flaky") is None
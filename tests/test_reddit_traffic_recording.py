@@ -0,0 +1,233 @@
+"""
+Tests recording the traffic with reddit - and replaying it, offline.
+"""
+
+from __future__ import annotations
+
+from typing import List
+
+import gzip
+import json
+import os
+import tempfile
+
+import pytest
+from fake_reddit_server import FakeRedditServer
+from reddit_fakes import ManualClock
+
+from mewbot.io.client_for_reddit import RedditBotPasswordIOConfig
+from mewbot.io.client_for_reddit.io_configs.inputs.subreddit import RedditSubredditInput
+from mewbot.io.client_for_reddit.io_configs.recording import (
+    RecordingRequestor,
+    ReplayRequestor,
+    read_recording,
+)
+
+
+@pytest.fixture(name="recording_path")
+def fixture_recording_path() -> str:
+    """
+    Somewhere to put the recording.
+
+    :return:
+    """
+    return os.path.join(tempfile.mkdtemp(), "traffic.jsonl.gz")
+
+
+@pytest.fixture(name="recorded_ids")
+async def fixture_recorded_ids(recording_path: str) -> List[List[str]]:
+    """
+    Record three polls of a subreddit on a fake reddit.
+
+    :param recording_path:
+    :return: The ids of the comments returned by each poll
+    """
+    clock = ManualClock()
+    server = FakeRedditServer(items_per_second=10.0, clock=clock)
+    await server.start()
+
+    config = RedditBotPasswordIOConfig()
+    config.base_url = server.base_url
+    config.record_traffic_file = recording_path
+    config.complete_authorization_flow()
+
+    polls = await poll_comments(config, clock, [0.5, 1.0, 2.5])
+
+    await config.praw_reddit.close()
+    await server.close()
+    return polls
+
+
+async def poll_comments(
+    config: RedditBotPasswordIOConfig, clock: ManualClock, times: List[float]
+) -> List[List[str]]:
+    """
+    Poll the comments on r/test - moving the clock on to the given time before each poll.
+
+    :param config: With the authorization flow completed
+    :param clock: Of the server - if there is one
+    :param times:
+    :return: The ids of the comments returned by each poll
+    """
+    reddit_input = RedditSubredditInput(praw_reddit=config.praw_reddit, subreddits=["test"])
+    subreddit = await config.praw_reddit.subreddit("test")
+    stream = reddit_input.listing_stream(subreddit.comments, "subreddit_comments:test", 10)
+
+    polls = []
+    for now in times:
+        clock.now = now
+        polls.append([comment.id for comment in await stream.poll()])
+    return polls
+
+
+class TestTrafficRecording:
+    """
+    Tests recording traffic through asyncpraw - and playing it back.
+    """
+
+    @staticmethod
+    async def test_recording_is_written(
+        recording_path: str, recorded_ids: List[List[str]]
+    ) -> None:
+        """
+        Every exchange should be in the recording - without the token.
+
+        :param recording_path:
+        :param recorded_ids:
+        :return:
+        """
+        assert [len(ids) for ids in recorded_ids] == [5, 5, 15]
+
+        records = list(read_recording(recording_path))
+        assert records[0]["path"] == "api/v1/access_token"
+        assert json.loads(records[0]["body"])["access_token"] == "redacted"
+        assert all(record["status"] == 200 for record in records)
+        assert [record["at"] for record in records] == sorted(
+            record["at"] for record in records
+        )
+
+        with gzip.open(recording_path, "rt", encoding="utf-8") as recording:
+            assert "fake-access-token" not in recording.read()
+
+    @staticmethod
+    async def test_replay_returns_the_recorded_items(
+        recording_path: str, recorded_ids: List[List[str]]
+    ) -> None:
+        """
+        Replaying - as fast as possible, with no server - should return the same items.
+
+        :param recording_path:
+        :param recorded_ids:
+        :return:
+        """
+        config = RedditBotPasswordIOConfig()
+        config.replay_traffic_file = recording_path
+        config.replay_speed = None
+        config.complete_authorization_flow()
+
+        clock = ManualClock()
+        polls = await poll_comments(config, clock, [0.0, 0.0, 0.0])
+
+        requestor = config.praw_reddit._core._requestor  # pylint: disable=protected-access
+        assert isinstance(requestor, ReplayRequestor)
+        assert polls == recorded_ids
+        assert requestor.finished.is_set()
+        assert requestor.unmatched == 0
+        await config.praw_reddit.close()
+
+    @staticmethod
+    async def test_runs_append_to_the_recording(
+        recording_path: str, recorded_ids: List[List[str]]
+    ) -> None:
+        """
+        A second run should follow on from the first - not overwrite it.
+
+        :param recording_path:
+        :param recorded_ids:
+        :return:
+        """
+        first_run = list(read_recording(recording_path))
+        assert recorded_ids
+
+        clock = ManualClock()
+        server = FakeRedditServer(clock=clock)
+        await server.start()
+        config = RedditBotPasswordIOConfig()
+        config.base_url = server.base_url
+        config.record_traffic_file = recording_path
+        config.complete_authorization_flow()
+        await poll_comments(config, clock, [1.0])
+        await config.praw_reddit.close()
+        await server.close()
+
+        both_runs = list(read_recording(recording_path))
+        assert both_runs[: len(first_run)] == first_run
+        assert len(both_runs) > len(first_run)
+        assert both_runs[len(first_run)]["at"] >= first_run[-1]["at"]
+
+    @staticmethod
+    async def test_killed_runs_leave_a_readable_recording(
+        recording_path: str, recorded_ids: List[List[str]]
+    ) -> None:
+        """
+        A run killed part way through writing an exchange should lose only that exchange.
+
+        :param recording_path:
+        :param recorded_ids:
+        :return:
+        """
+        first_run = list(read_recording(recording_path))
+        assert recorded_ids
+
+        # As if the run was killed while writing the next exchange
+        torn = gzip.compress(json.dumps(first_run[-1]).encode("utf-8") + b"\n")
+        with open(recording_path, "ab") as recording:
+            recording.write(torn[: len(torn) // 2])
+        assert list(read_recording(recording_path)) == first_run
+
+        clock = ManualClock()
+        server = FakeRedditServer(clock=clock)
+        await server.start()
+        config = RedditBotPasswordIOConfig()
+        config.base_url = server.base_url
+        config.record_traffic_file = recording_path
+        config.complete_authorization_flow()
+        await poll_comments(config, clock, [1.0])
+        await config.praw_reddit.close()
+        await server.close()
+
+        both_runs = list(read_recording(recording_path))
+        assert both_runs[: len(first_run)] == first_run
+        assert len(both_runs) > len(first_run)
+
+    @staticmethod
+    def test_overrides_pick_the_requestor() -> None:
+        """
+        Replaying should take precedence over recording.
+
+        :return:
+        """
+        config = RedditBotPasswordIOConfig()
+        assert not config.requestor_overrides()
+
+        config.record_traffic_file = "traffic.jsonl.gz"
+        assert config.requestor_overrides()["requestor_class"] is RecordingRequestor
+
+        config.replay_traffic_file = "traffic.jsonl.gz"
+        config.replay_speed = "10"
+        overrides = config.requestor_overrides()
+        assert overrides["requestor_class"] is ReplayRequestor
+        assert overrides["requestor_kwargs"]["speed"] == 10.0
+
+    @staticmethod
+    def test_replay_speed_must_be_positive() -> None:
+        """
+        A speed of zero would never replay anything.
+
+        :return:
+        """
+        config = RedditBotPasswordIOConfig()
+        with pytest.raises(AttributeError):
+            config.replay_speed = 0
+        with pytest.raises(AttributeError):
+            ReplayRequestor("agent", recording_path="unused", speed=-1.0)